@@ -0,0 +1,94 @@
+"""Compare the verification of signatures in an event loop by blocking calls and by xmlsec.aio.Executor.
+
+A ticker task measures the longest stall of the event loop while the signatures are verified.
+
+Run from the repository root::
+
+    python benchmarks/bench_aio.py [documents] [size in KiB] [max_pending]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+DATA = os.path.join(os.path.dirname(__file__), os.pardir, 'tests', 'data')
+
+
+def make_document(key, size):
+    root = etree.Element('Document')
+    etree.SubElement(root, 'Data').text = 'x' * (size * 1024)
+    sign = xmlsec.template.create(root, consts.TransformExclC14N, consts.TransformRsaSha256)
+    root.append(sign)
+    ref = xmlsec.template.add_reference(sign, consts.TransformSha256)
+    xmlsec.template.add_transform(ref, consts.TransformEnveloped)
+    xmlsec.template.ensure_key_info(sign)
+    ctx = xmlsec.SignatureContext()
+    ctx.key = key
+    ctx.sign(sign)
+    return etree.tostring(root)
+
+
+def make_manager():
+    manager = xmlsec.KeysManager()
+    manager.add_key(xmlsec.Key.from_file(os.path.join(DATA, 'rsapub.pem'), format=consts.KeyDataFormatPem))
+    return manager
+
+
+async def ticker(stop, stalls):
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.001)
+        now = time.perf_counter()
+        stalls.append(now - last)
+        last = now
+
+
+async def verify_blocking(manager, signs, max_pending):
+    ctx = xmlsec.SignatureContext(manager)
+    for sign in signs:
+        ctx.verify(sign)
+        ctx.reset()
+        # the other tasks run only between the documents
+        await asyncio.sleep(0)
+
+
+async def verify_aio(manager, signs, max_pending):
+    with xmlsec.aio.Executor(manager, max_pending=max_pending) as executor:
+        await asyncio.gather(*[executor.verify(sign) for sign in signs])
+
+
+async def measure(verify, manager, signs, max_pending):
+    stop = asyncio.Event()
+    stalls = []
+    task = asyncio.create_task(ticker(stop, stalls))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await verify(manager, signs, max_pending)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await task
+    return elapsed, max(stalls, default=0.0)
+
+
+def main(documents, size, max_pending):
+    key = xmlsec.Key.from_file(os.path.join(DATA, 'rsakey.pem'), format=consts.KeyDataFormatPem)
+    source = make_document(key, size)
+    manager = make_manager()
+    for verify in (verify_blocking, verify_aio):
+        signs = [xmlsec.tree.find_node(etree.fromstring(source), consts.NodeSignature) for _ in range(documents)]
+        elapsed, stall = asyncio.run(measure(verify, manager, signs, max_pending))
+        print(f'{verify.__name__:>15}: {elapsed * 1e3:8.1f} ms for {documents} x {size} KiB, longest stall {stall * 1e3:6.2f} ms')
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 4096,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 8,
+    )
@@ -0,0 +1,43 @@
+"""Compare building a signature template per document with stamping a :class:`xmlsec.template.CompiledTemplate`.
+
+Run from the repository root::
+
+    python benchmarks/bench_compiled_template.py [documents]
+"""
+
+import sys
+import timeit
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+
+
+def build(root, uri):
+    sign = xmlsec.template.create(root, consts.TransformExclC14N, consts.TransformRsaSha256, ns='ds')
+    root.append(sign)
+    ref = xmlsec.template.add_reference(sign, consts.TransformSha256, uri=uri)
+    xmlsec.template.add_transform(ref, consts.TransformEnveloped)
+    xmlsec.template.add_transform(ref, consts.TransformExclC14N)
+    xmlsec.template.add_x509_data(xmlsec.template.ensure_key_info(sign))
+    return sign
+
+
+def main(documents):
+    tmpl = xmlsec.template.CompiledTemplate(build(etree.Element('Message'), None))
+
+    def built():
+        build(etree.Element('Message'), '#message')
+
+    def stamped():
+        tmpl.stamp(etree.Element('Message'), uri='#message')
+
+    for name, func in (('built', built), ('stamped', stamped)):
+        elapsed = min(timeit.repeat(func, number=documents, repeat=5))
+        print(f'{name:>8}: {elapsed / documents * 1e6:8.2f} us/template')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,69 @@
+"""Compare the decryption of documents with many encrypted fields one by one and with one call of decrypt_all.
+
+The documents are decrypted by one thread and by several threads at once, decrypt_all holds the GIL once per document.
+
+Run from the repository root::
+
+    python benchmarks/bench_decrypt_all.py [fields] [threads]
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+
+
+def make_document(key, fields):
+    root = etree.Element('Records')
+    for i in range(fields):
+        etree.SubElement(etree.SubElement(root, 'Record'), 'Secret').text = f'secret {i}'
+    ctx = xmlsec.EncryptionContext()
+    for secret in list(root.iter('Secret')):
+        ctx.key = key
+        template = xmlsec.template.encrypted_data_create(root, consts.TransformAes128Cbc, type=consts.TypeEncElement)
+        xmlsec.template.encrypted_data_ensure_cipher_value(template)
+        ctx.encrypt_xml(template, secret)
+        ctx.reset()
+    return etree.tostring(root)
+
+
+def decrypt_each(ctx, key, root):
+    for enc_data in root.findall(f'.//{{{consts.EncNs}}}EncryptedData'):
+        ctx.key = key
+        ctx.decrypt(enc_data)
+        ctx.reset()
+
+
+def decrypt_all(ctx, key, root):
+    ctx.key = key
+    ctx.decrypt_all(root)
+
+
+def run(decrypt, key, source):
+    ctx = xmlsec.EncryptionContext()
+    root = etree.fromstring(source)
+    decrypt(ctx, key, root)
+
+
+def main(fields, threads):
+    key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+    source = make_document(key, fields)
+    for workers in (1, threads):
+        with ThreadPoolExecutor(workers) as executor:
+            for decrypt in (decrypt_each, decrypt_all):
+                best = None
+                for _ in range(5):
+                    started = time.perf_counter()
+                    list(executor.map(run, [decrypt] * threads, [key] * threads, [source] * threads))
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                print(f'{decrypt.__name__:>12}: {best * 1e3:8.1f} ms for {threads} x {fields} fields, {workers} threads')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000, int(sys.argv[2]) if len(sys.argv) > 2 else 4)
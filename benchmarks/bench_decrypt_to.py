@@ -0,0 +1,87 @@
+"""Compare the peak memory and the time of :meth:`xmlsec.EncryptionContext.decrypt` and ``decrypt_to``.
+
+Each mode runs in a fresh process, which parses the encrypted document and decrypts it once,
+while a thread samples the resident memory of the process (Linux only).
+Run from the repository root::
+
+    python benchmarks/bench_decrypt_to.py [megabytes]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+data_dir = Path(__file__).resolve().parent.parent / 'tests' / 'data'
+
+
+def encrypt(size, path):
+    root = etree.Element('root')
+    enc_data = xmlsec.template.encrypted_data_create(root, consts.TransformAes128Cbc, ns='xenc')
+    xmlsec.template.encrypted_data_ensure_cipher_value(enc_data)
+    key_info = xmlsec.template.encrypted_data_ensure_key_info(enc_data, ns='dsig')
+    enc_key = xmlsec.template.add_encrypted_key(key_info, consts.TransformRsaOaep)
+    xmlsec.template.encrypted_data_ensure_cipher_value(enc_key)
+    manager = xmlsec.KeysManager()
+    manager.add_key(xmlsec.Key.from_file(str(data_dir / 'rsacert.pem'), consts.KeyDataFormatCertPem))
+    ctx = xmlsec.EncryptionContext(manager)
+    ctx.key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+    etree.ElementTree(ctx.encrypt_binary(enc_data, os.urandom(size))).write(path)
+
+
+def resident():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def sample(peak, done):
+    while not done.wait(0.001):
+        peak[0] = max(peak[0], resident())
+
+
+def decrypt(path, streaming, queue):
+    manager = xmlsec.KeysManager()
+    manager.add_key(xmlsec.Key.from_file(str(data_dir / 'rsakey.pem'), consts.KeyDataFormatPem))
+    ctx = xmlsec.EncryptionContext(manager)
+    enc_data = etree.parse(path, etree.XMLParser(huge_tree=True)).getroot()
+    baseline = resident()
+    peak, done = [baseline], threading.Event()
+    sampler = threading.Thread(target=sample, args=(peak, done))
+    sampler.start()
+    started = time.perf_counter()
+    with open(os.devnull, 'wb') as sink:
+        if streaming:
+            ctx.decrypt_to(enc_data, sink)
+        else:
+            sink.write(ctx.decrypt(enc_data))
+    elapsed = time.perf_counter() - started
+    done.set()
+    sampler.join()
+    queue.put((elapsed, peak[0] - baseline))
+
+
+def main(megabytes):
+    mp = get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'encrypted.xml')
+        encrypt(megabytes * 2**20, path)
+        print(f'payload: {megabytes} MiB, document: {os.path.getsize(path) / 2**20:.0f} MiB')
+        for name, streaming in (('decrypt', False), ('decrypt_to', True)):
+            queue = mp.Queue()
+            process = mp.Process(target=decrypt, args=(path, streaming, queue))
+            process.start()
+            elapsed, peak = queue.get()
+            process.join()
+            print(f'{name:>12}: {elapsed:6.2f} s, peak memory growth {peak / 2**20:7.1f} MiB')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
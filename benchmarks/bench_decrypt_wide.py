@@ -0,0 +1,51 @@
+"""Measure decrypt() of the fields of a wide document, where every field is a sibling of all others.
+
+The time per decrypt should not depend on the number of the siblings.
+
+Run from the repository root::
+
+    python benchmarks/bench_decrypt_wide.py [widths...]
+"""
+
+import sys
+import time
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+
+
+def make_document(key, width):
+    root = etree.Element('Fields')
+    for i in range(width):
+        etree.SubElement(root, 'Field').text = f'value {i}'
+    ctx = xmlsec.EncryptionContext()
+    for field in list(root):
+        ctx.key = key
+        template = xmlsec.template.encrypted_data_create(root, consts.TransformAes128Cbc, type=consts.TypeEncElement)
+        xmlsec.template.encrypted_data_ensure_cipher_value(template)
+        ctx.encrypt_xml(template, field)
+        ctx.reset()
+    return etree.tostring(root)
+
+
+def main(widths):
+    key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+    ctx = xmlsec.EncryptionContext()
+    for width in widths:
+        root = etree.fromstring(make_document(key, width))
+        fields = list(root)
+        started = time.perf_counter()
+        # from the last field to the first one, so index() scans most of the siblings
+        for field in reversed(fields):
+            ctx.key = key
+            ctx.decrypt(field)
+            ctx.reset()
+        elapsed = time.perf_counter() - started
+        print(f'{width:>8} siblings: {elapsed / width * 1e6:8.1f} us/decrypt')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000, 50000])
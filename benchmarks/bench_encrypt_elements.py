@@ -0,0 +1,71 @@
+"""Compare the field level encryption of a document by encrypt_xml for every field and by one call of encrypt_elements.
+
+Every field gets its own :xml:`<enc:EncryptedKey/>` with encrypt_xml, encrypt_elements shares one.
+
+Run from the repository root::
+
+    python benchmarks/bench_encrypt_elements.py [fields]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+data_dir = Path(__file__).resolve().parent.parent / 'tests' / 'data'
+
+
+def make_document(fields):
+    root = etree.Element('Customers')
+    header = etree.SubElement(root, 'Header')
+    for i in range(fields):
+        etree.SubElement(etree.SubElement(root, 'Customer'), 'SSN').text = f'{i:09d}'
+    return root, header
+
+
+def make_template(root):
+    template = xmlsec.template.encrypted_data_create(root, consts.TransformAes128Cbc, type=consts.TypeEncElement, ns='xenc')
+    xmlsec.template.encrypted_data_ensure_cipher_value(template)
+    key_info = xmlsec.template.encrypted_data_ensure_key_info(template, ns='dsig')
+    enc_key = xmlsec.template.add_encrypted_key(key_info, consts.TransformRsaOaep, id='session-key')
+    xmlsec.template.encrypted_data_ensure_cipher_value(enc_key)
+    return template, enc_key
+
+
+def encrypt_each(manager, fields):
+    root, _ = make_document(fields)
+    ctx = xmlsec.EncryptionContext(manager)
+    for node in list(root.iter('SSN')):
+        template, _ = make_template(root)
+        ctx.key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+        ctx.encrypt_xml(template, node)
+        ctx.reset()
+
+
+def encrypt_elements(manager, fields):
+    root, header = make_document(fields)
+    template, enc_key = make_template(root)
+    header.append(enc_key)
+    ctx = xmlsec.EncryptionContext(manager)
+    ctx.encrypt_elements(template, list(root.iter('SSN')), encrypted_key=enc_key)
+
+
+def main(fields):
+    manager = xmlsec.KeysManager()
+    manager.add_key(xmlsec.Key.from_file(str(data_dir / 'rsacert.pem'), consts.KeyDataFormatCertPem))
+    for encrypt in (encrypt_each, encrypt_elements):
+        best = None
+        for _ in range(5):
+            started = time.perf_counter()
+            encrypt(manager, fields)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        print(f'{encrypt.__name__:>16}: {best * 1e3:8.1f} ms for {fields} fields')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,58 @@
+"""Compare encrypting a payload for many recipients one by one and with ``encrypt_for_recipients``.
+
+Run from the repository root::
+
+    python benchmarks/bench_encrypt_for_recipients.py [megabytes]
+"""
+
+import os
+import sys
+import timeit
+from pathlib import Path
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+data_dir = Path(__file__).resolve().parent.parent / 'tests' / 'data'
+
+
+def template():
+    enc_data = xmlsec.template.encrypted_data_create(etree.Element('root'), consts.TransformAes256Cbc, ns='xenc')
+    xmlsec.template.encrypted_data_ensure_cipher_value(enc_data)
+    return enc_data
+
+
+def one_by_one(data, recipients):
+    for recipient in recipients:
+        enc_data = template()
+        key_info = xmlsec.template.encrypted_data_ensure_key_info(enc_data, ns='dsig')
+        enc_key = xmlsec.template.add_encrypted_key(key_info, consts.TransformRsaOaep)
+        xmlsec.template.encrypted_data_ensure_cipher_value(enc_key)
+        manager = xmlsec.KeysManager()
+        manager.add_key(recipient)
+        ctx = xmlsec.EncryptionContext(manager)
+        ctx.key = xmlsec.Key.generate(consts.KeyDataAes, 256, consts.KeyDataTypeSession)
+        ctx.encrypt_binary(enc_data, data)
+
+
+def at_once(data, recipients):
+    xmlsec.EncryptionContext().encrypt_for_recipients(template(), data, recipients)
+
+
+def main(megabytes):
+    data = os.urandom(megabytes * 2**20)
+    key = xmlsec.Key.from_file(str(data_dir / 'rsacert.pem'), consts.KeyDataFormatCertPem)
+    print(f'payload: {megabytes} MiB')
+    for count in (1, 10, 50):
+        recipients = [key] * count
+        for name, encrypt in (('one by one', one_by_one), ('at once', at_once)):
+            elapsed = min(
+                timeit.repeat(lambda encrypt=encrypt, recipients=recipients: encrypt(data, recipients), number=1, repeat=3)
+            )
+            print(f'{count:3} recipients, {name:>10}: {elapsed * 1e3:9.1f} ms')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
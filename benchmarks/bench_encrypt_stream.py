@@ -0,0 +1,86 @@
+"""Compare the peak memory and the time of :meth:`xmlsec.EncryptionContext.encrypt_binary` and ``encrypt_stream``.
+
+Each mode runs in a fresh process, which encrypts a file once and serializes the resulting document,
+while a thread samples the resident memory of the process (Linux only).
+Run from the repository root::
+
+    python benchmarks/bench_encrypt_stream.py [megabytes]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+data_dir = Path(__file__).resolve().parent.parent / 'tests' / 'data'
+
+
+def resident():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def sample(peak, done):
+    while not done.wait(0.001):
+        peak[0] = max(peak[0], resident())
+
+
+def encrypt(tmp, streaming, queue):
+    root = etree.Element('root')
+    enc_data = xmlsec.template.encrypted_data_create(root, consts.TransformAes128Cbc, ns='xenc')
+    cipher_path = os.path.join(tmp, 'cipher.bin')
+    if streaming:
+        xmlsec.template.encrypted_data_ensure_cipher_reference(enc_data, cipher_path)
+    else:
+        xmlsec.template.encrypted_data_ensure_cipher_value(enc_data)
+    key_info = xmlsec.template.encrypted_data_ensure_key_info(enc_data, ns='dsig')
+    enc_key = xmlsec.template.add_encrypted_key(key_info, consts.TransformRsaOaep)
+    xmlsec.template.encrypted_data_ensure_cipher_value(enc_key)
+    manager = xmlsec.KeysManager()
+    manager.add_key(xmlsec.Key.from_file(str(data_dir / 'rsacert.pem'), consts.KeyDataFormatCertPem))
+    ctx = xmlsec.EncryptionContext(manager)
+    ctx.key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+
+    baseline = resident()
+    peak, done = [baseline], threading.Event()
+    sampler = threading.Thread(target=sample, args=(peak, done))
+    sampler.start()
+    started = time.perf_counter()
+    with open(os.path.join(tmp, 'plain.bin'), 'rb') as source:
+        if streaming:
+            with open(cipher_path, 'wb') as sink:
+                ctx.encrypt_stream(enc_data, source, sink)
+        else:
+            ctx.encrypt_binary(enc_data, source.read())
+    etree.ElementTree(enc_data).write(os.path.join(tmp, 'encrypted.xml'))
+    elapsed = time.perf_counter() - started
+    done.set()
+    sampler.join()
+    queue.put((elapsed, peak[0] - baseline))
+
+
+def main(megabytes):
+    mp = get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'plain.bin'), 'wb') as plain:
+            plain.write(os.urandom(megabytes * 2**20))
+        print(f'payload: {megabytes} MiB')
+        for name, streaming in (('encrypt_binary', False), ('encrypt_stream', True)):
+            queue = mp.Queue()
+            process = mp.Process(target=encrypt, args=(tmp, streaming, queue))
+            process.start()
+            elapsed, peak = queue.get()
+            process.join()
+            print(f'{name:>15}: {elapsed:6.2f} s, peak memory growth {peak / 2**20:7.1f} MiB')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,59 @@
+"""Compare the verification of a signature with :xml:`<dsig:KeyName/>` by the default and the indexed
+:class:`xmlsec.KeysManager` holding many named keys.
+
+Run from the repository root::
+
+    python benchmarks/bench_indexed_keys_manager.py [number]
+"""
+
+import sys
+import timeit
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+
+
+def signed_document(key):
+    root = etree.Element('Envelope')
+    etree.SubElement(root, 'Data').text = 'payload'
+    sign = xmlsec.template.create(root, consts.TransformExclC14N, consts.TransformHmacSha256)
+    root.append(sign)
+    ref = xmlsec.template.add_reference(sign, consts.TransformSha256)
+    xmlsec.template.add_transform(ref, consts.TransformEnveloped)
+    xmlsec.template.add_key_name(xmlsec.template.ensure_key_info(sign), key.name)
+    ctx = xmlsec.SignatureContext()
+    ctx.key = key
+    ctx.sign(sign)
+    return sign
+
+
+def main(number):
+    for size in (10, 1000, 100000):
+        keys = []
+        for i in range(size):
+            key = xmlsec.Key.from_binary_data(consts.KeyDataHmac, b'secret %d' % i)
+            key.name = f'tenant-{i}'
+            keys.append(key)
+        # the last added key is the worst case for the scan of the list
+        sign = signed_document(keys[-1])
+
+        for indexed in (False, True):
+            manager = xmlsec.KeysManager(indexed=indexed)
+            for key in keys:
+                manager.add_key(key)
+            ctx = xmlsec.SignatureContext(manager)
+
+            def verify(ctx=ctx, sign=sign):
+                ctx.verify(sign)
+                ctx.reset()
+
+            elapsed = min(timeit.repeat(verify, number=number, repeat=5))
+            name = 'indexed' if indexed else 'default'
+            print(f'{size:>7} keys {name:>8}: {elapsed / number * 1e6:10.1f} us/verify')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
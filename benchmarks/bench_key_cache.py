@@ -0,0 +1,53 @@
+"""Compare loading the same key again with :meth:`xmlsec.Key.from_file` and with :class:`xmlsec.KeyCache`.
+
+The password protected key is made by the ``openssl`` command, the benchmark is skipped for it if there is none.
+
+Run from the repository root::
+
+    python benchmarks/bench_key_cache.py [loads]
+"""
+
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+import xmlsec
+
+consts = xmlsec.constants
+data_dir = Path(__file__).resolve().parent.parent / 'tests' / 'data'
+
+
+def encrypt_key(directory):
+    path = Path(directory) / 'rsakey-encrypted.pem'
+    command = [
+        'openssl', 'pkcs8', '-topk8', '-v2', 'aes-256-cbc', '-iter', '100000',
+        '-in', str(data_dir / 'rsakey.pem'), '-out', str(path), '-passout', 'pass:secret',
+    ]  # fmt: skip
+    subprocess.run(command, check=True, capture_output=True)
+    return path
+
+
+def main(loads):
+    with tempfile.TemporaryDirectory() as directory:
+        keys = [('plain PEM', data_dir / 'rsakey.pem', None)]
+        if shutil.which('openssl'):
+            keys.append(('PKCS#8 with password', encrypt_key(directory), 'secret'))
+        for title, path, password in keys:
+            cache = xmlsec.KeyCache()
+
+            def uncached(path=path, password=password):
+                xmlsec.Key.from_file(str(path), consts.KeyDataFormatPem, password)
+
+            def cached(path=path, password=password, cache=cache):
+                cache.from_file(str(path), consts.KeyDataFormatPem, password)
+
+            for run in (uncached, cached):
+                elapsed = min(timeit.repeat(run, number=loads, repeat=3))
+                print(f'{title:>20} {run.__name__:>8}: {elapsed / loads * 1e6:10.1f} us per key')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,55 @@
+"""Compare loading a password protected PKCS#8 key file and loading the key from
+:meth:`xmlsec.Key.export`, e.g. in every worker of a process pool.
+
+Requires the ``openssl`` command to generate the key. Run from the repository root::
+
+    python benchmarks/bench_key_export.py [number]
+"""
+
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import xmlsec
+
+consts = xmlsec.constants
+password = 'secret'
+
+
+def generate(path):
+    key = subprocess.run(
+        ['openssl', 'genpkey', '-algorithm', 'RSA', '-pkeyopt', 'rsa_keygen_bits:2048'], check=True, capture_output=True
+    )
+    subprocess.run(
+        ['openssl', 'pkcs8', '-topk8', '-v2', 'aes-256-cbc', '-iter', '600000', '-passout', f'pass:{password}', '-out', path],
+        input=key.stdout,
+        check=True,
+        capture_output=True,
+    )
+
+
+def main(number):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'key.pem')
+        generate(path)
+        key = xmlsec.Key.from_file(path, consts.KeyDataFormatPem, password=password)
+        aes = xmlsec.Key.from_binary_data(consts.KeyDataAes, os.urandom(32))
+        exported = key.export()
+        encrypted = key.export(encryption_key=aes)
+        pickled = pickle.dumps(key)
+        loaders = (
+            ('from_file', lambda: xmlsec.Key.from_file(path, consts.KeyDataFormatPem, password=password)),
+            ('from_export', lambda: xmlsec.Key.from_export(exported)),
+            ('from_export, aes', lambda: xmlsec.Key.from_export(encrypted, encryption_key=aes)),
+            ('pickle.loads', lambda: pickle.loads(pickled)),
+        )
+        for name, load in loaders:
+            elapsed = min(timeit.repeat(load, number=number, repeat=5))
+            print(f'{name:>20}: {elapsed / number * 1e3:10.3f} ms/key')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
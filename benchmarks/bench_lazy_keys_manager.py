@@ -0,0 +1,61 @@
+"""Compare the startup and the verification of a signature with :xml:`<dsig:KeyName/>` by
+:class:`xmlsec.KeysManager` holding all tenant keys and by the one resolving them on demand.
+
+Run from the repository root::
+
+    python benchmarks/bench_lazy_keys_manager.py [number]
+"""
+
+import sys
+import time
+import timeit
+
+from bench_indexed_keys_manager import signed_document
+
+import xmlsec
+
+consts = xmlsec.constants
+tenants = 100000
+
+
+def load_key(i):
+    key = xmlsec.Key.from_binary_data(consts.KeyDataHmac, b'secret %d' % i)
+    key.name = f'tenant-{i}'
+    return key
+
+
+def resolve(name, klass, type):
+    if name is None or not name.startswith('tenant-'):
+        return None
+    return load_key(int(name[len('tenant-') :]))
+
+
+def main(number):
+    start = time.perf_counter()
+    eager = xmlsec.KeysManager(indexed=True)
+    for i in range(tenants):
+        eager.add_key(load_key(i))
+    print(f'{"eager startup":>20}: {(time.perf_counter() - start) * 1e3:10.1f} ms')
+    start = time.perf_counter()
+    lazy = xmlsec.KeysManager(resolver=resolve)
+    print(f'{"lazy startup":>20}: {(time.perf_counter() - start) * 1e3:10.1f} ms')
+
+    sign = signed_document(load_key(tenants - 1))
+    managers = (
+        ('eager', eager),
+        ('lazy, cached', lazy),
+        ('lazy, resolved', xmlsec.KeysManager(resolver=resolve, maxsize=0)),
+    )
+    for name, manager in managers:
+        ctx = xmlsec.SignatureContext(manager)
+
+        def verify(ctx=ctx):
+            ctx.verify(sign)
+            ctx.reset()
+
+        elapsed = min(timeit.repeat(verify, number=number, repeat=5))
+        print(f'{name:>20}: {elapsed / number * 1e6:10.1f} us/verify')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
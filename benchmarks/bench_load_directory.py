@@ -0,0 +1,64 @@
+"""Compare loading a directory of certificates and keys one file at a time and by
+:meth:`xmlsec.KeysManager.load_directory`.
+
+Requires the ``openssl`` command to generate the files. Run from the repository root::
+
+    python benchmarks/bench_load_directory.py [count]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import xmlsec
+
+consts = xmlsec.constants
+
+
+def generate(directory, count):
+    for i in range(count):
+        subprocess.run(
+            [
+                'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', f'/CN=tenant-{i}',
+                '-keyout', os.path.join(directory, f'tenant-{i}.key'),
+                '-out', os.path.join(directory, f'tenant-{i}.pem'),
+            ],
+            check=True,
+            capture_output=True,
+        )  # fmt: skip
+
+
+def load_serial(directory):
+    manager = xmlsec.KeysManager(indexed=True)
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith('.pem'):
+            manager.load_cert(path, consts.KeyDataFormatPem, consts.KeyDataTypeTrusted)
+        else:
+            key = xmlsec.Key.from_file(path, consts.KeyDataFormatPem)
+            key.name = name
+            manager.add_key(key)
+    return manager
+
+
+def main(count):
+    with tempfile.TemporaryDirectory() as directory:
+        generate(directory, count)
+        loaders = (
+            ('serial', lambda: load_serial(directory)),
+            ('load_directory, 1', lambda: xmlsec.KeysManager(indexed=True).load_directory(directory, workers=1)),
+            ('load_directory', lambda: xmlsec.KeysManager(indexed=True).load_directory(directory)),
+        )
+        for name, load in loaders:
+            elapsed = float('inf')
+            for _ in range(5):
+                start = time.perf_counter()
+                load()
+                elapsed = min(elapsed, time.perf_counter() - start)
+            print(f'{name:>20}: {elapsed * 1e3:10.1f} ms for {count} keys and certificates')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
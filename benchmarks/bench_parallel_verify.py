@@ -0,0 +1,56 @@
+"""Measure how :func:`xmlsec.parallel.verify_documents` scales with the number of worker threads.
+
+The single-threaded :meth:`xmlsec.SignatureContext.verify_many` is the baseline.
+
+Run from the repository root::
+
+    python benchmarks/bench_parallel_verify.py [documents]
+"""
+
+import os
+import sys
+import timeit
+from pathlib import Path
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+data_dir = Path(__file__).resolve().parent.parent / 'tests' / 'data'
+
+
+def load_signature():
+    root = etree.parse(str(data_dir / 'sign1-out.xml')).getroot()
+    return xmlsec.tree.find_node(root, consts.NodeSignature)
+
+
+def main(documents):
+    manager = xmlsec.KeysManager()
+    manager.add_key(xmlsec.Key.from_file(str(data_dir / 'rsapub.pem'), consts.KeyDataFormatPem))
+    signatures = [load_signature() for _ in range(documents)]
+
+    ctx = xmlsec.SignatureContext(manager)
+
+    def baseline():
+        ctx.verify_many(signatures)
+
+    elapsed = min(timeit.repeat(baseline, number=1, repeat=3))
+    print(f'{"verify_many":>16}: {documents / elapsed:10.0f} docs/s')
+
+    workers = 1
+    max_workers = os.cpu_count() or 1
+    while True:
+
+        def parallel(workers=workers):
+            xmlsec.parallel.verify_documents(signatures, manager, workers=workers)
+
+        parallel_elapsed = min(timeit.repeat(parallel, number=1, repeat=3))
+        print(f'{f"{workers} workers":>16}: {documents / parallel_elapsed:10.0f} docs/s, x{elapsed / parallel_elapsed:.2f}')
+        if workers >= max_workers:
+            break
+        workers = min(workers * 2, max_workers)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
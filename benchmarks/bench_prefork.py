@@ -0,0 +1,83 @@
+"""Compare the forked workers, which load the keys themselves, and the ones, which share
+:class:`xmlsec.KeysManager` prepared by :func:`xmlsec.preload` in the parent process.
+
+Measures the time to the first verified signature and the private memory of each worker,
+the memory is known on Linux only. Run from the repository root::
+
+    python benchmarks/bench_prefork.py [workers] [keys]
+"""
+
+import os
+import sys
+import time
+
+from bench_indexed_keys_manager import signed_document
+
+import xmlsec
+
+consts = xmlsec.constants
+
+
+def load_key(i):
+    key = xmlsec.Key.from_binary_data(consts.KeyDataHmac, b'secret %d' % i)
+    key.name = f'tenant-{i}'
+    return key
+
+
+def load_manager(count):
+    manager = xmlsec.KeysManager(indexed=True)
+    for i in range(count):
+        manager.add_key(load_key(i))
+    return manager
+
+
+def private_memory():
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            return sum(int(line.split()[1]) for line in f if line.startswith(('Private_Clean', 'Private_Dirty')))
+    except OSError:
+        return 0
+
+
+def run_workers(workers, work):
+    results = []
+    for _ in range(workers):
+        read, write = os.pipe()
+        start = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            try:
+                work()
+                os.write(write, f'{time.perf_counter() - start} {private_memory()}'.encode())
+            finally:
+                os._exit(0)
+        os.close(write)
+        with os.fdopen(read) as f:
+            elapsed, memory = f.read().split()
+        os.waitpid(pid, 0)
+        results.append((float(elapsed), int(memory)))
+    return results
+
+
+def main(workers, count):
+    sign = signed_document(load_key(count - 1))
+
+    def verify(manager):
+        xmlsec.SignatureContext(manager).verify(sign)
+
+    shared = load_manager(count)
+    xmlsec.preload(shared)
+    modes = (
+        ('load in worker', lambda: verify(load_manager(count))),
+        ('preloaded', lambda: verify(shared)),
+    )
+    for name, work in modes:
+        results = run_workers(workers, work)
+        elapsed = sum(r[0] for r in results) / workers
+        memory = sum(r[1] for r in results) / workers
+        print(f'{name:>20}: {elapsed * 1e3:10.1f} ms to first verify, {memory / 1024:8.1f} MiB private memory per worker')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4, int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
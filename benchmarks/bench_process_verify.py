@@ -0,0 +1,57 @@
+"""Compare the verification of serialized documents on threads and on processes.
+
+The thread path parses the documents and registers their IDs with lxml, which holds the GIL,
+then verifies them with :func:`xmlsec.parallel.verify_documents`.
+:class:`xmlsec.parallel.ProcessVerifier` ships the bytes to the worker processes, which do all of it.
+
+Run from the repository root::
+
+    python benchmarks/bench_process_verify.py [documents] [workers]
+"""
+
+import os
+import sys
+import timeit
+from pathlib import Path
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+data_dir = Path(__file__).resolve().parent.parent / 'tests' / 'data'
+
+
+def main(documents, workers):
+    sources = [(data_dir / f'sign{i % 5 + 1}-out.xml').read_bytes() for i in range(documents)]
+    manager = xmlsec.KeysManager()
+    key = xmlsec.Key.from_file(str(data_dir / 'rsapub.pem'), consts.KeyDataFormatPem)
+    key.name = 'rsakey.pem'
+    manager.add_key(key)
+
+    def threads():
+        signatures = []
+        for source in sources:
+            root = etree.fromstring(source)
+            xmlsec.tree.add_ids(root, ['ID'])
+            signatures.append(xmlsec.tree.find_node(root, consts.NodeSignature))
+        xmlsec.parallel.verify_documents(signatures, manager, workers=workers)
+
+    spec = [{'file': str(data_dir / 'rsapub.pem'), 'format': consts.KeyDataFormatPem, 'name': 'rsakey.pem'}]
+    with xmlsec.parallel.ProcessVerifier(spec, workers=workers, ids=['ID']) as verifier:
+        # the worker processes are started by the first call
+        verifier.verify(sources[:workers])
+
+        def processes():
+            verifier.verify(sources)
+
+        for run in (threads, processes):
+            elapsed = min(timeit.repeat(run, number=1, repeat=5))
+            print(f'{run.__name__:>10}: {documents / elapsed:10.0f} docs/s, {workers} workers')
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 5000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1,
+    )
@@ -0,0 +1,44 @@
+"""Compare the registration of the ids of a large document one by one and with :meth:`xmlsec.SignatureContext.register_ids`.
+
+Run from the repository root::
+
+    python benchmarks/bench_register_ids.py [elements]
+"""
+
+import sys
+import timeit
+
+from lxml import etree
+
+import xmlsec
+
+
+def make_document(elements):
+    root = etree.Element('{urn:envelope}Envelope')
+    for i in range(elements):
+        etree.SubElement(root, '{urn:envelope}Data', ID=f'id-{i}').text = f'entity {i}'
+    return etree.tostring(root)
+
+
+def main(elements):
+    data = make_document(elements)
+
+    def parse():
+        etree.fromstring(data)
+
+    def one_by_one():
+        ctx = xmlsec.SignatureContext()
+        for node in etree.fromstring(data).xpath('//*[@ID]'):
+            ctx.register_id(node, 'ID')
+
+    def bulk():
+        xmlsec.SignatureContext().register_ids(etree.fromstring(data))
+
+    parsing = min(timeit.repeat(parse, number=1, repeat=5))
+    for name, func in (('one by one', one_by_one), ('bulk', bulk)):
+        elapsed = min(timeit.repeat(func, number=1, repeat=5)) - parsing
+        print(f'{name:>10}: {elapsed * 1e3:8.2f} ms/document')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,42 @@
+"""Compare the decryption of a document with a wrapped session key with and without :class:`xmlsec.SessionKeyCache`.
+
+Run from the repository root::
+
+    python benchmarks/bench_session_key_cache.py [number]
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+data_dir = Path(__file__).resolve().parent.parent / 'tests' / 'data'
+
+
+def main(number):
+    manager = xmlsec.KeysManager()
+    manager.add_key(xmlsec.Key.from_file(str(data_dir / 'rsakey.pem'), consts.KeyDataFormatPem))
+    with open(data_dir / 'enc1-out.xml', 'rb') as stream:
+        source = stream.read()
+
+    def decrypt(ctx):
+        root = etree.fromstring(source)
+        ctx.decrypt(xmlsec.tree.find_child(root, consts.NodeEncryptedData, consts.EncNs))
+        ctx.reset()
+
+    uncached = xmlsec.EncryptionContext(manager)
+    cached = xmlsec.EncryptionContext(manager)
+    cached.session_key_cache = xmlsec.SessionKeyCache()
+    decrypt(cached)
+
+    for name, ctx in (('without cache', uncached), ('with cache', cached)):
+        elapsed = min(timeit.repeat(lambda ctx=ctx: decrypt(ctx), number=number, repeat=5))
+        print(f'{name:>16}: {elapsed / number * 1e6:8.1f} us/decrypt')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
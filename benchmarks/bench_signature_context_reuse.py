@@ -0,0 +1,65 @@
+"""Compare a fresh :class:`xmlsec.SignatureContext` per request against one context reused via ``reset()``.
+
+Run from the repository root::
+
+    python benchmarks/bench_signature_context_reuse.py [iterations]
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+data_dir = Path(__file__).resolve().parent.parent / 'tests' / 'data'
+
+
+def load_template():
+    root = etree.parse(str(data_dir / 'sign1-in.xml')).getroot()
+    return xmlsec.tree.find_node(root, consts.NodeSignature)
+
+
+def main(iterations):
+    manager = xmlsec.KeysManager()
+    key = xmlsec.Key.from_file(str(data_dir / 'rsakey.pem'), consts.KeyDataFormatPem)
+    templates = [load_template() for _ in range(iterations)]
+
+    def fresh_context():
+        for sign in templates:
+            ctx = xmlsec.SignatureContext(manager)
+            ctx.key = key
+            ctx.sign(sign)
+
+    reused = xmlsec.SignatureContext(manager)
+    reused.key = key
+
+    def reused_context():
+        for sign in templates:
+            reused.sign(sign)
+            reused.reset()
+
+    def fresh_setup():
+        for _ in templates:
+            ctx = xmlsec.SignatureContext(manager)
+            ctx.key = key
+
+    def reused_setup():
+        for _ in templates:
+            reused.reset()
+
+    cases = (
+        ('fresh context, setup only', fresh_setup),
+        ('reused context, setup only', reused_setup),
+        ('fresh context, sign', fresh_context),
+        ('reused context, sign', reused_context),
+    )
+    for name, func in cases:
+        elapsed = min(timeit.repeat(func, number=1, repeat=3))
+        print(f'{name:>28}: {elapsed / iterations * 1e6:8.2f} us/request')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
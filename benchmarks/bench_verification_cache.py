@@ -0,0 +1,56 @@
+"""Compare the verification of a large signed document with and without :class:`xmlsec.VerificationCache`.
+
+Run from the repository root::
+
+    python benchmarks/bench_verification_cache.py [elements]
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+from lxml import etree
+
+import xmlsec
+
+consts = xmlsec.constants
+data_dir = Path(__file__).resolve().parent.parent / 'tests' / 'data'
+
+
+def make_document(elements):
+    root = etree.Element('{urn:envelope}Envelope')
+    for i in range(elements):
+        etree.SubElement(root, '{urn:envelope}Data', id=str(i)).text = f'entity {i}'
+    sign = xmlsec.template.create(root, consts.TransformExclC14N, consts.TransformRsaSha256)
+    root.append(sign)
+    ref = xmlsec.template.add_reference(sign, consts.TransformSha256, uri='')
+    xmlsec.template.add_transform(ref, consts.TransformEnveloped)
+    ctx = xmlsec.SignatureContext()
+    ctx.key = xmlsec.Key.from_file(str(data_dir / 'rsakey.pem'), consts.KeyDataFormatPem)
+    ctx.sign(sign)
+    return sign
+
+
+def main(elements):
+    sign = make_document(elements)
+    key = xmlsec.Key.from_file(str(data_dir / 'rsapub.pem'), consts.KeyDataFormatPem)
+    print(f'document size: {len(etree.tostring(sign.getroottree())) / 2**20:.1f} MiB')
+
+    def verify(ctx):
+        ctx.verify(sign)
+        ctx.reset()
+
+    uncached = xmlsec.SignatureContext()
+    uncached.key = key
+    cached = xmlsec.SignatureContext()
+    cached.key = key
+    cached.verification_cache = xmlsec.VerificationCache(ttl=3600)
+    verify(cached)
+
+    for name, ctx in (('without cache', uncached), ('with cache', cached)):
+        elapsed = min(timeit.repeat(lambda ctx=ctx: verify(ctx), number=1, repeat=5))
+        print(f'{name:>16}: {elapsed * 1e3:8.2f} ms/verify')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,38 @@
+import os
+
+from lxml import etree
+
+import xmlsec
+
+# Build the keys manager once in the parent process, the forked workers share it.
+manager = xmlsec.KeysManager()
+key = xmlsec.Key.from_file('rsapub.pem', xmlsec.constants.KeyDataFormatPem)
+key.name = 'rsakey.pem'
+manager.add_key(key)
+# Initialize the crypto library in the parent instead of every worker.
+xmlsec.preload(manager)
+
+
+def worker():
+    with open('sign1-res.xml') as fp:
+        template = etree.parse(fp).getroot()
+    xmlsec.tree.add_ids(template, ['ID'])
+    ctx = xmlsec.SignatureContext(manager)
+    ctx.verify(xmlsec.tree.find_node(template, xmlsec.constants.NodeSignature))
+
+
+if hasattr(os, 'fork'):
+    pids = []
+    for _ in range(2):
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                worker()
+                status = 0
+            finally:
+                os._exit(status)
+        pids.append(pid)
+    for pid in pids:
+        _, status = os.waitpid(pid, 0)
+        assert status == 0
@@ -0,0 +1,738 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+#include "common.h"
+#include "platform.h"
+#include "exception.h"
+#include "fork.h"
+#include "keys.h"
+#include "utils.h"
+
+#define PYXMLSEC_AIO_DOC \
+    "Awaitable signature and encryption operations for :mod:`asyncio`.\n\n" \
+    "The operations are run on the threads of :class:`Executor`, so the event loop is not blocked by them. " \
+    "The objects are shared by the following rules, which are enforced by this module:\n\n" \
+    "* the :class:`~xmlsec.KeysManager` is shared by all threads, it cannot be modified until the executor is shut down;\n" \
+    "* each operation uses a context from the pool of the event loop, the context is reset before it is returned to the pool;\n" \
+    "* at most ``max_pending`` operations of the event loop run at once, the others wait for their turn in order.\n\n" \
+    "The nodes must not be modified until their operations are over."
+
+// the kinds of the pooled contexts
+#define PYXMLSEC_AIO_SIGNATURE 0
+#define PYXMLSEC_AIO_ENCRYPTION 1
+#define PYXMLSEC_AIO_KINDS 2
+
+static PyObject* PyXmlSec_AioContextTypes[PYXMLSEC_AIO_KINDS] = { NULL, NULL };
+static PyObject* PyXmlSec_AioCall = NULL;  // runs the operation on the worker thread
+static PyObject* PyXmlSec_AioGetRunningLoop = NULL;
+static PyObject* PyXmlSec_AioWrapFuture = NULL;
+
+// the state of an event loop
+typedef struct {
+    PyObject_HEAD
+    Py_ssize_t running;
+    PyObject* contexts[PYXMLSEC_AIO_KINDS];  // the lists of idle contexts
+    PyObject* waiting;  // the deque of the operations, which wait for their turn
+} PyXmlSec_AioLoop;
+
+typedef struct {
+    PyObject_HEAD
+    PyXmlSec_KeysManager* manager;
+    PyObject* pool;   // concurrent.futures.ThreadPoolExecutor
+    PyObject* loops;  // the event loop -> PyXmlSec_AioLoop
+    Py_ssize_t max_pending;
+    int workers;
+    int closed;
+    unsigned long forks;  // the executor cannot be used in the forked process, since its threads are not forked
+} PyXmlSec_AioExecutor;
+
+static void PyXmlSec_AioLoop__del__(PyObject* self) {
+    PyXmlSec_AioLoop* state = (PyXmlSec_AioLoop*)self;
+    int i;
+
+    for (i = 0; i < PYXMLSEC_AIO_KINDS; ++i) {
+        Py_XDECREF(state->contexts[i]);
+    }
+    Py_XDECREF(state->waiting);
+    Py_TYPE(self)->tp_free(self);
+}
+
+static PyTypeObject _PyXmlSec_AioLoopType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    STRINGIFY(MODULE_NAME) ".aio._Loop",  /* tp_name */
+    sizeof(PyXmlSec_AioLoop),             /* tp_basicsize */
+    0,                                    /* tp_itemsize */
+    PyXmlSec_AioLoop__del__,              /* tp_dealloc */
+    0,                                    /* tp_print */
+    0,                                    /* tp_getattr */
+    0,                                    /* tp_setattr */
+    0,                                    /* tp_reserved */
+    0,                                    /* tp_repr */
+    0,                                    /* tp_as_number */
+    0,                                    /* tp_as_sequence */
+    0,                                    /* tp_as_mapping */
+    0,                                    /* tp_hash  */
+    0,                                    /* tp_call */
+    0,                                    /* tp_str */
+    0,                                    /* tp_getattro */
+    0,                                    /* tp_setattro */
+    0,                                    /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT,                   /* tp_flags */
+    "The state of an event loop",         /* tp_doc */
+};
+
+// returns the state of the running event loop, the new reference
+static PyXmlSec_AioLoop* PyXmlSec_AioGetLoop(PyXmlSec_AioExecutor* executor, PyObject** loop) {
+    PyXmlSec_AioLoop* state;
+    PyObject* deque;
+    int i;
+
+    if ((*loop = PyObject_CallNoArgs(PyXmlSec_AioGetRunningLoop)) == NULL) return NULL;
+    state = (PyXmlSec_AioLoop*)PyObject_GetItem(executor->loops, *loop);
+    if (state != NULL || !PyErr_ExceptionMatches(PyExc_KeyError)) {
+        if (state == NULL) Py_CLEAR(*loop);
+        return state;
+    }
+    PyErr_Clear();
+
+    PYXMLSEC_DEBUGF("%p: aio - new loop %p", executor, *loop);
+    if ((state = PyObject_New(PyXmlSec_AioLoop, &_PyXmlSec_AioLoopType)) == NULL) goto ON_FAIL;
+    state->running = 0;
+    state->waiting = NULL;
+    for (i = 0; i < PYXMLSEC_AIO_KINDS; ++i) {
+        state->contexts[i] = PyList_New(0);
+    }
+    if ((deque = PyImport_ImportModule("collections")) != NULL) {
+        state->waiting = PyObject_CallMethod(deque, "deque", NULL);
+        Py_DECREF(deque);
+    }
+    if (state->contexts[PYXMLSEC_AIO_SIGNATURE] == NULL || state->contexts[PYXMLSEC_AIO_ENCRYPTION] == NULL || state->waiting == NULL) {
+        goto ON_FAIL;
+    }
+    if (PyObject_SetItem(executor->loops, *loop, (PyObject*)state) < 0) goto ON_FAIL;
+    return state;
+ON_FAIL:
+    Py_XDECREF(state);
+    Py_CLEAR(*loop);
+    return NULL;
+}
+
+static int PyXmlSec_AioStart(PyXmlSec_AioExecutor* executor, PyXmlSec_AioLoop* state, PyObject* operation);
+
+static const char PyXmlSec_AioDone__doc__[] = "Completes the operation when its thread is done.";
+// the callback of the future of the thread, self is (executor, state, kind, context, outer future)
+static PyObject* PyXmlSec_AioDone(PyObject* self, PyObject* inner) {
+    PyXmlSec_AioExecutor* executor = (PyXmlSec_AioExecutor*)PyTuple_GET_ITEM(self, 0);
+    PyXmlSec_AioLoop* state = (PyXmlSec_AioLoop*)PyTuple_GET_ITEM(self, 1);
+    Py_ssize_t kind = PyLong_AsSsize_t(PyTuple_GET_ITEM(self, 2));
+    PyObject* ctx = PyTuple_GET_ITEM(self, 3);
+    PyObject* outer = PyTuple_GET_ITEM(self, 4);
+    PyObject* operation;
+    PyObject* tmp = NULL;
+    int rv = 0;
+
+    // the context has been reset by the thread
+    state->running--;
+    if (PyList_Append(state->contexts[kind], ctx) < 0) rv = -1;
+
+    if (rv == 0 && (tmp = PyObject_CallMethod(outer, "done", NULL)) != NULL && !PyObject_IsTrue(tmp)) {
+        Py_DECREF(tmp);
+        if ((tmp = PyObject_CallMethod(inner, "cancelled", NULL)) != NULL && PyObject_IsTrue(tmp)) {
+            Py_DECREF(tmp);
+            tmp = PyObject_CallMethod(outer, "cancel", NULL);
+        } else if (tmp != NULL) {
+            Py_DECREF(tmp);
+            if ((tmp = PyObject_CallMethod(inner, "exception", NULL)) != NULL) {
+                if (tmp != Py_None) {
+                    Py_SETREF(tmp, PyObject_CallMethod(outer, "set_exception", "(O)", tmp));
+                } else {
+                    Py_SETREF(tmp, PyObject_CallMethod(inner, "result", NULL));
+                    if (tmp != NULL) Py_SETREF(tmp, PyObject_CallMethod(outer, "set_result", "(O)", tmp));
+                }
+            }
+        }
+    }
+    if (tmp == NULL) rv = -1;
+    Py_XDECREF(tmp);
+
+    // the next operations take the freed slots
+    while (state->running < executor->max_pending && PyObject_Length(state->waiting) > 0) {
+        if ((operation = PyObject_CallMethod(state->waiting, "popleft", NULL)) == NULL) return NULL;
+        if (PyXmlSec_AioStart(executor, state, operation) < 0) rv = -1;
+        Py_DECREF(operation);
+    }
+    if (rv < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef PyXmlSec_AioDoneDef = {"_done", (PyCFunction)PyXmlSec_AioDone, METH_O, PyXmlSec_AioDone__doc__};
+
+// sets the exception, which is raised, to the future
+static int PyXmlSec_AioSetException(PyObject* outer) {
+    PyObject* type;
+    PyObject* value;
+    PyObject* traceback;
+    PyObject* tmp;
+
+    PyErr_Fetch(&type, &value, &traceback);
+    PyErr_NormalizeException(&type, &value, &traceback);
+    if (traceback != NULL && value != NULL) PyException_SetTraceback(value, traceback);
+    tmp = PyObject_CallMethod(outer, "set_exception", "(O)", value != NULL ? value : Py_None);
+    Py_XDECREF(type);
+    Py_XDECREF(value);
+    Py_XDECREF(traceback);
+    if (tmp == NULL) return -1;
+    Py_DECREF(tmp);
+    return 0;
+}
+
+// starts the operation (kind, method, key, args, outer future) on the thread
+static int PyXmlSec_AioStart(PyXmlSec_AioExecutor* executor, PyXmlSec_AioLoop* state, PyObject* operation) {
+    PyObject* kind = PyTuple_GET_ITEM(operation, 0);
+    PyObject* outer = PyTuple_GET_ITEM(operation, 4);
+    PyObject* contexts = state->contexts[PyLong_AsSsize_t(kind)];
+    PyObject* ctx = NULL;
+    PyObject* future = NULL;
+    PyObject* inner = NULL;
+    PyObject* loop = NULL;
+    PyObject* done = NULL;
+    PyObject* tmp;
+    Py_ssize_t size;
+    int rv = -1;
+
+    // the operation is cancelled while it waits for its turn
+    if ((tmp = PyObject_CallMethod(outer, "done", NULL)) == NULL) return -1;
+    rv = PyObject_IsTrue(tmp);
+    Py_DECREF(tmp);
+    if (rv != 0) return rv < 0 ? -1 : 0;
+    rv = -1;
+
+    if (executor->closed) {
+        PyErr_SetString(PyExc_RuntimeError, "the executor is shut down.");
+        goto ON_FAIL;
+    }
+    size = PyList_GET_SIZE(contexts);
+    if (size > 0) {
+        ctx = PyList_GET_ITEM(contexts, size - 1);
+        Py_INCREF(ctx);
+        if (PyList_SetSlice(contexts, size - 1, size, NULL) < 0) goto ON_FAIL;
+    } else {
+        PYXMLSEC_DEBUGF("%p: aio - new context", executor);
+        ctx = PyObject_CallFunctionObjArgs(PyXmlSec_AioContextTypes[PyLong_AsSsize_t(kind)], (PyObject*)executor->manager, NULL);
+        if (ctx == NULL) goto ON_FAIL;
+    }
+
+    future = PyObject_CallMethod(executor->pool, "submit", "OOOOO",
+        PyXmlSec_AioCall, ctx, PyTuple_GET_ITEM(operation, 1), PyTuple_GET_ITEM(operation, 2), PyTuple_GET_ITEM(operation, 3));
+    if (future == NULL) {
+        PyList_Append(contexts, ctx);
+        goto ON_FAIL;
+    }
+    if ((loop = PyObject_CallMethod(outer, "get_loop", NULL)) == NULL) goto ON_FAIL;
+    if ((tmp = Py_BuildValue("{sO}", "loop", loop)) == NULL) goto ON_FAIL;
+    if ((done = PyTuple_Pack(1, future)) != NULL) {
+        inner = PyObject_Call(PyXmlSec_AioWrapFuture, done, tmp);
+        Py_CLEAR(done);
+    }
+    Py_DECREF(tmp);
+    if (inner == NULL) goto ON_FAIL;
+    // the callback holds the executor, so it outlives the running operations
+    if ((tmp = Py_BuildValue("(OOOOO)", executor, state, kind, ctx, outer)) == NULL) goto ON_FAIL;
+    done = PyCFunction_New(&PyXmlSec_AioDoneDef, tmp);
+    Py_DECREF(tmp);
+    if (done == NULL) goto ON_FAIL;
+    // the context is not returned to the pool until the thread is done
+    state->running++;
+    if ((tmp = PyObject_CallMethod(inner, "add_done_callback", "(O)", done)) == NULL) {
+        state->running--;
+        goto ON_FAIL;
+    }
+    Py_DECREF(tmp);
+    rv = 0;
+    goto ON_EXIT;
+
+ON_FAIL:
+    // the error of the operation goes to its future
+    rv = PyXmlSec_AioSetException(outer);
+ON_EXIT:
+    Py_XDECREF(ctx);
+    Py_XDECREF(future);
+    Py_XDECREF(inner);
+    Py_XDECREF(loop);
+    Py_XDECREF(done);
+    return rv;
+}
+
+// schedules the operation in the running event loop, returns the future of its result
+static PyObject* PyXmlSec_AioSubmit(PyXmlSec_AioExecutor* executor, int kind, const char* method, PyObject* key, PyObject* args) {
+    PyXmlSec_AioLoop* state = NULL;
+    PyObject* loop = NULL;
+    PyObject* outer = NULL;
+    PyObject* operation = NULL;
+    PyObject* tmp;
+
+    if (executor->pool == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "the executor is not initialized.");
+        return NULL;
+    }
+    if (executor->closed) {
+        PyErr_SetString(PyExc_RuntimeError, "the executor is shut down.");
+        return NULL;
+    }
+    if (executor->forks != PyXmlSec_ForkGeneration()) {
+        PyErr_SetString(PyExc_RuntimeError, "the executor is created by the parent process and cannot be used after fork.");
+        return NULL;
+    }
+    if ((state = PyXmlSec_AioGetLoop(executor, &loop)) == NULL) return NULL;
+    if ((outer = PyObject_CallMethod(loop, "create_future", NULL)) == NULL) goto ON_FAIL;
+    if ((operation = Py_BuildValue("(isOOO)", kind, method, key, args, outer)) == NULL) goto ON_FAIL;
+
+    if (state->running < executor->max_pending) {
+        if (PyXmlSec_AioStart(executor, state, operation) < 0) goto ON_FAIL;
+    } else {
+        PYXMLSEC_DEBUGF("%p: aio - %s waits", executor, method);
+        if ((tmp = PyObject_CallMethod(state->waiting, "append", "(O)", operation)) == NULL) goto ON_FAIL;
+        Py_DECREF(tmp);
+    }
+    goto ON_EXIT;
+ON_FAIL:
+    Py_CLEAR(outer);
+ON_EXIT:
+    Py_XDECREF(operation);
+    Py_XDECREF(state);
+    Py_XDECREF(loop);
+    return outer;
+}
+
+static const char PyXmlSec_AioCallImpl__doc__[] = "Runs the operation with the context and resets it.";
+// runs on the worker thread, args is (context, method, key, args)
+static PyObject* PyXmlSec_AioCallImpl(PyObject* self, PyObject* args) {
+    PyObject* ctx;
+    PyObject* method;
+    PyObject* key;
+    PyObject* method_args;
+    PyObject* func;
+    PyObject* result = NULL;
+    PyObject* type;
+    PyObject* value;
+    PyObject* traceback;
+    PyObject* tmp;
+
+    if (!PyArg_ParseTuple(args, "OUOO!:_call", &ctx, &method, &key, &PyTuple_Type, &method_args)) return NULL;
+
+    if (key == Py_None || PyObject_SetAttrString(ctx, "key", key) == 0) {
+        if ((func = PyObject_GetAttr(ctx, method)) != NULL) {
+            result = PyObject_Call(func, method_args, NULL);
+            Py_DECREF(func);
+        }
+    }
+
+    // the context is returned to the pool clean
+    PyErr_Fetch(&type, &value, &traceback);
+    if (key != Py_None && PyObject_DelAttrString(ctx, "key") < 0) PyErr_Clear();
+    if ((tmp = PyObject_CallMethod(ctx, "reset", NULL)) == NULL) PyErr_Clear();
+    Py_XDECREF(tmp);
+    PyErr_Restore(type, value, traceback);
+    return result;
+}
+
+static PyMethodDef PyXmlSec_AioCallDef = {"_call", (PyCFunction)PyXmlSec_AioCallImpl, METH_VARARGS, PyXmlSec_AioCallImpl__doc__};
+
+static PyObject* PyXmlSec_AioExecutor__new__(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
+    PyXmlSec_AioExecutor* executor = (PyXmlSec_AioExecutor*)PyType_GenericNew(type, args, kwargs);
+    PYXMLSEC_DEBUGF("%p: new aio executor", executor);
+    if (executor != NULL) {
+        executor->manager = NULL;
+        executor->pool = NULL;
+        executor->loops = NULL;
+        executor->max_pending = 0;
+        executor->workers = 0;
+        executor->closed = 0;
+        executor->forks = PyXmlSec_ForkGeneration();
+    }
+    return (PyObject*)executor;
+}
+
+static int PyXmlSec_AioExecutor__init__(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "manager", "workers", "max_pending", NULL};
+
+    PyXmlSec_AioExecutor* executor = (PyXmlSec_AioExecutor*)self;
+    PyXmlSec_KeysManager* manager = NULL;
+    PyObject* workers_obj = Py_None;
+    PyObject* max_pending_obj = Py_None;
+    PyObject* module;
+    long workers;
+    Py_ssize_t max_pending;
+
+    PYXMLSEC_DEBUGF("%p: init aio executor - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|O&OO:__init__", kwlist,
+        PyXmlSec_KeysManagerConvert, &manager, &workers_obj, &max_pending_obj))
+    {
+        goto ON_FAIL;
+    }
+    if (executor->pool != NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "the executor is already initialized.");
+        goto ON_FAIL;
+    }
+    workers = (workers_obj == Py_None) ? PyXmlSec_GetDefaultWorkers() : PyLong_AsLong(workers_obj);
+    if (workers == -1 && PyErr_Occurred()) goto ON_FAIL;
+    if (workers < 1 || workers > INT_MAX) {
+        PyErr_SetString(PyExc_ValueError, "workers must be greater than 0.");
+        goto ON_FAIL;
+    }
+    max_pending = (max_pending_obj == Py_None) ? (Py_ssize_t)workers : PyLong_AsSsize_t(max_pending_obj);
+    if (max_pending == -1 && PyErr_Occurred()) goto ON_FAIL;
+    if (max_pending < 1) {
+        PyErr_SetString(PyExc_ValueError, "max_pending must be greater than 0.");
+        goto ON_FAIL;
+    }
+
+    if ((module = PyImport_ImportModule("weakref")) == NULL) goto ON_FAIL;
+    executor->loops = PyObject_CallMethod(module, "WeakKeyDictionary", NULL);
+    Py_DECREF(module);
+    if (executor->loops == NULL) goto ON_FAIL;
+    if ((module = PyImport_ImportModule("concurrent.futures")) == NULL) goto ON_FAIL;
+    executor->pool = PyObject_CallMethod(module, "ThreadPoolExecutor", "ls", workers, "xmlsec");
+    Py_DECREF(module);
+    if (executor->pool == NULL) goto ON_FAIL;
+
+    executor->workers = (int)workers;
+    executor->max_pending = max_pending;
+    // the keys manager is shared by the threads
+    executor->manager = manager;
+    if (manager != NULL) manager->busy++;
+    PYXMLSEC_DEBUGF("%p: init aio executor - ok, manager: %p", self, manager);
+    return 0;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: init aio executor - failed", self);
+    Py_XDECREF(manager);
+    Py_CLEAR(executor->loops);
+    return -1;
+}
+
+// stops accepting the operations and releases the keys manager
+static int PyXmlSec_AioExecutorClose(PyXmlSec_AioExecutor* executor, int wait) {
+    PyObject* tmp;
+
+    if (executor->closed || executor->pool == NULL) return 0;
+    executor->closed = 1;
+    // the threads of the parent process are not forked, the child has nothing to shut down
+    if (executor->forks != PyXmlSec_ForkGeneration()) return 0;
+    if (executor->manager != NULL) executor->manager->busy--;
+    if ((tmp = PyObject_CallMethod(executor->pool, "shutdown", "i", wait)) == NULL) return -1;
+    Py_DECREF(tmp);
+    return 0;
+}
+
+static void PyXmlSec_AioExecutor__del__(PyObject* self) {
+    PyXmlSec_AioExecutor* executor = (PyXmlSec_AioExecutor*)self;
+
+    PYXMLSEC_DEBUGF("%p: delete aio executor", self);
+    // there are no running operations, they hold the executor
+    if (PyXmlSec_AioExecutorClose(executor, 0) < 0) PyErr_WriteUnraisable(self);
+    Py_XDECREF(executor->manager);
+    Py_XDECREF(executor->pool);
+    Py_XDECREF(executor->loops);
+    Py_TYPE(self)->tp_free(self);
+}
+
+static const char PyXmlSec_AioExecutorShutdown__doc__[] = \
+    "shutdown(wait=True) -> None\n"
+    "Stops accepting new operations. The operations, which wait for their turn, fail with :exc:`RuntimeError`.\n\n"
+    ":param wait: wait until the running operations are over\n"
+    ":type wait: :class:`bool`";
+static PyObject* PyXmlSec_AioExecutorShutdown(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "wait", NULL};
+    int wait = 1;
+
+    PYXMLSEC_DEBUGF("%p: shutdown - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|p:shutdown", kwlist, &wait)) goto ON_FAIL;
+    if (PyXmlSec_AioExecutorClose((PyXmlSec_AioExecutor*)self, wait) < 0) goto ON_FAIL;
+    PYXMLSEC_DEBUGF("%p: shutdown - ok", self);
+    Py_RETURN_NONE;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: shutdown - fail", self);
+    return NULL;
+}
+
+static PyObject* PyXmlSec_AioExecutor__enter__(PyObject* self, PyObject* args) {
+    Py_INCREF(self);
+    return self;
+}
+
+static PyObject* PyXmlSec_AioExecutor__exit__(PyObject* self, PyObject* args) {
+    if (PyXmlSec_AioExecutorClose((PyXmlSec_AioExecutor*)self, 1) < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+// parses the arguments of the operation, which takes the nodes and the optional key
+static PyObject* PyXmlSec_AioOperation(PyObject* self, PyObject* args, PyObject* kwargs, int kind, const char* method, char** kwlist, const char* format, int count) {
+    PyObject* values[3] = { NULL, NULL, NULL };
+    PyObject* key = Py_None;
+    PyObject* method_args;
+    PyObject* future;
+
+    PYXMLSEC_DEBUGF("%p: aio %s - start", self, method);
+    if (count == 1) {
+        if (!PyArg_ParseTupleAndKeywords(args, kwargs, format, kwlist, &values[0], &key)) return NULL;
+        method_args = PyTuple_Pack(1, values[0]);
+    } else {
+        if (!PyArg_ParseTupleAndKeywords(args, kwargs, format, kwlist, &values[0], &values[1], &key)) return NULL;
+        method_args = PyTuple_Pack(2, values[0], values[1]);
+    }
+    if (method_args == NULL) return NULL;
+    if (key != Py_None && !PyObject_IsInstance(key, (PyObject*)PyXmlSec_KeyType)) {
+        PyErr_SetString(PyExc_TypeError, "instance of *xmlsec.Key* expected.");
+        Py_DECREF(method_args);
+        return NULL;
+    }
+    future = PyXmlSec_AioSubmit((PyXmlSec_AioExecutor*)self, kind, method, key, method_args);
+    Py_DECREF(method_args);
+    PYXMLSEC_DEBUGF("%p: aio %s - %s", self, method, future != NULL ? "ok" : "fail");
+    return future;
+}
+
+static const char PyXmlSec_AioExecutorSign__doc__[] = \
+    "sign(node, key=None) -> asyncio.Future\n"
+    "Signs according to the signature template, like :meth:`xmlsec.SignatureContext.sign` does.\n\n"
+    ":param node: the pointer to :xml:`<dsig:Signature/>` node with signature template\n"
+    ":type node: :class:`lxml.etree._Element`\n"
+    ":param key: the signature key, the key is found in the keys manager if it is not set\n"
+    ":type key: :class:`~xmlsec.Key` or :data:`None`\n"
+    ":return: the awaitable, which is done when the node is signed\n"
+    ":rtype: :class:`asyncio.Future`";
+static PyObject* PyXmlSec_AioExecutorSign(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "node", "key", NULL};
+    return PyXmlSec_AioOperation(self, args, kwargs, PYXMLSEC_AIO_SIGNATURE, "sign", kwlist, "O|O:sign", 1);
+}
+
+static const char PyXmlSec_AioExecutorVerify__doc__[] = \
+    "verify(node, key=None) -> asyncio.Future\n"
+    "Verifies according to the signature template, like :meth:`xmlsec.SignatureContext.verify` does.\n\n"
+    ":param node: the pointer with :xml:`<dsig:Signature/>` node\n"
+    ":type node: :class:`lxml.etree._Element`\n"
+    ":param key: the signature key, the key is found in the keys manager if it is not set\n"
+    ":type key: :class:`~xmlsec.Key` or :data:`None`\n"
+    ":return: the awaitable, which raises :exc:`~xmlsec.VerificationError` if the signature is invalid\n"
+    ":rtype: :class:`asyncio.Future`";
+static PyObject* PyXmlSec_AioExecutorVerify(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "node", "key", NULL};
+    return PyXmlSec_AioOperation(self, args, kwargs, PYXMLSEC_AIO_SIGNATURE, "verify", kwlist, "O|O:verify", 1);
+}
+
+static const char PyXmlSec_AioExecutorEncryptBinary__doc__[] = \
+    "encrypt_binary(template, data, key=None) -> asyncio.Future\n"
+    "Encrypts binary ``data`` according to the template, like :meth:`xmlsec.EncryptionContext.encrypt_binary` does.\n\n"
+    ":param template: the pointer to :xml:`<enc:EncryptedData/>` template node\n"
+    ":type template: :class:`lxml.etree._Element`\n"
+    ":param data: the data\n"
+    ":type data: :class:`bytes` or any :term:`bytes-like object`\n"
+    ":param key: the encryption key\n"
+    ":type key: :class:`~xmlsec.Key` or :data:`None`\n"
+    ":return: the awaitable of the resulting :xml:`<enc:EncryptedData/>` subtree\n"
+    ":rtype: :class:`asyncio.Future`";
+static PyObject* PyXmlSec_AioExecutorEncryptBinary(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "template", "data", "key", NULL};
+    return PyXmlSec_AioOperation(self, args, kwargs, PYXMLSEC_AIO_ENCRYPTION, "encrypt_binary", kwlist, "OO|O:encrypt_binary", 2);
+}
+
+static const char PyXmlSec_AioExecutorEncryptXml__doc__[] = \
+    "encrypt_xml(template, node, key=None) -> asyncio.Future\n"
+    "Encrypts ``node`` using ``template``, like :meth:`xmlsec.EncryptionContext.encrypt_xml` does.\n\n"
+    ":param template: the pointer to :xml:`<enc:EncryptedData/>` template node\n"
+    ":type template: :class:`lxml.etree._Element`\n"
+    ":param node: the pointer to node for encryption\n"
+    ":type node: :class:`lxml.etree._Element`\n"
+    ":param key: the encryption key\n"
+    ":type key: :class:`~xmlsec.Key` or :data:`None`\n"
+    ":return: the awaitable of the newly created :xml:`<enc:EncryptedData/>` node\n"
+    ":rtype: :class:`asyncio.Future`";
+static PyObject* PyXmlSec_AioExecutorEncryptXml(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "template", "node", "key", NULL};
+    return PyXmlSec_AioOperation(self, args, kwargs, PYXMLSEC_AIO_ENCRYPTION, "encrypt_xml", kwlist, "OO|O:encrypt_xml", 2);
+}
+
+static const char PyXmlSec_AioExecutorDecrypt__doc__[] = \
+    "decrypt(node, key=None) -> asyncio.Future\n"
+    "Decrypts ``node`` (an ``EncryptedData`` or ``EncryptedKey`` element), "
+    "like :meth:`xmlsec.EncryptionContext.decrypt` does.\n\n"
+    ":param node: the pointer to :xml:`<enc:EncryptedData/>` or :xml:`<enc:EncryptedKey/>` element\n"
+    ":type node: :class:`lxml.etree._Element`\n"
+    ":param key: the decryption key, the key is found in the keys manager if it is not set\n"
+    ":type key: :class:`~xmlsec.Key` or :data:`None`\n"
+    ":return: the awaitable of the decrypted data or the decrypted element\n"
+    ":rtype: :class:`asyncio.Future`";
+static PyObject* PyXmlSec_AioExecutorDecrypt(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "node", "key", NULL};
+    return PyXmlSec_AioOperation(self, args, kwargs, PYXMLSEC_AIO_ENCRYPTION, "decrypt", kwlist, "O|O:decrypt", 1);
+}
+
+static const char PyXmlSec_AioExecutorWorkers__doc__[] = "The number of the threads.\n";
+static PyObject* PyXmlSec_AioExecutorWorkersGet(PyObject* self, void* closure) {
+    return PyLong_FromLong(((PyXmlSec_AioExecutor*)self)->workers);
+}
+
+static const char PyXmlSec_AioExecutorMaxPending__doc__[] = "The maximum number of the operations of an event loop, which run at once.\n";
+static PyObject* PyXmlSec_AioExecutorMaxPendingGet(PyObject* self, void* closure) {
+    return PyLong_FromSsize_t(((PyXmlSec_AioExecutor*)self)->max_pending);
+}
+
+static PyGetSetDef PyXmlSec_AioExecutorGetSet[] = {
+    {
+        "workers",
+        (getter)PyXmlSec_AioExecutorWorkersGet,
+        NULL,
+        (char*)PyXmlSec_AioExecutorWorkers__doc__,
+        NULL
+    },
+    {
+        "max_pending",
+        (getter)PyXmlSec_AioExecutorMaxPendingGet,
+        NULL,
+        (char*)PyXmlSec_AioExecutorMaxPending__doc__,
+        NULL
+    },
+    {NULL} /* Sentinel */
+};
+
+static PyMethodDef PyXmlSec_AioExecutorMethods[] = {
+    {
+        "sign",
+        (PyCFunction)PyXmlSec_AioExecutorSign,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_AioExecutorSign__doc__
+    },
+    {
+        "verify",
+        (PyCFunction)PyXmlSec_AioExecutorVerify,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_AioExecutorVerify__doc__
+    },
+    {
+        "encrypt_binary",
+        (PyCFunction)PyXmlSec_AioExecutorEncryptBinary,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_AioExecutorEncryptBinary__doc__
+    },
+    {
+        "encrypt_xml",
+        (PyCFunction)PyXmlSec_AioExecutorEncryptXml,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_AioExecutorEncryptXml__doc__
+    },
+    {
+        "decrypt",
+        (PyCFunction)PyXmlSec_AioExecutorDecrypt,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_AioExecutorDecrypt__doc__
+    },
+    {
+        "shutdown",
+        (PyCFunction)PyXmlSec_AioExecutorShutdown,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_AioExecutorShutdown__doc__
+    },
+    {"__enter__", (PyCFunction)PyXmlSec_AioExecutor__enter__, METH_NOARGS, NULL},
+    {"__exit__", (PyCFunction)PyXmlSec_AioExecutor__exit__, METH_VARARGS, NULL},
+    {NULL, NULL} /* sentinel */
+};
+
+static PyTypeObject _PyXmlSec_AioExecutorType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    STRINGIFY(MODULE_NAME) ".aio.Executor",      /* tp_name */
+    sizeof(PyXmlSec_AioExecutor),                /* tp_basicsize */
+    0,                                           /* tp_itemsize */
+    PyXmlSec_AioExecutor__del__,                 /* tp_dealloc */
+    0,                                           /* tp_print */
+    0,                                           /* tp_getattr */
+    0,                                           /* tp_setattr */
+    0,                                           /* tp_reserved */
+    0,                                           /* tp_repr */
+    0,                                           /* tp_as_number */
+    0,                                           /* tp_as_sequence */
+    0,                                           /* tp_as_mapping */
+    0,                                           /* tp_hash  */
+    0,                                           /* tp_call */
+    0,                                           /* tp_str */
+    0,                                           /* tp_getattro */
+    0,                                           /* tp_setattro */
+    0,                                           /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT|Py_TPFLAGS_BASETYPE,      /* tp_flags */
+    "__init__(self, manager=None, workers=None, max_pending=None)\n"
+    "Runs the operations on up to ``workers`` threads, :func:`os.cpu_count` by default, "
+    "at most ``max_pending`` operations of an event loop at once, ``workers`` by default.\n\n"
+    ":param manager: the keys manager shared by the contexts\n"
+    ":type manager: :class:`~xmlsec.KeysManager` or :data:`None`\n"
+    ":param workers: the number of threads\n"
+    ":type workers: :class:`int` or :data:`None`\n"
+    ":param max_pending: the maximum number of the operations of an event loop, which run at once\n"
+    ":type max_pending: :class:`int` or :data:`None`", /* tp_doc */
+    0,                                           /* tp_traverse */
+    0,                                           /* tp_clear */
+    0,                                           /* tp_richcompare */
+    0,                                           /* tp_weaklistoffset */
+    0,                                           /* tp_iter */
+    0,                                           /* tp_iternext */
+    PyXmlSec_AioExecutorMethods,                 /* tp_methods */
+    0,                                           /* tp_members */
+    PyXmlSec_AioExecutorGetSet,                  /* tp_getset */
+    0,                                           /* tp_base */
+    0,                                           /* tp_dict */
+    0,                                           /* tp_descr_get */
+    0,                                           /* tp_descr_set */
+    0,                                           /* tp_dictoffset */
+    PyXmlSec_AioExecutor__init__,                /* tp_init */
+    0,                                           /* tp_alloc */
+    PyXmlSec_AioExecutor__new__,                 /* tp_new */
+    0,                                           /* tp_free */
+};
+
+static PyModuleDef PyXmlSec_AioModule =
+{
+    PyModuleDef_HEAD_INIT,
+    STRINGIFY(MODULE_NAME) ".aio",
+    PYXMLSEC_AIO_DOC,
+    -1,
+    NULL,       /* m_methods */
+    NULL,       /* m_slots */
+    NULL,       /* m_traverse */
+    NULL,       /* m_clear */
+    NULL,       /* m_free */
+};
+
+int PyXmlSec_AioModule_Init(PyObject* package) {
+    PyObject* aio = NULL;
+    PyObject* asyncio = NULL;
+
+    if (PyType_Ready(&_PyXmlSec_AioLoopType) < 0) goto ON_FAIL;
+    if (PyType_Ready(&_PyXmlSec_AioExecutorType) < 0) goto ON_FAIL;
+
+    if ((PyXmlSec_AioContextTypes[PYXMLSEC_AIO_SIGNATURE] = PyObject_GetAttrString(package, "SignatureContext")) == NULL) goto ON_FAIL;
+    if ((PyXmlSec_AioContextTypes[PYXMLSEC_AIO_ENCRYPTION] = PyObject_GetAttrString(package, "EncryptionContext")) == NULL) goto ON_FAIL;
+    if ((PyXmlSec_AioCall = PyCFunction_New(&PyXmlSec_AioCallDef, NULL)) == NULL) goto ON_FAIL;
+    if ((asyncio = PyImport_ImportModule("asyncio")) == NULL) goto ON_FAIL;
+    if ((PyXmlSec_AioGetRunningLoop = PyObject_GetAttrString(asyncio, "get_running_loop")) == NULL) goto ON_FAIL;
+    if ((PyXmlSec_AioWrapFuture = PyObject_GetAttrString(asyncio, "wrap_future")) == NULL) goto ON_FAIL;
+    Py_CLEAR(asyncio);
+
+    if ((aio = PyModule_Create(&PyXmlSec_AioModule)) == NULL) goto ON_FAIL;
+    // PyModule_AddObject steals a reference on success
+    Py_INCREF(&_PyXmlSec_AioExecutorType);
+    if (PyModule_AddObject(aio, "Executor", (PyObject*)&_PyXmlSec_AioExecutorType) < 0) {
+        Py_DECREF(&_PyXmlSec_AioExecutorType);
+        goto ON_FAIL;
+    }
+    if (PyModule_AddObject(package, "aio", aio) < 0) goto ON_FAIL;
+
+    return 0;
+ON_FAIL:
+    Py_XDECREF(asyncio);
+    Py_XDECREF(aio);
+    return -1;
+}
@@ -0,0 +1,629 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+#include "common.h"
+#include "platform.h"
+#include "exception.h"
+#include "keys.h"
+#include "cache.h"
+#include "utils.h"
+
+#include <xmlsec/crypto.h>
+#include <xmlsec/keyinfo.h>
+
+int PyXmlSec_ComputeSha256(const xmlSecByte* data, xmlSecSize size, xmlSecByte* digest) {
+    xmlSecTransformCtxPtr transformCtx;
+    xmlSecTransformPtr transform;
+    int rv = -1;
+
+    if ((transformCtx = xmlSecTransformCtxCreate()) == NULL) return -1;
+    if ((transform = xmlSecTransformCtxCreateAndAppend(transformCtx, xmlSecTransformSha256Id)) == NULL) goto ON_EXIT;
+    transform->operation = xmlSecTransformOperationSign;
+    if (xmlSecTransformCtxPrepare(transformCtx, xmlSecTransformDataTypeBin) < 0) goto ON_EXIT;
+    if (xmlSecTransformPushBin(transformCtx->first, data, size, 1, transformCtx) < 0) goto ON_EXIT;
+    if (xmlSecBufferGetSize(transformCtx->result) != PYXMLSEC_SHA256_SIZE) goto ON_EXIT;
+
+    memcpy(digest, xmlSecBufferGetData(transformCtx->result), PYXMLSEC_SHA256_SIZE);
+    rv = 0;
+ON_EXIT:
+    xmlSecTransformCtxDestroy(transformCtx);
+    return rv;
+}
+
+// feeds the digest in chunks, so the document is never copied as a whole
+typedef struct {
+    xmlSecTransformCtxPtr transformCtx;
+    int failed;
+    xmlSecSize size;
+    xmlSecByte data[16384];
+} PyXmlSec_DigestWriter;
+
+static void PyXmlSec_DigestWriterFlush(PyXmlSec_DigestWriter* writer, int final) {
+    if (!writer->failed && xmlSecTransformPushBin(writer->transformCtx->first, writer->data, writer->size, final, writer->transformCtx) < 0) {
+        writer->failed = 1;
+    }
+    writer->size = 0;
+}
+
+static void PyXmlSec_DigestWriterAppend(PyXmlSec_DigestWriter* writer, const void* data, xmlSecSize size) {
+    if (writer->size + size > sizeof(writer->data)) {
+        PyXmlSec_DigestWriterFlush(writer, 0);
+        if (size > sizeof(writer->data)) {
+            if (!writer->failed && xmlSecTransformPushBin(writer->transformCtx->first, data, size, 0, writer->transformCtx) < 0) {
+                writer->failed = 1;
+            }
+            return;
+        }
+    }
+    memcpy(writer->data + writer->size, data, size);
+    writer->size += size;
+}
+
+// the length prefix makes the encoding unambiguous, NULL differs from the empty string.
+// the most of strings are short, so the length takes one byte unless it's 255 or more.
+static void PyXmlSec_DigestWriterString(PyXmlSec_DigestWriter* writer, const xmlChar* str) {
+    xmlSecSize size = str != NULL ? (xmlSecSize)xmlStrlen(str) + 1 : 0;
+    xmlSecByte short_size = size < 0xFF ? (xmlSecByte)size : 0xFF;
+
+    PyXmlSec_DigestWriterAppend(writer, &short_size, 1);
+    if (short_size == 0xFF) PyXmlSec_DigestWriterAppend(writer, &size, sizeof(size));
+    if (size > 1) PyXmlSec_DigestWriterAppend(writer, str, size - 1);
+}
+
+static void PyXmlSec_DigestWriterNs(PyXmlSec_DigestWriter* writer, xmlNsPtr ns) {
+    PyXmlSec_DigestWriterString(writer, ns != NULL ? ns->prefix : NULL);
+    PyXmlSec_DigestWriterString(writer, ns != NULL ? ns->href : NULL);
+}
+
+// writes the node without its children, the node types are less than the markers of namespaces and attributes
+static void PyXmlSec_DigestWriterNode(PyXmlSec_DigestWriter* writer, xmlNodePtr node) {
+    static const xmlSecByte end = 0, ns_marker = 'n';
+    xmlSecByte type = (xmlSecByte)node->type;
+    xmlSecByte attr_marker;
+    xmlBufferPtr buffer;
+    xmlAttrPtr attr;
+    xmlNodePtr child;
+    xmlNsPtr ns;
+
+    PyXmlSec_DigestWriterAppend(writer, &type, 1);
+    switch (node->type) {
+    case XML_ELEMENT_NODE:
+        PyXmlSec_DigestWriterString(writer, node->name);
+        PyXmlSec_DigestWriterNs(writer, node->ns);
+        for (ns = node->nsDef; ns != NULL; ns = ns->next) {
+            PyXmlSec_DigestWriterAppend(writer, &ns_marker, 1);
+            PyXmlSec_DigestWriterNs(writer, ns);
+        }
+        for (attr = node->properties; attr != NULL; attr = attr->next) {
+            // the attributes registered as ids differ from the others, the references are resolved by them
+            attr_marker = attr->atype == XML_ATTRIBUTE_ID ? 'i' : 'a';
+            PyXmlSec_DigestWriterAppend(writer, &attr_marker, 1);
+            PyXmlSec_DigestWriterString(writer, attr->name);
+            PyXmlSec_DigestWriterNs(writer, attr->ns);
+            for (child = attr->children; child != NULL; child = child->next) {
+                PyXmlSec_DigestWriterNode(writer, child);
+                PyXmlSec_DigestWriterAppend(writer, &end, 1);
+            }
+            PyXmlSec_DigestWriterAppend(writer, &end, 1);
+        }
+        break;
+    case XML_TEXT_NODE:
+    case XML_CDATA_SECTION_NODE:
+    case XML_COMMENT_NODE:
+        PyXmlSec_DigestWriterString(writer, node->content);
+        break;
+    case XML_PI_NODE:
+        PyXmlSec_DigestWriterString(writer, node->name);
+        PyXmlSec_DigestWriterString(writer, node->content);
+        break;
+    case XML_DTD_NODE:
+        // the declarations are rare and short, the entities which are not substituted are defined there
+        if ((buffer = xmlBufferCreate()) == NULL || xmlNodeDump(buffer, node->doc, node, 0, 0) < 0) {
+            writer->failed = 1;
+        } else {
+            PyXmlSec_DigestWriterString(writer, xmlBufferContent(buffer));
+        }
+        if (buffer != NULL) xmlBufferFree(buffer);
+        break;
+    default:
+        PyXmlSec_DigestWriterString(writer, node->name);
+        break;
+    }
+}
+
+static PyXmlSec_DigestWriter* PyXmlSec_DigestWriterCreate(void) {
+    PyXmlSec_DigestWriter* writer;
+    xmlSecTransformPtr transform;
+
+    if ((writer = (PyXmlSec_DigestWriter*)xmlMalloc(sizeof(PyXmlSec_DigestWriter))) == NULL) return NULL;
+    writer->failed = 0;
+    writer->size = 0;
+    if ((writer->transformCtx = xmlSecTransformCtxCreate()) == NULL) goto ON_FAIL;
+    if ((transform = xmlSecTransformCtxCreateAndAppend(writer->transformCtx, xmlSecTransformSha256Id)) == NULL) goto ON_FAIL;
+    transform->operation = xmlSecTransformOperationSign;
+    if (xmlSecTransformCtxPrepare(writer->transformCtx, xmlSecTransformDataTypeBin) < 0) goto ON_FAIL;
+    return writer;
+ON_FAIL:
+    if (writer->transformCtx != NULL) xmlSecTransformCtxDestroy(writer->transformCtx);
+    xmlFree(writer);
+    return NULL;
+}
+
+// finishes the digest and destroys the writer
+static int PyXmlSec_DigestWriterFinish(PyXmlSec_DigestWriter* writer, xmlSecByte* digest) {
+    int rv = -1;
+
+    PyXmlSec_DigestWriterFlush(writer, 1);
+    if (!writer->failed && xmlSecBufferGetSize(writer->transformCtx->result) == PYXMLSEC_SHA256_SIZE) {
+        memcpy(digest, xmlSecBufferGetData(writer->transformCtx->result), PYXMLSEC_SHA256_SIZE);
+        rv = 0;
+    }
+    xmlSecTransformCtxDestroy(writer->transformCtx);
+    xmlFree(writer);
+    return rv;
+}
+
+// walks the nodes in the document order starting with first, every node is closed by the end marker after its children.
+// the following siblings of first are visited too, if siblings is set. the pre-order index of mark is stored to position.
+// the subtree of skip is replaced by the marker.
+static void PyXmlSec_DigestWriterTree(
+    PyXmlSec_DigestWriter* writer, xmlNodePtr first, int siblings, xmlNodePtr mark, xmlSecSize* position, xmlNodePtr skip
+) {
+    static const xmlSecByte end = 0, skip_marker = 's';
+    xmlNodePtr top = first->parent;
+    xmlNodePtr cur;
+    xmlSecSize index = 0;
+
+    cur = first;
+    while (cur != NULL && !writer->failed) {
+        if (cur == mark) {
+            *position = index;
+        }
+        ++index;
+        if (cur == skip) {
+            PyXmlSec_DigestWriterAppend(writer, &skip_marker, 1);
+        } else {
+            PyXmlSec_DigestWriterNode(writer, cur);
+            if (cur->type == XML_ELEMENT_NODE && cur->children != NULL) {
+                cur = cur->children;
+                continue;
+            }
+        }
+        for (;;) {
+            PyXmlSec_DigestWriterAppend(writer, &end, 1);
+            if (cur->next != NULL && (siblings || cur != first)) {
+                cur = cur->next;
+                break;
+            }
+            cur = cur->parent;
+            if (cur == top) {
+                cur = NULL;
+                break;
+            }
+        }
+    }
+}
+
+int PyXmlSec_ComputeDocumentDigest(xmlNodePtr node, xmlSecByte* digest) {
+    PyXmlSec_DigestWriter* writer;
+    // the order of the node within the document identifies the signature
+    xmlSecSize position = (xmlSecSize)-1;
+
+    if (node->doc->children == NULL) return -1;
+    if ((writer = PyXmlSec_DigestWriterCreate()) == NULL) return -1;
+    PyXmlSec_DigestWriterTree(writer, node->doc->children, 1, node, &position, NULL);
+    PyXmlSec_DigestWriterAppend(writer, &position, sizeof(position));
+    if (PyXmlSec_DigestWriterFinish(writer, digest) < 0) return -1;
+    return position != (xmlSecSize)-1 ? 0 : -1;
+}
+
+int PyXmlSec_ComputeNodeDigest(xmlNodePtr node, xmlSecByte* digest) {
+    PyXmlSec_DigestWriter* writer;
+
+    if ((writer = PyXmlSec_DigestWriterCreate()) == NULL) return -1;
+    PyXmlSec_DigestWriterTree(writer, node, 0, NULL, NULL, NULL);
+    return PyXmlSec_DigestWriterFinish(writer, digest);
+}
+
+int PyXmlSec_ComputeReferenceDigest(xmlNodePtr reference, xmlNodePtr target, xmlNodePtr skip, xmlSecByte* digest) {
+    static const xmlSecByte ns_marker = 'n', attr_marker = 'a';
+    PyXmlSec_DigestWriter* writer;
+    xmlNodePtr cur;
+    xmlAttrPtr attr;
+    xmlNsPtr ns;
+
+    if ((writer = PyXmlSec_DigestWriterCreate()) == NULL) return -1;
+    PyXmlSec_DigestWriterTree(writer, reference, 0, NULL, NULL, NULL);
+    if (target->type == XML_DOCUMENT_NODE) {
+        if (target->children != NULL) PyXmlSec_DigestWriterTree(writer, target->children, 1, NULL, NULL, skip);
+    } else {
+        // the entities which are substituted by canonicalization are declared outside of the subtree
+        if (target->doc->intSubset != NULL) PyXmlSec_DigestWriterNode(writer, (xmlNodePtr)target->doc->intSubset);
+        // the canonical form of the subtree includes the namespaces and the xml attributes inherited from the ancestors
+        for (cur = target->parent; cur != NULL && cur->type == XML_ELEMENT_NODE; cur = cur->parent) {
+            for (ns = cur->nsDef; ns != NULL; ns = ns->next) {
+                PyXmlSec_DigestWriterAppend(writer, &ns_marker, 1);
+                PyXmlSec_DigestWriterNs(writer, ns);
+            }
+            for (attr = cur->properties; attr != NULL; attr = attr->next) {
+                if (attr->ns == NULL || !xmlStrEqual(attr->ns->href, XML_XML_NAMESPACE)) continue;
+                PyXmlSec_DigestWriterAppend(writer, &attr_marker, 1);
+                PyXmlSec_DigestWriterString(writer, attr->name);
+                PyXmlSec_DigestWriterString(writer, attr->children != NULL ? attr->children->content : NULL);
+            }
+        }
+        PyXmlSec_DigestWriterTree(writer, target, 0, NULL, NULL, skip);
+    }
+    return PyXmlSec_DigestWriterFinish(writer, digest);
+}
+
+// writes the public part of the asymmetric key or the value of the symmetric key to the buffer,
+// which is prefixed by the name of the key data, so keys of different types never match.
+static int PyXmlSec_KeyWriteMaterial(xmlSecKeyPtr key, xmlSecBufferPtr material) {
+    xmlSecKeyDataPtr value = xmlSecKeyGetValue(key);
+    xmlSecKeyInfoCtx keyInfoCtx;
+    xmlBufferPtr content = NULL;
+    xmlDocPtr doc = NULL;
+    xmlNodePtr node;
+    int rv = -1;
+
+    if (value == NULL || value->id->name == NULL) return 0;
+    if (xmlSecBufferAppend(material, value->id->name, (xmlSecSize)xmlStrlen(value->id->name) + 1) < 0) return -1;
+
+    if ((xmlSecKeyDataGetType(value) & xmlSecKeyDataTypeSymmetric) != 0) {
+        xmlSecBufferPtr buffer = xmlSecKeyDataBinaryValueGetBuffer(value);
+        if (buffer == NULL || xmlSecBufferGetSize(buffer) == 0) return 0;
+        if (xmlSecBufferAppend(material, xmlSecBufferGetData(buffer), xmlSecBufferGetSize(buffer)) < 0) return -1;
+        return 1;
+    }
+
+    if (value->id->dataNodeName == NULL || (value->id->usage & xmlSecKeyDataUsageKeyValueNodeWrite) == 0) return 0;
+    if (xmlSecKeyInfoCtxInitialize(&keyInfoCtx, NULL) < 0) return -1;
+    keyInfoCtx.mode = xmlSecKeyInfoModeWrite;
+    // only the public part, the same as the one which is written to <dsig:KeyValue/>
+    keyInfoCtx.keyReq.keyType = xmlSecKeyDataTypePublic;
+
+    if ((doc = xmlNewDoc(NULL)) == NULL) goto ON_EXIT;
+    if ((node = xmlNewDocNode(doc, NULL, value->id->dataNodeName, NULL)) == NULL) goto ON_EXIT;
+    xmlDocSetRootElement(doc, node);
+    if (xmlSecKeyDataXmlWrite(value->id, key, node, &keyInfoCtx) < 0) goto ON_EXIT;
+    if (node->children == NULL) {
+        rv = 0;
+        goto ON_EXIT;
+    }
+    if ((content = xmlBufferCreate()) == NULL) goto ON_EXIT;
+    if (xmlNodeDump(content, doc, node, 0, 0) < 0) goto ON_EXIT;
+    if (xmlSecBufferAppend(material, xmlBufferContent(content), (xmlSecSize)xmlBufferLength(content)) < 0) goto ON_EXIT;
+    rv = 1;
+ON_EXIT:
+    if (content != NULL) xmlBufferFree(content);
+    if (doc != NULL) xmlFreeDoc(doc);
+    xmlSecKeyInfoCtxFinalize(&keyInfoCtx);
+    return rv;
+}
+
+PyObject* PyXmlSec_KeyFingerprint(xmlSecKeyPtr key) {
+    xmlSecByte digest[PYXMLSEC_SHA256_SIZE];
+    xmlSecBufferPtr material;
+    int rv;
+
+    if ((material = xmlSecBufferCreate(0)) == NULL) {
+        PyXmlSec_SetLastError("failed to create buffer");
+        return NULL;
+    }
+    rv = PyXmlSec_KeyWriteMaterial(key, material);
+    if (rv > 0 && PyXmlSec_ComputeSha256(xmlSecBufferGetData(material), xmlSecBufferGetSize(material), digest) < 0) {
+        rv = -1;
+    }
+    xmlSecBufferDestroy(material);
+
+    if (rv < 0) {
+        PyXmlSec_SetLastError("failed to compute the fingerprint of the key");
+        return NULL;
+    }
+    if (rv == 0) {
+        PyXmlSec_ClearError();
+        Py_RETURN_NONE;
+    }
+    return PyBytes_FromStringAndSize((const char*)digest, sizeof(digest));
+}
+
+static PyObject* PyXmlSec_VerificationCache__new__(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
+    PyXmlSec_VerificationCache* cache = (PyXmlSec_VerificationCache*)PyType_GenericNew(type, args, kwargs);
+    PYXMLSEC_DEBUGF("%p: new verification cache", cache);
+    if (cache != NULL) {
+        cache->entries = NULL;
+        cache->timer = NULL;
+        cache->maxsize = 0;
+        cache->ttl = 0;
+        cache->hits = 0;
+        cache->misses = 0;
+    }
+    return (PyObject*)(cache);
+}
+
+static int PyXmlSec_VerificationCache__init__(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "maxsize", "ttl", "timer", NULL};
+    PyXmlSec_VerificationCache* cache = (PyXmlSec_VerificationCache*)self;
+    Py_ssize_t maxsize = 1024;
+    PyObject* ttl = Py_None;
+    PyObject* timer = NULL;
+    double ttl_value = 0;
+
+    PYXMLSEC_DEBUGF("%p: init verification cache", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|nOO:__init__", kwlist, &maxsize, &ttl, &timer)) {
+        goto ON_FAIL;
+    }
+    if (maxsize < 0) {
+        PyErr_SetString(PyExc_ValueError, "maxsize must not be negative.");
+        goto ON_FAIL;
+    }
+    if (PyXmlSec_LruParseTtl(ttl, &ttl_value) < 0) goto ON_FAIL;
+    if ((timer = PyXmlSec_LruGetTimer(timer)) == NULL) goto ON_FAIL;
+
+    Py_XSETREF(cache->timer, timer);
+    if (cache->entries == NULL && (cache->entries = PyDict_New()) == NULL) goto ON_FAIL;
+    PyDict_Clear(cache->entries);
+    cache->maxsize = maxsize;
+    cache->ttl = ttl_value;
+    cache->hits = 0;
+    cache->misses = 0;
+    PYXMLSEC_DEBUGF("%p: init verification cache - ok", self);
+    return 0;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: init verification cache - failed", self);
+    return -1;
+}
+
+static void PyXmlSec_VerificationCache__del__(PyObject* self) {
+    PyXmlSec_VerificationCache* cache = (PyXmlSec_VerificationCache*)self;
+    PYXMLSEC_DEBUGF("%p: delete verification cache", self);
+    Py_XDECREF(cache->entries);
+    Py_XDECREF(cache->timer);
+    Py_TYPE(self)->tp_free(self);
+}
+
+static int PyXmlSec_VerificationCacheCheckReady(PyXmlSec_VerificationCache* cache) {
+    if (cache->entries == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "VerificationCache is not initialized.");
+        return -1;
+    }
+    return 0;
+}
+
+int PyXmlSec_VerificationCacheLookup(PyXmlSec_VerificationCache* cache, PyObject* entry) {
+    PyObject* value = NULL;
+    int rv;
+
+    if (PyXmlSec_VerificationCacheCheckReady(cache) < 0) return -1;
+    if ((rv = PyXmlSec_LruLookupExpiring(cache->entries, entry, cache->timer, &value)) == 1) {
+        cache->hits++;
+        Py_DECREF(value);
+    } else if (rv == 0) {
+        cache->misses++;
+    }
+    return rv;
+}
+
+int PyXmlSec_VerificationCacheStore(PyXmlSec_VerificationCache* cache, PyObject* entry, PyObject* fingerprint) {
+    if (PyXmlSec_VerificationCacheCheckReady(cache) < 0) return -1;
+    return PyXmlSec_LruStoreExpiring(cache->entries, entry, fingerprint, cache->maxsize, cache->ttl, cache->timer);
+}
+
+static const char PyXmlSec_VerificationCacheInvalidate__doc__[] = \
+    "invalidate(key = None) -> int\n"
+    "Forgets the documents verified with the ``key``, e.g. when the key is rotated or revoked. "
+    "Forgets all documents if ``key`` is :data:`None`.\n\n"
+    "The keys are matched by the public part of the key material, so either the public or the private key can be given.\n\n"
+    ":param key: the key\n"
+    ":type key: :class:`~xmlsec.Key` or :data:`None`\n"
+    ":return: the number of forgotten documents\n"
+    ":rtype: :class:`int`";
+static PyObject* PyXmlSec_VerificationCacheInvalidate(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "key", NULL};
+    PyXmlSec_VerificationCache* cache = (PyXmlSec_VerificationCache*)self;
+    PyObject* key = Py_None;
+    PyObject* fingerprint = NULL;
+    PyObject* stale = NULL;
+    PyObject* entry;
+    PyObject* value;
+    Py_ssize_t pos = 0;
+    Py_ssize_t count = 0;
+    Py_ssize_t i;
+    int rv;
+
+    PYXMLSEC_DEBUGF("%p: invalidate - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|O:invalidate", kwlist, &key)) {
+        goto ON_FAIL;
+    }
+    if (PyXmlSec_VerificationCacheCheckReady(cache) < 0) goto ON_FAIL;
+
+    if (key == Py_None) {
+        count = PyDict_Size(cache->entries);
+        PyDict_Clear(cache->entries);
+        PYXMLSEC_DEBUGF("%p: invalidate - ok", self);
+        return PyLong_FromSsize_t(count);
+    }
+
+    if (!PyObject_IsInstance(key, (PyObject*)PyXmlSec_KeyType)) {
+        PyErr_SetString(PyExc_TypeError, "instance of *xmlsec.Key* expected.");
+        goto ON_FAIL;
+    }
+    if (((PyXmlSec_Key*)key)->handle == NULL) {
+        PyErr_SetString(PyExc_TypeError, "empty key.");
+        goto ON_FAIL;
+    }
+    if ((fingerprint = PyXmlSec_KeyFingerprint(((PyXmlSec_Key*)key)->handle)) == NULL) goto ON_FAIL;
+    if ((stale = PyList_New(0)) == NULL) goto ON_FAIL;
+
+    while (PyDict_Next(cache->entries, &pos, &entry, &value)) {
+        rv = PyObject_RichCompareBool(PyTuple_GET_ITEM(value, 1), fingerprint, Py_EQ);
+        if (rv < 0) goto ON_FAIL;
+        if (rv == 1 && PyList_Append(stale, entry) < 0) goto ON_FAIL;
+    }
+    count = PyList_GET_SIZE(stale);
+    for (i = 0; i < count; ++i) {
+        if (PyDict_DelItem(cache->entries, PyList_GET_ITEM(stale, i)) < 0) goto ON_FAIL;
+    }
+    Py_DECREF(stale);
+    Py_DECREF(fingerprint);
+    PYXMLSEC_DEBUGF("%p: invalidate - ok", self);
+    return PyLong_FromSsize_t(count);
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: invalidate - fail", self);
+    Py_XDECREF(stale);
+    Py_XDECREF(fingerprint);
+    return NULL;
+}
+
+static const char PyXmlSec_VerificationCacheInfo__doc__[] = \
+    "info() -> tuple[int, int, int, int]\n"
+    "Returns the statistics of the cache.\n\n"
+    ":return: ``(hits, misses, maxsize, currsize)``, expired entries are counted in ``currsize`` until they are looked up\n"
+    ":rtype: :class:`tuple`";
+static PyObject* PyXmlSec_VerificationCacheInfo(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyXmlSec_VerificationCache* cache = (PyXmlSec_VerificationCache*)self;
+    return Py_BuildValue("(nnnn)",
+        cache->hits,
+        cache->misses,
+        cache->maxsize,
+        cache->entries != NULL ? PyDict_Size(cache->entries) : (Py_ssize_t)0);
+}
+
+static Py_ssize_t PyXmlSec_VerificationCache__len__(PyObject* self) {
+    PyXmlSec_VerificationCache* cache = (PyXmlSec_VerificationCache*)self;
+    return cache->entries != NULL ? PyDict_Size(cache->entries) : 0;
+}
+
+static const char PyXmlSec_VerificationCacheTtl__doc__[] = "The lifetime of the entries in seconds or :data:`None` if they never expire.\n";
+static PyObject* PyXmlSec_VerificationCacheTtlGet(PyObject* self, void* closure) {
+    PyXmlSec_VerificationCache* cache = (PyXmlSec_VerificationCache*)self;
+    if (cache->ttl == 0) {
+        Py_RETURN_NONE;
+    }
+    return PyFloat_FromDouble(cache->ttl);
+}
+
+static const char PyXmlSec_VerificationCacheMaxsize__doc__[] = "The maximal number of the entries.\n";
+static PyObject* PyXmlSec_VerificationCacheMaxsizeGet(PyObject* self, void* closure) {
+    return PyLong_FromSsize_t(((PyXmlSec_VerificationCache*)self)->maxsize);
+}
+
+static PyGetSetDef PyXmlSec_VerificationCacheGetSet[] = {
+    {
+        "maxsize",
+        (getter)PyXmlSec_VerificationCacheMaxsizeGet,
+        NULL,
+        (char*)PyXmlSec_VerificationCacheMaxsize__doc__,
+        NULL
+    },
+    {
+        "ttl",
+        (getter)PyXmlSec_VerificationCacheTtlGet,
+        NULL,
+        (char*)PyXmlSec_VerificationCacheTtl__doc__,
+        NULL
+    },
+    {NULL} /* Sentinel */
+};
+
+static PyMethodDef PyXmlSec_VerificationCacheMethods[] = {
+    {
+        "invalidate",
+        (PyCFunction)PyXmlSec_VerificationCacheInvalidate,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_VerificationCacheInvalidate__doc__
+    },
+    {
+        "info",
+        (PyCFunction)PyXmlSec_VerificationCacheInfo,
+        METH_NOARGS,
+        PyXmlSec_VerificationCacheInfo__doc__
+    },
+    {NULL, NULL} /* sentinel */
+};
+
+static PySequenceMethods PyXmlSec_VerificationCacheAsSequence = {
+    PyXmlSec_VerificationCache__len__,          /* sq_length */
+};
+
+static const char PyXmlSec_VerificationCache__doc__[] = \
+    "VerificationCache(maxsize = 1024, ttl = None, timer = time.monotonic)\n"
+    "Remembers the documents which were successfully verified, "
+    "so a :class:`~xmlsec.SignatureContext` which has the cache skips the verification of unchanged documents.\n\n"
+    "A document is remembered together with the key which is used to verify it and "
+    "the enabled transforms and key data of the context, so one cache can be shared by several contexts. "
+    "If the key is found in the :class:`~xmlsec.KeysManager`, the cached result is bound to that manager "
+    "and is not used after keys or certificates are added to it. The managers with ``resolver`` are not cached. "
+    "A cached result still looks up the key, so :attr:`SignatureContext.key` is set like after verification. "
+    "Only the signatures, all references of which point to the same document, are cached.\n\n"
+    "The results cached within ``ttl`` are trusted even if the certificates have expired since, "
+    "use :meth:`invalidate` when a key is rotated or revoked.\n\n"
+    ":param maxsize: the maximal number of documents, the least recently used ones are forgotten first\n"
+    ":type maxsize: :class:`int`\n"
+    ":param ttl: the number of seconds the result is trusted for, :data:`None` means forever\n"
+    ":type ttl: :class:`float` or :data:`None`\n"
+    ":param timer: the function which returns the current time in seconds\n"
+    ":type timer: :class:`~collections.abc.Callable`";
+
+static PyTypeObject _PyXmlSec_VerificationCacheType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    STRINGIFY(MODULE_NAME) ".VerificationCache", /* tp_name */
+    sizeof(PyXmlSec_VerificationCache),          /* tp_basicsize */
+    0,                                           /* tp_itemsize */
+    PyXmlSec_VerificationCache__del__,           /* tp_dealloc */
+    0,                                           /* tp_print */
+    0,                                           /* tp_getattr */
+    0,                                           /* tp_setattr */
+    0,                                           /* tp_reserved */
+    0,                                           /* tp_repr */
+    0,                                           /* tp_as_number */
+    &PyXmlSec_VerificationCacheAsSequence,       /* tp_as_sequence */
+    0,                                           /* tp_as_mapping */
+    0,                                           /* tp_hash  */
+    0,                                           /* tp_call */
+    0,                                           /* tp_str */
+    0,                                           /* tp_getattro */
+    0,                                           /* tp_setattro */
+    0,                                           /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT|Py_TPFLAGS_BASETYPE,      /* tp_flags */
+    PyXmlSec_VerificationCache__doc__,           /* tp_doc */
+    0,                                           /* tp_traverse */
+    0,                                           /* tp_clear */
+    0,                                           /* tp_richcompare */
+    0,                                           /* tp_weaklistoffset */
+    0,                                           /* tp_iter */
+    0,                                           /* tp_iternext */
+    PyXmlSec_VerificationCacheMethods,           /* tp_methods */
+    0,                                           /* tp_members */
+    PyXmlSec_VerificationCacheGetSet,            /* tp_getset */
+    0,                                           /* tp_base */
+    0,                                           /* tp_dict */
+    0,                                           /* tp_descr_get */
+    0,                                           /* tp_descr_set */
+    0,                                           /* tp_dictoffset */
+    PyXmlSec_VerificationCache__init__,          /* tp_init */
+    0,                                           /* tp_alloc */
+    PyXmlSec_VerificationCache__new__,           /* tp_new */
+    0,                                           /* tp_free */
+};
+
+PyTypeObject* PyXmlSec_VerificationCacheType = &_PyXmlSec_VerificationCacheType;
+
+int PyXmlSec_CacheModule_Init(PyObject* package) {
+    if (PyType_Ready(PyXmlSec_VerificationCacheType) < 0) goto ON_FAIL;
+
+    // since objects is created as static objects, need to increase refcount to prevent deallocate
+    Py_INCREF(PyXmlSec_VerificationCacheType);
+
+    if (PyModule_AddObject(package, "VerificationCache", (PyObject*)PyXmlSec_VerificationCacheType) < 0) goto ON_FAIL;
+    return 0;
+ON_FAIL:
+    return -1;
+}
@@ -0,0 +1,56 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+#ifndef __PYXMLSEC_CACHE_H__
+#define __PYXMLSEC_CACHE_H__
+
+#include "platform.h"
+
+#include <xmlsec/xmlsec.h>
+#include <xmlsec/keys.h>
+
+#define PYXMLSEC_SHA256_SIZE 32
+
+typedef struct {
+    PyObject_HEAD
+    PyObject* entries;  // entry -> (expiration time or None, fingerprint of the verification key) in LRU order
+    PyObject* timer;
+    Py_ssize_t maxsize;
+    double ttl;  // zero if the entries never expire
+    Py_ssize_t hits;
+    Py_ssize_t misses;
+} PyXmlSec_VerificationCache;
+
+extern PyTypeObject* PyXmlSec_VerificationCacheType;
+
+// computes SHA-256 of the data. the gil is not required.
+int PyXmlSec_ComputeSha256(const xmlSecByte* data, xmlSecSize size, xmlSecByte* digest);
+
+// computes SHA-256 over the content of the document, including the registered ids, and the position of the node within it,
+// the document is walked in place rather than serialized. the gil is not required.
+int PyXmlSec_ComputeDocumentDigest(xmlNodePtr node, xmlSecByte* digest);
+
+// computes SHA-256 over the content of the node and its descendants. the gil is not required.
+int PyXmlSec_ComputeNodeDigest(xmlNodePtr node, xmlSecByte* digest);
+
+// computes SHA-256 over the content of the <dsig:Reference/> node and the node it refers to, which is either
+// the document or the element with its inherited namespaces and the declarations of the document.
+// the subtree of skip, e.g. the enveloped signature, is left out. the gil is not required.
+int PyXmlSec_ComputeReferenceDigest(xmlNodePtr reference, xmlNodePtr target, xmlNodePtr skip, xmlSecByte* digest);
+
+// returns the fingerprint of the key material as bytes or None if the key has no material which could be identified
+PyObject* PyXmlSec_KeyFingerprint(xmlSecKeyPtr key);
+
+// looks up the entry and marks it as recently used, returns 1 if found, 0 if not or expired, -1 on error
+int PyXmlSec_VerificationCacheLookup(PyXmlSec_VerificationCache* cache, PyObject* entry);
+
+// remembers the entry verified with the key which has the given fingerprint
+int PyXmlSec_VerificationCacheStore(PyXmlSec_VerificationCache* cache, PyObject* entry, PyObject* fingerprint);
+
+#endif //__PYXMLSEC_CACHE_H__
@@ -10,6 +10,8 @@
 #include "common.h"
 #include "constants.h"
 
+#include <xmlsec/xmldsig.h>
+
 #define PYXMLSEC_CONSTANTS_DOC "Various constants used by the library.\n"
 
 // destructor
@@ -245,6 +247,37 @@ static PyObject* PyXmlSec_KeyDataNew(xmlSecKeyDataId id) {
     return (PyObject*)keydata;
 }
 
+// the key data constants by the address of xmlSecKeyDataId
+static PyObject* PyXmlSec_KeyDataConstants = NULL;
+
+static int PyXmlSec_KeyDataRegister(PyObject* keydata) {
+    PyObject* id;
+    int rv;
+
+    if (PyXmlSec_KeyDataConstants == NULL && (PyXmlSec_KeyDataConstants = PyDict_New()) == NULL) return -1;
+    if ((id = PyLong_FromVoidPtr((void*)((PyXmlSec_KeyData*)keydata)->id)) == NULL) return -1;
+    rv = PyDict_SetItem(PyXmlSec_KeyDataConstants, id, keydata);
+    Py_DECREF(id);
+    return rv;
+}
+
+PyObject* PyXmlSec_KeyDataFromId(xmlSecKeyDataId id) {
+    PyObject* key;
+    PyObject* keydata = NULL;
+
+    if (PyXmlSec_KeyDataConstants != NULL) {
+        if ((key = PyLong_FromVoidPtr((void*)id)) == NULL) return NULL;
+        keydata = PyDict_GetItemWithError(PyXmlSec_KeyDataConstants, key);
+        Py_DECREF(key);
+        if (keydata == NULL && PyErr_Occurred()) return NULL;
+    }
+    if (keydata != NULL) {
+        Py_INCREF(keydata);
+        return keydata;
+    }
+    return PyXmlSec_KeyDataNew(id);
+}
+
 static PyModuleDef PyXmlSec_ConstantsModule =
 {
     PyModuleDef_HEAD_INIT,
@@ -282,6 +315,10 @@ int PyXmlSec_ConstantsModule_Init(PyObject* package) {
     if (PYXMLSEC_ADD_INT_CONSTANT(TransformUsageEncryptionMethod) < 0) goto ON_FAIL;
     if (PYXMLSEC_ADD_INT_CONSTANT(TransformUsageAny) < 0) goto ON_FAIL;
 
+    if (PYXMLSEC_ADD_INT_CONSTANT(DSigStatusUnknown) < 0) goto ON_FAIL;
+    if (PYXMLSEC_ADD_INT_CONSTANT(DSigStatusSucceeded) < 0) goto ON_FAIL;
+    if (PYXMLSEC_ADD_INT_CONSTANT(DSigStatusInvalid) < 0) goto ON_FAIL;
+
 #undef PYXMLSEC_ADD_INT_CONSTANT
 
 #define PYXMLSEC_DECLARE_NAMESPACE(var, name) \
@@ -429,6 +466,7 @@ int PyXmlSec_ConstantsModule_Init(PyObject* package) {
 
 #define PYXMLSEC_ADD_KEYDATA_CONSTANT(name, lname)  \
     tmp = PyXmlSec_KeyDataNew(xmlSec ## name ## Id); \
+    if (tmp != NULL && PyXmlSec_KeyDataRegister(tmp) < 0) goto ON_FAIL; \
     PYXMLSEC_ADD_CONSTANT(keyDataCls, name, lname);
 
     // keydata
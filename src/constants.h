@@ -28,4 +28,7 @@ typedef struct {
 extern PyTypeObject* PyXmlSec_TransformType;
 extern PyTypeObject* PyXmlSec_KeyDataType;
 
+// returns the constant for the key data id, or a new object if there is no such constant
+PyObject* PyXmlSec_KeyDataFromId(xmlSecKeyDataId id);
+
 #endif //__PYXMLSEC_CONSTANTS_H__
@@ -13,13 +13,27 @@
 #include "constants.h"
 #include "keys.h"
 #include "lxml.h"
+#include "ds.h"
+#include "cache.h"
+#include "keysstore.h"
+#include "report.h"
+#include "utils.h"
 
-#include <xmlsec/xmldsig.h>
+#include <xmlsec/crypto.h>
+#include <xmlsec/xmltree.h>
 
 typedef struct {
     PyObject_HEAD
     xmlSecDSigCtxPtr handle;
     PyXmlSec_KeysManager* manager;
+    int has_user_key;
+    PyObject* stream;  // the active binary stream, borrowed reference
+    PyObject* digest_cache;  // the digests of verified references in LRU order, NULL if the cache is disabled
+    Py_ssize_t digest_cache_maxsize;
+    Py_ssize_t digest_cache_hits;
+    Py_ssize_t digest_cache_misses;
+    PyXmlSec_VerificationCache* verification_cache;
+    PyXmlSec_SignatureTiming timing;  // pointed by the userData of the handle
 } PyXmlSec_SignatureContext;
 
 static PyObject* PyXmlSec_SignatureContext__new__(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
@@ -28,6 +42,14 @@ static PyObject* PyXmlSec_SignatureContext__new__(PyTypeObject *type, PyObject *
     if (ctx != NULL) {
         ctx->handle = NULL;
         ctx->manager = NULL;
+        ctx->has_user_key = 0;
+        ctx->stream = NULL;
+        ctx->digest_cache = NULL;
+        ctx->digest_cache_maxsize = 0;
+        ctx->digest_cache_hits = 0;
+        ctx->digest_cache_misses = 0;
+        ctx->verification_cache = NULL;
+        memset(&(ctx->timing), 0, sizeof(ctx->timing));
     }
     return (PyObject*)(ctx);
 }
@@ -47,6 +69,7 @@ static int PyXmlSec_SignatureContext__init__(PyObject* self, PyObject* args, PyO
         goto ON_FAIL;
     }
     ctx->manager = manager;
+    ctx->handle->userData = &(ctx->timing);
     PYXMLSEC_DEBUGF("%p: signMethod: %p", self, ctx->handle->signMethod);
     PYXMLSEC_DEBUGF("%p: init sign context - ok, manager - %p", self, manager);
     return 0;
@@ -60,13 +83,309 @@ static void PyXmlSec_SignatureContext__del__(PyObject* self) {
     PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
     PYXMLSEC_DEBUGF("%p: delete sign context", self);
     if (ctx->handle != NULL) {
+        PyXmlSec_SignatureTimingClear(ctx->handle);
         xmlSecDSigCtxDestroy(ctx->handle);
     }
     // release manager object
     Py_XDECREF(ctx->manager);
+    Py_XDECREF(ctx->digest_cache);
+    Py_XDECREF(ctx->verification_cache);
     Py_TYPE(self)->tp_free(self);
 }
 
+// drops the cached digests, it's called when the settings which affect verification are changed
+static void PyXmlSec_SignatureContextClearDigestCache(PyXmlSec_SignatureContext* ctx) {
+    if (ctx->digest_cache != NULL) {
+        PyDict_Clear(ctx->digest_cache);
+    }
+}
+
+// checks that all references of the signature are resolved within the same document,
+// so the outcome of verification depends only on the document. the gil is not required.
+static int PyXmlSec_SignatureIsSelfContained(xmlNodePtr node) {
+    xmlNodePtr signedInfo = xmlSecFindChild(node, xmlSecNodeSignedInfo, xmlSecDSigNs);
+    xmlNodePtr cur;
+    xmlChar* uri;
+    int res = 1;
+
+    if (signedInfo == NULL) return 0;
+
+    for (cur = xmlSecGetNextElementNode(signedInfo->children); cur != NULL && res; cur = xmlSecGetNextElementNode(cur->next)) {
+        if (!xmlSecCheckNodeName(cur, xmlSecNodeReference, xmlSecDSigNs)) continue;
+        uri = xmlGetProp(cur, xmlSecAttrURI);
+        if (uri != NULL) {
+            res = (uri[0] == '\0' || uri[0] == '#');
+            xmlFree(uri);
+        }
+    }
+    return res;
+}
+
+// looks up the digests of the references and marks them as recently used, returns 1 if all are found, 0 if not, -1 on error
+static int PyXmlSec_SignatureContextDigestCacheLookup(PyXmlSec_SignatureContext* ctx, xmlSecBufferPtr digests, int count) {
+    PyObject* digest;
+    int found = 1;
+    int rv;
+    int i;
+
+    for (i = 0; i < count; ++i) {
+        digest = PyBytes_FromStringAndSize((const char*)xmlSecBufferGetData(digests) + i * PYXMLSEC_SHA256_SIZE, PYXMLSEC_SHA256_SIZE);
+        if (digest == NULL) return -1;
+        rv = PyDict_Contains(ctx->digest_cache, digest);
+        if (rv == 1 && PyXmlSec_LruTouch(ctx->digest_cache, digest, Py_None) < 0) rv = -1;
+        Py_DECREF(digest);
+        if (rv < 0) return -1;
+        if (rv == 1) {
+            ctx->digest_cache_hits++;
+        } else {
+            ctx->digest_cache_misses++;
+            found = 0;
+        }
+    }
+    return found;
+}
+
+// remembers the digests of the references which have been verified by the last operation
+static int PyXmlSec_SignatureContextDigestCacheStore(PyXmlSec_SignatureContext* ctx, xmlSecBufferPtr digests, int count) {
+    xmlSecSize size = xmlSecPtrListGetSize(&(ctx->handle->signedInfoReferences));
+    xmlSecDSigReferenceCtxPtr dsigRefCtx;
+    PyObject* digest;
+    int rv;
+    int i;
+
+    // the references are processed in the document order until the first invalid one
+    for (i = 0; i < count && (xmlSecSize)i < size; ++i) {
+        dsigRefCtx = (xmlSecDSigReferenceCtxPtr)xmlSecPtrListGetItem(&(ctx->handle->signedInfoReferences), (xmlSecSize)i);
+        if (dsigRefCtx == NULL || dsigRefCtx->status != xmlSecDSigStatusSucceeded) continue;
+
+        digest = PyBytes_FromStringAndSize((const char*)xmlSecBufferGetData(digests) + i * PYXMLSEC_SHA256_SIZE, PYXMLSEC_SHA256_SIZE);
+        if (digest == NULL) return -1;
+        rv = PyXmlSec_LruStore(ctx->digest_cache, digest, Py_None, ctx->digest_cache_maxsize);
+        Py_DECREF(digest);
+        if (rv < 0) return -1;
+    }
+    return 0;
+}
+
+// the document has been found in the verification cache or all of its references have been found in the digest cache
+#define PYXMLSEC_VERIFY_CACHED_DOCUMENT 1
+#define PYXMLSEC_VERIFY_CACHED_REFERENCES 2
+
+// the ids which are registered by xmlSecDSigCtxVerify within the signature
+static const xmlChar* PyXmlSec_DSigIds[] = { xmlSecAttrId, NULL };
+
+// checks that the transform depends only on the node, which the reference refers to. the gil is not required.
+static int PyXmlSec_IsSubtreeTransform(const xmlChar* href) {
+    xmlSecTransformId transforms[] = {
+        xmlSecTransformEnvelopedId,
+        xmlSecTransformInclC14NId,
+        xmlSecTransformInclC14NWithCommentsId,
+        xmlSecTransformInclC14N11Id,
+        xmlSecTransformInclC14N11WithCommentsId,
+        xmlSecTransformExclC14NId,
+        xmlSecTransformExclC14NWithCommentsId,
+    };
+    size_t i;
+
+    for (i = 0; i < sizeof(transforms) / sizeof(transforms[0]); ++i) {
+        if (xmlStrEqual(href, transforms[i]->href)) return 1;
+    }
+    return 0;
+}
+
+// returns the node, which the reference refers to, or NULL if the outcome of processing of the reference
+// may depend on something else, e.g. another document or xpath. enveloped is set if the signature is removed
+// from the node by the transforms. the gil is not required.
+static xmlNodePtr PyXmlSec_ReferenceTarget(xmlNodePtr reference, int* enveloped) {
+    xmlChar* uri = xmlGetProp(reference, xmlSecAttrURI);
+    xmlNodePtr target = NULL;
+    xmlNodePtr cur;
+    xmlChar* href;
+    xmlAttrPtr id;
+
+    *enveloped = 0;
+    // xmlsec processes the missing uri like the empty one, i.e. the whole document
+    if (uri == NULL || uri[0] == '\0') {
+        target = (xmlNodePtr)reference->doc;
+    } else if (uri[0] == '#' && xmlStrncmp(uri, BAD_CAST "#xpointer(", 10) != 0 && strpbrk((const char*)uri, " \t\r\n'\"") == NULL) {
+        // xmlsec resolves the bare name by the id() function, which looks up the registered ids of the document
+        id = xmlGetID(reference->doc, uri + 1);
+        if (id != NULL) {
+            target = id->type == XML_ATTRIBUTE_NODE ? id->parent : (xmlNodePtr)id;
+        }
+    }
+    if (uri != NULL) xmlFree(uri);
+
+    cur = xmlSecGetNextElementNode(reference->children);
+    if (target != NULL && cur != NULL && xmlSecCheckNodeName(cur, xmlSecNodeTransforms, xmlSecDSigNs)) {
+        for (cur = xmlSecGetNextElementNode(cur->children); cur != NULL && target != NULL; cur = xmlSecGetNextElementNode(cur->next)) {
+            href = xmlGetProp(cur, xmlSecAttrAlgorithm);
+            if (href == NULL || !PyXmlSec_IsSubtreeTransform(href)) target = NULL;
+            if (href != NULL && xmlStrEqual(href, xmlSecTransformEnvelopedId->href)) *enveloped = 1;
+            if (href != NULL) xmlFree(href);
+        }
+    }
+    return target;
+}
+
+// appends the digest of each <dsig:Reference/> of the signature, which identifies the reference and the content it refers to,
+// to the buffer. returns the number of references or 0 if some of them cannot be cached. the gil is not required.
+static int PyXmlSec_ComputeReferenceDigests(xmlSecDSigCtxPtr handle, xmlNodePtr node, xmlSecBufferPtr digests) {
+    xmlNodePtr signedInfo = xmlSecGetNextElementNode(node->children);
+    xmlNodePtr cur;
+    xmlNodePtr target;
+    xmlSecByte digest[PYXMLSEC_SHA256_SIZE];
+    int enveloped;
+    int count = 0;
+
+    // the signatures, the processing of which is stored or goes beyond <dsig:SignedInfo/>, are left to xmlsec
+    if ((handle->flags & (XMLSEC_DSIG_FLAGS_STORE_SIGNEDINFO_REFERENCES | XMLSEC_DSIG_FLAGS_STORE_SIGNATURE)) != 0) return 0;
+    if ((handle->flags & XMLSEC_DSIG_FLAGS_IGNORE_MANIFESTS) == 0 && xmlSecFindChild(node, xmlSecNodeObject, xmlSecDSigNs) != NULL) return 0;
+    if (signedInfo == NULL || !xmlSecCheckNodeName(signedInfo, xmlSecNodeSignedInfo, xmlSecDSigNs)) return 0;
+
+    cur = xmlSecGetNextElementNode(signedInfo->children);
+    if (cur == NULL || !xmlSecCheckNodeName(cur, xmlSecNodeCanonicalizationMethod, xmlSecDSigNs)) return 0;
+    cur = xmlSecGetNextElementNode(cur->next);
+    if (cur == NULL || !xmlSecCheckNodeName(cur, xmlSecNodeSignatureMethod, xmlSecDSigNs)) return 0;
+
+    for (cur = xmlSecGetNextElementNode(cur->next); cur != NULL; cur = xmlSecGetNextElementNode(cur->next)) {
+        if (!xmlSecCheckNodeName(cur, xmlSecNodeReference, xmlSecDSigNs)) return 0;
+        if ((target = PyXmlSec_ReferenceTarget(cur, &enveloped)) == NULL) return 0;
+        // the signature is not digested by the reference, so it is checked anyway
+        if (PyXmlSec_ComputeReferenceDigest(cur, target, enveloped ? node : NULL, digest) < 0) return 0;
+        if (xmlSecBufferAppend(digests, digest, PYXMLSEC_SHA256_SIZE) < 0) return 0;
+        ++count;
+    }
+    return count;
+}
+
+// does the same as xmlSecDSigCtxVerify for the signature, the references of which have been verified already:
+// reads <dsig:SignedInfo/>, looks up the key and verifies <dsig:SignatureValue/>, if check is set.
+// if check is not set, the signature is considered to be valid. the gil is not required.
+static int PyXmlSec_DSigCtxVerifySignedInfo(xmlSecDSigCtxPtr handle, xmlNodePtr node, int check) {
+    xmlNodePtr signedInfo = xmlSecGetNextElementNode(node->children);
+    xmlNodePtr signValue = signedInfo != NULL ? xmlSecGetNextElementNode(signedInfo->next) : NULL;
+    xmlNodePtr keyInfo = signValue != NULL ? xmlSecGetNextElementNode(signValue->next) : NULL;
+    xmlNodePtr cur;
+    xmlSecNodeSetPtr nodeset;
+    int rv;
+
+    if (signValue == NULL || !xmlSecCheckNodeName(signValue, xmlSecNodeSignatureValue, xmlSecDSigNs)) return -1;
+    if (keyInfo != NULL && !xmlSecCheckNodeName(keyInfo, xmlSecNodeKeyInfo, xmlSecDSigNs)) keyInfo = NULL;
+
+    handle->operation = xmlSecTransformOperationVerify;
+    handle->status = xmlSecDSigStatusUnknown;
+    handle->id = xmlGetProp(node, xmlSecAttrId);
+    handle->signValueNode = signValue;
+
+    // the nodes have been checked by PyXmlSec_ComputeReferenceDigests
+    cur = xmlSecGetNextElementNode(signedInfo->children);
+    handle->c14nMethod = xmlSecTransformCtxNodeRead(&(handle->transformCtx), cur, xmlSecTransformUsageC14NMethod);
+    if (handle->c14nMethod == NULL) return -1;
+    cur = xmlSecGetNextElementNode(cur->next);
+    handle->signMethod = xmlSecTransformCtxNodeRead(&(handle->transformCtx), cur, xmlSecTransformUsageSignatureMethod);
+    if (handle->signMethod == NULL) return -1;
+    handle->signMethod->operation = handle->operation;
+
+    if (xmlSecTransformSetKeyReq(handle->signMethod, &(handle->keyInfoReadCtx.keyReq)) < 0) return -1;
+    if (handle->signKey == NULL && handle->keyInfoReadCtx.keysMngr != NULL && handle->keyInfoReadCtx.keysMngr->getKey != NULL) {
+        handle->signKey = (handle->keyInfoReadCtx.keysMngr->getKey)(keyInfo, &(handle->keyInfoReadCtx));
+    }
+    if (handle->signKey == NULL || !xmlSecKeyMatch(handle->signKey, NULL, &(handle->keyInfoReadCtx.keyReq))) return -1;
+    if (xmlSecTransformSetKey(handle->signMethod, handle->signKey) < 0) return -1;
+
+    if (!check) {
+        handle->status = xmlSecDSigStatusSucceeded;
+        return 0;
+    }
+
+    if ((nodeset = xmlSecNodeSetGetChildren(signedInfo->doc, signedInfo, 1, 0)) == NULL) return -1;
+    rv = xmlSecTransformCtxXmlExecute(&(handle->transformCtx), nodeset);
+    xmlSecNodeSetDestroy(nodeset);
+    if (rv < 0) return -1;
+    handle->result = handle->transformCtx.result;
+    if (xmlSecTransformVerifyNodeContent(handle->signMethod, signValue, &(handle->transformCtx)) < 0) return -1;
+    handle->status = handle->signMethod->status == xmlSecTransformStatusOk ? xmlSecDSigStatusSucceeded : xmlSecDSigStatusInvalid;
+    return 0;
+}
+
+// appends the items of the list of klasses to the buffer, the klasses are static, so their addresses identify them
+static int PyXmlSec_AppendPtrList(xmlSecBufferPtr buffer, xmlSecPtrListPtr list) {
+    xmlSecSize size = list != NULL ? xmlSecPtrListGetSize(list) : 0;
+    xmlSecSize i;
+    void* item;
+
+    if (xmlSecBufferAppend(buffer, (const xmlSecByte*)&size, sizeof(size)) < 0) return -1;
+    for (i = 0; i < size; ++i) {
+        item = xmlSecPtrListGetItem(list, i);
+        if (xmlSecBufferAppend(buffer, (const xmlSecByte*)&item, sizeof(item)) < 0) return -1;
+    }
+    return 0;
+}
+
+// identifies the result of verification of the document with the given digest by the key
+// and the settings of the context. *entry is set to NULL if the result cannot be cached.
+static int PyXmlSec_SignatureContextCacheEntry(PyXmlSec_SignatureContext* ctx, const xmlSecByte* digest, PyObject** entry) {
+    xmlSecDSigCtxPtr handle = ctx->handle;
+    xmlSecByte entry_data[PYXMLSEC_SHA256_SIZE];
+    xmlSecBufferPtr buffer = NULL;
+    xmlSecKeyStorePtr store;
+    PyObject* fingerprint = NULL;
+    xmlSecByte kind;
+    int rv = -1;
+
+    *entry = NULL;
+    if (ctx->has_user_key) {
+        if ((fingerprint = PyXmlSec_KeyFingerprint(handle->signKey)) == NULL) return -1;
+        if (fingerprint == Py_None) {
+            Py_DECREF(fingerprint);
+            return 0;
+        }
+    } else if (ctx->manager == NULL) {
+        return 0;
+    } else {
+        // the keys which are resolved on demand may change at any time
+        store = xmlSecKeysMngrGetKeysStore(ctx->manager->handle);
+        if (store != NULL && store->id == PyXmlSec_LazyKeysStoreId) return 0;
+    }
+
+    if ((buffer = xmlSecBufferCreate(256)) == NULL) {
+        PyXmlSec_SetLastError("failed to create buffer");
+        goto ON_EXIT;
+    }
+    if (xmlSecBufferAppend(buffer, digest, PYXMLSEC_SHA256_SIZE) < 0) goto ON_BUFFER_FAIL;
+    // the key set by user or the manager which the key is looked up in
+    kind = fingerprint != NULL ? 'K' : 'M';
+    if (xmlSecBufferAppend(buffer, &kind, 1) < 0) goto ON_BUFFER_FAIL;
+    if (fingerprint != NULL) {
+        if (xmlSecBufferAppend(buffer, (const xmlSecByte*)PyBytes_AS_STRING(fingerprint), (xmlSecSize)PyBytes_GET_SIZE(fingerprint)) < 0) goto ON_BUFFER_FAIL;
+    } else {
+        if (xmlSecBufferAppend(buffer, (const xmlSecByte*)&(ctx->manager->serial), sizeof(ctx->manager->serial)) < 0) goto ON_BUFFER_FAIL;
+        // the keys added to the manager since then may verify the document differently
+        if (xmlSecBufferAppend(buffer, (const xmlSecByte*)&(ctx->manager->generation), sizeof(ctx->manager->generation)) < 0) goto ON_BUFFER_FAIL;
+    }
+    // the settings which affect the outcome of verification
+    if (xmlSecBufferAppend(buffer, (const xmlSecByte*)&(handle->flags), sizeof(handle->flags)) < 0) goto ON_BUFFER_FAIL;
+    if (xmlSecBufferAppend(buffer, (const xmlSecByte*)&(handle->flags2), sizeof(handle->flags2)) < 0) goto ON_BUFFER_FAIL;
+    if (xmlSecBufferAppend(buffer, (const xmlSecByte*)&(handle->enabledReferenceUris), sizeof(handle->enabledReferenceUris)) < 0) goto ON_BUFFER_FAIL;
+    if (xmlSecBufferAppend(buffer, (const xmlSecByte*)&(handle->keyInfoReadCtx.flags), sizeof(handle->keyInfoReadCtx.flags)) < 0) goto ON_BUFFER_FAIL;
+    if (xmlSecBufferAppend(buffer, (const xmlSecByte*)&(handle->keyInfoReadCtx.flags2), sizeof(handle->keyInfoReadCtx.flags2)) < 0) goto ON_BUFFER_FAIL;
+    if (PyXmlSec_AppendPtrList(buffer, handle->enabledReferenceTransforms) < 0) goto ON_BUFFER_FAIL;
+    if (PyXmlSec_AppendPtrList(buffer, &(handle->transformCtx.enabledTransforms)) < 0) goto ON_BUFFER_FAIL;
+    if (PyXmlSec_AppendPtrList(buffer, &(handle->keyInfoReadCtx.enabledKeyData)) < 0) goto ON_BUFFER_FAIL;
+
+    if (PyXmlSec_ComputeSha256(xmlSecBufferGetData(buffer), xmlSecBufferGetSize(buffer), entry_data) < 0) goto ON_BUFFER_FAIL;
+    if ((*entry = PyBytes_FromStringAndSize((const char*)entry_data, sizeof(entry_data))) == NULL) goto ON_EXIT;
+    rv = 1;
+    goto ON_EXIT;
+ON_BUFFER_FAIL:
+    PyXmlSec_SetLastError("failed to compute the verification cache entry");
+ON_EXIT:
+    if (buffer != NULL) xmlSecBufferDestroy(buffer);
+    Py_XDECREF(fingerprint);
+    return rv;
+}
+
 static const char PyXmlSec_SignatureContextKey__doc__[] = "Signature key.\n";
 static PyObject* PyXmlSec_SignatureContextKeyGet(PyObject* self, void* closure) {
     PyXmlSec_SignatureContext* ctx = ((PyXmlSec_SignatureContext*)self);
@@ -88,11 +407,13 @@ static int PyXmlSec_SignatureContextKeySet(PyObject* self, PyObject* value, void
 
     PYXMLSEC_DEBUGF("%p, %p", self, value);
 
+    PyXmlSec_SignatureContextClearDigestCache(ctx);
     if (value == NULL) {  // key deletion
         if (ctx->handle->signKey != NULL) {
             xmlSecKeyDestroy(ctx->handle->signKey);
             ctx->handle->signKey = NULL;
         }
+        ctx->has_user_key = 0;
         return 0;
     }
 
@@ -113,12 +434,70 @@ static int PyXmlSec_SignatureContextKeySet(PyObject* self, PyObject* value, void
 
     ctx->handle->signKey = xmlSecKeyDuplicate(key->handle);
     if (ctx->handle->signKey == NULL) {
+        ctx->has_user_key = 0;
         PyXmlSec_SetLastError("failed to duplicate key");
         return -1;
     }
+    ctx->has_user_key = 1;
     return 0;
 }
 
+void PyXmlSec_DSigCtxResetState(xmlSecDSigCtxPtr handle, int keep_key) {
+    xmlSecTransformCtxReset(&(handle->transformCtx));
+    xmlSecKeyInfoCtxReset(&(handle->keyInfoReadCtx));
+    xmlSecKeyInfoCtxReset(&(handle->keyInfoWriteCtx));
+    // the same as in xmlSecDSigCtxInitialize, it's not wise to write private key
+    handle->keyInfoWriteCtx.keyReq.keyType = xmlSecKeyDataTypePublic;
+
+    PyXmlSec_SignatureTimingClear(handle);
+    xmlSecPtrListEmpty(&(handle->signedInfoReferences));
+    xmlSecPtrListEmpty(&(handle->manifestReferences));
+
+    if (handle->signKey != NULL && !keep_key) {
+        xmlSecKeyDestroy(handle->signKey);
+        handle->signKey = NULL;
+    }
+    if (handle->id != NULL) {
+        xmlFree(handle->id);
+        handle->id = NULL;
+    }
+
+    // transforms are owned by transformCtx and have been destroyed by reset
+    handle->operation = xmlSecTransformOperationNone;
+    handle->result = NULL;
+    handle->status = xmlSecDSigStatusUnknown;
+    handle->signMethod = NULL;
+    handle->c14nMethod = NULL;
+    handle->preSignMemBufMethod = NULL;
+    handle->signValueNode = NULL;
+}
+
+// clears the per-operation state of the context, keeps the user settings and the key set by user.
+// does not touch python objects, so it may be called without gil
+static void PyXmlSec_SignatureContextResetState(PyXmlSec_SignatureContext* ctx) {
+    // the key which was found by keys manager during the last operation is not reusable
+    PyXmlSec_DSigCtxResetState(ctx->handle, ctx->has_user_key);
+    // the transforms of the active stream are gone
+    ctx->stream = NULL;
+}
+
+static const char PyXmlSec_SignatureContextReset__doc__[] = \
+    "reset() -> None\n"
+    "Resets this context, so it can be used for the next operation.\n\n"
+    "The key, the enabled transforms and the enabled key data are not touched; "
+    "the key which was found by the keys manager during the previous operation is released.\n";
+static PyObject* PyXmlSec_SignatureContextReset(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
+
+    PYXMLSEC_DEBUGF("%p: reset context - start", self);
+    Py_BEGIN_ALLOW_THREADS;
+    PyXmlSec_SignatureContextResetState(ctx);
+    PYXMLSEC_DUMP(xmlSecDSigCtxDebugDump, ctx->handle);
+    Py_END_ALLOW_THREADS;
+    PYXMLSEC_DEBUGF("%p: reset context - ok", self);
+    Py_RETURN_NONE;
+}
+
 static const char PyXmlSec_SignatureContextRegisterId__doc__[] = \
     "register_id(node, id_attr = 'ID', id_ns = None) -> None\n"
     "Registers new id.\n\n"
@@ -179,6 +558,168 @@ ON_FAIL:
     return NULL;
 }
 
+// registers the matching attributes of the subtree of node as ids, the duplicated values are collected into duplicates
+static int PyXmlSec_RegisterIds(xmlNodePtr node, const xmlChar** names, Py_ssize_t count, const xmlChar* ns,
+                                xmlChar*** duplicates, Py_ssize_t* duplicates_count) {
+    xmlNodePtr cur = node;
+    xmlNodePtr next;
+    xmlAttrPtr attr;
+    xmlAttrPtr tmpAttr;
+    xmlChar* value;
+    xmlChar** tmp;
+    Py_ssize_t capacity = 0;
+    Py_ssize_t i;
+
+    while (cur != NULL) {
+        for (attr = cur->properties; attr != NULL; attr = attr->next) {
+            if (attr->children == NULL) continue;
+            if (ns != NULL && (attr->ns == NULL || !xmlStrEqual(attr->ns->href, ns))) continue;
+            for (i = 0; i < count && !xmlStrEqual(attr->name, names[i]); ++i);
+            if (i == count) continue;
+
+            // the value is copied only if the attribute has several children
+            if (attr->children->next == NULL && attr->children->type == XML_TEXT_NODE) {
+                if ((value = attr->children->content) == NULL) continue;
+            } else if ((value = xmlNodeListGetString(cur->doc, attr->children, 1)) == NULL) {
+                return -1;
+            }
+            tmpAttr = xmlGetID(cur->doc, value);
+            if (tmpAttr == NULL) {
+                tmpAttr = xmlAddID(NULL, cur->doc, value, attr) != NULL ? attr : NULL;
+            } else if (tmpAttr != attr) {
+                if (value == attr->children->content && (value = xmlStrdup(value)) == NULL) return -1;
+                if (*duplicates_count == capacity) {
+                    capacity = capacity * 2 + 8;
+                    tmp = (xmlChar**)xmlRealloc(*duplicates, sizeof(xmlChar*) * capacity);
+                    if (tmp == NULL) {
+                        xmlFree(value);
+                        return -1;
+                    }
+                    *duplicates = tmp;
+                }
+                (*duplicates)[(*duplicates_count)++] = value;
+                continue;
+            }
+            if (value != attr->children->content) xmlFree(value);
+            if (tmpAttr == NULL) return -1;
+        }
+        // the next element in the document order, the siblings of node are not visited
+        next = xmlSecGetNextElementNode(cur->children);
+        while (next == NULL && cur != node) {
+            next = xmlSecGetNextElementNode(cur->next);
+            cur = cur->parent;
+        }
+        cur = next;
+    }
+    return 0;
+}
+
+static const char PyXmlSec_SignatureContextRegisterIds__doc__[] = \
+    "register_ids(node, attr_names = ('ID', 'Id'), ns = None) -> list[str]\n"
+    "Registers the attributes named ``attr_names`` of ``node`` and all its descendants as ids "
+    "in a single pass over the subtree. The attributes, whose value is already registered for "
+    "another attribute, are not registered and their values are returned, the signatures which "
+    "refer to a duplicated id should not be trusted.\n\n"
+    ":param node: the root of the subtree\n"
+    ":type node: :class:`lxml.etree._Element`\n"
+    ":param attr_names: the names of the id attributes\n"
+    ":type attr_names: :class:`list` of strings\n"
+    ":param ns: the namespace of the id attributes, if :data:`None` the namespace is not checked (optional)\n"
+    ":type ns: :class:`str` or :data:`None`\n"
+    ":return: the duplicated ids in the document order\n"
+    ":rtype: :class:`list` of strings";
+static PyObject* PyXmlSec_SignatureContextRegisterIds(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "node", "attr_names", "ns", NULL};
+
+    PyXmlSec_LxmlElementPtr node = NULL;
+    PyObject* attr_names = NULL;
+    const char* ns = NULL;
+
+    PyObject* seq = NULL;
+    PyObject* result = NULL;
+    PyObject* seen = NULL;
+    PyObject* value;
+    const xmlChar** names = NULL;
+    xmlChar** duplicates = NULL;
+    Py_ssize_t duplicates_count = 0;
+    Py_ssize_t count = 0;
+    Py_ssize_t i;
+    int rv;
+
+    PYXMLSEC_DEBUGF("%p: register ids - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&|Oz:register_ids", kwlist,
+        PyXmlSec_LxmlElementConverter, &node, &attr_names, &ns))
+    {
+        goto ON_FAIL;
+    }
+
+    if (attr_names == NULL) {
+        names = (const xmlChar**)PyMem_Malloc(sizeof(xmlChar*) * 2);
+        if (names == NULL) {
+            PyErr_NoMemory();
+            goto ON_FAIL;
+        }
+        names[count++] = BAD_CAST "ID";
+        names[count++] = BAD_CAST "Id";
+    } else {
+        if (PyUnicode_Check(attr_names)) {
+            PyErr_SetString(PyExc_TypeError, "attr_names must be a sequence of strings.");
+            goto ON_FAIL;
+        }
+        if ((seq = PySequence_Fast(attr_names, "attr_names must be a sequence of strings.")) == NULL) goto ON_FAIL;
+        // a private tuple owns the strings while the GIL is released, the list of the caller may be changed meanwhile
+        Py_SETREF(seq, PySequence_Tuple(seq));
+        if (seq == NULL) goto ON_FAIL;
+        names = (const xmlChar**)PyMem_Malloc(sizeof(xmlChar*) * (PyTuple_GET_SIZE(seq) + 1));
+        if (names == NULL) {
+            PyErr_NoMemory();
+            goto ON_FAIL;
+        }
+        for (; count < PyTuple_GET_SIZE(seq); ++count) {
+            value = PyTuple_GET_ITEM(seq, count);
+            if (!PyUnicode_Check(value)) {
+                PyErr_SetString(PyExc_TypeError, "attr_names must be a sequence of strings.");
+                goto ON_FAIL;
+            }
+            // the strings are owned by seq
+            if ((names[count] = XSTR(PyUnicode_AsUTF8(value))) == NULL) goto ON_FAIL;
+        }
+    }
+
+    Py_BEGIN_ALLOW_THREADS;
+    rv = PyXmlSec_RegisterIds(node->_c_node, names, count, XSTR(ns), &duplicates, &duplicates_count);
+    Py_END_ALLOW_THREADS;
+    if (rv < 0) {
+        PyErr_SetString(PyXmlSec_InternalError, "cannot register ids.");
+        goto ON_FAIL;
+    }
+
+    if ((result = PyList_New(0)) == NULL) goto ON_FAIL;
+    if ((seen = PySet_New(NULL)) == NULL) goto ON_FAIL;
+    for (i = 0; i < duplicates_count; ++i) {
+        if ((value = PyUnicode_FromString((const char*)duplicates[i])) == NULL) goto ON_FAIL;
+        rv = PySet_Contains(seen, value);
+        if (rv == 0 && (PySet_Add(seen, value) < 0 || PyList_Append(result, value) < 0)) rv = -1;
+        Py_DECREF(value);
+        if (rv < 0) goto ON_FAIL;
+    }
+
+    PYXMLSEC_DEBUGF("%p: register ids - ok", self);
+    goto ON_EXIT;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: register ids - fail", self);
+    Py_CLEAR(result);
+ON_EXIT:
+    for (i = 0; i < duplicates_count; ++i) {
+        xmlFree(duplicates[i]);
+    }
+    xmlFree(duplicates);
+    PyMem_Free(names);
+    Py_XDECREF(seen);
+    Py_XDECREF(seq);
+    return result;
+}
+
 static const char PyXmlSec_SignatureContextSign__doc__[] = \
     "sign(node) -> None\n"
     "Signs according to the signature template.\n\n"
@@ -197,7 +738,9 @@ static PyObject* PyXmlSec_SignatureContextSign(PyObject* self, PyObject* args, P
     }
 
     Py_BEGIN_ALLOW_THREADS;
+    PyXmlSec_SignatureTimingStart(ctx->handle);
     rv = xmlSecDSigCtxSign(ctx->handle, node->_c_node);
+    PyXmlSec_SignatureTimingFinish(ctx->handle);
     PYXMLSEC_DUMP(xmlSecDSigCtxDebugDump, ctx->handle);
     Py_END_ALLOW_THREADS;
     if (rv < 0) {
@@ -224,6 +767,12 @@ static PyObject* PyXmlSec_SignatureContextVerify(PyObject* self, PyObject* args,
 
     PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
     PyXmlSec_LxmlElementPtr node = NULL;
+    xmlSecBufferPtr references = NULL;  // the digests of the references for the digest cache
+    PyObject* entry = NULL;
+    PyObject* fingerprint = NULL;
+    xmlSecByte digest_data[PYXMLSEC_SHA256_SIZE];
+    int references_count = 0;
+    int cached = 0;  // the document or all of its references have been verified already
     int rv;
 
     PYXMLSEC_DEBUGF("%p: verify - start", self);
@@ -231,28 +780,183 @@ static PyObject* PyXmlSec_SignatureContextVerify(PyObject* self, PyObject* args,
         goto ON_FAIL;
     }
 
+    PyXmlSec_SignatureTimingStart(ctx->handle);
+    // the caches are used only if the context has been reset since the last operation, like xmlsec requires
+    if ((ctx->digest_cache != NULL || ctx->verification_cache != NULL) && ctx->handle->signMethod == NULL) {
+        if (ctx->digest_cache != NULL && (references = xmlSecBufferCreate(PYXMLSEC_SHA256_SIZE)) == NULL) {
+            PyXmlSec_SetLastError("failed to create buffer");
+            goto ON_FAIL;
+        }
+        Py_BEGIN_ALLOW_THREADS;
+        // xmlSecDSigCtxVerify registers them too, so the digests do not change after verification
+        xmlSecAddIDs(node->_c_node->doc, node->_c_node, PyXmlSec_DSigIds);
+        if (references != NULL) {
+            references_count = PyXmlSec_ComputeReferenceDigests(ctx->handle, node->_c_node, references);
+        }
+        rv = -1;
+        if (ctx->verification_cache != NULL && PyXmlSec_SignatureIsSelfContained(node->_c_node)) {
+            rv = PyXmlSec_ComputeDocumentDigest(node->_c_node, digest_data);
+        }
+        PyXmlSec_ClearError();
+        Py_END_ALLOW_THREADS;
+
+        if (rv == 0 && ctx->verification_cache != NULL) {
+            if (PyXmlSec_SignatureContextCacheEntry(ctx, digest_data, &entry) < 0) goto ON_FAIL;
+            if (entry != NULL) {
+                if ((rv = PyXmlSec_VerificationCacheLookup(ctx->verification_cache, entry)) < 0) goto ON_FAIL;
+                if (rv == 1) cached = PYXMLSEC_VERIFY_CACHED_DOCUMENT;
+            }
+        }
+        if (!cached && references_count > 0 && ctx->digest_cache != NULL) {
+            if ((rv = PyXmlSec_SignatureContextDigestCacheLookup(ctx, references, references_count)) < 0) goto ON_FAIL;
+            if (rv == 1) cached = PYXMLSEC_VERIFY_CACHED_REFERENCES;
+        }
+    }
+
     Py_BEGIN_ALLOW_THREADS;
-    rv = xmlSecDSigCtxVerify(ctx->handle, node->_c_node);
+    if (cached) {
+        // the key is looked up anyway, so the context has the same state as after verification
+        rv = PyXmlSec_DSigCtxVerifySignedInfo(ctx->handle, node->_c_node, cached == PYXMLSEC_VERIFY_CACHED_REFERENCES);
+        if (rv < 0) {
+            // xmlsec reports the error
+            PyXmlSec_ClearError();
+            PyXmlSec_SignatureContextResetState(ctx);
+            PyXmlSec_SignatureTimingStart(ctx->handle);
+            cached = 0;
+        }
+    }
+    if (!cached) {
+        rv = xmlSecDSigCtxVerify(ctx->handle, node->_c_node);
+    }
+    PyXmlSec_SignatureTimingFinish(ctx->handle);
     PYXMLSEC_DUMP(xmlSecDSigCtxDebugDump, ctx->handle);
     Py_END_ALLOW_THREADS;
+    ctx->timing.cached = cached != 0;
 
     if (rv < 0) {
         PyXmlSec_SetLastError("failed to verify");
         goto ON_FAIL;
     }
+    // the references are remembered even if the signature is invalid, the cache may be disabled by a callback during verification
+    if (!cached && references_count > 0 && ctx->digest_cache != NULL) {
+        if (PyXmlSec_SignatureContextDigestCacheStore(ctx, references, references_count) < 0) goto ON_FAIL;
+    }
     if (ctx->handle->status != xmlSecDSigStatusSucceeded) {
         PyErr_SetString(PyXmlSec_VerificationError, "Signature is invalid.");
         goto ON_FAIL;
     }
-    PYXMLSEC_DEBUGF("%p: verify - ok", self);
+    // the result is bound to the key which verified the document, so it is forgotten when the key is invalidated
+    if (cached != PYXMLSEC_VERIFY_CACHED_DOCUMENT && entry != NULL && ctx->verification_cache != NULL && ctx->handle->signKey != NULL) {
+        if ((fingerprint = PyXmlSec_KeyFingerprint(ctx->handle->signKey)) == NULL) goto ON_FAIL;
+        if (fingerprint != Py_None) {
+            if (PyXmlSec_VerificationCacheStore(ctx->verification_cache, entry, fingerprint) < 0) goto ON_FAIL;
+        }
+    }
+    Py_XDECREF(fingerprint);
+    Py_XDECREF(entry);
+    if (references != NULL) xmlSecBufferDestroy(references);
+    PYXMLSEC_DEBUGF("%p: verify - ok%s", self, cached ? ", cached" : "");
     Py_RETURN_NONE;
 ON_FAIL:
     PYXMLSEC_DEBUGF("%p: verify - fail", self);
+    PyXmlSec_SignatureTimingFinish(ctx->handle);
+    Py_XDECREF(fingerprint);
+    Py_XDECREF(entry);
+    if (references != NULL) xmlSecBufferDestroy(references);
     return NULL;
 }
 
-// common helper for operations binary_verify and binary_sign
-static int PyXmlSec_ProcessSignBinary(PyXmlSec_SignatureContext* ctx, const xmlSecByte* data, xmlSecSize data_size, xmlSecTransformId method) {
+// the node and the outcome of its verification, used by verify_many
+typedef struct {
+    xmlNodePtr node;
+    int status;
+    int code;
+} PyXmlSec_VerifyItem;
+
+static const char PyXmlSec_SignatureContextVerifyMany__doc__[] = \
+    "verify_many(nodes) -> list[tuple[int, int]]\n"
+    "Verifies each of ``nodes`` within a single GIL-free section, the context is reset before each node.\n\n"
+    "Unlike :meth:`~SignatureContext.verify`, does not raise on invalid signatures or processing failures.\n\n"
+    ":param nodes: the pointers with :xml:`<dsig:Signature/>` nodes\n"
+    ":type nodes: :class:`~collections.abc.Iterable` of :class:`lxml.etree._Element`\n"
+    ":return: ``(status, code)`` for each node, where ``status`` is one of ``DSigStatus*`` constants "
+    "and ``code`` is the xmlsec error code, ``0`` if there was no error\n"
+    ":rtype: :class:`list` of :class:`tuple`";
+static PyObject* PyXmlSec_SignatureContextVerifyMany(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "nodes", NULL};
+
+    PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
+    PyObject* nodes = NULL;
+    PyObject* seq = NULL;
+    PyObject* result = NULL;
+    PyObject* tmp;
+    PyXmlSec_LxmlElementPtr node = NULL;
+    PyXmlSec_VerifyItem* items = NULL;
+    Py_ssize_t count;
+    Py_ssize_t i;
+
+    PYXMLSEC_DEBUGF("%p: verify_many - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O:verify_many", kwlist, &nodes)) {
+        goto ON_FAIL;
+    }
+
+    // a private tuple holds references to the nodes until the end of processing, the list of the caller may be
+    // changed by another thread while the GIL is released
+    if ((seq = PySequence_Tuple(nodes)) == NULL) goto ON_FAIL;
+    count = PyTuple_GET_SIZE(seq);
+
+    items = PyMem_New(PyXmlSec_VerifyItem, count > 0 ? count : 1);
+    if (items == NULL) {
+        PyErr_NoMemory();
+        goto ON_FAIL;
+    }
+    for (i = 0; i < count; ++i) {
+        if (!PyXmlSec_LxmlElementConverter(PyTuple_GET_ITEM(seq, i), &node)) goto ON_FAIL;
+        items[i].node = node->_c_node;
+    }
+
+    Py_BEGIN_ALLOW_THREADS;
+    PyXmlSec_ClearError();
+    for (i = 0; i < count; ++i) {
+        PyXmlSec_SignatureContextResetState(ctx);
+        if (xmlSecDSigCtxVerify(ctx->handle, items[i].node) < 0) {
+            items[i].status = xmlSecDSigStatusUnknown;
+            items[i].code = PyXmlSec_PopLastErrorCode();
+            if (items[i].code == 0) {
+                items[i].code = -1;
+            }
+        } else {
+            items[i].status = ctx->handle->status;
+            items[i].code = PyXmlSec_PopLastErrorCode();
+            if (items[i].status == xmlSecDSigStatusSucceeded) {
+                items[i].code = 0;
+            }
+        }
+        PYXMLSEC_DUMP(xmlSecDSigCtxDebugDump, ctx->handle);
+    }
+    PyXmlSec_SignatureContextResetState(ctx);
+    Py_END_ALLOW_THREADS;
+
+    if ((result = PyList_New(count)) == NULL) goto ON_FAIL;
+    for (i = 0; i < count; ++i) {
+        if ((tmp = Py_BuildValue("(ii)", items[i].status, items[i].code)) == NULL) goto ON_FAIL;
+        PyList_SET_ITEM(result, i, tmp);
+    }
+
+    PyMem_Free(items);
+    Py_DECREF(seq);
+    PYXMLSEC_DEBUGF("%p: verify_many - ok", self);
+    return result;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: verify_many - fail", self);
+    PyMem_Free(items);
+    Py_XDECREF(seq);
+    Py_XDECREF(result);
+    return NULL;
+}
+
+// prepares the transforms chain for operations binary_verify and binary_sign
+static int PyXmlSec_PrepareSignBinary(PyXmlSec_SignatureContext* ctx, xmlSecTransformId method) {
     int rv;
 
     if (!(method->usage & xmlSecTransformUsageSignatureMethod)) {
@@ -292,6 +996,16 @@ static int PyXmlSec_ProcessSignBinary(PyXmlSec_SignatureContext* ctx, const xmlS
     }
     ctx->handle->transformCtx.result = NULL;
     ctx->handle->transformCtx.status = xmlSecTransformStatusNone;
+    return 0;
+}
+
+// common helper for operations binary_verify and binary_sign
+static int PyXmlSec_ProcessSignBinary(PyXmlSec_SignatureContext* ctx, const xmlSecByte* data, xmlSecSize data_size, xmlSecTransformId method) {
+    int rv;
+
+    if (PyXmlSec_PrepareSignBinary(ctx, method) != 0) {
+        return -1;
+    }
 
     Py_BEGIN_ALLOW_THREADS;
     rv = xmlSecTransformCtxBinaryExecute(&(ctx->handle->transformCtx), data, data_size);
@@ -310,7 +1024,7 @@ static const char PyXmlSec_SignatureContextSignBinary__doc__[] = \
     "sign_binary(bytes, transform) -> bytes\n"
     "Signs binary data ``data`` with algorithm ``transform``.\n\n"
     ":param bytes: the binary data\n"
-    ":type bytes: :class:`bytes`\n"
+    ":type bytes: :class:`bytes` or any :term:`bytes-like object`\n"
     ":param transform: the signature algorithm\n"
     ":type transform: :class:`__Transform`\n"
     ":return: the signature\n"
@@ -319,21 +1033,21 @@ static PyObject* PyXmlSec_SignatureContextSignBinary(PyObject* self, PyObject* a
     static char *kwlist[] = { "bytes", "transform", NULL};
     PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
     PyXmlSec_Transform* transform = NULL;
-    const char* data = NULL;
-    Py_ssize_t data_size = 0;
+    Py_buffer data = {0};
 
     PYXMLSEC_DEBUGF("%p: sign_binary - start", self);
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s#O!:sign_binary", kwlist,
-        &data, &data_size, PyXmlSec_TransformType, &transform))
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s*O!:sign_binary", kwlist,
+        &data, PyXmlSec_TransformType, &transform))
     {
         goto ON_FAIL;
     }
 
     ctx->handle->operation = xmlSecTransformOperationSign;
 
-    if (PyXmlSec_ProcessSignBinary(ctx, (const xmlSecByte*)data, (xmlSecSize)data_size, transform->id) != 0) {
+    if (PyXmlSec_ProcessSignBinary(ctx, (const xmlSecByte*)data.buf, (xmlSecSize)data.len, transform->id) != 0) {
         goto ON_FAIL;
     }
+    PyBuffer_Release(&data);
 
     PYXMLSEC_DEBUGF("%p: sign_binary - ok", self);
     return PyBytes_FromStringAndSize(
@@ -342,6 +1056,7 @@ static PyObject* PyXmlSec_SignatureContextSignBinary(PyObject* self, PyObject* a
     );
 ON_FAIL:
     PYXMLSEC_DEBUGF("%p: sign_binary - fail", self);
+    PyBuffer_Release(&data);
     return NULL;
 }
 
@@ -349,11 +1064,11 @@ static const char PyXmlSec_SignatureContextVerifyBinary__doc__[] = \
     "verify_binary(bytes, transform, signature) -> None\n"
     "Verifies signature for binary data.\n\n"
     ":param bytes: the binary data\n"
-    ":type bytes: :class:`bytes`\n"
+    ":type bytes: :class:`bytes` or any :term:`bytes-like object`\n"
     ":param transform: the signature algorithm\n"
     ":type transform: :class:`__Transform`\n"
     ":param signature: the signature\n"
-    ":type signature: :class:`bytes`\n"
+    ":type signature: :class:`bytes` or any :term:`bytes-like object`\n"
     ":return: :data:`None` on success\n"
     ":raise VerificationError: on failure";
 static PyObject* PyXmlSec_SignatureContextVerifyBinary(PyObject* self, PyObject* args, PyObject* kwargs) {
@@ -361,26 +1076,24 @@ static PyObject* PyXmlSec_SignatureContextVerifyBinary(PyObject* self, PyObject*
 
     PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
     PyXmlSec_Transform* transform = NULL;
-    const char* data = NULL;
-    Py_ssize_t data_size = 0;
-    const char* sign = NULL;
-    Py_ssize_t sign_size = 0;
+    Py_buffer data = {0};
+    Py_buffer sign = {0};
     int rv;
 
     PYXMLSEC_DEBUGF("%p: verify binary - start", self);
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s#O!s#:verify_binary", kwlist,
-        &data, &data_size, PyXmlSec_TransformType, &transform, &sign, &sign_size))
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s*O!s*:verify_binary", kwlist,
+        &data, PyXmlSec_TransformType, &transform, &sign))
     {
         goto ON_FAIL;
     }
 
     ctx->handle->operation = xmlSecTransformOperationVerify;
-    if (PyXmlSec_ProcessSignBinary(ctx, (const xmlSecByte*)data, (xmlSecSize)data_size, transform->id) != 0) {
+    if (PyXmlSec_ProcessSignBinary(ctx, (const xmlSecByte*)data.buf, (xmlSecSize)data.len, transform->id) != 0) {
         goto ON_FAIL;
     }
 
     Py_BEGIN_ALLOW_THREADS;
-    rv = xmlSecTransformVerify(ctx->handle->signMethod, (const xmlSecByte*)sign, (xmlSecSize)sign_size, &(ctx->handle->transformCtx));
+    rv = xmlSecTransformVerify(ctx->handle->signMethod, (const xmlSecByte*)sign.buf, (xmlSecSize)sign.len, &(ctx->handle->transformCtx));
     Py_END_ALLOW_THREADS;
 
     if (rv < 0) {
@@ -393,10 +1106,315 @@ static PyObject* PyXmlSec_SignatureContextVerifyBinary(PyObject* self, PyObject*
         goto ON_FAIL;
     }
 
+    PyBuffer_Release(&data);
+    PyBuffer_Release(&sign);
     PYXMLSEC_DEBUGF("%p: verify binary - ok", self);
     Py_RETURN_NONE;
 ON_FAIL:
     PYXMLSEC_DEBUGF("%p: verify binary - fail", self);
+    PyBuffer_Release(&data);
+    PyBuffer_Release(&sign);
+    return NULL;
+}
+
+typedef struct {
+    PyObject_HEAD
+    PyXmlSec_SignatureContext* ctx;
+} PyXmlSec_SignatureStream;
+
+static void PyXmlSec_SignatureStream__del__(PyObject* self) {
+    PyXmlSec_SignatureStream* stream = (PyXmlSec_SignatureStream*)self;
+    PYXMLSEC_DEBUGF("%p: delete signature stream", self);
+    if (stream->ctx != NULL) {
+        if (stream->ctx->stream == self) {
+            stream->ctx->stream = NULL;
+        }
+        Py_DECREF(stream->ctx);
+    }
+    Py_TYPE(self)->tp_free(self);
+}
+
+// checks that the transforms of the stream still belong to it
+static int PyXmlSec_SignatureStreamCheck(PyXmlSec_SignatureStream* stream) {
+    if (stream->ctx->stream != (PyObject*)stream) {
+        PyErr_SetString(PyXmlSec_Error, "Signature stream is finalized or its context has been reset.");
+        return -1;
+    }
+    return 0;
+}
+
+static const char PyXmlSec_SignatureStreamUpdate__doc__[] = \
+    "update(data) -> None\n"
+    "Feeds the next chunk of the binary data to the signature algorithm.\n\n"
+    ":param data: the chunk of the binary data\n"
+    ":type data: :class:`bytes` or any :term:`bytes-like object`";
+static PyObject* PyXmlSec_SignatureStreamUpdate(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "data", NULL};
+    PyXmlSec_SignatureStream* stream = (PyXmlSec_SignatureStream*)self;
+    xmlSecTransformCtxPtr transformCtx;
+    Py_buffer data = {0};
+    int rv = 0;
+
+    PYXMLSEC_DEBUGF("%p: update signature stream - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s*:update", kwlist, &data)) {
+        goto ON_FAIL;
+    }
+    if (PyXmlSec_SignatureStreamCheck(stream) != 0) {
+        goto ON_FAIL;
+    }
+
+    transformCtx = &(stream->ctx->handle->transformCtx);
+    if (data.len > 0) {
+        Py_BEGIN_ALLOW_THREADS;
+        rv = xmlSecTransformPushBin(transformCtx->first, (const xmlSecByte*)data.buf, (xmlSecSize)data.len, 0, transformCtx);
+        Py_END_ALLOW_THREADS;
+    }
+
+    if (rv < 0) {
+        // the state of transforms is undefined, the stream cannot be continued
+        stream->ctx->stream = NULL;
+        PyXmlSec_SetLastError("failed to transform.");
+        goto ON_FAIL;
+    }
+
+    PyBuffer_Release(&data);
+    PYXMLSEC_DEBUGF("%p: update signature stream - ok", self);
+    Py_RETURN_NONE;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: update signature stream - fail", self);
+    PyBuffer_Release(&data);
+    return NULL;
+}
+
+static const char PyXmlSec_SignatureStreamFinalize__doc__[] = \
+    "finalize(signature = None) -> bytes | None\n"
+    "Completes the signature operation, the stream cannot be used after that.\n\n"
+    "For the stream started by :meth:`SignatureContext.sign_binary_stream` returns the signature, "
+    "for the stream started by :meth:`SignatureContext.verify_binary_stream` verifies ``signature``.\n\n"
+    ":param signature: the signature to verify, only for the verification stream\n"
+    ":type signature: :class:`bytes` or any :term:`bytes-like object`\n"
+    ":return: the signature or :data:`None` on successful verification\n"
+    ":rtype: :class:`bytes` or :data:`None`\n"
+    ":raise VerificationError: if the signature is invalid";
+static PyObject* PyXmlSec_SignatureStreamFinalize(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "signature", NULL};
+    PyXmlSec_SignatureStream* stream = (PyXmlSec_SignatureStream*)self;
+    xmlSecDSigCtxPtr handle;
+    Py_buffer sign = {0};
+    int rv;
+
+    PYXMLSEC_DEBUGF("%p: finalize signature stream - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|z*:finalize", kwlist, &sign)) {
+        goto ON_FAIL;
+    }
+    if (PyXmlSec_SignatureStreamCheck(stream) != 0) {
+        goto ON_FAIL;
+    }
+
+    handle = stream->ctx->handle;
+    if (handle->operation == xmlSecTransformOperationVerify) {
+        if (sign.buf == NULL) {
+            PyErr_SetString(PyExc_TypeError, "signature is required to finalize the verification stream.");
+            goto ON_FAIL;
+        }
+    } else if (sign.buf != NULL) {
+        PyErr_SetString(PyExc_TypeError, "signature is not expected by the signing stream.");
+        goto ON_FAIL;
+    }
+
+    // whatever happens, the stream is over
+    stream->ctx->stream = NULL;
+
+    Py_BEGIN_ALLOW_THREADS;
+    rv = xmlSecTransformPushBin(handle->transformCtx.first, NULL, 0, 1, &(handle->transformCtx));
+    if (rv >= 0) {
+        handle->transformCtx.status = xmlSecTransformStatusFinished;
+        if (sign.buf != NULL) {
+            rv = xmlSecTransformVerify(handle->signMethod, (const xmlSecByte*)sign.buf, (xmlSecSize)sign.len, &(handle->transformCtx));
+        }
+    }
+    Py_END_ALLOW_THREADS;
+
+    if (rv < 0) {
+        if (sign.buf != NULL) {
+            PyXmlSec_SetLastError2(PyXmlSec_VerificationError, "Cannot verify signature.");
+        } else {
+            PyXmlSec_SetLastError("failed to transform.");
+        }
+        goto ON_FAIL;
+    }
+
+    if (sign.buf != NULL) {
+        if (handle->signMethod->status != xmlSecTransformStatusOk) {
+            PyXmlSec_SetLastError2(PyXmlSec_VerificationError, "Signature is invalid.");
+            goto ON_FAIL;
+        }
+        PyBuffer_Release(&sign);
+        PYXMLSEC_DEBUGF("%p: finalize signature stream - ok", self);
+        Py_RETURN_NONE;
+    }
+
+    handle->result = handle->transformCtx.result;
+    PYXMLSEC_DEBUGF("%p: finalize signature stream - ok", self);
+    return PyBytes_FromStringAndSize(
+        (const char*)xmlSecBufferGetData(handle->result),
+        (Py_ssize_t)xmlSecBufferGetSize(handle->result)
+    );
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: finalize signature stream - fail", self);
+    PyBuffer_Release(&sign);
+    return NULL;
+}
+
+static PyMethodDef PyXmlSec_SignatureStreamMethods[] = {
+    {
+        "update",
+        (PyCFunction)PyXmlSec_SignatureStreamUpdate,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_SignatureStreamUpdate__doc__
+    },
+    {
+        "finalize",
+        (PyCFunction)PyXmlSec_SignatureStreamFinalize,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_SignatureStreamFinalize__doc__
+    },
+    {NULL, NULL} /* sentinel */
+};
+
+static PyTypeObject _PyXmlSec_SignatureStreamType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    STRINGIFY(MODULE_NAME) ".SignatureStream",  /* tp_name */
+    sizeof(PyXmlSec_SignatureStream),           /* tp_basicsize */
+    0,                                          /* tp_itemsize */
+    PyXmlSec_SignatureStream__del__,            /* tp_dealloc */
+    0,                                          /* tp_print */
+    0,                                          /* tp_getattr */
+    0,                                          /* tp_setattr */
+    0,                                          /* tp_reserved */
+    0,                                          /* tp_repr */
+    0,                                          /* tp_as_number */
+    0,                                          /* tp_as_sequence */
+    0,                                          /* tp_as_mapping */
+    0,                                          /* tp_hash  */
+    0,                                          /* tp_call */
+    0,                                          /* tp_str */
+    0,                                          /* tp_getattro */
+    0,                                          /* tp_setattro */
+    0,                                          /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT,                         /* tp_flags */
+    "Incremental signing or verification of binary data", /* tp_doc */
+    0,                                          /* tp_traverse */
+    0,                                          /* tp_clear */
+    0,                                          /* tp_richcompare */
+    0,                                          /* tp_weaklistoffset */
+    0,                                          /* tp_iter */
+    0,                                          /* tp_iternext */
+    PyXmlSec_SignatureStreamMethods,            /* tp_methods */
+    0,                                          /* tp_members */
+    0,                                          /* tp_getset */
+    0,                                          /* tp_base */
+    0,                                          /* tp_dict */
+    0,                                          /* tp_descr_get */
+    0,                                          /* tp_descr_set */
+    0,                                          /* tp_dictoffset */
+    0,                                          /* tp_init */
+    0,                                          /* tp_alloc */
+    0,                                          /* tp_new */
+    0,                                          /* tp_free */
+};
+
+// common helper for operations sign_binary_stream and verify_binary_stream
+static PyObject* PyXmlSec_StartSignatureStream(PyXmlSec_SignatureContext* ctx, xmlSecTransformId method) {
+    PyXmlSec_SignatureStream* stream;
+    int rv;
+
+    if (PyXmlSec_PrepareSignBinary(ctx, method) != 0) {
+        return NULL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS;
+    rv = xmlSecTransformCtxPrepare(&(ctx->handle->transformCtx), xmlSecTransformDataTypeBin);
+    Py_END_ALLOW_THREADS;
+
+    if (rv < 0) {
+        PyXmlSec_SetLastError("failed to prepare transforms.");
+        return NULL;
+    }
+
+    stream = PyObject_New(PyXmlSec_SignatureStream, &_PyXmlSec_SignatureStreamType);
+    if (stream == NULL) {
+        return NULL;
+    }
+    Py_INCREF(ctx);
+    stream->ctx = ctx;
+    ctx->stream = (PyObject*)stream;
+    return (PyObject*)stream;
+}
+
+static const char PyXmlSec_SignatureContextSignBinaryStream__doc__[] = \
+    "sign_binary_stream(transform) -> SignatureStream\n"
+    "Starts incremental signing of binary data with algorithm ``transform``.\n\n"
+    "The data is fed by :meth:`SignatureStream.update`, the signature is returned by "
+    ":meth:`SignatureStream.finalize`, so the whole data need not be held in memory.\n\n"
+    ":param transform: the signature algorithm\n"
+    ":type transform: :class:`__Transform`\n"
+    ":return: the signature stream\n"
+    ":rtype: :class:`SignatureStream`";
+static PyObject* PyXmlSec_SignatureContextSignBinaryStream(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "transform", NULL};
+    PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
+    PyXmlSec_Transform* transform = NULL;
+    PyObject* stream;
+
+    PYXMLSEC_DEBUGF("%p: sign_binary_stream - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!:sign_binary_stream", kwlist, PyXmlSec_TransformType, &transform)) {
+        goto ON_FAIL;
+    }
+
+    ctx->handle->operation = xmlSecTransformOperationSign;
+    stream = PyXmlSec_StartSignatureStream(ctx, transform->id);
+    if (stream == NULL) {
+        goto ON_FAIL;
+    }
+
+    PYXMLSEC_DEBUGF("%p: sign_binary_stream - ok", self);
+    return stream;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: sign_binary_stream - fail", self);
+    return NULL;
+}
+
+static const char PyXmlSec_SignatureContextVerifyBinaryStream__doc__[] = \
+    "verify_binary_stream(transform) -> SignatureStream\n"
+    "Starts incremental verification of signature for binary data.\n\n"
+    "The data is fed by :meth:`SignatureStream.update`, the signature is passed to "
+    ":meth:`SignatureStream.finalize`, so the whole data need not be held in memory.\n\n"
+    ":param transform: the signature algorithm\n"
+    ":type transform: :class:`__Transform`\n"
+    ":return: the signature stream\n"
+    ":rtype: :class:`SignatureStream`";
+static PyObject* PyXmlSec_SignatureContextVerifyBinaryStream(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "transform", NULL};
+    PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
+    PyXmlSec_Transform* transform = NULL;
+    PyObject* stream;
+
+    PYXMLSEC_DEBUGF("%p: verify_binary_stream - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!:verify_binary_stream", kwlist, PyXmlSec_TransformType, &transform)) {
+        goto ON_FAIL;
+    }
+
+    ctx->handle->operation = xmlSecTransformOperationVerify;
+    stream = PyXmlSec_StartSignatureStream(ctx, transform->id);
+    if (stream == NULL) {
+        goto ON_FAIL;
+    }
+
+    PYXMLSEC_DEBUGF("%p: verify_binary_stream - ok", self);
+    return stream;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: verify_binary_stream - fail", self);
     return NULL;
 }
 
@@ -423,6 +1441,7 @@ static PyObject* PyXmlSec_SignatureContextEnableReferenceTransform(PyObject* sel
     Py_BEGIN_ALLOW_THREADS;
     rv = xmlSecDSigCtxEnableReferenceTransform(ctx->handle, transform->id);
     Py_END_ALLOW_THREADS;
+    PyXmlSec_SignatureContextClearDigestCache(ctx);
 
     if (rv < 0) {
         PyXmlSec_SetLastError("cannot enable reference transform.");
@@ -458,6 +1477,7 @@ static PyObject* PyXmlSec_SignatureContextEnableSignatureTransform(PyObject* sel
     Py_BEGIN_ALLOW_THREADS;
     rv = xmlSecDSigCtxEnableSignatureTransform(ctx->handle, transform->id);
     Py_END_ALLOW_THREADS;
+    PyXmlSec_SignatureContextClearDigestCache(ctx);
 
     if (rv < 0) {
         PyXmlSec_SetLastError("cannot enable signature transform.");
@@ -493,6 +1513,7 @@ static PyObject* PyXmlSec_SignatureContextSetEnabledKeyData(PyObject* self, PyOb
 
     enabled_list = &(ctx->handle->keyInfoReadCtx.enabledKeyData);
     xmlSecPtrListEmpty(enabled_list);
+    PyXmlSec_SignatureContextClearDigestCache(ctx);
 
     while ((item = PyIter_Next(iter)) != NULL) {
         if (!PyObject_IsInstance(item, (PyObject*)PyXmlSec_KeyDataType)) {
@@ -517,6 +1538,116 @@ ON_FAIL:
     return NULL;
 }
 
+static const char PyXmlSec_SignatureContextEnableDigestCache__doc__[] = \
+    "enable_digest_cache(maxsize = 128) -> None\n"
+    "Enables the cache of digests of successfully verified references, ``maxsize`` ``0`` disables it.\n\n"
+    "Before verification each :xml:`<dsig:Reference/>` is digested together with the node it refers to, "
+    "which is the document or the element with the registered id, and the inherited namespaces of that element. "
+    "If all references have been verified already, :meth:`~SignatureContext.verify` skips their transforms and digests, "
+    "the key is still looked up and the signature of :xml:`<dsig:SignedInfo/>` is still checked. "
+    "The references to other documents or with transforms other than the canonicalization and the enveloped signature "
+    "are never cached. The least recently used digests are evicted first.\n\n"
+    "The cache is cleared when the key, the enabled transforms or the enabled key data are changed.\n\n"
+    ":param maxsize: the maximum number of cached references\n"
+    ":type maxsize: :class:`int`";
+static PyObject* PyXmlSec_SignatureContextEnableDigestCache(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "maxsize", NULL};
+
+    PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
+    Py_ssize_t maxsize = 128;
+
+    PYXMLSEC_DEBUGF("%p: enable_digest_cache - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|n:enable_digest_cache", kwlist, &maxsize)) {
+        goto ON_FAIL;
+    }
+    if (maxsize < 0) {
+        PyErr_SetString(PyExc_ValueError, "maxsize must not be negative.");
+        goto ON_FAIL;
+    }
+
+    if (maxsize == 0) {
+        Py_CLEAR(ctx->digest_cache);
+    } else if (ctx->digest_cache == NULL) {
+        if ((ctx->digest_cache = PyDict_New()) == NULL) goto ON_FAIL;
+    } else if (PyXmlSec_LruShrink(ctx->digest_cache, maxsize) < 0) {
+        goto ON_FAIL;
+    }
+    ctx->digest_cache_maxsize = maxsize;
+
+    PYXMLSEC_DEBUGF("%p: enable_digest_cache - ok", self);
+    Py_RETURN_NONE;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: enable_digest_cache - fail", self);
+    return NULL;
+}
+
+static const char PyXmlSec_SignatureContextDigestCacheInfo__doc__[] = \
+    "digest_cache_info() -> tuple[int, int, int, int]\n"
+    "Returns the statistics of the digest cache.\n\n"
+    ":return: ``(hits, misses, maxsize, currsize)``\n"
+    ":rtype: :class:`tuple`";
+static PyObject* PyXmlSec_SignatureContextDigestCacheInfo(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
+
+    return Py_BuildValue("(nnnn)",
+        ctx->digest_cache_hits,
+        ctx->digest_cache_misses,
+        ctx->digest_cache_maxsize,
+        ctx->digest_cache != NULL ? PyDict_Size(ctx->digest_cache) : (Py_ssize_t)0);
+}
+
+static const char PyXmlSec_SignatureContextClearDigestCache__doc__[] = \
+    "clear_digest_cache() -> None\n"
+    "Removes all cached digests and resets the statistics of the digest cache.\n";
+static PyObject* PyXmlSec_SignatureContextClearDigestCacheMethod(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
+
+    PyXmlSec_SignatureContextClearDigestCache(ctx);
+    ctx->digest_cache_hits = 0;
+    ctx->digest_cache_misses = 0;
+    Py_RETURN_NONE;
+}
+
+static const char PyXmlSec_SignatureContextReport__doc__[] = \
+    "report() -> SignatureReport\n"
+    "Returns the outcome of the last :meth:`sign` or :meth:`verify`: the status of the signature and "
+    "of each reference together with the wall time spent in the canonicalization, the digest methods "
+    "and the signature method. The report is empty after :meth:`reset`.\n\n"
+    ":return: the report of the last operation\n"
+    ":rtype: :class:`~xmlsec.SignatureReport`";
+static PyObject* PyXmlSec_SignatureContextReport(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
+
+    return PyXmlSec_SignatureReportNew(ctx->handle);
+}
+
+static const char PyXmlSec_SignatureContextVerificationCache__doc__[] = \
+    "The :class:`~xmlsec.VerificationCache` which :meth:`verify` consults and updates, :data:`None` if not set.\n";
+static PyObject* PyXmlSec_SignatureContextVerificationCacheGet(PyObject* self, void* closure) {
+    PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
+    if (ctx->verification_cache == NULL) {
+        Py_RETURN_NONE;
+    }
+    Py_INCREF(ctx->verification_cache);
+    return (PyObject*)ctx->verification_cache;
+}
+
+static int PyXmlSec_SignatureContextVerificationCacheSet(PyObject* self, PyObject* value, void* closure) {
+    PyXmlSec_SignatureContext* ctx = (PyXmlSec_SignatureContext*)self;
+
+    if (value == NULL || value == Py_None) {
+        Py_CLEAR(ctx->verification_cache);
+        return 0;
+    }
+    if (!PyObject_IsInstance(value, (PyObject*)PyXmlSec_VerificationCacheType)) {
+        PyErr_SetString(PyExc_TypeError, "instance of *xmlsec.VerificationCache* expected.");
+        return -1;
+    }
+    Py_INCREF(value);
+    Py_XSETREF(ctx->verification_cache, (PyXmlSec_VerificationCache*)value);
+    return 0;
+}
+
 static PyGetSetDef PyXmlSec_SignatureContextGetSet[] = {
     {
         "key",
@@ -525,16 +1656,35 @@ static PyGetSetDef PyXmlSec_SignatureContextGetSet[] = {
         (char*)PyXmlSec_SignatureContextKey__doc__,
         NULL
     },
+    {
+        "verification_cache",
+        (getter)PyXmlSec_SignatureContextVerificationCacheGet,
+        (setter)PyXmlSec_SignatureContextVerificationCacheSet,
+        (char*)PyXmlSec_SignatureContextVerificationCache__doc__,
+        NULL
+    },
     {NULL} /* Sentinel */
 };
 
 static PyMethodDef PyXmlSec_SignatureContextMethods[] = {
+    {
+        "reset",
+        (PyCFunction)PyXmlSec_SignatureContextReset,
+        METH_NOARGS,
+        PyXmlSec_SignatureContextReset__doc__,
+    },
     {
         "register_id",
         (PyCFunction)PyXmlSec_SignatureContextRegisterId,
         METH_VARARGS|METH_KEYWORDS,
         PyXmlSec_SignatureContextRegisterId__doc__,
     },
+    {
+        "register_ids",
+        (PyCFunction)PyXmlSec_SignatureContextRegisterIds,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_SignatureContextRegisterIds__doc__,
+    },
     {
         "sign",
         (PyCFunction)PyXmlSec_SignatureContextSign,
@@ -547,6 +1697,12 @@ static PyMethodDef PyXmlSec_SignatureContextMethods[] = {
         METH_VARARGS|METH_KEYWORDS,
         PyXmlSec_SignatureContextVerify__doc__
     },
+    {
+        "verify_many",
+        (PyCFunction)PyXmlSec_SignatureContextVerifyMany,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_SignatureContextVerifyMany__doc__
+    },
     {
         "sign_binary",
         (PyCFunction)PyXmlSec_SignatureContextSignBinary,
@@ -559,6 +1715,18 @@ static PyMethodDef PyXmlSec_SignatureContextMethods[] = {
         METH_VARARGS|METH_KEYWORDS,
         PyXmlSec_SignatureContextVerifyBinary__doc__
     },
+    {
+        "sign_binary_stream",
+        (PyCFunction)PyXmlSec_SignatureContextSignBinaryStream,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_SignatureContextSignBinaryStream__doc__
+    },
+    {
+        "verify_binary_stream",
+        (PyCFunction)PyXmlSec_SignatureContextVerifyBinaryStream,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_SignatureContextVerifyBinaryStream__doc__
+    },
     {
         "enable_reference_transform",
         (PyCFunction)PyXmlSec_SignatureContextEnableReferenceTransform,
@@ -577,6 +1745,30 @@ static PyMethodDef PyXmlSec_SignatureContextMethods[] = {
         METH_VARARGS|METH_KEYWORDS,
         PyXmlSec_SignatureContextSetEnabledKeyData__doc__,
     },
+    {
+        "enable_digest_cache",
+        (PyCFunction)PyXmlSec_SignatureContextEnableDigestCache,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_SignatureContextEnableDigestCache__doc__,
+    },
+    {
+        "digest_cache_info",
+        (PyCFunction)PyXmlSec_SignatureContextDigestCacheInfo,
+        METH_NOARGS,
+        PyXmlSec_SignatureContextDigestCacheInfo__doc__,
+    },
+    {
+        "clear_digest_cache",
+        (PyCFunction)PyXmlSec_SignatureContextClearDigestCacheMethod,
+        METH_NOARGS,
+        PyXmlSec_SignatureContextClearDigestCache__doc__,
+    },
+    {
+        "report",
+        (PyCFunction)PyXmlSec_SignatureContextReport,
+        METH_NOARGS,
+        PyXmlSec_SignatureContextReport__doc__,
+    },
     {NULL, NULL} /* sentinel */
 };
 
@@ -631,6 +1823,10 @@ int PyXmlSec_DSModule_Init(PyObject* package) {
     Py_INCREF(PyXmlSec_SignatureContextType);
 
     if (PyModule_AddObject(package, "SignatureContext", (PyObject*)PyXmlSec_SignatureContextType) < 0) goto ON_FAIL;
+
+    if (PyType_Ready(&_PyXmlSec_SignatureStreamType) < 0) goto ON_FAIL;
+    Py_INCREF(&_PyXmlSec_SignatureStreamType);
+    if (PyModule_AddObject(package, "SignatureStream", (PyObject*)&_PyXmlSec_SignatureStreamType) < 0) goto ON_FAIL;
     return 0;
 ON_FAIL:
     return -1;
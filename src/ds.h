@@ -0,0 +1,21 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+#ifndef __PYXMLSEC_DS_H__
+#define __PYXMLSEC_DS_H__
+
+#include "platform.h"
+
+#include <xmlsec/xmldsig.h>
+
+// clears the per-operation state of the digital signature context, so it can be used for the next operation.
+// the sign key is kept only if `keep_key` is not zero. the gil is not required.
+void PyXmlSec_DSigCtxResetState(xmlSecDSigCtxPtr handle, int keep_key);
+
+#endif //__PYXMLSEC_DS_H__
@@ -13,9 +13,15 @@
 #include "constants.h"
 #include "keys.h"
 #include "lxml.h"
+#include "session.h"
+#include "stream.h"
 
+#include <stddef.h>
+
+#include <xmlsec/crypto.h>
 #include <xmlsec/xmlenc.h>
 #include <xmlsec/xmltree.h>
+#include <xmlsec/templates.h>
 
 // Backwards compatibility with xmlsec 1.2
 #ifndef XMLSEC_KEYINFO_FLAGS_LAX_KEY_SEARCH
@@ -26,6 +32,8 @@ typedef struct {
     PyObject_HEAD
     xmlSecEncCtxPtr handle;
     PyXmlSec_KeysManager* manager;
+    PyXmlSec_SessionKeyCache* session_key_cache;
+    PyXmlSec_SessionKeyCacheRef session_key_ref;  // pointed by the userData of the key info context
 } PyXmlSec_EncryptionContext;
 
 static PyObject* PyXmlSec_EncryptionContext__new__(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
@@ -34,6 +42,9 @@ static PyObject* PyXmlSec_EncryptionContext__new__(PyTypeObject *type, PyObject
     if (ctx != NULL) {
         ctx->handle = NULL;
         ctx->manager = NULL;
+        ctx->session_key_cache = NULL;
+        ctx->session_key_ref.cache = NULL;
+        ctx->session_key_ref.serial = 0;
     }
     return (PyObject*)(ctx);
 }
@@ -61,6 +72,7 @@ static int PyXmlSec_EncryptionContext__init__(PyObject* self, PyObject* args, Py
     // lax mode for now.
     ctx->handle->keyInfoReadCtx.flags = XMLSEC_KEYINFO_FLAGS_LAX_KEY_SEARCH;
     ctx->handle->keyInfoWriteCtx.flags = XMLSEC_KEYINFO_FLAGS_LAX_KEY_SEARCH;
+    ctx->handle->keyInfoReadCtx.userData = &(ctx->session_key_ref);
 
     return 0;
 ON_FAIL:
@@ -79,6 +91,7 @@ static void PyXmlSec_EncryptionContext__del__(PyObject* self) {
     }
     // release manager object
     Py_XDECREF(ctx->manager);
+    Py_XDECREF(ctx->session_key_cache);
     Py_TYPE(self)->tp_free(self);
 }
 
@@ -156,7 +169,7 @@ static const char PyXmlSec_EncryptionContextEncryptBinary__doc__[] = \
     ":param template: the pointer to :xml:`<enc:EncryptedData/>` template node\n"
     ":type template: :class:`lxml.etree._Element`\n"
     ":param data: the data\n"
-    ":type data: :class:`bytes`\n"
+    ":type data: :class:`bytes` or any :term:`bytes-like object`\n"
     ":return: the resulting :xml:`<enc:EncryptedData/>` subtree\n"
     ":rtype: :class:`lxml.etree._Element`";
 static PyObject* PyXmlSec_EncryptionContextEncryptBinary(PyObject* self, PyObject* args, PyObject* kwargs) {
@@ -164,19 +177,18 @@ static PyObject* PyXmlSec_EncryptionContextEncryptBinary(PyObject* self, PyObjec
 
     PyXmlSec_EncryptionContext* ctx = (PyXmlSec_EncryptionContext*)self;
     PyXmlSec_LxmlElementPtr template = NULL;
-    const char* data = NULL;
-    Py_ssize_t data_size = 0;
+    Py_buffer data = {0};
     int rv;
 
     PYXMLSEC_DEBUGF("%p: encrypt_binary - start", self);
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&s#:encrypt_binary", kwlist,
-        PyXmlSec_LxmlElementConverter, &template, &data, &data_size))
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&s*:encrypt_binary", kwlist,
+        PyXmlSec_LxmlElementConverter, &template, &data))
     {
         goto ON_FAIL;
     }
 
     Py_BEGIN_ALLOW_THREADS;
-    rv = xmlSecEncCtxBinaryEncrypt(ctx->handle, template->_c_node, (const xmlSecByte*)data, (xmlSecSize)data_size);
+    rv = xmlSecEncCtxBinaryEncrypt(ctx->handle, template->_c_node, (const xmlSecByte*)data.buf, (xmlSecSize)data.len);
     PYXMLSEC_DUMP(xmlSecEncCtxDebugDump, ctx->handle);
     Py_END_ALLOW_THREADS;
 
@@ -185,24 +197,32 @@ static PyObject* PyXmlSec_EncryptionContextEncryptBinary(PyObject* self, PyObjec
         goto ON_FAIL;
     }
     Py_INCREF(template);
+    PyBuffer_Release(&data);
     PYXMLSEC_DEBUGF("%p: encrypt_binary - ok", self);
 
     return (PyObject*)template;
 ON_FAIL:
     PYXMLSEC_DEBUGF("%p: encrypt_binary - fail", self);
+    PyBuffer_Release(&data);
     return NULL;
 }
 
 // release the replaced nodes in a way safe for `lxml`
-static void PyXmlSec_ClearReplacedNodes(xmlSecEncCtxPtr ctx, PyXmlSec_LxmlDocumentPtr doc) {
+static void PyXmlSec_ClearNodeList(xmlNodePtr n, PyXmlSec_LxmlDocumentPtr doc) {
     PyXmlSec_LxmlElementPtr elem;
-    // release the replaced nodes in a way safe for `lxml`
-    xmlNodePtr n = ctx->replacedNodeList;
     xmlNodePtr nn;
 
     while (n != NULL) {
         PYXMLSEC_DEBUGF("clear replaced node %p", n);
         nn = n->next;
+        // the nodes are chained by next, lxml would take them for siblings
+        n->next = NULL;
+        if (!PyXmlSec_IsElement(n)) {
+            // the decrypted content may be replaced by text, which has no proxies in `lxml`
+            xmlFreeNode(n);
+            n = nn;
+            continue;
+        }
         // if n has references, it will not be deleted
         elem = (PyXmlSec_LxmlElementPtr)PyXmlSec_elementFactory(doc, n);
         if (NULL == elem)
@@ -211,6 +231,11 @@ static void PyXmlSec_ClearReplacedNodes(xmlSecEncCtxPtr ctx, PyXmlSec_LxmlDocume
             Py_DECREF(elem);
         n = nn;
     }
+}
+
+static void PyXmlSec_ClearReplacedNodes(xmlSecEncCtxPtr ctx, PyXmlSec_LxmlDocumentPtr doc) {
+    // release the replaced nodes in a way safe for `lxml`
+    PyXmlSec_ClearNodeList(ctx->replacedNodeList, doc);
     ctx->replacedNodeList = NULL;
 }
 
@@ -340,6 +365,138 @@ ON_FAIL:
     return NULL;
 }
 
+// the state of encrypt_stream, which is pointed by the userData of the transform context
+typedef struct {
+    xmlSecEncCtxPtr handle;
+    PyXmlSec_StreamSource* source;
+    PyXmlSec_StreamSink* sink;
+    xmlSecByte last;         // the last byte of the data, xmlsec pushes it with the final flag
+    int empty;               // the source has no data
+} PyXmlSec_EncryptStream;
+
+// the callback is called when the transforms chain is prepared, it pushes the data except the last byte
+static int PyXmlSec_EncryptStreamPreExecute(xmlSecTransformCtxPtr transformCtx) {
+    xmlSecEncCtxPtr encCtx = (xmlSecEncCtxPtr)((char*)transformCtx - offsetof(xmlSecEncCtx, transformCtx));
+    PyXmlSec_EncryptStream* stream = (PyXmlSec_EncryptStream*)transformCtx->userData;
+    xmlSecSize block_size = stream != NULL ? stream->sink->block_size : 0;
+    xmlSecByte* block;
+    xmlSecSize held = 0;  // the last byte of the previous block is held at the beginning of the block
+    Py_ssize_t n;
+    int rv = -1;
+
+    // the nested contexts, which encrypt the session key, inherit the callback
+    if (stream == NULL || stream->handle != encCtx) return 0;
+    if (PyXmlSec_StreamSinkInsert(transformCtx, stream->sink) < 0) return -1;
+    if ((block = (xmlSecByte*)xmlMalloc(block_size + 1)) == NULL) return -1;
+
+    for (;;) {
+        n = PyXmlSec_StreamSourceRead(stream->source, block + held, block_size);
+        if (n < 0) goto ON_FAIL;
+        if (n == 0) break;
+        n += held;
+        if (n > 1 && xmlSecTransformPushBin(transformCtx->first, block, (xmlSecSize)n - 1, 0, transformCtx) < 0) goto ON_FAIL;
+        block[0] = block[n - 1];
+        held = 1;
+    }
+    if (held == 0) {
+        stream->empty = 1;
+        goto ON_FAIL;
+    }
+    stream->last = block[0];
+    rv = 0;
+ON_FAIL:
+    memset(block, 0, block_size + 1);
+    xmlFree(block);
+    return rv;
+}
+
+static const char PyXmlSec_EncryptionContextEncryptStream__doc__[] = \
+    "encrypt_stream(template, readable, sink, block_size=65536) -> lxml.etree._Element\n"
+    "Encrypts binary data read from ``readable`` according to ``template`` and writes the cipher text "
+    "to ``sink``, both by blocks of ``block_size`` bytes, the GIL is released between the reads and the writes.\n"
+    "``template`` must have :xml:`<enc:CipherReference/>` "
+    "(see :func:`~xmlsec.template.encrypted_data_ensure_cipher_reference`), which points to the location "
+    "of the raw cipher text, so neither the data nor the cipher text is kept in memory as a whole.\n\n"
+    ".. note:: ``template`` is modified in place.\n\n"
+    ":param template: the pointer to :xml:`<enc:EncryptedData/>` template node\n"
+    ":type template: :class:`lxml.etree._Element`\n"
+    ":param readable: the binary file object, or any object with the ``readinto`` or the ``read`` method, "
+    "or the file descriptor\n"
+    ":type readable: :class:`~typing.BinaryIO` or :class:`int`\n"
+    ":param sink: the binary file object, or any object with the ``write`` method, or the file descriptor\n"
+    ":type sink: :class:`~typing.BinaryIO` or :class:`int`\n"
+    ":param block_size: the size of the read and the written blocks\n"
+    ":type block_size: :class:`int`\n"
+    ":return: the resulting :xml:`<enc:EncryptedData/>` subtree\n"
+    ":rtype: :class:`lxml.etree._Element`";
+static PyObject* PyXmlSec_EncryptionContextEncryptStream(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "template", "readable", "sink", "block_size", NULL};
+
+    PyXmlSec_EncryptionContext* ctx = (PyXmlSec_EncryptionContext*)self;
+    PyXmlSec_LxmlElementPtr template = NULL;
+    PyXmlSec_StreamSource source;
+    PyXmlSec_StreamSink sink;
+    PyXmlSec_EncryptStream stream;
+    Py_ssize_t block_size = PYXMLSEC_STREAM_BLOCK_SIZE;
+    xmlNodePtr cur;
+    int rv;
+
+    PYXMLSEC_DEBUGF("%p: encrypt_stream - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&O&O&|n:encrypt_stream", kwlist,
+        PyXmlSec_LxmlElementConverter, &template, PyXmlSec_StreamSourceConverter, &source,
+        PyXmlSec_StreamSinkConverter, &sink, &block_size))
+    {
+        goto ON_FAIL;
+    }
+    if (block_size <= 0) {
+        PyErr_SetString(PyExc_ValueError, "block_size must be positive.");
+        goto ON_FAIL;
+    }
+    // with <enc:CipherValue/> xmlsec would put the cipher text into the tree
+    cur = xmlSecFindChild(template->_c_node, xmlSecNodeCipherData, xmlSecEncNs);
+    cur = cur != NULL ? xmlSecGetNextElementNode(cur->children) : NULL;
+    if (cur == NULL || !xmlSecCheckNodeName(cur, xmlSecNodeCipherReference, xmlSecEncNs)) {
+        PyErr_SetString(PyXmlSec_Error, "template has no cipher reference.");
+        goto ON_FAIL;
+    }
+
+    sink.block_size = (xmlSecSize)block_size;
+    memset(&stream, 0, sizeof(stream));
+    stream.handle = ctx->handle;
+    stream.source = &source;
+    stream.sink = &sink;
+
+    Py_BEGIN_ALLOW_THREADS;
+    ctx->handle->transformCtx.preExecCallback = PyXmlSec_EncryptStreamPreExecute;
+    ctx->handle->transformCtx.userData = &stream;
+    // xmlsec reads the last byte after the callback has pushed the rest of the data
+    rv = xmlSecEncCtxBinaryEncrypt(ctx->handle, template->_c_node, &(stream.last), 1);
+    ctx->handle->transformCtx.preExecCallback = NULL;
+    ctx->handle->transformCtx.userData = NULL;
+    PYXMLSEC_DUMP(xmlSecEncCtxDebugDump, ctx->handle);
+    Py_END_ALLOW_THREADS;
+
+    stream.last = 0;
+    if (rv < 0) {
+        if (PyXmlSec_StreamSourceCheckError(&source) || PyXmlSec_StreamSinkCheckError(&sink)) {
+            goto ON_FAIL;
+        }
+        if (stream.empty) {
+            PyErr_SetString(PyXmlSec_Error, "no data to encrypt.");
+            goto ON_FAIL;
+        }
+        PyXmlSec_SetLastError("failed to encrypt stream");
+        goto ON_FAIL;
+    }
+    Py_INCREF(template);
+    PYXMLSEC_DEBUGF("%p: encrypt_stream - ok", self);
+    return (PyObject*)template;
+
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: encrypt_stream - fail", self);
+    return NULL;
+}
+
 static const char PyXmlSec_EncryptionContextDecrypt__doc__[] = \
     "decrypt(node)\n"
     "Decrypts ``node`` (an ``EncryptedData`` or ``EncryptedKey`` element) and returns the result. "
@@ -357,12 +514,9 @@ static PyObject* PyXmlSec_EncryptionContextDecrypt(PyObject* self, PyObject* arg
     PyXmlSec_EncryptionContext* ctx = (PyXmlSec_EncryptionContext*)self;
     PyXmlSec_LxmlElementPtr node = NULL;
 
-    PyObject* node_num = NULL;
-    PyObject* parent = NULL;
-
-    PyObject* tmp;
     xmlNodePtr root;
     xmlNodePtr xparent;
+    xmlNodePtr xprev;
     int rv;
     xmlChar* ttype;
     int notContent;
@@ -376,17 +530,13 @@ static PyObject* PyXmlSec_EncryptionContextDecrypt(PyObject* self, PyObject* arg
     if (xparent != NULL && !PyXmlSec_IsElement(xparent)) {
         xparent = NULL;
     }
+    // the decrypted nodes are inserted before the node, so the previous sibling marks their position
+    xprev = node->_c_node->prev;
+    PYXMLSEC_DEBUGF("parent: %p, prev: %p", xparent, xprev);
 
-    if (xparent != NULL) {
-        parent = (PyObject*)PyXmlSec_elementFactory(node->_doc, xparent);
-        if (parent == NULL) {
-            PyErr_SetString(PyXmlSec_InternalError, "failed to construct parent");
-            goto ON_FAIL;
-        }
-        // get index of node
-        node_num = PyObject_CallMethod(parent, "index", "O", node);
-        PYXMLSEC_DEBUGF("parent: %p, %p", parent, node_num);
-    }
+    // the cache is used only during this call, the context holds the reference to it
+    ctx->session_key_ref.cache = ctx->session_key_cache;
+    ctx->session_key_ref.serial = ctx->manager != NULL ? ctx->manager->serial : 0;
 
     Py_BEGIN_ALLOW_THREADS;
     ctx->handle->flags = XMLSEC_ENC_RETURN_REPLACED_NODE;
@@ -396,6 +546,8 @@ static PyObject* PyXmlSec_EncryptionContextDecrypt(PyObject* self, PyObject* arg
     PYXMLSEC_DUMP(xmlSecEncCtxDebugDump, ctx->handle);
     Py_END_ALLOW_THREADS;
 
+    ctx->session_key_ref.cache = NULL;
+
     PyXmlSec_ClearReplacedNodes(ctx->handle, node->_doc);
 
     if (rv < 0) {
@@ -404,8 +556,6 @@ static PyObject* PyXmlSec_EncryptionContextDecrypt(PyObject* self, PyObject* arg
     }
 
     if (!ctx->handle->resultReplaced) {
-        Py_XDECREF(node_num);
-        Py_XDECREF(parent);
         PYXMLSEC_DEBUGF("%p: binary.decrypt - ok", self);
         return PyBytes_FromStringAndSize(
             (const char*)xmlSecBufferGetData(ctx->handle->result),
@@ -419,14 +569,17 @@ static PyObject* PyXmlSec_EncryptionContextDecrypt(PyObject* self, PyObject* arg
         xmlFree(ttype);
 
         if (notContent) {
-            tmp = PyObject_GetItem(parent, node_num);
-            if (tmp == NULL) goto ON_FAIL;
-            Py_DECREF(parent);
-            parent = tmp;
+            // the first element at the position of the replaced node
+            root = xprev != NULL ? xprev->next : xparent->children;
+            while (root != NULL && !PyXmlSec_IsElement(root)) root = root->next;
+            if (root == NULL) {
+                PyErr_SetString(PyXmlSec_Error, "decryption resulted in no element");
+                goto ON_FAIL;
+            }
+            xparent = root;
         }
-        Py_DECREF(node_num);
         PYXMLSEC_DEBUGF("%p: parent.decrypt - ok", self);
-        return parent;
+        return (PyObject*)PyXmlSec_elementFactory(node->_doc, xparent);
     }
 
     // root has been replaced
@@ -436,19 +589,702 @@ static PyObject* PyXmlSec_EncryptionContextDecrypt(PyObject* self, PyObject* arg
         goto ON_FAIL;
     }
 
-    Py_XDECREF(node_num);
-    Py_XDECREF(parent);
-
     PYXMLSEC_DEBUGF("%p: decrypt - ok", self);
     return (PyObject*)PyXmlSec_elementFactory(node->_doc, root);
 
 ON_FAIL:
     PYXMLSEC_DEBUGF("%p: decrypt - fail", self);
-    Py_XDECREF(node_num);
-    Py_XDECREF(parent);
     return NULL;
 }
 
+// generates the session key, which is required by <enc:EncryptionMethod/> of the template
+static xmlSecKeyPtr PyXmlSec_GenerateSessionKey(xmlNodePtr template) {
+    xmlNodePtr cur = xmlSecFindChild(template, xmlSecNodeEncryptionMethod, xmlSecEncNs);
+    xmlChar* href = cur != NULL ? xmlGetProp(cur, xmlSecAttrAlgorithm) : NULL;
+    xmlSecTransformId id = xmlSecTransformIdUnknown;
+    xmlSecTransformPtr transform = NULL;
+    xmlSecKeyReq keyReq;
+    xmlSecKeyPtr key = NULL;
+
+    if (href == NULL) return NULL;
+    if (xmlSecKeyReqInitialize(&keyReq) < 0) goto ON_EXIT;
+    id = xmlSecTransformIdListFindByHref(xmlSecTransformIdsGet(), href, xmlSecTransformUsageEncryptionMethod);
+    if (id == xmlSecTransformIdUnknown || (transform = xmlSecTransformCreate(id)) == NULL) goto ON_EXIT;
+    transform->operation = xmlSecTransformOperationEncrypt;
+    if (xmlSecTransformSetKeyReq(transform, &keyReq) < 0) goto ON_EXIT;
+    key = xmlSecKeyGenerate(keyReq.keyId, keyReq.keyBitsSize, xmlSecKeyDataTypeSession);
+ON_EXIT:
+    if (transform != NULL) xmlSecTransformDestroy(transform);
+    xmlSecKeyReqFinalize(&keyReq);
+    xmlFree(href);
+    return key;
+}
+
+// adds <enc:EncryptedKey/> with the session key, which is encrypted by the key of the recipient, for every recipient.
+// the keys are consumed.
+static int PyXmlSec_AddEncryptedKeys(xmlNodePtr encData, xmlSecTransformId method, xmlSecKeyPtr* keys, Py_ssize_t count, xmlSecBufferPtr sessionKey) {
+    xmlSecEncCtxPtr wrapCtx = xmlSecEncCtxCreate(NULL);
+    xmlNodePtr keyInfo;
+    xmlNodePtr encKey;
+    const xmlChar* name;
+    Py_ssize_t i;
+    int rv = -1;
+
+    if (wrapCtx == NULL) return -1;
+    if ((keyInfo = xmlSecTmplEncDataEnsureKeyInfo(encData, NULL)) == NULL) goto ON_EXIT;
+    for (i = 0; i < count; ++i) {
+        name = xmlSecKeyGetName(keys[i]);
+        encKey = xmlSecTmplKeyInfoAddEncryptedKey(keyInfo, method, NULL, NULL, name);
+        if (encKey == NULL) goto ON_EXIT;
+        // the recipient finds its key by name, xmlsec writes the name of the key
+        if (name != NULL && xmlSecTmplKeyInfoAddKeyName(xmlSecTmplEncDataEnsureKeyInfo(encKey, NULL), NULL) == NULL) goto ON_EXIT;
+        if (xmlSecTmplEncDataEnsureCipherValue(encKey) == NULL) goto ON_EXIT;
+
+        xmlSecEncCtxReset(wrapCtx);
+        if (wrapCtx->encKey != NULL) xmlSecKeyDestroy(wrapCtx->encKey);
+        wrapCtx->mode = xmlEncCtxModeEncryptedKey;
+        wrapCtx->encKey = keys[i];
+        keys[i] = NULL;
+        if (xmlSecEncCtxBinaryEncrypt(wrapCtx, encKey, xmlSecBufferGetData(sessionKey), xmlSecBufferGetSize(sessionKey)) < 0) goto ON_EXIT;
+    }
+    rv = 0;
+ON_EXIT:
+    xmlSecEncCtxDestroy(wrapCtx);
+    return rv;
+}
+
+// resolves the recipient, which is either the key or the name of the key in the keys manager
+static xmlSecKeyPtr PyXmlSec_FindRecipientKey(PyXmlSec_EncryptionContext* ctx, PyObject* recipient) {
+    xmlSecKeyInfoCtx keyInfoCtx;
+    xmlSecKeyPtr key = NULL;
+    const char* name;
+
+    if (PyObject_IsInstance(recipient, (PyObject*)PyXmlSec_KeyType)) {
+        if (((PyXmlSec_Key*)recipient)->handle == NULL) {
+            PyErr_SetString(PyExc_TypeError, "empty key.");
+            return NULL;
+        }
+        if ((key = xmlSecKeyDuplicate(((PyXmlSec_Key*)recipient)->handle)) == NULL) {
+            PyXmlSec_SetLastError("failed to duplicate key");
+        }
+        return key;
+    }
+    if (!PyUnicode_Check(recipient)) {
+        PyErr_SetString(PyExc_TypeError, "recipients must be a sequence of keys or key names.");
+        return NULL;
+    }
+    if ((name = PyUnicode_AsUTF8(recipient)) == NULL) {
+        return NULL;
+    }
+    if (ctx->manager != NULL && xmlSecKeyInfoCtxInitialize(&keyInfoCtx, ctx->manager->handle) == 0) {
+        keyInfoCtx.keyReq.keyType = xmlSecKeyDataTypePublic;
+        key = xmlSecKeysMngrFindKey(ctx->manager->handle, XSTR(name), &keyInfoCtx);
+        xmlSecKeyInfoCtxFinalize(&keyInfoCtx);
+    }
+    if (key == NULL) {
+        PyErr_Format(PyXmlSec_Error, "recipient key '%s' is not found.", name);
+    }
+    return key;
+}
+
+static const char PyXmlSec_EncryptionContextEncryptForRecipients__doc__[] = \
+    "encrypt_for_recipients(template, data, recipients, key_transport=xmlsec.constants.TransformRsaOaep) -> lxml.etree._Element\n"
+    "Encrypts ``data`` once with the session key, and adds :xml:`<enc:EncryptedKey/>` with the session key, "
+    "which is encrypted by the key of the recipient, to :xml:`<dsig:KeyInfo/>` of the result for every recipient. "
+    "If :attr:`key` is not set, the session key is generated according to :xml:`<enc:EncryptionMethod/>` of ``template``.\n"
+    "The binary ``data`` is encrypted like :meth:`encrypt_binary` does, the element like :meth:`encrypt_xml` does.\n\n"
+    ":param template: the pointer to :xml:`<enc:EncryptedData/>` template node\n"
+    ":type template: :class:`lxml.etree._Element`\n"
+    ":param data: the data or the node for encryption\n"
+    ":type data: :class:`bytes`, any :term:`bytes-like object` or :class:`lxml.etree._Element`\n"
+    ":param recipients: the public keys of the recipients, or the names of the keys in the keys manager\n"
+    ":type recipients: :class:`list` of :class:`~xmlsec.Key` or :class:`str`\n"
+    ":param key_transport: the key transport method\n"
+    ":type key_transport: :class:`__Transform`\n"
+    ":return: the resulting :xml:`<enc:EncryptedData/>` subtree\n"
+    ":rtype: :class:`lxml.etree._Element`";
+static PyObject* PyXmlSec_EncryptionContextEncryptForRecipients(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "template", "data", "recipients", "key_transport", NULL};
+
+    PyXmlSec_EncryptionContext* ctx = (PyXmlSec_EncryptionContext*)self;
+    PyXmlSec_LxmlElementPtr template = NULL;
+    PyXmlSec_Transform* key_transport = NULL;
+    PyObject* data = NULL;
+    PyObject* recipients = NULL;
+    PyObject* seq = NULL;
+    PyObject* encrypt_args = NULL;
+    PyObject* result = NULL;
+    xmlSecKeyPtr* keys = NULL;
+    xmlSecBufferPtr sessionKey = NULL;
+    xmlSecBufferPtr value;
+    xmlSecTransformId method = xmlSecTransformRsaOaepId;
+    Py_ssize_t count = 0;
+    Py_ssize_t i;
+    int rv;
+
+    PYXMLSEC_DEBUGF("%p: encrypt_for_recipients - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&OO|O!:encrypt_for_recipients", kwlist,
+        PyXmlSec_LxmlElementConverter, &template, &data, &recipients, PyXmlSec_TransformType, &key_transport))
+    {
+        goto ON_FAIL;
+    }
+    if (key_transport != NULL) {
+        method = key_transport->id;
+    }
+    if (PyUnicode_Check(recipients) || (seq = PySequence_Fast(recipients, "recipients must be a sequence of keys or key names.")) == NULL) {
+        if (seq == NULL && !PyErr_Occurred()) {
+            PyErr_SetString(PyExc_TypeError, "recipients must be a sequence of keys or key names.");
+        }
+        goto ON_FAIL;
+    }
+    count = PySequence_Fast_GET_SIZE(seq);
+    if (count == 0) {
+        PyErr_SetString(PyExc_ValueError, "recipients must not be empty.");
+        goto ON_FAIL;
+    }
+    if ((keys = (xmlSecKeyPtr*)PyMem_Calloc((size_t)count, sizeof(xmlSecKeyPtr))) == NULL) {
+        PyErr_NoMemory();
+        goto ON_FAIL;
+    }
+    for (i = 0; i < count; ++i) {
+        if ((keys[i] = PyXmlSec_FindRecipientKey(ctx, PySequence_Fast_GET_ITEM(seq, i))) == NULL) goto ON_FAIL;
+    }
+
+    if (ctx->handle->encKey == NULL && (ctx->handle->encKey = PyXmlSec_GenerateSessionKey(template->_c_node)) == NULL) {
+        PyXmlSec_SetLastError("cannot generate the session key");
+        goto ON_FAIL;
+    }
+    if ((xmlSecKeyGetType(ctx->handle->encKey) & xmlSecKeyDataTypeSymmetric) == 0 ||
+        (value = xmlSecKeyDataBinaryValueGetBuffer(xmlSecKeyGetValue(ctx->handle->encKey))) == NULL)
+    {
+        PyErr_SetString(PyXmlSec_Error, "the session key must be symmetric.");
+        goto ON_FAIL;
+    }
+    // the encryption may reset the context, which destroys the key
+    if ((sessionKey = xmlSecBufferCreate(xmlSecBufferGetSize(value))) == NULL ||
+        xmlSecBufferSetData(sessionKey, xmlSecBufferGetData(value), xmlSecBufferGetSize(value)) < 0)
+    {
+        PyXmlSec_SetLastError("failed to copy the session key");
+        goto ON_FAIL;
+    }
+
+    if ((encrypt_args = PyTuple_Pack(2, (PyObject*)template, data)) == NULL) goto ON_FAIL;
+    if (PyObject_CheckBuffer(data)) {
+        result = PyXmlSec_EncryptionContextEncryptBinary(self, encrypt_args, NULL);
+    } else {
+        result = PyXmlSec_EncryptionContextEncryptXml(self, encrypt_args, NULL);
+    }
+    if (result == NULL) goto ON_FAIL;
+
+    Py_BEGIN_ALLOW_THREADS;
+    rv = PyXmlSec_AddEncryptedKeys(((PyXmlSec_LxmlElementPtr)result)->_c_node, method, keys, count, sessionKey);
+    Py_END_ALLOW_THREADS;
+
+    if (rv < 0) {
+        PyXmlSec_SetLastError("failed to encrypt the session key");
+        goto ON_FAIL;
+    }
+    PYXMLSEC_DEBUGF("%p: encrypt_for_recipients - ok", self);
+    goto ON_EXIT;
+
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: encrypt_for_recipients - fail", self);
+    Py_CLEAR(result);
+ON_EXIT:
+    if (keys != NULL) {
+        for (i = 0; i < count; ++i) {
+            if (keys[i] != NULL) xmlSecKeyDestroy(keys[i]);
+        }
+        PyMem_Free(keys);
+    }
+    if (sessionKey != NULL) {
+        xmlSecBufferDestroy(sessionKey);
+    }
+    Py_XDECREF(encrypt_args);
+    Py_XDECREF(seq);
+    return result;
+}
+
+// encrypts the session key to <enc:EncryptedKey/>, the key of the recipient is found in the keys manager
+static int PyXmlSec_EncryptSessionKey(xmlSecKeysMngrPtr manager, xmlNodePtr encKey, xmlSecKeyPtr sessionKey) {
+    xmlSecBufferPtr value = xmlSecKeyDataBinaryValueGetBuffer(xmlSecKeyGetValue(sessionKey));
+    xmlSecEncCtxPtr wrapCtx = xmlSecEncCtxCreate(manager);
+    int rv;
+
+    if (wrapCtx == NULL) return -1;
+    wrapCtx->mode = xmlEncCtxModeEncryptedKey;
+    rv = xmlSecEncCtxBinaryEncrypt(wrapCtx, encKey, xmlSecBufferGetData(value), xmlSecBufferGetSize(value));
+    xmlSecEncCtxDestroy(wrapCtx);
+    return rv;
+}
+
+// the batch of the elements for encrypt_elements
+typedef struct {
+    xmlNodePtr template;
+    xmlNodePtr encKey;          // the shared <enc:EncryptedKey/> or NULL
+    const xmlChar* encKeyUri;   // the reference to the shared <enc:EncryptedKey/>
+    int perElementKey;
+    PyXmlSec_LxmlElementPtr* nodes;
+    xmlNodePtr* results;        // the resulting <enc:EncryptedData/> for every node
+    xmlNodePtr* replaced;       // the replaced nodes for every node
+    Py_ssize_t count;
+} PyXmlSec_EncryptBatch;
+
+// encrypts the batch, the key of the context is shared by all elements unless perElementKey is set.
+// returns 1 if the template could not be copied, 2 if the session key could not be encrypted, -1 if the encryption failed.
+static int PyXmlSec_EncryptElements(xmlSecEncCtxPtr handle, PyXmlSec_EncryptBatch* batch) {
+    xmlSecKeyPtr key = handle->encKey;  // the shared key is kept for all elements
+    xmlNodePtr encData;
+    xmlNodePtr keyInfo;
+    Py_ssize_t i;
+    int rv = 0;
+
+    if (batch->encKey != NULL && PyXmlSec_EncryptSessionKey(handle->keyInfoReadCtx.keysMngr, batch->encKey, key) < 0) {
+        return 2;
+    }
+
+    handle->encKey = NULL;
+    xmlSecEncCtxReset(handle);
+    for (i = 0; i < batch->count; ++i) {
+        encData = xmlDocCopyNode(batch->template, batch->nodes[i]->_doc->_c_doc, 1); // recursive
+        if (encData == NULL) {
+            rv = 1;
+            break;
+        }
+        if (batch->encKeyUri != NULL) {
+            keyInfo = xmlSecTmplEncDataEnsureKeyInfo(encData, NULL);
+            if (keyInfo == NULL || xmlSecTmplKeyInfoAddRetrievalMethod(keyInfo, batch->encKeyUri, xmlSecHrefEncryptedKey) == NULL) {
+                xmlFreeNode(encData);
+                rv = -1;
+                break;
+            }
+        }
+
+        handle->encKey = batch->perElementKey ? PyXmlSec_GenerateSessionKey(batch->template) : key;
+        handle->flags = XMLSEC_ENC_RETURN_REPLACED_NODE;
+        if (handle->encKey == NULL || xmlSecEncCtxXmlEncrypt(handle, encData, batch->nodes[i]->_c_node) < 0) {
+            xmlFreeNode(encData);
+            rv = -1;
+        } else {
+            batch->results[i] = encData;
+        }
+        if (handle->encKey == key) handle->encKey = NULL;
+        batch->replaced[i] = handle->replacedNodeList;
+        handle->replacedNodeList = NULL;
+        if (rv != 0) break;
+        xmlSecEncCtxReset(handle);
+    }
+    handle->encKey = key;
+    return rv;
+}
+
+static const char PyXmlSec_EncryptionContextEncryptElements__doc__[] = \
+    "encrypt_elements(template, nodes, encrypted_key=None, per_element_key=False) -> list\n"
+    "Encrypts every node of ``nodes`` using a copy of ``template``, like :meth:`encrypt_xml` does, "
+    "the GIL is released for the whole batch. ``template`` is left unchanged.\n\n"
+    "All nodes are encrypted with the same session key: :attr:`key`, or the key which is generated according "
+    "to :xml:`<enc:EncryptionMethod/>` of ``template`` and is set to :attr:`key`. "
+    "If ``encrypted_key`` is given, the session key is encrypted to it once, by the key which is found in the keys manager, "
+    "and every :xml:`<enc:EncryptedData/>` refers to it by :xml:`<dsig:RetrievalMethod/>`. "
+    "If ``per_element_key`` is set, a new session key is generated for every node instead, "
+    "and :xml:`<dsig:KeyInfo/>` of ``template`` is processed for every node.\n\n"
+    ".. note:: The ``\"Id\"`` attribute of ``encrypted_key`` has to be registered as the ID "
+    "(see :func:`xmlsec.tree.add_ids`) to decrypt the result.\n"
+    "   If the encryption of a node fails, the nodes which have been encrypted before stay encrypted.\n\n"
+    ":param template: the pointer to :xml:`<enc:EncryptedData/>` template node\n"
+    ":type template: :class:`lxml.etree._Element`\n"
+    ":param nodes: the nodes for encryption\n"
+    ":type nodes: :class:`list` of :class:`lxml.etree._Element`\n"
+    ":param encrypted_key: the :xml:`<enc:EncryptedKey/>` template node with the ``\"Id\"`` attribute (optional)\n"
+    ":type encrypted_key: :class:`lxml.etree._Element`\n"
+    ":param per_element_key: generate a session key for every node (optional)\n"
+    ":type per_element_key: :class:`bool`\n"
+    ":return: the newly created :xml:`<enc:EncryptedData/>` node for every node\n"
+    ":rtype: :class:`list` of :class:`lxml.etree._Element`";
+static PyObject* PyXmlSec_EncryptionContextEncryptElements(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "template", "nodes", "encrypted_key", "per_element_key", NULL};
+
+    PyXmlSec_EncryptionContext* ctx = (PyXmlSec_EncryptionContext*)self;
+    PyXmlSec_LxmlElementPtr template = NULL;
+    PyXmlSec_LxmlElementPtr enc_key = NULL;
+    PyObject* nodes = NULL;
+    PyObject* seq = NULL;
+    PyObject* result = NULL;
+    PyObject* tmp;
+    PyXmlSec_EncryptBatch batch = { NULL, NULL, NULL, 0, NULL, NULL, NULL, 0 };
+    xmlChar* tmpType = NULL;
+    xmlChar* id = NULL;
+    xmlChar* uri = NULL;
+    Py_ssize_t i;
+    int rv = 0;
+
+    PYXMLSEC_DEBUGF("%p: encrypt_elements - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&O|O&p:encrypt_elements", kwlist,
+        PyXmlSec_LxmlElementConverter, &template, &nodes, PyXmlSec_LxmlElementConverter, &enc_key, &batch.perElementKey))
+    {
+        goto ON_FAIL;
+    }
+    tmpType = xmlGetProp(template->_c_node, XSTR("Type"));
+    if (tmpType == NULL || !(xmlStrEqual(tmpType, xmlSecTypeEncElement) || xmlStrEqual(tmpType, xmlSecTypeEncContent))) {
+        PyErr_SetString(PyXmlSec_Error, "unsupported `Type`, it should be `element` or `content`");
+        goto ON_FAIL;
+    }
+    if ((seq = PySequence_Fast(nodes, "nodes must be a sequence of elements.")) == NULL) {
+        goto ON_FAIL;
+    }
+    // a private tuple holds references to the nodes until the end of processing, the list of the caller may be
+    // changed by another thread while the GIL is released
+    Py_SETREF(seq, PySequence_Tuple(seq));
+    if (seq == NULL) goto ON_FAIL;
+    batch.count = PyTuple_GET_SIZE(seq);
+    batch.template = template->_c_node;
+    batch.nodes = (PyXmlSec_LxmlElementPtr*)PyMem_Calloc((size_t)batch.count + 1, sizeof(PyXmlSec_LxmlElementPtr));
+    batch.results = (xmlNodePtr*)PyMem_Calloc((size_t)batch.count + 1, sizeof(xmlNodePtr));
+    batch.replaced = (xmlNodePtr*)PyMem_Calloc((size_t)batch.count + 1, sizeof(xmlNodePtr));
+    if (batch.nodes == NULL || batch.results == NULL || batch.replaced == NULL) {
+        PyErr_NoMemory();
+        goto ON_FAIL;
+    }
+    for (i = 0; i < batch.count; ++i) {
+        if (!PyXmlSec_LxmlElementConverter(PyTuple_GET_ITEM(seq, i), &batch.nodes[i])) goto ON_FAIL;
+    }
+
+    if (enc_key != NULL) {
+        if (batch.perElementKey) {
+            PyErr_SetString(PyExc_ValueError, "per_element_key cannot be used with encrypted_key.");
+            goto ON_FAIL;
+        }
+        if ((id = xmlGetProp(enc_key->_c_node, xmlSecAttrId)) == NULL) {
+            PyErr_SetString(PyExc_ValueError, "encrypted_key must have the Id attribute.");
+            goto ON_FAIL;
+        }
+        if ((uri = xmlStrncatNew(BAD_CAST "#", id, -1)) == NULL) {
+            PyErr_NoMemory();
+            goto ON_FAIL;
+        }
+        batch.encKey = enc_key->_c_node;
+        batch.encKeyUri = uri;
+    }
+    if (batch.perElementKey) {
+        if (ctx->handle->encKey != NULL) {
+            PyErr_SetString(PyExc_ValueError, "per_element_key cannot be used with the key of the context.");
+            goto ON_FAIL;
+        }
+    } else if (batch.count > 0) {
+        if (ctx->handle->encKey == NULL && (ctx->handle->encKey = PyXmlSec_GenerateSessionKey(template->_c_node)) == NULL) {
+            PyXmlSec_SetLastError("cannot generate the session key");
+            goto ON_FAIL;
+        }
+        if (enc_key != NULL && ((xmlSecKeyGetType(ctx->handle->encKey) & xmlSecKeyDataTypeSymmetric) == 0 ||
+            xmlSecKeyDataBinaryValueGetBuffer(xmlSecKeyGetValue(ctx->handle->encKey)) == NULL))
+        {
+            PyErr_SetString(PyXmlSec_Error, "the session key must be symmetric.");
+            goto ON_FAIL;
+        }
+    }
+
+    if (batch.count > 0) {
+        Py_BEGIN_ALLOW_THREADS;
+        rv = PyXmlSec_EncryptElements(ctx->handle, &batch);
+        PYXMLSEC_DUMP(xmlSecEncCtxDebugDump, ctx->handle);
+        Py_END_ALLOW_THREADS;
+    }
+
+    for (i = 0; i < batch.count; ++i) {
+        PyXmlSec_ClearNodeList(batch.replaced[i], batch.nodes[i]->_doc);
+    }
+    if (PyErr_Occurred()) {
+        goto ON_FAIL;
+    }
+    if (rv != 0) {
+        if (rv == 1) {
+            PyErr_SetString(PyXmlSec_InternalError, "could not copy template tree");
+        } else if (rv == 2) {
+            PyXmlSec_SetLastError("failed to encrypt the session key");
+        } else {
+            PyXmlSec_SetLastError("failed to encrypt xml");
+        }
+        goto ON_FAIL;
+    }
+
+    if ((result = PyList_New(batch.count)) == NULL) goto ON_FAIL;
+    for (i = 0; i < batch.count; ++i) {
+        if ((tmp = (PyObject*)PyXmlSec_elementFactory(batch.nodes[i]->_doc, batch.results[i])) == NULL) goto ON_FAIL;
+        PyList_SET_ITEM(result, i, tmp);
+    }
+    PYXMLSEC_DEBUGF("%p: encrypt_elements - ok", self);
+    goto ON_EXIT;
+
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: encrypt_elements - fail", self);
+    Py_CLEAR(result);
+ON_EXIT:
+    PyMem_Free(batch.nodes);
+    PyMem_Free(batch.results);
+    PyMem_Free(batch.replaced);
+    xmlFree(tmpType);
+    xmlFree(id);
+    xmlFree(uri);
+    Py_XDECREF(seq);
+    return result;
+}
+
+// the state of decrypt_to, which is pointed by the userData of the transform context
+typedef struct {
+    xmlSecEncCtxPtr handle;
+    PyXmlSec_StreamSink* sink;
+} PyXmlSec_DecryptStream;
+
+// checks that the data decrypted by the transform is not authenticated until the final push
+static int PyXmlSec_IsAeadTransform(xmlSecTransformPtr transform) {
+#if XMLSEC_VERSION_HEX > 0x1021B
+    // from version 1.2.28
+    return xmlSecTransformCheckId(transform, xmlSecTransformAes128GcmId)
+        || xmlSecTransformCheckId(transform, xmlSecTransformAes192GcmId)
+        || xmlSecTransformCheckId(transform, xmlSecTransformAes256GcmId);
+#else
+    return 0;
+#endif
+}
+
+// the callback is called when the transforms chain is prepared
+static int PyXmlSec_DecryptStreamPreExecute(xmlSecTransformCtxPtr transformCtx) {
+    xmlSecEncCtxPtr encCtx = (xmlSecEncCtxPtr)((char*)transformCtx - offsetof(xmlSecEncCtx, transformCtx));
+    PyXmlSec_DecryptStream* stream = (PyXmlSec_DecryptStream*)transformCtx->userData;
+
+    // the nested contexts, which decrypt <enc:EncryptedKey/>, inherit the callback
+    if (stream == NULL || stream->handle != encCtx) return 0;
+    // the plain text of AES-GCM is not written until the tag is checked
+    stream->sink->hold = encCtx->encMethod != NULL && PyXmlSec_IsAeadTransform(encCtx->encMethod);
+    return PyXmlSec_StreamSinkInsert(transformCtx, stream->sink);
+}
+
+static const char PyXmlSec_EncryptionContextDecryptTo__doc__[] = \
+    "decrypt_to(node, writable, block_size=65536)\n"
+    "Decrypts ``node`` (an ``EncryptedData`` or ``EncryptedKey`` element) and writes the decrypted data "
+    "to ``writable`` by blocks of ``block_size`` bytes, the GIL is released between the writes. "
+    "Unlike :meth:`decrypt`, the tree is not modified and the whole decrypted data is not kept in memory, "
+    "except the data decrypted by AES-GCM, which is written only after its authentication tag is checked.\n\n"
+    ".. warning:: The other algorithms, e.g. AES-CBC, don't authenticate the data, and their padding is checked "
+    "after the last block. Some blocks may be written before the failure, so the contents of ``writable`` "
+    "must be discarded if the call raises.\n\n"
+    ":param node: the pointer to :xml:`<enc:EncryptedData/>` or :xml:`<enc:EncryptedKey/>` node\n"
+    ":type node: :class:`lxml.etree._Element`\n"
+    ":param writable: the binary file object, or any object with the ``write`` method, or the file descriptor\n"
+    ":type writable: :class:`~typing.BinaryIO` or :class:`int`\n"
+    ":param block_size: the size of the written blocks\n"
+    ":type block_size: :class:`int`\n"
+    ":return: the number of the written bytes\n"
+    ":rtype: :class:`int`";
+static PyObject* PyXmlSec_EncryptionContextDecryptTo(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "node", "writable", "block_size", NULL};
+
+    PyXmlSec_EncryptionContext* ctx = (PyXmlSec_EncryptionContext*)self;
+    PyXmlSec_LxmlElementPtr node = NULL;
+    PyXmlSec_StreamSink sink;
+    PyXmlSec_DecryptStream stream;
+    Py_ssize_t block_size = PYXMLSEC_STREAM_BLOCK_SIZE;
+    xmlSecBufferPtr result;
+
+    PYXMLSEC_DEBUGF("%p: decrypt_to - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&O&|n:decrypt_to", kwlist,
+        PyXmlSec_LxmlElementConverter, &node, PyXmlSec_StreamSinkConverter, &sink, &block_size))
+    {
+        goto ON_FAIL;
+    }
+    if (block_size <= 0) {
+        PyErr_SetString(PyExc_ValueError, "block_size must be positive.");
+        goto ON_FAIL;
+    }
+
+    sink.block_size = (xmlSecSize)block_size;
+    memset(&stream, 0, sizeof(stream));
+    stream.handle = ctx->handle;
+    stream.sink = &sink;
+
+    ctx->session_key_ref.cache = ctx->session_key_cache;
+    ctx->session_key_ref.serial = ctx->manager != NULL ? ctx->manager->serial : 0;
+
+    Py_BEGIN_ALLOW_THREADS;
+    ctx->handle->mode = xmlSecCheckNodeName(node->_c_node, xmlSecNodeEncryptedKey, xmlSecEncNs) ? xmlEncCtxModeEncryptedKey : xmlEncCtxModeEncryptedData;
+    ctx->handle->transformCtx.preExecCallback = PyXmlSec_DecryptStreamPreExecute;
+    ctx->handle->transformCtx.userData = &stream;
+    result = xmlSecEncCtxDecryptToBuffer(ctx->handle, node->_c_node);
+    ctx->handle->transformCtx.preExecCallback = NULL;
+    ctx->handle->transformCtx.userData = NULL;
+    PYXMLSEC_DUMP(xmlSecEncCtxDebugDump, ctx->handle);
+    Py_END_ALLOW_THREADS;
+
+    ctx->session_key_ref.cache = NULL;
+
+    if (result == NULL) {
+        if (PyXmlSec_StreamSinkCheckError(&sink)) {
+            goto ON_FAIL;
+        }
+        PyXmlSec_SetLastError("failed to decrypt");
+        goto ON_FAIL;
+    }
+
+    PYXMLSEC_DEBUGF("%p: decrypt_to - ok", self);
+    return PyLong_FromUnsignedLongLong(sink.written);
+
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: decrypt_to - fail", self);
+    return NULL;
+}
+
+// returns the first element, which follows start among the children of parent, or follows parent in the subtree of root
+static xmlNodePtr PyXmlSec_NextElementFrom(xmlNodePtr start, xmlNodePtr parent, xmlNodePtr root) {
+    xmlNodePtr next = xmlSecGetNextElementNode(start);
+
+    while (next == NULL && parent != root) {
+        next = xmlSecGetNextElementNode(parent->next);
+        parent = parent->parent;
+    }
+    return next;
+}
+
+// checks that the element is <enc:EncryptedData/>, which is decrypted to xml
+static int PyXmlSec_IsEncryptedXml(xmlNodePtr node) {
+    xmlChar* type;
+    int rv;
+
+    if (!xmlSecCheckNodeName(node, xmlSecNodeEncryptedData, xmlSecEncNs)) return 0;
+    type = xmlGetProp(node, xmlSecAttrType);
+    rv = type != NULL && (xmlStrEqual(type, xmlSecTypeEncElement) || xmlStrEqual(type, xmlSecTypeEncContent));
+    xmlFree(type);
+    return rv;
+}
+
+// decrypts every <enc:EncryptedData/>, which is decrypted to xml, in the subtree of root except root itself.
+// the replaced nodes are appended to the replaced list, returns the number of the decrypted elements or -1.
+static Py_ssize_t PyXmlSec_DecryptAll(xmlSecEncCtxPtr handle, xmlNodePtr root, xmlNodePtr* replaced) {
+    xmlSecKeyPtr key = handle->encKey;  // the key, which is set by the user, is kept for all elements
+    xmlNodePtr cur = PyXmlSec_NextElementFrom(root->children, root, root);
+    xmlNodePtr prev;
+    xmlNodePtr parent;
+    xmlNodePtr last;
+    Py_ssize_t count = 0;
+    int rv = 0;
+
+    handle->encKey = NULL;
+    xmlSecEncCtxReset(handle);
+    while (cur != NULL) {
+        if (!xmlSecCheckNodeName(cur, xmlSecNodeEncryptedData, xmlSecEncNs)) {
+            cur = PyXmlSec_NextElementFrom(cur->children, cur, root);
+            continue;
+        }
+        if (!PyXmlSec_IsEncryptedXml(cur)) {
+            // the binary data has no place in the tree
+            cur = PyXmlSec_NextElementFrom(cur->next, cur->parent, root);
+            continue;
+        }
+
+        prev = cur->prev;
+        parent = cur->parent;
+        handle->encKey = key;
+        handle->flags = XMLSEC_ENC_RETURN_REPLACED_NODE;
+        handle->mode = xmlEncCtxModeEncryptedData;
+        rv = xmlSecEncCtxDecrypt(handle, cur);
+        if (handle->encKey == key) handle->encKey = NULL;
+        if (handle->replacedNodeList != NULL) {
+            for (last = handle->replacedNodeList; last->next != NULL; last = last->next);
+            last->next = *replaced;
+            *replaced = handle->replacedNodeList;
+            handle->replacedNodeList = NULL;
+        }
+        if (rv < 0) break;
+        xmlSecEncCtxReset(handle);
+        ++count;
+        // the decrypted content may have <enc:EncryptedData/> as well
+        cur = PyXmlSec_NextElementFrom(prev != NULL ? prev->next : parent->children, parent, root);
+    }
+    handle->encKey = key;
+    return rv < 0 ? -1 : count;
+}
+
+static const char PyXmlSec_EncryptionContextDecryptAll__doc__[] = \
+    "decrypt_all(root) -> int\n"
+    "Decrypts every :xml:`<enc:EncryptedData/>` under ``root``, whose ``Type`` is "
+    "``http://www.w3.org/2001/04/xmlenc#Element`` or ``http://www.w3.org/2001/04/xmlenc#Content``, in place, "
+    "including the ones which appear in the decrypted content. The elements with binary data are left as is. "
+    "The GIL is released for the whole operation and the state of the context is reset between the elements.\n\n"
+    ".. note:: If the decryption of an element fails, the elements which have been decrypted before stay decrypted.\n\n"
+    ":param root: the root of the subtree, it is not decrypted itself\n"
+    ":type root: :class:`lxml.etree._Element`\n"
+    ":return: the number of the decrypted elements\n"
+    ":rtype: :class:`int`";
+static PyObject* PyXmlSec_EncryptionContextDecryptAll(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "root", NULL};
+
+    PyXmlSec_EncryptionContext* ctx = (PyXmlSec_EncryptionContext*)self;
+    PyXmlSec_LxmlElementPtr root = NULL;
+    xmlNodePtr replaced = NULL;
+    Py_ssize_t count;
+
+    PYXMLSEC_DEBUGF("%p: decrypt_all - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&:decrypt_all", kwlist, PyXmlSec_LxmlElementConverter, &root)) {
+        goto ON_FAIL;
+    }
+
+    ctx->session_key_ref.cache = ctx->session_key_cache;
+    ctx->session_key_ref.serial = ctx->manager != NULL ? ctx->manager->serial : 0;
+
+    Py_BEGIN_ALLOW_THREADS;
+    count = PyXmlSec_DecryptAll(ctx->handle, root->_c_node, &replaced);
+    Py_END_ALLOW_THREADS;
+
+    ctx->session_key_ref.cache = NULL;
+
+    PyXmlSec_ClearNodeList(replaced, root->_doc);
+
+    if (count < 0) {
+        PyXmlSec_SetLastError("failed to decrypt");
+        goto ON_FAIL;
+    }
+    PYXMLSEC_DEBUGF("%p: decrypt_all - ok, %zd elements", self, count);
+    return PyLong_FromSsize_t(count);
+
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: decrypt_all - fail", self);
+    return NULL;
+}
+
+static const char PyXmlSec_EncryptionContextSessionKeyCache__doc__[] = \
+    "The :class:`~xmlsec.SessionKeyCache` which :meth:`decrypt` consults and updates, :data:`None` if not set.\n";
+static PyObject* PyXmlSec_EncryptionContextSessionKeyCacheGet(PyObject* self, void* closure) {
+    PyXmlSec_EncryptionContext* ctx = (PyXmlSec_EncryptionContext*)self;
+    if (ctx->session_key_cache == NULL) {
+        Py_RETURN_NONE;
+    }
+    Py_INCREF(ctx->session_key_cache);
+    return (PyObject*)ctx->session_key_cache;
+}
+
+static int PyXmlSec_EncryptionContextSessionKeyCacheSet(PyObject* self, PyObject* value, void* closure) {
+    PyXmlSec_EncryptionContext* ctx = (PyXmlSec_EncryptionContext*)self;
+
+    if (value == NULL || value == Py_None) {
+        Py_CLEAR(ctx->session_key_cache);
+        return 0;
+    }
+    if (!PyObject_IsInstance(value, (PyObject*)PyXmlSec_SessionKeyCacheType)) {
+        PyErr_SetString(PyExc_TypeError, "instance of *xmlsec.SessionKeyCache* expected.");
+        return -1;
+    }
+    if (ctx->handle == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "EncryptionContext is not initialized.");
+        return -1;
+    }
+    if (PyXmlSec_SessionKeyCacheEnable(&(ctx->handle->keyInfoReadCtx)) < 0) {
+        PyXmlSec_SetLastError("cannot enable the session key cache");
+        return -1;
+    }
+    Py_INCREF(value);
+    Py_XSETREF(ctx->session_key_cache, (PyXmlSec_SessionKeyCache*)value);
+    return 0;
+}
+
 static PyGetSetDef PyXmlSec_EncryptionContextGetSet[] = {
     {
         "key",
@@ -457,6 +1293,13 @@ static PyGetSetDef PyXmlSec_EncryptionContextGetSet[] = {
         (char*)PyXmlSec_EncryptionContextKey__doc__,
         NULL
     },
+    {
+        "session_key_cache",
+        (getter)PyXmlSec_EncryptionContextSessionKeyCacheGet,
+        (setter)PyXmlSec_EncryptionContextSessionKeyCacheSet,
+        (char*)PyXmlSec_EncryptionContextSessionKeyCache__doc__,
+        NULL
+    },
     {NULL} /* Sentinel */
 };
 
@@ -485,12 +1328,42 @@ static PyMethodDef PyXmlSec_EncryptionContextMethods[] = {
         METH_VARARGS|METH_KEYWORDS,
         PyXmlSec_EncryptionContextEncryptUri__doc__
     },
+    {
+        "encrypt_stream",
+        (PyCFunction)PyXmlSec_EncryptionContextEncryptStream,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_EncryptionContextEncryptStream__doc__
+    },
+    {
+        "encrypt_for_recipients",
+        (PyCFunction)PyXmlSec_EncryptionContextEncryptForRecipients,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_EncryptionContextEncryptForRecipients__doc__
+    },
+    {
+        "encrypt_elements",
+        (PyCFunction)PyXmlSec_EncryptionContextEncryptElements,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_EncryptionContextEncryptElements__doc__
+    },
     {
         "decrypt",
         (PyCFunction)PyXmlSec_EncryptionContextDecrypt,
         METH_VARARGS|METH_KEYWORDS,
         PyXmlSec_EncryptionContextDecrypt__doc__
     },
+    {
+        "decrypt_to",
+        (PyCFunction)PyXmlSec_EncryptionContextDecryptTo,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_EncryptionContextDecryptTo__doc__
+    },
+    {
+        "decrypt_all",
+        (PyCFunction)PyXmlSec_EncryptionContextDecryptAll,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_EncryptionContextDecryptAll__doc__
+    },
     {NULL, NULL} /* sentinel */
 };
 
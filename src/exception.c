@@ -175,6 +175,17 @@ void PyXmlSec_ClearError(void) {
     PyXmlSec_ErrorHolderFree(PyXmlSec_ExchangeLastError(NULL));
 }
 
+int PyXmlSec_PopLastErrorCode(void) {
+    PyXmlSec_ErrorHolder* h = PyXmlSec_ExchangeLastError(NULL);
+    int reason = 0;
+
+    if (h != NULL) {
+        reason = h->reason;
+        PyXmlSec_ErrorHolderFree(h);
+    }
+    return reason;
+}
+
 void PyXmlSecEnableDebugTrace(int v) {
     PyXmlSec_PrintErrorMessage = v;
 }
@@ -22,6 +22,10 @@ void PyXmlSec_SetLastError2(PyObject* type, const char* msg);
 
 void PyXmlSec_ClearError(void);
 
+// pops the last error which was occurred in current thread and returns its code, 0 if there is no error.
+// the gil is not required
+int PyXmlSec_PopLastErrorCode(void);
+
 void PyXmlSecEnableDebugTrace(int);
 
 void PyXmlSec_InstallErrorCallback();
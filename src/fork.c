@@ -0,0 +1,152 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+
+#include "common.h"
+#include "platform.h"
+#include "exception.h"
+#include "fork.h"
+#include "keys.h"
+
+#include <xmlsec/transforms.h>
+
+static unsigned long PyXmlSec_Forks = 0;
+static PyObject* PyXmlSec_ForkLocked = NULL;  // the managers, which are locked while forking
+
+unsigned long PyXmlSec_ForkGeneration(void) {
+    return PyXmlSec_Forks;
+}
+
+static PyObject* PyXmlSec_BeforeFork(PyObject* self, PyObject* args) {
+    Py_XSETREF(PyXmlSec_ForkLocked, PyXmlSec_KeysManagersBeforeFork());
+    if (PyXmlSec_ForkLocked == NULL) return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject* PyXmlSec_AfterForkInParent(PyObject* self, PyObject* args) {
+    PyXmlSec_KeysManagersAfterFork(PyXmlSec_ForkLocked, 0);
+    Py_CLEAR(PyXmlSec_ForkLocked);
+    Py_RETURN_NONE;
+}
+
+static PyObject* PyXmlSec_AfterForkInChild(PyObject* self, PyObject* args) {
+    PyXmlSec_Forks++;
+    PyXmlSec_KeysManagersAfterFork(PyXmlSec_ForkLocked, 1);
+    Py_CLEAR(PyXmlSec_ForkLocked);
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef PyXmlSec_BeforeForkDef = {"_before_fork", PyXmlSec_BeforeFork, METH_NOARGS, NULL};
+static PyMethodDef PyXmlSec_AfterForkInParentDef = {"_after_fork_in_parent", PyXmlSec_AfterForkInParent, METH_NOARGS, NULL};
+static PyMethodDef PyXmlSec_AfterForkInChildDef = {"_after_fork_in_child", PyXmlSec_AfterForkInChild, METH_NOARGS, NULL};
+
+// runs every digest algorithm, so the crypto library initializes it. the gil is not required.
+static void PyXmlSec_PreloadDigests(void) {
+    xmlSecPtrListPtr ids = xmlSecTransformIdsGet();
+    xmlSecTransformCtxPtr transformCtx;
+    xmlSecTransformPtr transform;
+    xmlSecTransformId id;
+    xmlSecSize i;
+
+    for (i = 0; i < xmlSecPtrListGetSize(ids); ++i) {
+        id = (xmlSecTransformId)xmlSecPtrListGetItem(ids, i);
+        if (id == NULL || (id->usage & xmlSecTransformUsageDigestMethod) == 0) continue;
+        if ((transformCtx = xmlSecTransformCtxCreate()) == NULL) continue;
+        if ((transform = xmlSecTransformCtxCreateAndAppend(transformCtx, id)) != NULL) {
+            transform->operation = xmlSecTransformOperationSign;
+            xmlSecTransformCtxBinaryExecute(transformCtx, (const xmlSecByte*)"", 0);
+        }
+        xmlSecTransformCtxDestroy(transformCtx);
+    }
+}
+
+static const char PyXmlSec_Preload__doc__[] = \
+    "preload(*managers) -> None\n"
+    "Prepares the parent process of the forked workers, which share the prepared state with it copy-on-write.\n\n"
+    "Runs every digest algorithm once, so the crypto library initializes them in the parent "
+    "instead of the first operation of every worker. The keys ``managers`` are built in the parent and "
+    "must not be shared by running operations, since the threads, which run them, are not forked.\n\n"
+    "The state of :mod:`xmlsec` is safe to fork in any case: the keys managers are locked while forking and "
+    "are no longer used by the operations of the parent in the child, while the :class:`~xmlsec.aio.Executor` "
+    "and :class:`~xmlsec.parallel.ProcessVerifier` objects of the parent cannot be used in the child.\n\n"
+    ":param managers: the keys managers, which are shared with the workers\n"
+    ":type managers: :class:`~xmlsec.KeysManager`";
+static PyObject* PyXmlSec_Preload(PyObject* self, PyObject* args) {
+    PyObject* mgr;
+    Py_ssize_t i;
+
+    PYXMLSEC_DEBUG("preload - start");
+    for (i = 0; i < PyTuple_GET_SIZE(args); ++i) {
+        mgr = PyTuple_GET_ITEM(args, i);
+        if (!PyObject_IsInstance(mgr, (PyObject*)PyXmlSec_KeysManagerType)) {
+            PyErr_SetString(PyExc_TypeError, "managers must be keys managers.");
+            goto ON_FAIL;
+        }
+        if (((PyXmlSec_KeysManager*)mgr)->busy > 0) {
+            PyErr_SetString(PyXmlSec_Error, "KeysManager is shared by running operations, which are not forked.");
+            goto ON_FAIL;
+        }
+    }
+
+    Py_BEGIN_ALLOW_THREADS;
+    PyXmlSec_PreloadDigests();
+    Py_END_ALLOW_THREADS;
+    // the unsupported algorithms are skipped
+    PyXmlSec_ClearError();
+
+    PYXMLSEC_DEBUG("preload - ok");
+    Py_RETURN_NONE;
+ON_FAIL:
+    PYXMLSEC_DEBUG("preload - fail");
+    return NULL;
+}
+
+static PyMethodDef PyXmlSec_ForkMethods[] = {
+    {
+        "preload",
+        PyXmlSec_Preload,
+        METH_VARARGS,
+        PyXmlSec_Preload__doc__
+    },
+    {NULL, NULL} /* sentinel */
+};
+
+int PyXmlSec_ForkModule_Init(PyObject* package) {
+    PyObject* os = NULL;
+    PyObject* register_at_fork = NULL;
+    PyObject* hooks = NULL;
+    PyObject* args = NULL;
+    PyObject* tmp = NULL;
+    int rv = -1;
+
+    if (PyModule_AddFunctions(package, PyXmlSec_ForkMethods) < 0) goto ON_EXIT;
+
+    // os.register_at_fork is not available on the platforms without fork
+    if ((os = PyImport_ImportModule("os")) == NULL) goto ON_EXIT;
+    if ((register_at_fork = PyObject_GetAttrString(os, "register_at_fork")) == NULL) {
+        if (!PyErr_ExceptionMatches(PyExc_AttributeError)) goto ON_EXIT;
+        PyErr_Clear();
+        rv = 0;
+        goto ON_EXIT;
+    }
+    hooks = Py_BuildValue("{sNsNsN}",
+        "before", PyCFunction_New(&PyXmlSec_BeforeForkDef, NULL),
+        "after_in_parent", PyCFunction_New(&PyXmlSec_AfterForkInParentDef, NULL),
+        "after_in_child", PyCFunction_New(&PyXmlSec_AfterForkInChildDef, NULL));
+    if (hooks == NULL || (args = PyTuple_New(0)) == NULL) goto ON_EXIT;
+    if ((tmp = PyObject_Call(register_at_fork, args, hooks)) == NULL) goto ON_EXIT;
+    rv = 0;
+ON_EXIT:
+    Py_XDECREF(tmp);
+    Py_XDECREF(args);
+    Py_XDECREF(hooks);
+    Py_XDECREF(register_at_fork);
+    Py_XDECREF(os);
+    return rv;
+}
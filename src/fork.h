@@ -0,0 +1,20 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+
+#ifndef __PYXMLSEC_FORK_H__
+#define __PYXMLSEC_FORK_H__
+
+#include "platform.h"
+
+// returns the number of forks, which the process descends from. the objects, which cannot be used
+// in the child process, remember it when they are created. the gil is required.
+unsigned long PyXmlSec_ForkGeneration(void);
+
+#endif //__PYXMLSEC_FORK_H__
@@ -0,0 +1,511 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+#include "common.h"
+#include "platform.h"
+#include "keys.h"
+#include "utils.h"
+
+typedef struct {
+    PyObject_HEAD
+    // (source, stamp, format, password digest, certs) -> the master key in LRU order,
+    // where certs is the tuple of (source, stamp, format) of each certificate
+    PyObject* entries;
+    // the random key of the password digests, so they are not comparable with the digests outside of the cache
+    PyObject* secret_key;
+    Py_ssize_t maxsize;
+    Py_ssize_t hits;
+    Py_ssize_t misses;
+} PyXmlSec_KeyCache;
+
+// returns the SHA-256 digest of data as bytes
+static PyObject* PyXmlSec_KeyCacheDigest(const char* data, Py_ssize_t size) {
+    PyObject* hashlib = PyImport_ImportModule("hashlib");
+    PyObject* hash;
+    PyObject* digest;
+
+    if (hashlib == NULL) return NULL;
+    hash = PyObject_CallMethod(hashlib, "sha256", "y#", data, size);
+    Py_DECREF(hashlib);
+    if (hash == NULL) return NULL;
+    digest = PyObject_CallMethod(hash, "digest", NULL);
+    Py_DECREF(hash);
+    return digest;
+}
+
+// returns the HMAC-SHA-256 digest of the password with the key of the cache as bytes
+static PyObject* PyXmlSec_KeyCachePasswordDigest(PyXmlSec_KeyCache* cache, const char* password) {
+    PyObject* hmac = PyImport_ImportModule("hmac");
+    PyObject* digest;
+
+    if (hmac == NULL) return NULL;
+    digest = PyObject_CallMethod(hmac, "digest", "Oy#s", cache->secret_key, password, (Py_ssize_t)strlen(password), "sha256");
+    Py_DECREF(hmac);
+    return digest;
+}
+
+// identifies the file by its real path or by the digest of the content of the file object.
+// the content is returned in *content, the stamp of the file in *stamp if stamp is not NULL.
+static PyObject* PyXmlSec_KeyCacheSource(PyObject* file, PyObject** content, PyObject** stamp) {
+    PyObject* os = NULL;
+    PyObject* data;
+    PyObject* source = NULL;
+    PyObject* st = NULL;
+    PyObject* mtime = NULL;
+    PyObject* size = NULL;
+    int is_content = 0;
+
+    *content = NULL;
+    if ((data = PyXmlSec_GetFilePathOrContent(file, &is_content)) == NULL) return NULL;
+    if (is_content) {
+        if (!PyBytes_Check(data)) {
+            PyErr_SetString(PyExc_TypeError, "the file must be opened in binary or text mode.");
+            goto ON_FAIL;
+        }
+        source = PyXmlSec_KeyCacheDigest(PyBytes_AS_STRING(data), PyBytes_GET_SIZE(data));
+        if (source == NULL) goto ON_FAIL;
+        if (stamp != NULL) {
+            Py_INCREF(Py_None);
+            *stamp = Py_None;
+        }
+        *content = data;
+        return source;
+    }
+
+    // the file is replaced when the link is switched to the new one
+    if ((os = PyImport_ImportModule("os.path")) == NULL) goto ON_FAIL;
+    source = PyObject_CallMethod(os, "realpath", "O", data);
+    Py_CLEAR(os);
+    if (source == NULL) goto ON_FAIL;
+    if (stamp != NULL) {
+        if ((os = PyImport_ImportModule("os")) == NULL) goto ON_FAIL;
+        if ((st = PyObject_CallMethod(os, "stat", "O", source)) == NULL) goto ON_FAIL;
+        if ((mtime = PyObject_GetAttrString(st, "st_mtime_ns")) == NULL) goto ON_FAIL;
+        if ((size = PyObject_GetAttrString(st, "st_size")) == NULL) goto ON_FAIL;
+        if ((*stamp = PyTuple_Pack(2, mtime, size)) == NULL) goto ON_FAIL;
+    }
+    Py_XDECREF(size);
+    Py_XDECREF(mtime);
+    Py_XDECREF(st);
+    Py_XDECREF(os);
+    Py_DECREF(data);
+    return source;
+ON_FAIL:
+    Py_XDECREF(size);
+    Py_XDECREF(mtime);
+    Py_XDECREF(st);
+    Py_XDECREF(os);
+    Py_XDECREF(source);
+    Py_DECREF(data);
+    return NULL;
+}
+
+// drops the entries, which use source with other stamp, or any stamp if stamp is NULL; returns the number of them
+static Py_ssize_t PyXmlSec_KeyCacheDrop(PyXmlSec_KeyCache* cache, PyObject* source, PyObject* stamp) {
+    PyObject* stale = PyList_New(0);
+    PyObject* entry;
+    PyObject* value;
+    PyObject* certs;
+    PyObject* item;
+    Py_ssize_t pos = 0;
+    Py_ssize_t i;
+    Py_ssize_t count;
+    int found;
+    int rv;
+
+    if (stale == NULL) return -1;
+    while (PyDict_Next(cache->entries, &pos, &entry, &value)) {
+        certs = PyTuple_GET_ITEM(entry, 4);
+        found = 0;
+        for (i = -1; i < PyTuple_GET_SIZE(certs) && !found; ++i) {
+            // the first item is the key itself
+            item = (i < 0) ? entry : PyTuple_GET_ITEM(certs, i);
+            if ((rv = PyObject_RichCompareBool(PyTuple_GET_ITEM(item, 0), source, Py_EQ)) < 0) goto ON_FAIL;
+            if (rv && stamp != NULL) {
+                if ((rv = PyObject_RichCompareBool(PyTuple_GET_ITEM(item, 1), stamp, Py_NE)) < 0) goto ON_FAIL;
+            }
+            found = rv;
+        }
+        if (found && PyList_Append(stale, entry) < 0) goto ON_FAIL;
+    }
+    count = PyList_GET_SIZE(stale);
+    for (i = 0; i < count; ++i) {
+        if (PyDict_DelItem(cache->entries, PyList_GET_ITEM(stale, i)) < 0) goto ON_FAIL;
+    }
+    Py_DECREF(stale);
+    return count;
+ON_FAIL:
+    Py_DECREF(stale);
+    return -1;
+}
+
+static PyObject* PyXmlSec_KeyCache__new__(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
+    PyXmlSec_KeyCache* cache = (PyXmlSec_KeyCache*)PyType_GenericNew(type, args, kwargs);
+    PYXMLSEC_DEBUGF("%p: new key cache", cache);
+    if (cache != NULL) {
+        cache->entries = NULL;
+        cache->secret_key = NULL;
+        cache->maxsize = 0;
+        cache->hits = 0;
+        cache->misses = 0;
+    }
+    return (PyObject*)(cache);
+}
+
+static int PyXmlSec_KeyCache__init__(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "maxsize", NULL};
+    PyXmlSec_KeyCache* cache = (PyXmlSec_KeyCache*)self;
+    PyObject* os;
+    Py_ssize_t maxsize = 128;
+
+    PYXMLSEC_DEBUGF("%p: init key cache", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|n:__init__", kwlist, &maxsize)) {
+        goto ON_FAIL;
+    }
+    if (maxsize < 0) {
+        PyErr_SetString(PyExc_ValueError, "maxsize must not be negative.");
+        goto ON_FAIL;
+    }
+    if (cache->secret_key == NULL) {
+        if ((os = PyImport_ImportModule("os")) == NULL) goto ON_FAIL;
+        cache->secret_key = PyObject_CallMethod(os, "urandom", "i", 32);
+        Py_DECREF(os);
+        if (cache->secret_key == NULL) goto ON_FAIL;
+    }
+    if (cache->entries == NULL && (cache->entries = PyDict_New()) == NULL) goto ON_FAIL;
+    PyDict_Clear(cache->entries);
+    cache->maxsize = maxsize;
+    cache->hits = 0;
+    cache->misses = 0;
+    PYXMLSEC_DEBUGF("%p: init key cache - ok", self);
+    return 0;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: init key cache - failed", self);
+    return -1;
+}
+
+static void PyXmlSec_KeyCache__del__(PyObject* self) {
+    PYXMLSEC_DEBUGF("%p: delete key cache", self);
+    Py_XDECREF(((PyXmlSec_KeyCache*)self)->entries);
+    Py_XDECREF(((PyXmlSec_KeyCache*)self)->secret_key);
+    Py_TYPE(self)->tp_free(self);
+}
+
+static int PyXmlSec_KeyCacheCheckReady(PyXmlSec_KeyCache* cache) {
+    if (cache->entries == NULL || cache->secret_key == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "KeyCache is not initialized.");
+        return -1;
+    }
+    return 0;
+}
+
+// loads the master key, which is stored in the cache
+static PyObject* PyXmlSec_KeyCacheLoad(PyObject* source, PyObject* content, unsigned int format, const char* password,
+                                      PyObject* certs, PyObject* cert_contents) {
+    PyObject* key;
+    PyObject* tmp;
+    PyObject* cert;
+    Py_ssize_t i;
+
+    if (content != NULL) {
+        key = PyObject_CallMethod((PyObject*)PyXmlSec_KeyType, "from_memory", "OIz", content, format, password);
+    } else {
+        key = PyObject_CallMethod((PyObject*)PyXmlSec_KeyType, "from_file", "OIz", source, format, password);
+    }
+    if (key == NULL) return NULL;
+    for (i = 0; i < PyTuple_GET_SIZE(certs); ++i) {
+        cert = PyTuple_GET_ITEM(certs, i);
+        if (PyTuple_GET_ITEM(cert_contents, i) != Py_None) {
+            tmp = PyObject_CallMethod(key, "load_cert_from_memory", "OO", PyTuple_GET_ITEM(cert_contents, i), PyTuple_GET_ITEM(cert, 2));
+        } else {
+            tmp = PyObject_CallMethod(key, "load_cert_from_file", "OO", PyTuple_GET_ITEM(cert, 0), PyTuple_GET_ITEM(cert, 2));
+        }
+        if (tmp == NULL) {
+            Py_DECREF(key);
+            return NULL;
+        }
+        Py_DECREF(tmp);
+    }
+    return key;
+}
+
+static const char PyXmlSec_KeyCacheFromFile__doc__[] = \
+    "from_file(file, format, password = None, certs = ()) -> xmlsec.Key\n"
+    "Loads PKI key from a file like :meth:`~xmlsec.Key.from_file` does and adds the certificates to it "
+    "like :meth:`~xmlsec.Key.load_cert_from_file` does. The key is loaded once and the copies of it are returned "
+    "until the file, the format, the password or the certificates change.\n\n"
+    ":param file: the file object or file path\n"
+    ":type file: :class:`str`, :class:`bytes`, any :class:`~os.PathLike`, "
+    ":class:`~typing.BinaryIO` or :class:`~typing.TextIO`\n"
+    ":param format: the key file format\n"
+    ":type format: :class:`int`\n"
+    ":param password: the key file password (optional)\n"
+    ":type password: :class:`str` or :data:`None`\n"
+    ":param certs: ``(file, format)`` of each certificate\n"
+    ":type certs: :class:`~collections.abc.Iterable` of :class:`tuple`\n"
+    ":return: the copy of the loaded key\n"
+    ":rtype: :class:`~xmlsec.Key`";
+static PyObject* PyXmlSec_KeyCacheFromFile(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "file", "format", "password", "certs", NULL};
+
+    PyXmlSec_KeyCache* cache = (PyXmlSec_KeyCache*)self;
+    PyObject* file = NULL;
+    unsigned int format = 0;
+    const char* password = NULL;
+    PyObject* certs_obj = NULL;
+    PyObject* source = NULL;
+    PyObject* stamp = NULL;
+    PyObject* content = NULL;
+    PyObject* seq = NULL;
+    PyObject* certs = NULL;
+    PyObject* cert_contents = NULL;
+    PyObject* secret = NULL;
+    PyObject* entry = NULL;
+    PyObject* master = NULL;
+    PyObject* result = NULL;
+    PyObject* cert_file;
+    PyObject* cert_format;
+    PyObject* cert_source;
+    PyObject* cert_stamp;
+    PyObject* cert_content;
+    Py_ssize_t i;
+
+    PYXMLSEC_DEBUGF("%p: key cache load - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OI|zO:from_file", kwlist, &file, &format, &password, &certs_obj)) {
+        goto ON_FAIL;
+    }
+    if (PyXmlSec_KeyCacheCheckReady(cache) < 0) goto ON_FAIL;
+    if ((source = PyXmlSec_KeyCacheSource(file, &content, &stamp)) == NULL) goto ON_FAIL;
+
+    if (certs_obj == NULL) {
+        certs = PyTuple_New(0);
+        cert_contents = PyTuple_New(0);
+    } else if ((seq = PySequence_Fast(certs_obj, "certs must be a sequence of (file, format).")) != NULL) {
+        certs = PyTuple_New(PySequence_Fast_GET_SIZE(seq));
+        cert_contents = PyTuple_New(PySequence_Fast_GET_SIZE(seq));
+    }
+    if (certs == NULL || cert_contents == NULL) goto ON_FAIL;
+    for (i = 0; i < PyTuple_GET_SIZE(certs); ++i) {
+        cert_file = PySequence_Fast_GET_ITEM(seq, i);
+        if (!PyTuple_Check(cert_file) || !PyArg_ParseTuple(cert_file, "OO!:certs", &cert_file, &PyLong_Type, &cert_format)) {
+            PyErr_SetString(PyExc_TypeError, "certs must be a sequence of (file, format).");
+            goto ON_FAIL;
+        }
+        if ((cert_source = PyXmlSec_KeyCacheSource(cert_file, &cert_content, &cert_stamp)) == NULL) goto ON_FAIL;
+        PyTuple_SET_ITEM(certs, i, Py_BuildValue("(NNO)", cert_source, cert_stamp, cert_format));
+        PyTuple_SET_ITEM(cert_contents, i, cert_content != NULL ? cert_content : (Py_INCREF(Py_None), Py_None));
+        if (PyTuple_GET_ITEM(certs, i) == NULL) goto ON_FAIL;
+    }
+    // neither the password nor its plain digest is kept
+    if (password != NULL) {
+        secret = PyXmlSec_KeyCachePasswordDigest(cache, password);
+    } else {
+        Py_INCREF(Py_None);
+        secret = Py_None;
+    }
+    if (secret == NULL) goto ON_FAIL;
+    if ((entry = Py_BuildValue("(OOIOO)", source, stamp, format, secret, certs)) == NULL) goto ON_FAIL;
+
+    if ((master = PyDict_GetItemWithError(cache->entries, entry)) != NULL) {
+        Py_INCREF(master);
+        if (PyXmlSec_LruTouch(cache->entries, entry, master) < 0) goto ON_FAIL;
+        cache->hits++;
+    } else if (PyErr_Occurred()) {
+        goto ON_FAIL;
+    } else {
+        cache->misses++;
+        if ((master = PyXmlSec_KeyCacheLoad(source, content, format, password, certs, cert_contents)) == NULL) goto ON_FAIL;
+        // the keys loaded from the older versions of the file are not used anymore
+        if (stamp != Py_None && PyXmlSec_KeyCacheDrop(cache, source, stamp) < 0) goto ON_FAIL;
+        if (PyXmlSec_LruStore(cache->entries, entry, master, cache->maxsize) < 0) goto ON_FAIL;
+    }
+    // the master key is not changed by the caller
+    result = PyObject_CallMethod(master, "__copy__", NULL);
+    PYXMLSEC_DEBUGF("%p: key cache load - ok", self);
+    goto ON_EXIT;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: key cache load - fail", self);
+ON_EXIT:
+    Py_XDECREF(master);
+    Py_XDECREF(entry);
+    Py_XDECREF(secret);
+    Py_XDECREF(cert_contents);
+    Py_XDECREF(certs);
+    Py_XDECREF(seq);
+    Py_XDECREF(content);
+    Py_XDECREF(stamp);
+    Py_XDECREF(source);
+    return result;
+}
+
+static const char PyXmlSec_KeyCacheInvalidate__doc__[] = \
+    "invalidate(file = None) -> int\n"
+    "Forgets the keys, which are loaded from ``file`` or use the certificate from ``file``, or all keys, "
+    "e.g. when a key is rotated without the change of the modification time of its file.\n\n"
+    ":param file: the file object or file path, :data:`None` means all files\n"
+    ":type file: :class:`str`, :class:`bytes`, any :class:`~os.PathLike`, "
+    ":class:`~typing.BinaryIO`, :class:`~typing.TextIO` or :data:`None`\n"
+    ":return: the number of forgotten keys\n"
+    ":rtype: :class:`int`";
+static PyObject* PyXmlSec_KeyCacheInvalidate(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "file", NULL};
+
+    PyXmlSec_KeyCache* cache = (PyXmlSec_KeyCache*)self;
+    PyObject* file = Py_None;
+    PyObject* source;
+    PyObject* content;
+    Py_ssize_t count;
+
+    PYXMLSEC_DEBUGF("%p: key cache invalidate", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|O:invalidate", kwlist, &file)) return NULL;
+    if (PyXmlSec_KeyCacheCheckReady(cache) < 0) return NULL;
+    if (file == Py_None) {
+        count = PyDict_Size(cache->entries);
+        PyDict_Clear(cache->entries);
+        return PyLong_FromSsize_t(count);
+    }
+    // the file may be removed already
+    if ((source = PyXmlSec_KeyCacheSource(file, &content, NULL)) == NULL) return NULL;
+    Py_XDECREF(content);
+    count = PyXmlSec_KeyCacheDrop(cache, source, NULL);
+    Py_DECREF(source);
+    if (count < 0) return NULL;
+    return PyLong_FromSsize_t(count);
+}
+
+static const char PyXmlSec_KeyCacheInfo__doc__[] = \
+    "info() -> tuple[int, int, int, int]\n"
+    "Returns the statistics of the cache.\n\n"
+    ":return: ``(hits, misses, maxsize, currsize)``\n"
+    ":rtype: :class:`tuple`";
+static PyObject* PyXmlSec_KeyCacheInfo(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyXmlSec_KeyCache* cache = (PyXmlSec_KeyCache*)self;
+    return Py_BuildValue("(nnnn)",
+        cache->hits,
+        cache->misses,
+        cache->maxsize,
+        cache->entries != NULL ? PyDict_Size(cache->entries) : (Py_ssize_t)0);
+}
+
+static Py_ssize_t PyXmlSec_KeyCache__len__(PyObject* self) {
+    PyXmlSec_KeyCache* cache = (PyXmlSec_KeyCache*)self;
+    return cache->entries != NULL ? PyDict_Size(cache->entries) : 0;
+}
+
+static const char PyXmlSec_KeyCacheMaxsize__doc__[] = "The maximal number of the entries.\n";
+static PyObject* PyXmlSec_KeyCacheMaxsizeGet(PyObject* self, void* closure) {
+    return PyLong_FromSsize_t(((PyXmlSec_KeyCache*)self)->maxsize);
+}
+
+static PyGetSetDef PyXmlSec_KeyCacheGetSet[] = {
+    {
+        "maxsize",
+        (getter)PyXmlSec_KeyCacheMaxsizeGet,
+        NULL,
+        (char*)PyXmlSec_KeyCacheMaxsize__doc__,
+        NULL
+    },
+    {NULL} /* Sentinel */
+};
+
+static PyMethodDef PyXmlSec_KeyCacheMethods[] = {
+    {
+        "from_file",
+        (PyCFunction)PyXmlSec_KeyCacheFromFile,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_KeyCacheFromFile__doc__
+    },
+    {
+        "invalidate",
+        (PyCFunction)PyXmlSec_KeyCacheInvalidate,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_KeyCacheInvalidate__doc__
+    },
+    {
+        "info",
+        (PyCFunction)PyXmlSec_KeyCacheInfo,
+        METH_NOARGS,
+        PyXmlSec_KeyCacheInfo__doc__
+    },
+    {NULL, NULL} /* sentinel */
+};
+
+static PySequenceMethods PyXmlSec_KeyCacheAsSequence = {
+    PyXmlSec_KeyCache__len__,                   /* sq_length */
+};
+
+static const char PyXmlSec_KeyCache__doc__[] = \
+    "KeyCache(maxsize = 128)\n"
+    "Remembers the keys loaded from files, so the files are not parsed and decrypted again "
+    "each time the same key is loaded.\n\n"
+    "A key is remembered by the real path of its file with the modification time and the size of the file, "
+    "or by the digest of the content of the file object, and by the format, the keyed digest of the password "
+    "and the certificates. The changed files are loaded again. :data:`xmlsec.key_cache` is shared by the whole process.\n\n"
+    ":param maxsize: the maximal number of keys, the least recently used ones are forgotten first\n"
+    ":type maxsize: :class:`int`";
+
+static PyTypeObject _PyXmlSec_KeyCacheType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    STRINGIFY(MODULE_NAME) ".KeyCache",         /* tp_name */
+    sizeof(PyXmlSec_KeyCache),                  /* tp_basicsize */
+    0,                                          /* tp_itemsize */
+    PyXmlSec_KeyCache__del__,                   /* tp_dealloc */
+    0,                                          /* tp_print */
+    0,                                          /* tp_getattr */
+    0,                                          /* tp_setattr */
+    0,                                          /* tp_reserved */
+    0,                                          /* tp_repr */
+    0,                                          /* tp_as_number */
+    &PyXmlSec_KeyCacheAsSequence,               /* tp_as_sequence */
+    0,                                          /* tp_as_mapping */
+    0,                                          /* tp_hash  */
+    0,                                          /* tp_call */
+    0,                                          /* tp_str */
+    0,                                          /* tp_getattro */
+    0,                                          /* tp_setattro */
+    0,                                          /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT|Py_TPFLAGS_BASETYPE,     /* tp_flags */
+    PyXmlSec_KeyCache__doc__,                   /* tp_doc */
+    0,                                          /* tp_traverse */
+    0,                                          /* tp_clear */
+    0,                                          /* tp_richcompare */
+    0,                                          /* tp_weaklistoffset */
+    0,                                          /* tp_iter */
+    0,                                          /* tp_iternext */
+    PyXmlSec_KeyCacheMethods,                   /* tp_methods */
+    0,                                          /* tp_members */
+    PyXmlSec_KeyCacheGetSet,                    /* tp_getset */
+    0,                                          /* tp_base */
+    0,                                          /* tp_dict */
+    0,                                          /* tp_descr_get */
+    0,                                          /* tp_descr_set */
+    0,                                          /* tp_dictoffset */
+    PyXmlSec_KeyCache__init__,                  /* tp_init */
+    0,                                          /* tp_alloc */
+    PyXmlSec_KeyCache__new__,                   /* tp_new */
+    0,                                          /* tp_free */
+};
+
+int PyXmlSec_KeyCacheModule_Init(PyObject* package) {
+    PyObject* cache = NULL;
+
+    if (PyType_Ready(&_PyXmlSec_KeyCacheType) < 0) goto ON_FAIL;
+
+    // since objects is created as static objects, need to increase refcount to prevent deallocate
+    Py_INCREF(&_PyXmlSec_KeyCacheType);
+    if (PyModule_AddObject(package, "KeyCache", (PyObject*)&_PyXmlSec_KeyCacheType) < 0) goto ON_FAIL;
+
+    // the cache shared by the whole process
+    if ((cache = PyObject_CallNoArgs((PyObject*)&_PyXmlSec_KeyCacheType)) == NULL) goto ON_FAIL;
+    if (PyModule_AddObject(package, "key_cache", cache) < 0) goto ON_FAIL;
+    return 0;
+ON_FAIL:
+    Py_XDECREF(cache);
+    return -1;
+}
@@ -8,13 +8,28 @@
 // SOFTWARE.
 
 #include "common.h"
+#include "cache.h"
 #include "constants.h"
 #include "exception.h"
 #include "keys.h"
+#include "keysstore.h"
 #include "utils.h"
 
 #include <xmlsec/crypto.h>
 
+// the asymmetric keys are exported and the parsed certificates are adopted by the crypto library, which is linked directly
+#if defined(XMLSEC_CRYPTO_OPENSSL) && defined(XMLSEC_NO_CRYPTO_DYNAMIC_LOADING) && !defined(XMLSEC_NO_X509)
+#define PYXMLSEC_KEY_EXPORT_OPENSSL 1
+#include <xmlsec/openssl/evp.h>
+#include <xmlsec/openssl/x509.h>
+#include <openssl/evp.h>
+#include <openssl/x509.h>
+#endif
+
+#include <errno.h>
+#include <stdio.h>
+#include <string.h>
+
 
 static PyObject* PyXmlSec_Key__new__(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
     PyXmlSec_Key* key = (PyXmlSec_Key*)PyType_GenericNew(type, args, kwargs);
@@ -71,7 +86,7 @@ static const char PyXmlSec_KeyFromMemory__doc__[] = \
     "from_memory(data, format, password = None) -> xmlsec.Key\n"
     "Loads PKI key from memory.\n\n"
     ":param data: the binary key data\n"
-    ":type data: :class:`str` or :class:`bytes`\n"
+    ":type data: :class:`str`, :class:`bytes` or any :term:`bytes-like object`\n"
     ":param format: the key file format\n"
     ":type format: :class:`int`\n"
     ":param password: the key file password (optional)\n"
@@ -81,22 +96,21 @@ static const char PyXmlSec_KeyFromMemory__doc__[] = \
 static PyObject* PyXmlSec_KeyFromMemory(PyObject* self, PyObject* args, PyObject* kwargs) {
     static char *kwlist[] = { "data", "format", "password", NULL};
 
-    const char* data = NULL;
-    Py_ssize_t data_size = 0;
+    Py_buffer data = {0};
     const char* password = NULL;
     unsigned int format = 0;
 
     PyXmlSec_Key* key = NULL;
 
     PYXMLSEC_DEBUG("load key from memory - start");
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s#I|z:from_memory", kwlist, &data, &data_size, &format, &password)) {
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s*I|z:from_memory", kwlist, &data, &format, &password)) {
         goto ON_FAIL;
     }
 
     if ((key = PyXmlSec_NewKey1((PyTypeObject*)self)) == NULL) goto ON_FAIL;
 
     Py_BEGIN_ALLOW_THREADS;
-    key->handle = xmlSecCryptoAppKeyLoadMemory((const xmlSecByte*)data, (xmlSecSize)data_size, format, password, NULL, NULL);
+    key->handle = xmlSecCryptoAppKeyLoadMemory((const xmlSecByte*)data.buf, (xmlSecSize)data.len, format, password, NULL, NULL);
     Py_END_ALLOW_THREADS;
 
     if (key->handle == NULL) {
@@ -105,6 +119,7 @@ static PyObject* PyXmlSec_KeyFromMemory(PyObject* self, PyObject* args, PyObject
     }
 
     key->is_own = 1;
+    PyBuffer_Release(&data);
 
     PYXMLSEC_DEBUG("load key from memory - ok");
 
@@ -112,6 +127,7 @@ static PyObject* PyXmlSec_KeyFromMemory(PyObject* self, PyObject* args, PyObject
 
 ON_FAIL:
     PYXMLSEC_DEBUG("load key from memory - fail");
+    PyBuffer_Release(&data);
     Py_XDECREF(key);
     return NULL;
 }
@@ -336,21 +352,20 @@ static const char PyXmlSec_KeyFromBinaryData__doc__[] = \
     ":param klass: the key value data klass\n"
     ":type klass: :class:`__KeyData`\n"
     ":param data: the key binary data\n"
-    ":type data: :class:`str` or :class:`bytes`\n"
+    ":type data: :class:`str`, :class:`bytes` or any :term:`bytes-like object`\n"
     ":return: pointer to newly created key\n"
     ":rtype: :class:`~xmlsec.Key`";
 static PyObject* PyXmlSec_KeyFromBinaryData(PyObject* self, PyObject* args, PyObject* kwargs) {
     static char *kwlist[] = { "klass", "data", NULL};
 
     PyXmlSec_KeyData* keydata = NULL;
-    const char* data = NULL;
-    Py_ssize_t data_size = 0;
+    Py_buffer data = {0};
 
     PyXmlSec_Key* key = NULL;
 
     PYXMLSEC_DEBUG("load symmetric key from memory - start");
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!s#:from_binary_data", kwlist,
-        PyXmlSec_KeyDataType, &keydata,  &data, &data_size))
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O!s*:from_binary_data", kwlist,
+        PyXmlSec_KeyDataType, &keydata, &data))
     {
         goto ON_FAIL;
     }
@@ -358,7 +373,7 @@ static PyObject* PyXmlSec_KeyFromBinaryData(PyObject* self, PyObject* args, PyOb
     if ((key = PyXmlSec_NewKey1((PyTypeObject*)self)) == NULL) goto ON_FAIL;
 
     Py_BEGIN_ALLOW_THREADS;
-    key->handle = xmlSecKeyReadMemory(keydata->id, (const xmlSecByte*)data, (xmlSecSize)data_size);
+    key->handle = xmlSecKeyReadMemory(keydata->id, (const xmlSecByte*)data.buf, (xmlSecSize)data.len);
     Py_END_ALLOW_THREADS;
 
     if (key->handle == NULL) {
@@ -367,12 +382,14 @@ static PyObject* PyXmlSec_KeyFromBinaryData(PyObject* self, PyObject* args, PyOb
     }
 
     key->is_own = 1;
+    PyBuffer_Release(&data);
 
     PYXMLSEC_DEBUG("load symmetric key from memory - ok");
     return (PyObject*)key;
 
 ON_FAIL:
     PYXMLSEC_DEBUG("load symmetric key from memory - fail");
+    PyBuffer_Release(&data);
     Py_XDECREF(key);
     return NULL;
 }
@@ -381,38 +398,39 @@ static const char PyXmlSec_KeyCertFromMemory__doc__[] = \
     "load_cert_from_memory(data, format) -> None\n"
     "Loads certificate from memory.\n\n"
     ":param data: the certificate binary data\n"
-    ":type data: :class:`str` or :class:`bytes`\n"
+    ":type data: :class:`str`, :class:`bytes` or any :term:`bytes-like object`\n"
     ":param format: the certificate file format\n"
     ":type format: :class:`int`";
 static PyObject* PyXmlSec_KeyCertFromMemory(PyObject* self, PyObject* args, PyObject* kwargs) {
     static char *kwlist[] = { "data", "format", NULL};
 
     PyXmlSec_Key* key = (PyXmlSec_Key*)self;
-    const char* data = NULL;
-    Py_ssize_t data_size = 0;
+    Py_buffer data = {0};
     unsigned int format = 0;
 
     PyObject* tmp = NULL;
     int rv = 0;
 
     PYXMLSEC_DEBUGF("%p: load certificate from memory - start", self);
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s#I:load_cert_from_memory", kwlist, &data, &data_size, &format)) {
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s*I:load_cert_from_memory", kwlist, &data, &format)) {
         goto ON_FAIL;
     }
 
     Py_BEGIN_ALLOW_THREADS;
-    rv = xmlSecCryptoAppKeyCertLoadMemory(key->handle, (const xmlSecByte*)data, (xmlSecSize)data_size, format);
+    rv = xmlSecCryptoAppKeyCertLoadMemory(key->handle, (const xmlSecByte*)data.buf, (xmlSecSize)data.len, format);
     Py_END_ALLOW_THREADS;
     if (rv < 0) {
         PyXmlSec_SetLastError("cannot load cert");
         goto ON_FAIL;
     }
     Py_XDECREF(tmp);
+    PyBuffer_Release(&data);
     PYXMLSEC_DEBUGF("%p: load certificate from memory - ok", self);
     Py_RETURN_NONE;
 ON_FAIL:
     PYXMLSEC_DEBUGF("%p: load certificate from memory - fail", self);
     Py_XDECREF(tmp);
+    PyBuffer_Release(&data);
     return NULL;
 }
 
@@ -474,6 +492,379 @@ ON_FAIL:
     return NULL;
 }
 
+/// the export of the keys
+
+// the exported key is the header followed by the records, which are encrypted if the header says so
+#define PYXMLSEC_EXPORT_MAGIC "XSK1"
+#define PYXMLSEC_EXPORT_MAGIC_SIZE 4
+#define PYXMLSEC_EXPORT_ENCRYPTED 1
+// the record is the tag, the size as 4 bytes big endian and the value
+#define PYXMLSEC_EXPORT_NAME 'N'
+#define PYXMLSEC_EXPORT_ASYMMETRIC 'K'  // PKCS#8 DER of the private key or SubjectPublicKeyInfo DER of the public key
+#define PYXMLSEC_EXPORT_SYMMETRIC 'S'   // the name of the key data, NUL and the value of the key
+#define PYXMLSEC_EXPORT_CERT 'C'        // DER of the certificate
+
+static int PyXmlSec_ExportAppendHeader(xmlSecBufferPtr out, xmlSecByte tag, xmlSecSize size) {
+    xmlSecByte header[5];
+
+    header[0] = tag;
+    header[1] = (xmlSecByte)(size >> 24);
+    header[2] = (xmlSecByte)(size >> 16);
+    header[3] = (xmlSecByte)(size >> 8);
+    header[4] = (xmlSecByte)size;
+    return xmlSecBufferAppend(out, header, sizeof(header));
+}
+
+static int PyXmlSec_ExportAppend(xmlSecBufferPtr out, xmlSecByte tag, const xmlSecByte* value, xmlSecSize size) {
+    if (PyXmlSec_ExportAppendHeader(out, tag, size) < 0) return -1;
+    return xmlSecBufferAppend(out, value, size);
+}
+
+#ifdef PYXMLSEC_KEY_EXPORT_OPENSSL
+// writes DER of the key value and the certificates of the key. the gil is not required.
+static int PyXmlSec_ExportAsymmetric(xmlSecKeyPtr key, xmlSecBufferPtr out) {
+    xmlSecKeyDataPtr value = xmlSecKeyGetValue(key);
+    xmlSecKeyDataPtr x509;
+    PKCS8_PRIV_KEY_INFO* p8;
+    EVP_PKEY* pkey;
+    unsigned char* der = NULL;
+    xmlSecSize i;
+    int size;
+    int rv;
+
+    if ((pkey = xmlSecOpenSSLEvpKeyDataGetEvp(value)) == NULL) return -1;
+    if ((xmlSecKeyDataGetType(value) & xmlSecKeyDataTypePrivate) != 0) {
+        if ((p8 = EVP_PKEY2PKCS8(pkey)) == NULL) return -1;
+        size = i2d_PKCS8_PRIV_KEY_INFO(p8, &der);
+        PKCS8_PRIV_KEY_INFO_free(p8);
+    } else {
+        size = i2d_PUBKEY(pkey, &der);
+    }
+    if (size <= 0) return -1;
+    rv = PyXmlSec_ExportAppend(out, PYXMLSEC_EXPORT_ASYMMETRIC, der, (xmlSecSize)size);
+    // the private key is wiped with the size of DER
+    OPENSSL_clear_free(der, (size_t)size);
+    if (rv < 0) return -1;
+
+    if ((x509 = xmlSecKeyGetData(key, xmlSecOpenSSLKeyDataX509Id)) == NULL) return 0;
+    for (i = 0; i < xmlSecOpenSSLKeyDataX509GetCertsSize(x509); ++i) {
+        der = NULL;
+        if ((size = i2d_X509(xmlSecOpenSSLKeyDataX509GetCert(x509, i), &der)) <= 0) return -1;
+        rv = PyXmlSec_ExportAppend(out, PYXMLSEC_EXPORT_CERT, der, (xmlSecSize)size);
+        OPENSSL_free(der);
+        if (rv < 0) return -1;
+    }
+    return 0;
+}
+#endif // PYXMLSEC_KEY_EXPORT_OPENSSL
+
+// encrypts or decrypts the records by AES-GCM with the key of the matching size. the gil is not required.
+static int PyXmlSec_ExportCrypt(xmlSecKeyPtr key, xmlSecTransformOperation operation, const xmlSecByte* data, xmlSecSize size, xmlSecBufferPtr out) {
+    xmlSecTransformCtxPtr transformCtx;
+    xmlSecTransformPtr transform;
+    xmlSecTransformId id;
+    xmlSecKeyReq keyReq;
+    int rv = -1;
+
+    switch (xmlSecKeyDataGetSize(xmlSecKeyGetValue(key))) {
+    case 128: id = xmlSecTransformAes128GcmId; break;
+    case 192: id = xmlSecTransformAes192GcmId; break;
+    case 256: id = xmlSecTransformAes256GcmId; break;
+    default: return -1;
+    }
+    if (xmlSecKeyReqInitialize(&keyReq) < 0) return -1;
+    if ((transformCtx = xmlSecTransformCtxCreate()) == NULL) goto ON_EXIT;
+    if ((transform = xmlSecTransformCtxCreateAndAppend(transformCtx, id)) == NULL) goto ON_EXIT;
+    transform->operation = operation;
+    if (xmlSecTransformSetKeyReq(transform, &keyReq) < 0) goto ON_EXIT;
+    if (xmlSecTransformSetKey(transform, key) < 0) goto ON_EXIT;
+    if (xmlSecTransformCtxBinaryExecute(transformCtx, data, size) < 0) goto ON_EXIT;
+    rv = xmlSecBufferSetData(out, xmlSecBufferGetData(transformCtx->result), xmlSecBufferGetSize(transformCtx->result));
+ON_EXIT:
+    if (transformCtx != NULL) xmlSecTransformCtxDestroy(transformCtx);
+    xmlSecKeyReqFinalize(&keyReq);
+    return rv;
+}
+
+// reads the records, returns NULL and sets malformed if the data is not the exported key. the gil is not required.
+static xmlSecKeyPtr PyXmlSec_ImportRecords(const xmlSecByte* data, xmlSecSize size, int* malformed) {
+    const xmlSecByte* end = data + size;
+    const xmlSecByte* value;
+    xmlSecKeyDataId id;
+    xmlSecKeyPtr key = NULL;
+    xmlSecSize value_size;
+    xmlSecSize name_size;
+    xmlChar* name = NULL;
+    xmlSecByte tag;
+
+    *malformed = 1;
+    while (data < end) {
+        if (end - data < 5) goto ON_FAIL;
+        tag = data[0];
+        value_size = ((xmlSecSize)data[1] << 24) | ((xmlSecSize)data[2] << 16) | ((xmlSecSize)data[3] << 8) | (xmlSecSize)data[4];
+        value = data + 5;
+        if ((xmlSecSize)(end - value) < value_size) goto ON_FAIL;
+        data = value + value_size;
+
+        switch (tag) {
+        case PYXMLSEC_EXPORT_NAME:
+            if (name != NULL || (name = xmlStrndup(value, (int)value_size)) == NULL) goto ON_FAIL;
+            break;
+        case PYXMLSEC_EXPORT_ASYMMETRIC:
+            if (key != NULL) goto ON_FAIL;
+            *malformed = 0;
+            if ((key = xmlSecCryptoAppKeyLoadMemory(value, value_size, xmlSecKeyDataFormatDer, NULL, NULL, NULL)) == NULL) goto ON_FAIL;
+            break;
+        case PYXMLSEC_EXPORT_SYMMETRIC:
+            if (key != NULL) goto ON_FAIL;
+            for (name_size = 0; name_size < value_size && value[name_size] != 0; ++name_size);
+            if (name_size == value_size) goto ON_FAIL;
+            *malformed = 0;
+            id = xmlSecKeyDataIdListFindByName(xmlSecKeyDataIdsGet(), value, xmlSecKeyDataUsageAny);
+            if (id == xmlSecKeyDataIdUnknown) goto ON_FAIL;
+            key = xmlSecKeyReadMemory(id, value + name_size + 1, value_size - name_size - 1);
+            if (key == NULL) goto ON_FAIL;
+            break;
+        case PYXMLSEC_EXPORT_CERT:
+            if (key == NULL) goto ON_FAIL;
+            *malformed = 0;
+            if (xmlSecCryptoAppKeyCertLoadMemory(key, value, value_size, xmlSecKeyDataFormatCertDer) < 0) goto ON_FAIL;
+            break;
+        default:
+            goto ON_FAIL;
+        }
+        *malformed = 1;
+    }
+    if (key == NULL) goto ON_FAIL;
+    if (name != NULL && xmlSecKeySetName(key, name) < 0) {
+        *malformed = 0;
+        goto ON_FAIL;
+    }
+    *malformed = 0;
+    xmlFree(name);
+    return key;
+ON_FAIL:
+    if (key != NULL) xmlSecKeyDestroy(key);
+    xmlFree(name);
+    return NULL;
+}
+
+// checks that the optional encryption key is the AES key
+static xmlSecKeyPtr PyXmlSec_ExportEncryptionKey(PyObject* encryption_key) {
+    xmlSecKeyPtr handle;
+    xmlSecKeyDataPtr value;
+
+    if (encryption_key == Py_None) return NULL;
+    if (!PyObject_IsInstance(encryption_key, (PyObject*)PyXmlSec_KeyType) || (handle = ((PyXmlSec_Key*)encryption_key)->handle) == NULL) {
+        PyErr_SetString(PyExc_TypeError, "encryption_key must be a key.");
+        return NULL;
+    }
+    value = xmlSecKeyGetValue(handle);
+    if (value == NULL || !xmlSecKeyDataCheckId(value, xmlSecKeyDataAesId)) {
+        PyErr_SetString(PyExc_ValueError, "encryption_key must be an AES key.");
+        return NULL;
+    }
+    return handle;
+}
+
+static const char PyXmlSec_KeyExport__doc__[] = \
+    "export(encryption_key = None) -> bytes\n"
+    "Exports the key, its name and its certificates to the compact binary form, which is loaded by :meth:`from_export`.\n\n"
+    "The key is stored as DER and needs no password to load, so the export is encrypted by ``encryption_key`` "
+    "with AES-GCM if it leaves the trusted boundary. Pickling the key uses the unencrypted export.\n\n"
+    ":param encryption_key: the AES key, which encrypts the export (optional)\n"
+    ":type encryption_key: :class:`~xmlsec.Key` or :data:`None`\n"
+    ":return: the exported key\n"
+    ":rtype: :class:`bytes`";
+static PyObject* PyXmlSec_KeyExport(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "encryption_key", NULL};
+
+    PyXmlSec_Key* key = (PyXmlSec_Key*)self;
+    PyObject* encryption_key = Py_None;
+    xmlSecKeyPtr encKey = NULL;
+    xmlSecKeyDataPtr value;
+    xmlSecBufferPtr records = NULL;
+    xmlSecBufferPtr out = NULL;
+    xmlSecBufferPtr buffer;
+    const xmlChar* name;
+    xmlSecByte flags = 0;
+    PyObject* result = NULL;
+    int rv = 0;
+
+    PYXMLSEC_DEBUGF("%p: export key - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|O:export", kwlist, &encryption_key)) {
+        goto ON_FAIL;
+    }
+    if (key->handle == NULL) {
+        PyErr_SetString(PyExc_ValueError, "key is not ready");
+        goto ON_FAIL;
+    }
+    if ((encKey = PyXmlSec_ExportEncryptionKey(encryption_key)) == NULL && PyErr_Occurred()) goto ON_FAIL;
+    if ((value = xmlSecKeyGetValue(key->handle)) == NULL) {
+        PyErr_SetString(PyExc_ValueError, "key has no value.");
+        goto ON_FAIL;
+    }
+    if ((records = xmlSecBufferCreate(0)) == NULL || (out = xmlSecBufferCreate(0)) == NULL) {
+        PyXmlSec_SetLastError("failed to create buffer");
+        goto ON_FAIL;
+    }
+
+    if ((xmlSecKeyDataGetType(value) & xmlSecKeyDataTypeSymmetric) != 0 && (buffer = xmlSecKeyDataBinaryValueGetBuffer(value)) != NULL) {
+        xmlSecSize name_size = (xmlSecSize)xmlStrlen(value->id->name) + 1;
+        rv = PyXmlSec_ExportAppendHeader(records, PYXMLSEC_EXPORT_SYMMETRIC, name_size + xmlSecBufferGetSize(buffer));
+        if (rv >= 0) rv = xmlSecBufferAppend(records, value->id->name, name_size);
+        if (rv >= 0) rv = xmlSecBufferAppend(records, xmlSecBufferGetData(buffer), xmlSecBufferGetSize(buffer));
+    } else {
+#ifdef PYXMLSEC_KEY_EXPORT_OPENSSL
+        rv = PyXmlSec_ExportAsymmetric(key->handle, records);
+#else
+        PyErr_SetString(PyExc_NotImplementedError, "the crypto library does not support the export of asymmetric keys.");
+        goto ON_FAIL;
+#endif
+    }
+    if (rv >= 0 && (name = xmlSecKeyGetName(key->handle)) != NULL) {
+        rv = PyXmlSec_ExportAppend(records, PYXMLSEC_EXPORT_NAME, name, (xmlSecSize)xmlStrlen(name));
+    }
+    if (rv < 0) {
+        PyXmlSec_SetLastError("cannot export key");
+        goto ON_FAIL;
+    }
+
+    if (encKey != NULL) {
+        flags = PYXMLSEC_EXPORT_ENCRYPTED;
+        Py_BEGIN_ALLOW_THREADS;
+        rv = PyXmlSec_ExportCrypt(encKey, xmlSecTransformOperationEncrypt, xmlSecBufferGetData(records), xmlSecBufferGetSize(records), out);
+        Py_END_ALLOW_THREADS;
+        if (rv < 0) {
+            PyXmlSec_SetLastError("cannot encrypt key");
+            goto ON_FAIL;
+        }
+    } else if (xmlSecBufferSetData(out, xmlSecBufferGetData(records), xmlSecBufferGetSize(records)) < 0) {
+        PyXmlSec_SetLastError("cannot export key");
+        goto ON_FAIL;
+    }
+
+    if ((result = PyBytes_FromStringAndSize(NULL, PYXMLSEC_EXPORT_MAGIC_SIZE + 1 + xmlSecBufferGetSize(out))) == NULL) goto ON_FAIL;
+    memcpy(PyBytes_AS_STRING(result), PYXMLSEC_EXPORT_MAGIC, PYXMLSEC_EXPORT_MAGIC_SIZE);
+    PyBytes_AS_STRING(result)[PYXMLSEC_EXPORT_MAGIC_SIZE] = (char)flags;
+    memcpy(PyBytes_AS_STRING(result) + PYXMLSEC_EXPORT_MAGIC_SIZE + 1, xmlSecBufferGetData(out), xmlSecBufferGetSize(out));
+
+    PYXMLSEC_DEBUGF("%p: export key - ok", self);
+    goto ON_EXIT;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: export key - fail", self);
+ON_EXIT:
+    // the buffers hold the private key
+    if (records != NULL) {
+        memset(xmlSecBufferGetData(records), 0, xmlSecBufferGetMaxSize(records));
+        xmlSecBufferDestroy(records);
+    }
+    if (out != NULL) {
+        memset(xmlSecBufferGetData(out), 0, xmlSecBufferGetMaxSize(out));
+        xmlSecBufferDestroy(out);
+    }
+    return result;
+}
+
+static const char PyXmlSec_KeyFromExport__doc__[] = \
+    "from_export(data, encryption_key = None) -> xmlsec.Key\n"
+    "Loads the key, which is exported by :meth:`export`.\n\n"
+    "The key is stored as DER, so loading it is much cheaper than loading the password protected key file.\n\n"
+    ":param data: the exported key\n"
+    ":type data: :class:`bytes` or any :term:`bytes-like object`\n"
+    ":param encryption_key: the AES key, which encrypted the export (optional)\n"
+    ":type encryption_key: :class:`~xmlsec.Key` or :data:`None`\n"
+    ":return: pointer to newly created key\n"
+    ":rtype: :class:`~xmlsec.Key`";
+static PyObject* PyXmlSec_KeyFromExport(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "data", "encryption_key", NULL};
+
+    PyObject* encryption_key = Py_None;
+    PyXmlSec_Key* key = NULL;
+    xmlSecKeyPtr encKey = NULL;
+    xmlSecBufferPtr records = NULL;
+    Py_buffer data = {0};
+    const xmlSecByte* body;
+    xmlSecSize body_size;
+    int malformed = 0;
+    int rv = 0;
+
+    PYXMLSEC_DEBUG("load key from export - start");
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "y*|O:from_export", kwlist, &data, &encryption_key)) {
+        goto ON_FAIL;
+    }
+    if ((encKey = PyXmlSec_ExportEncryptionKey(encryption_key)) == NULL && PyErr_Occurred()) goto ON_FAIL;
+    if (data.len < PYXMLSEC_EXPORT_MAGIC_SIZE + 1 || memcmp(data.buf, PYXMLSEC_EXPORT_MAGIC, PYXMLSEC_EXPORT_MAGIC_SIZE) != 0 ||
+        (((const xmlSecByte*)data.buf)[PYXMLSEC_EXPORT_MAGIC_SIZE] & ~PYXMLSEC_EXPORT_ENCRYPTED) != 0) {
+        PyErr_SetString(PyExc_ValueError, "data is not an exported key.");
+        goto ON_FAIL;
+    }
+    body = (const xmlSecByte*)data.buf + PYXMLSEC_EXPORT_MAGIC_SIZE + 1;
+    body_size = (xmlSecSize)(data.len - PYXMLSEC_EXPORT_MAGIC_SIZE - 1);
+    if ((((const xmlSecByte*)data.buf)[PYXMLSEC_EXPORT_MAGIC_SIZE] & PYXMLSEC_EXPORT_ENCRYPTED) != 0) {
+        if (encKey == NULL) {
+            PyErr_SetString(PyExc_ValueError, "the key is encrypted, encryption_key is required.");
+            goto ON_FAIL;
+        }
+        if ((records = xmlSecBufferCreate(0)) == NULL) {
+            PyXmlSec_SetLastError("failed to create buffer");
+            goto ON_FAIL;
+        }
+        Py_BEGIN_ALLOW_THREADS;
+        rv = PyXmlSec_ExportCrypt(encKey, xmlSecTransformOperationDecrypt, body, body_size, records);
+        Py_END_ALLOW_THREADS;
+        if (rv < 0) {
+            PyXmlSec_SetLastError("cannot decrypt key");
+            goto ON_FAIL;
+        }
+        body = xmlSecBufferGetData(records);
+        body_size = xmlSecBufferGetSize(records);
+    }
+
+    if ((key = PyXmlSec_NewKey1((PyTypeObject*)self)) == NULL) goto ON_FAIL;
+    Py_BEGIN_ALLOW_THREADS;
+    key->handle = PyXmlSec_ImportRecords(body, body_size, &malformed);
+    Py_END_ALLOW_THREADS;
+    if (key->handle == NULL) {
+        if (malformed) {
+            PyXmlSec_ClearError();
+            PyErr_SetString(PyExc_ValueError, "data is not an exported key.");
+        } else {
+            PyXmlSec_SetLastError("cannot load key");
+        }
+        goto ON_FAIL;
+    }
+    key->is_own = 1;
+
+    PYXMLSEC_DEBUG("load key from export - ok");
+    goto ON_EXIT;
+ON_FAIL:
+    PYXMLSEC_DEBUG("load key from export - fail");
+    Py_CLEAR(key);
+ON_EXIT:
+    if (records != NULL) {
+        memset(xmlSecBufferGetData(records), 0, xmlSecBufferGetMaxSize(records));
+        xmlSecBufferDestroy(records);
+    }
+    PyBuffer_Release(&data);
+    return (PyObject*)key;
+}
+
+static PyObject* PyXmlSec_Key__reduce__(PyObject* self) {
+    PyObject* from_export;
+    PyObject* data;
+
+    if (((PyXmlSec_Key*)self)->handle == NULL) {
+        return Py_BuildValue("(O())", (PyObject*)Py_TYPE(self));
+    }
+    if ((data = PyObject_CallMethod(self, "export", NULL)) == NULL) return NULL;
+    if ((from_export = PyObject_GetAttrString((PyObject*)Py_TYPE(self), "from_export")) == NULL) {
+        Py_DECREF(data);
+        return NULL;
+    }
+    return Py_BuildValue("(N(N))", from_export, data);
+}
+
 static const char PyXmlSec_KeyName__doc__[] = "the name of this key.\n";
 static PyObject* PyXmlSec_KeyNameGet(PyObject* self, void* closure) {
     PyXmlSec_Key* key = (PyXmlSec_Key*)self;
@@ -580,6 +971,24 @@ static PyMethodDef PyXmlSec_KeyMethods[] = {
         METH_VARARGS|METH_KEYWORDS,
         PyXmlSec_KeyCertFromFile__doc__
     },
+    {
+        "export",
+        (PyCFunction)PyXmlSec_KeyExport,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_KeyExport__doc__
+    },
+    {
+        "from_export",
+        (PyCFunction)PyXmlSec_KeyFromExport,
+        METH_CLASS|METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_KeyFromExport__doc__
+    },
+    {
+        "__reduce__",
+        (PyCFunction)PyXmlSec_Key__reduce__,
+        METH_NOARGS,
+        "",
+    },
     {
         "__copy__",
         (PyCFunction)PyXmlSec_Key__copy__,
@@ -646,23 +1055,79 @@ PyXmlSec_Key* PyXmlSec_NewKey(void) {
 
 /// key manager class
 
+// all managers in the process
+static PyXmlSec_KeysManager* PyXmlSec_KeysManagers = NULL;
+
 static PyObject* PyXmlSec_KeysManager__new__(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
+    static unsigned long long last_serial = 0;
     PyXmlSec_KeysManager* mgr = (PyXmlSec_KeysManager*)PyType_GenericNew(type, args, kwargs);
     PYXMLSEC_DEBUGF("%p: new manager", mgr);
     if (mgr != NULL) {
         mgr->handle = NULL;
+        mgr->busy = 0;
+        mgr->serial = ++last_serial;
+        mgr->generation = 0;
+        mgr->prev = NULL;
+        mgr->next = PyXmlSec_KeysManagers;
+        if (mgr->next != NULL) mgr->next->prev = mgr;
+        PyXmlSec_KeysManagers = mgr;
     }
     return (PyObject*)(mgr);
 }
 
 static int PyXmlSec_KeysManager__init__(PyObject* self, PyObject* args, PyObject* kwargs) {
-    xmlSecKeysMngrPtr handle = xmlSecKeysMngrCreate();
+    static char *kwlist[] = { "indexed", "resolver", "maxsize", "ttl", NULL};
+    xmlSecKeysMngrPtr handle = NULL;
+    xmlSecKeyStorePtr store;
+    PyObject* resolver = Py_None;
+    PyObject* ttl = Py_None;
+    Py_ssize_t maxsize = 128;
+    double ttl_value = 0;
+    int indexed = 0;
 
     PYXMLSEC_DEBUGF("%p: init key manager", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|pOnO:__init__", kwlist, &indexed, &resolver, &maxsize, &ttl)) {
+        return -1;
+    }
+    if (resolver != Py_None && !PyCallable_Check(resolver)) {
+        PyErr_SetString(PyExc_TypeError, "resolver must be callable.");
+        return -1;
+    }
+    if (maxsize < 0) {
+        PyErr_SetString(PyExc_ValueError, "maxsize must not be negative.");
+        return -1;
+    }
+    if (ttl != Py_None) {
+        ttl_value = PyFloat_AsDouble(ttl);
+        if (ttl_value == -1 && PyErr_Occurred()) return -1;
+        if (!(ttl_value > 0)) {
+            PyErr_SetString(PyExc_ValueError, "ttl must be positive.");
+            return -1;
+        }
+    }
+    handle = xmlSecKeysMngrCreate();
     if (handle == NULL) {
         PyXmlSec_SetLastError("failed to create xmlsecKeyManager");
         return -1;
     }
+    if (indexed || resolver != Py_None) {
+        // the default initialization keeps the keys store which is already set
+        store = xmlSecKeyStoreCreate(resolver != Py_None ? PyXmlSec_LazyKeysStoreId : PyXmlSec_IndexedKeysStoreId);
+        if (store == NULL) {
+            xmlSecKeysMngrDestroy(handle);
+            PyXmlSec_SetLastError("failed to create keys store");
+            return -1;
+        }
+        if (resolver != Py_None) {
+            PyXmlSec_LazyKeysStoreSetResolver(store, resolver, (xmlSecSize)maxsize, ttl_value);
+        }
+        if (xmlSecKeysMngrAdoptKeysStore(handle, store) < 0) {
+            xmlSecKeyStoreDestroy(store);
+            xmlSecKeysMngrDestroy(handle);
+            PyXmlSec_SetLastError("failed to set keys store");
+            return -1;
+        }
+    }
     if (xmlSecCryptoAppDefaultKeysMngrInit(handle) < 0) {
         xmlSecKeysMngrDestroy(handle);
         PyXmlSec_SetLastError("failed to initialize xmlsecKeyManager");
@@ -670,6 +1135,7 @@ static int PyXmlSec_KeysManager__init__(PyObject* self, PyObject* args, PyObject
     }
     PYXMLSEC_DEBUGF("%p: init key manager - done: %p", self, handle);
     ((PyXmlSec_KeysManager*)self)->handle = handle;
+    ((PyXmlSec_KeysManager*)self)->generation++;
     return 0;
 }
 
@@ -682,9 +1148,56 @@ static void PyXmlSec_KeysManager__del__(PyObject* self) {
         PYXMLSEC_DEBUGF("%p: delete KeysManager handle - %p", self, mgr->handle);
         xmlSecKeysMngrDestroy(mgr->handle);
     }
+    if (mgr->prev != NULL) mgr->prev->next = mgr->next; else PyXmlSec_KeysManagers = mgr->next;
+    if (mgr->next != NULL) mgr->next->prev = mgr->prev;
     Py_TYPE(self)->tp_free(self);
 }
 
+PyObject* PyXmlSec_KeysManagersBeforeFork(void) {
+    PyXmlSec_KeysManager* mgr;
+    PyObject* locked = PyList_New(0);
+    Py_ssize_t i;
+
+    if (locked == NULL) return NULL;
+    // the managers are kept alive, while the gil is released to wait for the locks
+    for (mgr = PyXmlSec_KeysManagers; mgr != NULL; mgr = mgr->next) {
+        if (mgr->handle != NULL && PyList_Append(locked, (PyObject*)mgr) < 0) {
+            Py_DECREF(locked);
+            return NULL;
+        }
+    }
+    for (i = 0; i < PyList_GET_SIZE(locked); ++i) {
+        PyXmlSec_KeysStoreBeforeFork(xmlSecKeysMngrGetKeysStore(((PyXmlSec_KeysManager*)PyList_GET_ITEM(locked, i))->handle));
+    }
+    return locked;
+}
+
+void PyXmlSec_KeysManagersAfterFork(PyObject* locked, int child) {
+    PyXmlSec_KeysManager* mgr;
+    Py_ssize_t i;
+
+    if (locked != NULL) {
+        for (i = 0; i < PyList_GET_SIZE(locked); ++i) {
+            PyXmlSec_KeysStoreAfterFork(xmlSecKeysMngrGetKeysStore(((PyXmlSec_KeysManager*)PyList_GET_ITEM(locked, i))->handle));
+        }
+    }
+    if (child) {
+        // the threads, which ran the operations, do not exist in the child
+        for (mgr = PyXmlSec_KeysManagers; mgr != NULL; mgr = mgr->next) {
+            mgr->busy = 0;
+        }
+    }
+}
+
+// the manager must not be modified while it is shared between threads
+static int PyXmlSec_KeysManagerCheckNotBusy(PyXmlSec_KeysManager* mgr) {
+    if (mgr->busy > 0) {
+        PyErr_SetString(PyXmlSec_Error, "KeysManager is shared by running operations and cannot be modified.");
+        return -1;
+    }
+    return 0;
+}
+
 static const char PyXmlSec_KeysManagerAddKey__doc__[] = \
     "add_key(key: xmlsec.Key) -> None\n"
     "Adds a copy of ``key`` to keys manager\n\n"
@@ -708,6 +1221,8 @@ static PyObject* PyXmlSec_KeysManagerAddKey(PyObject* self, PyObject* args, PyOb
         goto ON_FAIL;
     }
 
+    if (PyXmlSec_KeysManagerCheckNotBusy(mgr) != 0) goto ON_FAIL;
+
     Py_BEGIN_ALLOW_THREADS
     key2 = xmlSecKeyDuplicate(key->handle);
     Py_END_ALLOW_THREADS;
@@ -718,13 +1233,14 @@ static PyObject* PyXmlSec_KeysManagerAddKey(PyObject* self, PyObject* args, PyOb
     }
 
     Py_BEGIN_ALLOW_THREADS;
-    rv = xmlSecCryptoAppDefaultKeysMngrAdoptKey(mgr->handle, key2);
+    rv = PyXmlSec_KeysMngrAdoptKey(mgr->handle, key2);
     Py_END_ALLOW_THREADS;
     if (rv < 0) {
         PyXmlSec_SetLastError("cannot add key");
         xmlSecKeyDestroy(key2);
         goto ON_FAIL;
     }
+    mgr->generation++;
     PYXMLSEC_DEBUGF("%p: add key - ok", self);
     Py_RETURN_NONE;
 ON_FAIL:
@@ -758,6 +1274,8 @@ static PyObject* PyXmlSec_KeysManagerLoadCert(PyObject* self, PyObject* args, Py
         goto ON_FAIL;
     }
 
+    if (PyXmlSec_KeysManagerCheckNotBusy(mgr) != 0) goto ON_FAIL;
+
     filename = PyBytes_AsString(filepath);
 
     Py_BEGIN_ALLOW_THREADS;
@@ -767,6 +1285,7 @@ static PyObject* PyXmlSec_KeysManagerLoadCert(PyObject* self, PyObject* args, Py
         PyXmlSec_SetLastError("cannot load cert");
         goto ON_FAIL;
     }
+    mgr->generation++;
     Py_DECREF(filepath);
     PYXMLSEC_DEBUGF("%p: load cert - ok", self);
     Py_RETURN_NONE;
@@ -780,7 +1299,7 @@ static const char PyXmlSec_KeysManagerLoadCertFromMemory__doc__[] = \
     "load_cert_from_memory(data, format, type) -> None\n"
     "Loads certificate from ``data``\n\n"
     ":param data: the certificate binary data\n"
-    ":type data: :class:`str` or :class:`bytes`\n"
+    ":type data: :class:`str`, :class:`bytes` or any :term:`bytes-like object`\n"
     ":param format: the certificate file format\n"
     ":type format: :class:`int`\n"
     ":param type: the flag that indicates is the certificate in filename trusted or not\n"
@@ -790,31 +1309,691 @@ static PyObject* PyXmlSec_KeysManagerLoadCertFromMemory(PyObject* self, PyObject
 
     PyXmlSec_KeysManager* mgr = (PyXmlSec_KeysManager*)self;
 
-    const char* data = NULL;
+    Py_buffer data = {0};
     unsigned int type = 0;
     unsigned int format = 0;
-    Py_ssize_t data_size = 0;
     int rv;
 
     PYXMLSEC_DEBUGF("%p: load cert from memory - start", self);
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s#II:load_cert", kwlist, &data, &data_size, &format, &type)) {
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s*II:load_cert", kwlist, &data, &format, &type)) {
         goto ON_FAIL;
     }
 
+    if (PyXmlSec_KeysManagerCheckNotBusy(mgr) != 0) goto ON_FAIL;
+
     Py_BEGIN_ALLOW_THREADS;
-    rv = xmlSecCryptoAppKeysMngrCertLoadMemory(mgr->handle, (const xmlSecByte*)data, (xmlSecSize)data_size, format, type);
+    rv = xmlSecCryptoAppKeysMngrCertLoadMemory(mgr->handle, (const xmlSecByte*)data.buf, (xmlSecSize)data.len, format, type);
     Py_END_ALLOW_THREADS;
     if (rv < 0) {
         PyXmlSec_SetLastError("cannot load cert from memory");
         goto ON_FAIL;
     }
+    mgr->generation++;
+    PyBuffer_Release(&data);
     PYXMLSEC_DEBUGF("%p: load cert from memory - ok", self);
     Py_RETURN_NONE;
 ON_FAIL:
     PYXMLSEC_DEBUGF("%p: load cert from memory - fail", self);
+    PyBuffer_Release(&data);
+    return NULL;
+}
+
+/// bulk loading of the keys and the certificates
+
+#define PYXMLSEC_LOAD_CERT 1
+#define PYXMLSEC_LOAD_KEY 2
+// the DER file, which is tried as a key first and then as a certificate
+#define PYXMLSEC_LOAD_ANY 3
+
+typedef struct {
+    const char* path;    // fs encoded, NULL if the data is given
+    const char* name;    // the name of the keys from the source, NULL if they have no name
+    xmlSecByte* data;
+    xmlSecSize size;
+    int owned;           // the data is read from the file
+    int error;           // errno of reading the file
+} PyXmlSec_LoadSource;
+
+typedef struct {
+    Py_ssize_t source;
+    const xmlSecByte* data;  // the PEM block or the whole DER source
+    xmlSecSize size;
+    const xmlSecByte* body;  // the base64 body of the PEM block, NULL for DER
+    xmlSecSize body_size;
+    xmlSecKeyDataFormat format;
+    int kind;
+    // the results of the worker
+    xmlSecKeyPtr key;
+    xmlSecByte fingerprint[PYXMLSEC_SHA256_SIZE];
+    int identified;          // the fingerprint is computed
+    int failed;
+    int code;                // the xmlsec error code if failed
+} PyXmlSec_LoadItem;
+
+typedef struct _PyXmlSec_LoadJob {
+    void (*process)(struct _PyXmlSec_LoadJob* job, Py_ssize_t index);
+    Py_ssize_t count;
+    Py_ssize_t next;
+    int running;
+    PyThread_type_lock lock;
+    PyThread_type_lock done;
+    PyXmlSec_LoadSource* sources;
+    Py_ssize_t sources_count;
+    PyXmlSec_LoadItem* items;
+    Py_ssize_t items_count;
+    const char* password;
+} PyXmlSec_LoadJob;
+
+static void PyXmlSec_LoadWorker(void* arg) {
+    PyXmlSec_LoadJob* job = (PyXmlSec_LoadJob*)arg;
+    Py_ssize_t index;
+    int last;
+
+    for (;;) {
+        PyThread_acquire_lock(job->lock, WAIT_LOCK);
+        index = (job->next < job->count) ? job->next++ : -1;
+        PyThread_release_lock(job->lock);
+        if (index < 0) break;
+        job->process(job, index);
+    }
+    PyXmlSec_ClearError();
+
+    PyThread_acquire_lock(job->lock, WAIT_LOCK);
+    last = (--job->running == 0);
+    PyThread_release_lock(job->lock);
+    if (last) {
+        PyThread_release_lock(job->done);
+    }
+}
+
+// processes count entries on up to workers threads, the current thread is the last worker. the gil is not required.
+static void PyXmlSec_LoadRun(PyXmlSec_LoadJob* job, void (*process)(PyXmlSec_LoadJob*, Py_ssize_t), Py_ssize_t count, long workers) {
+    long i;
+
+    job->process = process;
+    job->count = count;
+    job->next = 0;
+    if (workers > count) workers = (long)count;
+    if (workers < 1) return;
+
+    PyThread_acquire_lock(job->done, WAIT_LOCK);
+    job->running = (int)workers;
+    for (i = 1; i < workers; ++i) {
+        if (PyThread_start_new_thread(PyXmlSec_LoadWorker, job) == PYTHREAD_INVALID_THREAD_ID) {
+            PyThread_acquire_lock(job->lock, WAIT_LOCK);
+            job->running--;
+            PyThread_release_lock(job->lock);
+        }
+    }
+    PyXmlSec_LoadWorker(job);
+    PyThread_acquire_lock(job->done, WAIT_LOCK);
+    PyThread_release_lock(job->done);
+}
+
+static void PyXmlSec_LoadReadFile(PyXmlSec_LoadJob* job, Py_ssize_t index) {
+    PyXmlSec_LoadSource* source = &(job->sources[index]);
+    FILE* f;
+    long size;
+
+    errno = 0;
+    if ((f = fopen(source->path, "rb")) == NULL) {
+        source->error = errno ? errno : EIO;
+        return;
+    }
+    if (fseek(f, 0, SEEK_END) != 0 || (size = ftell(f)) < 0 || fseek(f, 0, SEEK_SET) != 0) {
+        source->error = errno ? errno : EIO;
+    } else if ((source->data = (xmlSecByte*)PyMem_RawMalloc(size > 0 ? (size_t)size : 1)) == NULL) {
+        source->error = ENOMEM;
+    } else {
+        source->owned = 1;
+        source->size = (xmlSecSize)size;
+        if (fread(source->data, 1, (size_t)size, f) != (size_t)size) {
+            source->error = errno ? errno : EIO;
+        }
+    }
+    fclose(f);
+}
+
+// computes SHA-256 of DER encoded in base64, that is the usual fingerprint of the certificate. the gil is not required.
+static int PyXmlSec_ComputeBase64Sha256(const xmlSecByte* data, xmlSecSize size, xmlSecByte* digest) {
+    xmlSecTransformCtxPtr transformCtx;
+    xmlSecTransformPtr transform;
+    int rv = -1;
+
+    if ((transformCtx = xmlSecTransformCtxCreate()) == NULL) return -1;
+    if ((transform = xmlSecTransformCtxCreateAndAppend(transformCtx, xmlSecTransformBase64Id)) == NULL) goto ON_EXIT;
+    transform->operation = xmlSecTransformOperationDecode;
+    if ((transform = xmlSecTransformCtxCreateAndAppend(transformCtx, xmlSecTransformSha256Id)) == NULL) goto ON_EXIT;
+    transform->operation = xmlSecTransformOperationSign;
+    if (xmlSecTransformCtxPrepare(transformCtx, xmlSecTransformDataTypeBin) < 0) goto ON_EXIT;
+    if (xmlSecTransformPushBin(transformCtx->first, data, size, 1, transformCtx) < 0) goto ON_EXIT;
+    if (xmlSecBufferGetSize(transformCtx->result) != PYXMLSEC_SHA256_SIZE) goto ON_EXIT;
+
+    memcpy(digest, xmlSecBufferGetData(transformCtx->result), PYXMLSEC_SHA256_SIZE);
+    rv = 0;
+ON_EXIT:
+    xmlSecTransformCtxDestroy(transformCtx);
+    return rv;
+}
+
+// parses the key or the certificate, which is kept in a holder key until it is adopted. the gil is not required.
+static void PyXmlSec_LoadParseItem(PyXmlSec_LoadJob* job, Py_ssize_t index) {
+    PyXmlSec_LoadItem* item = &(job->items[index]);
+    xmlSecKeyPtr holder;
+    int rv = -1;
+
+    if (item->kind != PYXMLSEC_LOAD_CERT) {
+        item->key = xmlSecCryptoAppKeyLoadMemory(item->data, item->size, item->format, job->password, NULL, NULL);
+        if (item->key != NULL) {
+            item->kind = PYXMLSEC_LOAD_KEY;
+        } else if (item->kind == PYXMLSEC_LOAD_KEY) {
+            item->failed = 1;
+            item->code = PyXmlSec_PopLastErrorCode();
+            return;
+        } else {
+            PyXmlSec_ClearError();
+        }
+    }
+    if (item->key == NULL) {
+        if ((holder = xmlSecKeyCreate()) != NULL) {
+            rv = xmlSecCryptoAppKeyCertLoadMemory(holder, item->data, item->size, item->format);
+#ifdef PYXMLSEC_KEY_EXPORT_OPENSSL
+            if (rv >= 0) {
+                item->key = holder;
+                holder = NULL;
+            }
+#endif
+            if (holder != NULL) xmlSecKeyDestroy(holder);
+        }
+        if (rv < 0) {
+            item->failed = 1;
+            item->code = PyXmlSec_PopLastErrorCode();
+            return;
+        }
+        item->kind = PYXMLSEC_LOAD_CERT;
+    }
+
+    // the fingerprint of DER, that is much cheaper than the one of the key material
+    if (item->body != NULL) {
+        rv = PyXmlSec_ComputeBase64Sha256(item->body, item->body_size, item->fingerprint);
+    } else {
+        rv = PyXmlSec_ComputeSha256(item->data, item->size, item->fingerprint);
+    }
+    item->identified = (rv == 0);
+    PyXmlSec_ClearError();
+}
+
+static const xmlSecByte* PyXmlSec_LoadFind(const xmlSecByte* data, const xmlSecByte* end, const char* what) {
+    size_t size = strlen(what);
+
+    for (; (size_t)(end - data) >= size; ++data) {
+        if (memcmp(data, what, size) == 0) return data;
+    }
+    return NULL;
+}
+
+static int PyXmlSec_LoadLabelIn(const xmlSecByte* label, size_t size, const char** labels) {
+    for (; *labels != NULL; ++labels) {
+        if (strlen(*labels) == size && memcmp(label, *labels, size) == 0) return 1;
+    }
+    return 0;
+}
+
+// splits the sources into the PEM blocks of the known types, the source without PEM blocks is a DER item
+static int PyXmlSec_LoadSplit(PyXmlSec_LoadJob* job) {
+    static const char* cert_labels[] = { "CERTIFICATE", "TRUSTED CERTIFICATE", "X509 CERTIFICATE", NULL };
+    static const char* key_labels[] = {
+        "PRIVATE KEY", "ENCRYPTED PRIVATE KEY", "RSA PRIVATE KEY", "DSA PRIVATE KEY", "EC PRIVATE KEY", "PUBLIC KEY", NULL
+    };
+
+    PyXmlSec_LoadSource* source;
+    PyXmlSec_LoadItem* items;
+    PyXmlSec_LoadItem* item;
+    const xmlSecByte* pos;
+    const xmlSecByte* end;
+    const xmlSecByte* label;
+    const xmlSecByte* label_end;
+    const xmlSecByte* body;
+    const xmlSecByte* footer;
+    char footer_text[96];
+    Py_ssize_t capacity = 0;
+    Py_ssize_t i;
+    int kind;
+
+    for (i = 0; i < job->sources_count; ++i) {
+        source = &(job->sources[i]);
+        pos = source->data;
+        end = source->data + source->size;
+        if (source->size == 0) continue;
+        if (PyXmlSec_LoadFind(pos, end, "-----BEGIN ") == NULL) {
+            pos = NULL;
+        }
+        do {
+            item = NULL;
+            if (pos == NULL) {
+                kind = PYXMLSEC_LOAD_ANY;
+            } else {
+                if ((pos = PyXmlSec_LoadFind(pos, end, "-----BEGIN ")) == NULL) break;
+                label = pos + 11;
+                if ((label_end = PyXmlSec_LoadFind(label, end, "-----")) == NULL) break;
+                if ((size_t)(label_end - label) > sizeof(footer_text) - 16) {
+                    pos = label_end;
+                    continue;
+                }
+                snprintf(footer_text, sizeof(footer_text), "-----END %.*s-----", (int)(label_end - label), (const char*)label);
+                body = label_end + 5;
+                if ((footer = PyXmlSec_LoadFind(body, end, footer_text)) == NULL) break;
+
+                if (PyXmlSec_LoadLabelIn(label, (size_t)(label_end - label), cert_labels)) {
+                    kind = PYXMLSEC_LOAD_CERT;
+                } else if (PyXmlSec_LoadLabelIn(label, (size_t)(label_end - label), key_labels)) {
+                    kind = PYXMLSEC_LOAD_KEY;
+                } else {
+                    kind = 0;
+                }
+            }
+            if (kind != 0) {
+                if (job->items_count == capacity) {
+                    capacity = capacity * 2 + 16;
+                    // the old items are kept on failure, so they are freed by the caller
+                    items = job->items;
+                    if (PyMem_Resize(items, PyXmlSec_LoadItem, capacity) == NULL) {
+                        PyErr_NoMemory();
+                        return -1;
+                    }
+                    job->items = items;
+                }
+                item = &(job->items[job->items_count++]);
+                memset(item, 0, sizeof(PyXmlSec_LoadItem));
+                item->source = i;
+                item->kind = kind;
+            }
+            if (pos == NULL) {
+                item->data = source->data;
+                item->size = source->size;
+                item->format = xmlSecKeyDataFormatDer;
+                break;
+            }
+            if (item != NULL) {
+                item->data = pos;
+                item->size = (xmlSecSize)(footer + strlen(footer_text) - pos);
+                item->body = body;
+                item->body_size = (xmlSecSize)(footer - body);
+                item->format = xmlSecKeyDataFormatPem;
+            }
+            pos = footer + strlen(footer_text);
+        } while (pos < end);
+    }
+    return 0;
+}
+
+// raises the error of the first source or item which has failed
+static int PyXmlSec_LoadCheck(PyXmlSec_LoadJob* job, PyObject* paths) {
+    PyXmlSec_LoadItem* item;
+    PyObject* error;
+    PyObject* source;
+    const char* what;
+    Py_ssize_t i;
+
+    for (i = 0; i < job->sources_count; ++i) {
+        if (job->sources[i].error != 0) {
+            errno = job->sources[i].error;
+            PyErr_SetFromErrnoWithFilenameObject(PyExc_OSError, PyList_GET_ITEM(paths, i));
+            return -1;
+        }
+    }
+    for (i = 0; i < job->items_count; ++i) {
+        item = &(job->items[i]);
+        if (!item->failed) continue;
+        what = (item->kind == PYXMLSEC_LOAD_CERT) ? "cert" : (item->kind == PYXMLSEC_LOAD_KEY) ? "key" : "key or cert";
+        source = (paths != NULL) ? PyList_GET_ITEM(paths, item->source) : NULL;
+        if (source != NULL) {
+            error = PyObject_CallFunction(PyXmlSec_Error, "iN", item->code, PyUnicode_FromFormat("cannot load %s from %R", what, source));
+        } else {
+            error = PyObject_CallFunction(PyXmlSec_Error, "iN", item->code, PyUnicode_FromFormat("cannot load %s from memory", what));
+        }
+        if (error != NULL) {
+            PyErr_SetObject(PyXmlSec_Error, error);
+            Py_DECREF(error);
+        }
+        return -1;
+    }
+    return 0;
+}
+
+// adds the certificate, which is parsed by the worker, to the manager.
+// the certificate is parsed again if the crypto library is not linked directly.
+static int PyXmlSec_LoadAdoptCert(xmlSecKeysMngrPtr mngr, PyXmlSec_LoadItem* item, unsigned int type) {
+#ifdef PYXMLSEC_KEY_EXPORT_OPENSSL
+    xmlSecKeyDataStorePtr store = xmlSecKeysMngrGetDataStore(mngr, xmlSecOpenSSLX509StoreId);
+    xmlSecKeyDataPtr data;
+    X509* cert;
+
+    if (store == NULL || item->key == NULL) return -1;
+    if ((data = xmlSecKeyGetData(item->key, xmlSecOpenSSLKeyDataX509Id)) == NULL) return -1;
+    if ((cert = xmlSecOpenSSLKeyDataX509GetCert(data, 0)) == NULL || X509_up_ref(cert) != 1) return -1;
+    if (xmlSecOpenSSLX509StoreAdoptCert(store, cert, type) < 0) {
+        X509_free(cert);
+        return -1;
+    }
+    return 0;
+#else
+    return xmlSecCryptoAppKeysMngrCertLoadMemory(mngr, item->data, item->size, item->format, type);
+#endif
+}
+
+// adopts the unique keys and certificates in the order of the sources, returns (certs, keys)
+static PyObject* PyXmlSec_LoadAdopt(PyXmlSec_KeysManager* mgr, PyXmlSec_LoadJob* job, unsigned int type) {
+    PyXmlSec_LoadItem* item;
+    PyObject* seen = PySet_New(NULL);
+    PyObject* entry;
+    const char* name;
+    Py_ssize_t certs = 0;
+    Py_ssize_t keys = 0;
+    Py_ssize_t i;
+    int rv;
+
+    if (seen == NULL) return NULL;
+    for (i = 0; i < job->items_count; ++i) {
+        item = &(job->items[i]);
+        if (item->identified) {
+            entry = Py_BuildValue("(iy#)", item->kind, item->fingerprint, (Py_ssize_t)sizeof(item->fingerprint));
+            if (entry == NULL) goto ON_FAIL;
+            rv = PySet_Contains(seen, entry);
+            if (rv == 0) rv = PySet_Add(seen, entry);
+            Py_DECREF(entry);
+            if (rv < 0) goto ON_FAIL;
+            if (rv == 1) continue;
+        }
+        if (item->kind == PYXMLSEC_LOAD_CERT) {
+            if (PyXmlSec_LoadAdoptCert(mgr->handle, item, type) < 0) {
+                PyXmlSec_SetLastError("cannot load cert");
+                goto ON_FAIL;
+            }
+            certs++;
+        } else {
+            name = job->sources[item->source].name;
+            if (name != NULL && xmlSecKeyGetName(item->key) == NULL && xmlSecKeySetName(item->key, XSTR(name)) < 0) {
+                PyXmlSec_SetLastError("cannot set name");
+                goto ON_FAIL;
+            }
+            if (PyXmlSec_KeysMngrAdoptKey(mgr->handle, item->key) < 0) {
+                PyXmlSec_SetLastError("cannot add key");
+                goto ON_FAIL;
+            }
+            item->key = NULL;
+            keys++;
+        }
+    }
+    Py_DECREF(seen);
+    return Py_BuildValue("(nn)", certs, keys);
+ON_FAIL:
+    Py_DECREF(seen);
     return NULL;
 }
 
+// parses the sources on up to workers threads and adopts the result, paths are the file names of the sources or NULL
+static PyObject* PyXmlSec_KeysManagerLoad(PyXmlSec_KeysManager* mgr, PyXmlSec_LoadJob* job, PyObject* paths,
+                                          PyObject* workers_obj, unsigned int type) {
+    PyObject* result = NULL;
+    Py_ssize_t i;
+    long workers;
+
+    workers = (workers_obj == Py_None) ? PyXmlSec_GetDefaultWorkers() : PyLong_AsLong(workers_obj);
+    if (workers == -1 && PyErr_Occurred()) goto ON_EXIT;
+    if (workers < 1) {
+        PyErr_SetString(PyExc_ValueError, "workers must be greater than 0.");
+        goto ON_EXIT;
+    }
+    if (PyXmlSec_KeysManagerCheckNotBusy(mgr) != 0) goto ON_EXIT;
+
+    job->lock = PyThread_allocate_lock();
+    job->done = PyThread_allocate_lock();
+    if (job->lock == NULL || job->done == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "cannot allocate lock");
+        goto ON_EXIT;
+    }
+    if (paths != NULL) {
+        Py_BEGIN_ALLOW_THREADS;
+        PyXmlSec_LoadRun(job, PyXmlSec_LoadReadFile, job->sources_count, workers);
+        Py_END_ALLOW_THREADS;
+        if (PyXmlSec_LoadCheck(job, paths) < 0) goto ON_EXIT;
+    }
+    if (PyXmlSec_LoadSplit(job) < 0) goto ON_EXIT;
+    Py_BEGIN_ALLOW_THREADS;
+    PyXmlSec_LoadRun(job, PyXmlSec_LoadParseItem, job->items_count, workers);
+    Py_END_ALLOW_THREADS;
+    if (PyXmlSec_LoadCheck(job, paths) < 0) goto ON_EXIT;
+
+    // the manager could become busy while the gil was released
+    if (PyXmlSec_KeysManagerCheckNotBusy(mgr) != 0) goto ON_EXIT;
+    // the items, which are adopted before a failure, stay in the manager
+    mgr->generation++;
+    result = PyXmlSec_LoadAdopt(mgr, job, type);
+ON_EXIT:
+    for (i = 0; i < job->items_count; ++i) {
+        if (job->items[i].key != NULL) xmlSecKeyDestroy(job->items[i].key);
+    }
+    PyMem_Free(job->items);
+    job->items = NULL;
+    for (i = 0; i < job->sources_count; ++i) {
+        if (job->sources[i].owned) PyMem_RawFree(job->sources[i].data);
+    }
+    if (job->lock != NULL) PyThread_free_lock(job->lock);
+    if (job->done != NULL) PyThread_free_lock(job->done);
+    return result;
+}
+
+// returns the sorted paths of the regular files in the directory, which names match any of patterns
+static PyObject* PyXmlSec_KeysManagerListFiles(PyObject* path, PyObject* patterns) {
+    PyObject* os = NULL;
+    PyObject* os_path = NULL;
+    PyObject* fnmatch = NULL;
+    PyObject* directory = NULL;
+    PyObject* names = NULL;
+    PyObject* seq = NULL;
+    PyObject* result = NULL;
+    PyObject* name;
+    PyObject* file = NULL;
+    PyObject* tmp;
+    Py_ssize_t i;
+    Py_ssize_t j;
+    int matched;
+
+    if ((os = PyImport_ImportModule("os")) == NULL) goto ON_FAIL;
+    if ((os_path = PyImport_ImportModule("os.path")) == NULL) goto ON_FAIL;
+    if ((fnmatch = PyImport_ImportModule("fnmatch")) == NULL) goto ON_FAIL;
+    if (PyUnicode_Check(patterns)) {
+        seq = PyTuple_Pack(1, patterns);
+    } else {
+        seq = PySequence_Fast(patterns, "patterns must be a sequence of str.");
+    }
+    if (seq == NULL) goto ON_FAIL;
+
+    if ((directory = PyObject_CallMethod(os, "fsdecode", "O", path)) == NULL) goto ON_FAIL;
+    if ((names = PyObject_CallMethod(os, "listdir", "O", directory)) == NULL) goto ON_FAIL;
+    if (PyList_Sort(names) < 0) goto ON_FAIL;
+    if ((result = PyList_New(0)) == NULL) goto ON_FAIL;
+
+    for (i = 0; i < PyList_GET_SIZE(names); ++i) {
+        name = PyList_GET_ITEM(names, i);
+        matched = 0;
+        for (j = 0; j < PySequence_Fast_GET_SIZE(seq) && !matched; ++j) {
+            if ((tmp = PyObject_CallMethod(fnmatch, "fnmatch", "OO", name, PySequence_Fast_GET_ITEM(seq, j))) == NULL) goto ON_FAIL;
+            matched = PyObject_IsTrue(tmp);
+            Py_DECREF(tmp);
+            if (matched < 0) goto ON_FAIL;
+        }
+        if (!matched) continue;
+        if ((file = PyObject_CallMethod(os_path, "join", "OO", directory, name)) == NULL) goto ON_FAIL;
+        if ((tmp = PyObject_CallMethod(os_path, "isfile", "O", file)) == NULL) goto ON_FAIL;
+        matched = PyObject_IsTrue(tmp);
+        Py_DECREF(tmp);
+        if (matched < 0) goto ON_FAIL;
+        if (matched && PyList_Append(result, file) < 0) goto ON_FAIL;
+        Py_CLEAR(file);
+    }
+    goto ON_EXIT;
+ON_FAIL:
+    Py_CLEAR(result);
+ON_EXIT:
+    Py_XDECREF(file);
+    Py_XDECREF(names);
+    Py_XDECREF(directory);
+    Py_XDECREF(seq);
+    Py_XDECREF(fnmatch);
+    Py_XDECREF(os_path);
+    Py_XDECREF(os);
+    return result;
+}
+
+static const char PyXmlSec_KeysManagerLoadDirectory__doc__[] = \
+    "load_directory(path, patterns = ('*.pem', '*.crt', '*.cer', '*.der', '*.key'), workers = None, "
+    "type = KeyDataTypeTrusted, password = None) -> tuple[int, int]\n"
+    "Loads the certificates and the keys from the files in the directory ``path``, which names match any of ``patterns``.\n\n"
+    "The files are read and parsed on up to ``workers`` threads without the GIL. A PEM file may hold any number of "
+    "certificates and keys, the other files are DER encoded keys or certificates. The keys are named by their files. "
+    "The duplicates are recognized by the SHA-256 fingerprint and loaded once. Nothing is loaded if any file fails "
+    "to be read or parsed. The parsed keys and certificates are added one by one, if adding one of them fails, e.g. "
+    "when the memory is exhausted, the ones added before it stay in the manager.\n\n"
+    ":param path: the directory\n"
+    ":type path: :class:`str`, :class:`bytes` or any :class:`~os.PathLike`\n"
+    ":param patterns: the shell-style wildcards of the file names\n"
+    ":type patterns: :class:`str` or :class:`~collections.abc.Sequence` of :class:`str`\n"
+    ":param workers: the maximum number of threads, :func:`os.cpu_count` by default\n"
+    ":type workers: :class:`int` or :data:`None`\n"
+    ":param type: the flag that indicates whether the certificates are trusted\n"
+    ":type type: :class:`int`\n"
+    ":param password: the password of the encrypted keys\n"
+    ":type password: :class:`str` or :data:`None`\n"
+    ":return: the number of the loaded certificates and keys\n"
+    ":rtype: :class:`tuple`";
+static PyObject* PyXmlSec_KeysManagerLoadDirectory(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "path", "patterns", "workers", "type", "password", NULL};
+
+    PyXmlSec_KeysManager* mgr = (PyXmlSec_KeysManager*)self;
+    PyXmlSec_LoadJob job = {0};
+    PyObject* path = NULL;
+    PyObject* patterns = NULL;
+    PyObject* workers_obj = Py_None;
+    PyObject* paths = NULL;
+    PyObject* encoded = NULL;
+    PyObject* os_path = NULL;
+    PyObject* result = NULL;
+    PyObject* tmp;
+    const char* password = NULL;
+    unsigned int type = xmlSecKeyDataTypeTrusted;
+    Py_ssize_t i;
+
+    PYXMLSEC_DEBUGF("%p: load directory - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|OOIz:load_directory", kwlist, &path, &patterns, &workers_obj, &type, &password)) {
+        goto ON_FAIL;
+    }
+    if (patterns == NULL) {
+        patterns = Py_BuildValue("(sssss)", "*.pem", "*.crt", "*.cer", "*.der", "*.key");
+    } else {
+        Py_INCREF(patterns);
+    }
+    if (patterns == NULL) goto ON_FAIL;
+    paths = PyXmlSec_KeysManagerListFiles(path, patterns);
+    Py_DECREF(patterns);
+    if (paths == NULL) goto ON_FAIL;
+
+    // the encoded file name and the name of the key for each file
+    job.sources_count = PyList_GET_SIZE(paths);
+    if ((encoded = PyList_New(0)) == NULL) goto ON_FAIL;
+    if ((os_path = PyImport_ImportModule("os.path")) == NULL) goto ON_FAIL;
+    if ((job.sources = PyMem_New(PyXmlSec_LoadSource, job.sources_count > 0 ? job.sources_count : 1)) == NULL) {
+        PyErr_NoMemory();
+        goto ON_FAIL;
+    }
+    memset(job.sources, 0, sizeof(PyXmlSec_LoadSource) * (size_t)job.sources_count);
+    for (i = 0; i < job.sources_count; ++i) {
+        if ((tmp = PyUnicode_EncodeFSDefault(PyList_GET_ITEM(paths, i))) == NULL) goto ON_FAIL;
+        if (PyList_Append(encoded, tmp) < 0) {
+            Py_DECREF(tmp);
+            goto ON_FAIL;
+        }
+        Py_DECREF(tmp);
+        job.sources[i].path = PyBytes_AS_STRING(tmp);
+        if ((tmp = PyObject_CallMethod(os_path, "basename", "O", PyList_GET_ITEM(paths, i))) == NULL) goto ON_FAIL;
+        if (PyList_Append(encoded, tmp) < 0) {
+            Py_DECREF(tmp);
+            goto ON_FAIL;
+        }
+        Py_DECREF(tmp);
+        if ((job.sources[i].name = PyUnicode_AsUTF8(tmp)) == NULL) goto ON_FAIL;
+    }
+    job.password = password;
+    if ((result = PyXmlSec_KeysManagerLoad(mgr, &job, paths, workers_obj, type)) == NULL) goto ON_FAIL;
+
+    PYXMLSEC_DEBUGF("%p: load directory - ok", self);
+    goto ON_EXIT;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: load directory - fail", self);
+ON_EXIT:
+    PyMem_Free(job.sources);
+    Py_XDECREF(os_path);
+    Py_XDECREF(encoded);
+    Py_XDECREF(paths);
+    return result;
+}
+
+static const char PyXmlSec_KeysManagerLoadPemBundle__doc__[] = \
+    "load_pem_bundle(data, workers = None, type = KeyDataTypeTrusted, password = None) -> tuple[int, int]\n"
+    "Loads the certificates and the keys from the PEM blocks in ``data``, the blocks of other types are skipped. "
+    ":exc:`xmlsec.Error` is raised if ``data`` has no PEM blocks at all.\n\n"
+    "The blocks are parsed on up to ``workers`` threads without the GIL. The duplicates are recognized "
+    "by the SHA-256 fingerprint and loaded once. Nothing is loaded if any block fails to be parsed. "
+    "The parsed keys and certificates are added one by one, if adding one of them fails, e.g. "
+    "when the memory is exhausted, the ones added before it stay in the manager.\n\n"
+    ":param data: the concatenated PEM blocks\n"
+    ":type data: :class:`str`, :class:`bytes` or any :term:`bytes-like object`\n"
+    ":param workers: the maximum number of threads, :func:`os.cpu_count` by default\n"
+    ":type workers: :class:`int` or :data:`None`\n"
+    ":param type: the flag that indicates whether the certificates are trusted\n"
+    ":type type: :class:`int`\n"
+    ":param password: the password of the encrypted keys\n"
+    ":type password: :class:`str` or :data:`None`\n"
+    ":return: the number of the loaded certificates and keys\n"
+    ":rtype: :class:`tuple`";
+static PyObject* PyXmlSec_KeysManagerLoadPemBundle(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "data", "workers", "type", "password", NULL};
+
+    PyXmlSec_KeysManager* mgr = (PyXmlSec_KeysManager*)self;
+    PyXmlSec_LoadJob job = {0};
+    PyXmlSec_LoadSource source = {0};
+    PyObject* workers_obj = Py_None;
+    PyObject* result = NULL;
+    Py_buffer data = {0};
+    const char* password = NULL;
+    unsigned int type = xmlSecKeyDataTypeTrusted;
+
+    PYXMLSEC_DEBUGF("%p: load pem bundle - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "s*|OIz:load_pem_bundle", kwlist, &data, &workers_obj, &type, &password)) {
+        goto ON_FAIL;
+    }
+    // the data without PEM blocks is not DER
+    if (PyXmlSec_LoadFind((const xmlSecByte*)data.buf, (const xmlSecByte*)data.buf + data.len, "-----BEGIN ") == NULL) {
+        PyErr_SetString(PyXmlSec_Error, "data has no PEM blocks.");
+        goto ON_FAIL;
+    }
+    source.data = (xmlSecByte*)data.buf;
+    source.size = (xmlSecSize)data.len;
+    job.sources = &source;
+    job.sources_count = 1;
+    job.password = password;
+    if ((result = PyXmlSec_KeysManagerLoad(mgr, &job, NULL, workers_obj, type)) == NULL) goto ON_FAIL;
+
+    PYXMLSEC_DEBUGF("%p: load pem bundle - ok", self);
+    goto ON_EXIT;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: load pem bundle - fail", self);
+ON_EXIT:
+    PyBuffer_Release(&data);
+    return result;
+}
+
 static PyMethodDef PyXmlSec_KeysManagerMethods[] = {
     {
         "add_key",
@@ -834,9 +2013,42 @@ static PyMethodDef PyXmlSec_KeysManagerMethods[] = {
         METH_VARARGS|METH_KEYWORDS,
         PyXmlSec_KeysManagerLoadCertFromMemory__doc__
     },
+    {
+        "load_directory",
+        (PyCFunction)PyXmlSec_KeysManagerLoadDirectory,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_KeysManagerLoadDirectory__doc__
+    },
+    {
+        "load_pem_bundle",
+        (PyCFunction)PyXmlSec_KeysManagerLoadPemBundle,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_KeysManagerLoadPemBundle__doc__
+    },
     {NULL, NULL} /* sentinel */
 };
 
+static const char PyXmlSec_KeysManager__doc__[] = \
+    "KeysManager(indexed = False, resolver = None, maxsize = 128, ttl = None)\n"
+    "Keys Manager\n\n"
+    "By default the keys are found by scanning the list of the added keys. "
+    "An indexed manager finds the keys by :xml:`<dsig:KeyName/>` through a hash index, "
+    "so the lookup does not slow down as the number of keys grows.\n\n"
+    "A manager with ``resolver`` is indexed and loads the keys on demand: when no added key is found, "
+    "``resolver(name, klass, type)`` is called with the :xml:`<dsig:KeyName/>` (or :data:`None`), "
+    "the requested :class:`~xmlsec.constants.__KeyData` (or :data:`None`) and the requested key type, "
+    "and returns :class:`~xmlsec.Key` or :data:`None`. The named keys are remembered, "
+    "so the GIL is taken only when the key is not known yet. The exceptions of the resolver are reported "
+    "by :func:`sys.unraisablehook` and the key is not found.\n\n"
+    ":param indexed: index the keys by name\n"
+    ":type indexed: :class:`bool`\n"
+    ":param resolver: the callback, which loads the keys\n"
+    ":type resolver: :class:`~collections.abc.Callable` or :data:`None`\n"
+    ":param maxsize: the maximal number of the remembered resolved keys, the least recently used ones are forgotten first\n"
+    ":type maxsize: :class:`int`\n"
+    ":param ttl: the number of seconds the resolved key is remembered for, forever if :data:`None`\n"
+    ":type ttl: :class:`float` or :data:`None`";
+
 static PyTypeObject _PyXmlSec_KeysManagerType = {
     PyVarObject_HEAD_INIT(NULL, 0)
     STRINGIFY(MODULE_NAME) ".KeysManager",      /* tp_name */
@@ -858,7 +2070,7 @@ static PyTypeObject _PyXmlSec_KeysManagerType = {
     0,                                          /* tp_setattro */
     0,                                          /* tp_as_buffer */
     Py_TPFLAGS_DEFAULT|Py_TPFLAGS_BASETYPE,     /* tp_flags */
-    "Keys Manager",                             /* tp_doc */
+    PyXmlSec_KeysManager__doc__,                /* tp_doc */
     0,                                          /* tp_traverse */
     0,                                          /* tp_clear */
     0,                                          /* tp_richcompare */
@@ -24,9 +24,14 @@ extern PyTypeObject* PyXmlSec_KeyType;
 
 PyXmlSec_Key* PyXmlSec_NewKey(void);
 
-typedef struct {
+typedef struct _PyXmlSec_KeysManager {
     PyObject_HEAD
     xmlSecKeysMngrPtr handle;
+    int busy;  // the number of running operations which share the manager between threads
+    unsigned long long serial;  // unique within the process, identifies the manager in the verification cache
+    unsigned long long generation;  // incremented by every change of the keys and the certificates
+    struct _PyXmlSec_KeysManager* prev;  // the list of all managers, which is guarded by the gil
+    struct _PyXmlSec_KeysManager* next;
 } PyXmlSec_KeysManager;
 
 extern PyTypeObject* PyXmlSec_KeysManagerType;
@@ -34,4 +39,10 @@ extern PyTypeObject* PyXmlSec_KeysManagerType;
 // converts object `o` to PyXmlSec_KeysManager, None will be converted to NULL, increments ref_count
 int PyXmlSec_KeysManagerConvert(PyObject* o, PyXmlSec_KeysManager** p);
 
+// locks the keys stores of all managers before fork, returns the list of the locked managers
+PyObject* PyXmlSec_KeysManagersBeforeFork(void);
+
+// unlocks the managers locked before fork, in the child process the managers are no longer used by any operation
+void PyXmlSec_KeysManagersAfterFork(PyObject* locked, int child);
+
 #endif //__PYXMLSEC_KEY_H__
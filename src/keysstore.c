@@ -0,0 +1,410 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+#include "common.h"
+#include "constants.h"
+#include "exception.h"
+#include "keys.h"
+#include "keysstore.h"
+#include "utils.h"
+
+#include <xmlsec/crypto.h>
+#include <xmlsec/keys.h>
+#include <xmlsec/list.h>
+
+#include <libxml/hash.h>
+
+#include <string.h>
+
+// the keys with the same name in the order of adding, the keys are owned by the list of all keys
+typedef struct {
+    xmlSecSize size;
+    xmlSecKeyPtr keys[1];
+} PyXmlSec_KeysBucket;
+
+// the key returned by the resolver of the lazy keys store, in the list of the least recently used keys
+typedef struct _PyXmlSec_ResolvedKey {
+    struct _PyXmlSec_ResolvedKey* prev;
+    struct _PyXmlSec_ResolvedKey* next;
+    xmlSecKeyPtr key;
+    double expires;
+} PyXmlSec_ResolvedKey;
+
+typedef struct {
+    // the keys and the resolved keys are guarded by the lock, since they are looked up without GIL
+    PyThread_type_lock lock;
+    xmlSecPtrList keys;      // all keys in the order of adding
+    xmlHashTablePtr index;   // (name, NULL) and (name, key data name) -> PyXmlSec_KeysBucket
+    // the lazy keys store only
+    PyObject* resolver;
+    xmlHashTablePtr resolved;   // name -> PyXmlSec_ResolvedKey
+    PyXmlSec_ResolvedKey* head; // the least recently used key
+    PyXmlSec_ResolvedKey* tail;
+    xmlSecSize size;
+    xmlSecSize maxsize;
+    double ttl;
+} PyXmlSec_IndexedKeysStoreCtx;
+
+#define PyXmlSec_IndexedKeysStoreSize (sizeof(xmlSecKeyStore) + sizeof(PyXmlSec_IndexedKeysStoreCtx))
+#define PyXmlSec_IndexedKeysStoreGetCtx(store) \
+    ((PyXmlSec_IndexedKeysStoreCtx*)(((xmlSecByte*)(store)) + sizeof(xmlSecKeyStore)))
+
+static void PyXmlSec_KeysBucketFree(void* payload, const xmlChar* name) {
+    xmlFree(payload);
+}
+
+static int PyXmlSec_IndexedKeysStoreInitialize(xmlSecKeyStorePtr store) {
+    PyXmlSec_IndexedKeysStoreCtx* ctx = PyXmlSec_IndexedKeysStoreGetCtx(store);
+
+    if ((ctx->lock = PyThread_allocate_lock()) == NULL) return -1;
+    if (xmlSecPtrListInitialize(&(ctx->keys), xmlSecKeyPtrListId) < 0) {
+        PyThread_free_lock(ctx->lock);
+        ctx->lock = NULL;
+        return -1;
+    }
+    if ((ctx->index = xmlHashCreate(0)) == NULL) {
+        xmlSecPtrListFinalize(&(ctx->keys));
+        PyThread_free_lock(ctx->lock);
+        ctx->lock = NULL;
+        return -1;
+    }
+    return 0;
+}
+
+static void PyXmlSec_IndexedKeysStoreFinalize(xmlSecKeyStorePtr store) {
+    PyXmlSec_IndexedKeysStoreCtx* ctx = PyXmlSec_IndexedKeysStoreGetCtx(store);
+
+    if (ctx->index != NULL) {
+        xmlHashFree(ctx->index, PyXmlSec_KeysBucketFree);
+        ctx->index = NULL;
+    }
+    xmlSecPtrListFinalize(&(ctx->keys));
+    if (ctx->lock != NULL) {
+        PyThread_free_lock(ctx->lock);
+        ctx->lock = NULL;
+    }
+}
+
+// finds the key in the same way as the simple keys store: the first added key, which matches the name and the requirements;
+// the key without name is looked up by the requirements only.
+static xmlSecKeyPtr PyXmlSec_IndexedKeysStoreFindKey(xmlSecKeyStorePtr store, const xmlChar* name, xmlSecKeyInfoCtxPtr keyInfoCtx) {
+    PyXmlSec_IndexedKeysStoreCtx* ctx = PyXmlSec_IndexedKeysStoreGetCtx(store);
+    PyXmlSec_KeysBucket* bucket;
+    const xmlChar* type = NULL;
+    xmlSecKeyPtr key = NULL;
+    xmlSecKeyPtr item;
+    xmlSecSize pos;
+    xmlSecSize size;
+
+    // the keys of the other types never match the requirements, so they are not scanned
+    if (keyInfoCtx->keyReq.keyId != xmlSecKeyDataIdUnknown) type = xmlSecKeyDataKlassGetName(keyInfoCtx->keyReq.keyId);
+
+    PyThread_acquire_lock(ctx->lock, WAIT_LOCK);
+    if (name != NULL) {
+        bucket = (PyXmlSec_KeysBucket*)xmlHashLookup2(ctx->index, name, type);
+        for (pos = 0; bucket != NULL && pos < bucket->size; ++pos) {
+            if (xmlSecKeyMatch(bucket->keys[pos], name, &(keyInfoCtx->keyReq)) == 1) {
+                key = xmlSecKeyDuplicate(bucket->keys[pos]);
+                break;
+            }
+        }
+    } else {
+        size = xmlSecPtrListGetSize(&(ctx->keys));
+        for (pos = 0; pos < size; ++pos) {
+            item = (xmlSecKeyPtr)xmlSecPtrListGetItem(&(ctx->keys), pos);
+            if (item != NULL && xmlSecKeyMatch(item, NULL, &(keyInfoCtx->keyReq)) == 1) {
+                key = xmlSecKeyDuplicate(item);
+                break;
+            }
+        }
+    }
+    PyThread_release_lock(ctx->lock);
+    return key;
+}
+
+static xmlSecKeyStoreKlass PyXmlSec_IndexedKeysStoreKlass = {
+    sizeof(xmlSecKeyStoreKlass),
+    PyXmlSec_IndexedKeysStoreSize,
+    BAD_CAST "indexed-keys-store",              /* const xmlChar* name; */
+    PyXmlSec_IndexedKeysStoreInitialize,        /* xmlSecKeyStoreInitializeMethod initialize; */
+    PyXmlSec_IndexedKeysStoreFinalize,          /* xmlSecKeyStoreFinalizeMethod finalize; */
+    PyXmlSec_IndexedKeysStoreFindKey,           /* xmlSecKeyStoreFindKeyMethod findKey; */
+    NULL,                                       /* void* reserved0; */
+    NULL,                                       /* void* reserved1; */
+};
+
+xmlSecKeyStoreId PyXmlSec_IndexedKeysStoreGetKlass(void) {
+    return &PyXmlSec_IndexedKeysStoreKlass;
+}
+
+// replaces the bucket of (name, type) by a larger one with the key after the end, so a failure leaves the index untouched;
+// the key is hidden until the size of the bucket is incremented. the lock must be held.
+static PyXmlSec_KeysBucket* PyXmlSec_IndexedKeysStoreGrowBucket(PyXmlSec_IndexedKeysStoreCtx* ctx, const xmlChar* name, const xmlChar* type, xmlSecKeyPtr key) {
+    PyXmlSec_KeysBucket* bucket;
+    PyXmlSec_KeysBucket* old;
+    xmlSecSize size = 0;
+
+    if ((old = (PyXmlSec_KeysBucket*)xmlHashLookup2(ctx->index, name, type)) != NULL) size = old->size;
+    if ((bucket = (PyXmlSec_KeysBucket*)xmlMalloc(sizeof(PyXmlSec_KeysBucket) + size * sizeof(xmlSecKeyPtr))) == NULL) return NULL;
+    if (old != NULL) memcpy(bucket->keys, old->keys, size * sizeof(xmlSecKeyPtr));
+    bucket->size = size;
+    bucket->keys[size] = key;
+    if (xmlHashUpdateEntry2(ctx->index, name, type, bucket, PyXmlSec_KeysBucketFree) < 0) {
+        xmlFree(bucket);
+        return NULL;
+    }
+    return bucket;
+}
+
+static int PyXmlSec_IndexedKeysStoreAdoptKey(xmlSecKeyStorePtr store, xmlSecKeyPtr key) {
+    PyXmlSec_IndexedKeysStoreCtx* ctx = PyXmlSec_IndexedKeysStoreGetCtx(store);
+    const xmlChar* name = xmlSecKeyGetName(key);
+    xmlSecKeyDataPtr value = xmlSecKeyGetValue(key);
+    PyXmlSec_KeysBucket* named = NULL;
+    PyXmlSec_KeysBucket* typed = NULL;
+    int rv = -1;
+
+    PyThread_acquire_lock(ctx->lock, WAIT_LOCK);
+    if (name != NULL) {
+        // the bucket of the name is used by the lookups without the key data type
+        if ((named = PyXmlSec_IndexedKeysStoreGrowBucket(ctx, name, NULL, key)) == NULL) goto ON_EXIT;
+        if (value != NULL) {
+            typed = PyXmlSec_IndexedKeysStoreGrowBucket(ctx, name, xmlSecKeyDataKlassGetName(value->id), key);
+            if (typed == NULL) goto ON_EXIT;
+        }
+    }
+    if (xmlSecPtrListAdd(&(ctx->keys), key) < 0) goto ON_EXIT;
+    // the key becomes visible only after it is owned by the store
+    if (named != NULL) named->size++;
+    if (typed != NULL) typed->size++;
+    rv = 0;
+ON_EXIT:
+    PyThread_release_lock(ctx->lock);
+    return rv;
+}
+
+static int PyXmlSec_LazyKeysStoreInitialize(xmlSecKeyStorePtr store) {
+    PyXmlSec_IndexedKeysStoreCtx* ctx = PyXmlSec_IndexedKeysStoreGetCtx(store);
+
+    if (PyXmlSec_IndexedKeysStoreInitialize(store) < 0) return -1;
+    if ((ctx->resolved = xmlHashCreate(0)) == NULL) {
+        PyXmlSec_IndexedKeysStoreFinalize(store);
+        return -1;
+    }
+    return 0;
+}
+
+// unlinks the key from the list of the least recently used keys
+static void PyXmlSec_LazyKeysStoreUnlink(PyXmlSec_IndexedKeysStoreCtx* ctx, PyXmlSec_ResolvedKey* entry) {
+    if (entry->prev != NULL) entry->prev->next = entry->next; else ctx->head = entry->next;
+    if (entry->next != NULL) entry->next->prev = entry->prev; else ctx->tail = entry->prev;
+    entry->prev = entry->next = NULL;
+}
+
+// links the key as the most recently used one
+static void PyXmlSec_LazyKeysStoreLink(PyXmlSec_IndexedKeysStoreCtx* ctx, PyXmlSec_ResolvedKey* entry) {
+    entry->prev = ctx->tail;
+    entry->next = NULL;
+    if (ctx->tail != NULL) ctx->tail->next = entry; else ctx->head = entry;
+    ctx->tail = entry;
+}
+
+static void PyXmlSec_LazyKeysStoreRemove(PyXmlSec_IndexedKeysStoreCtx* ctx, PyXmlSec_ResolvedKey* entry) {
+    PyXmlSec_LazyKeysStoreUnlink(ctx, entry);
+    xmlHashRemoveEntry(ctx->resolved, xmlSecKeyGetName(entry->key), NULL);
+    xmlSecKeyDestroy(entry->key);
+    xmlFree(entry);
+    ctx->size--;
+}
+
+static void PyXmlSec_LazyKeysStoreFinalize(xmlSecKeyStorePtr store) {
+    PyXmlSec_IndexedKeysStoreCtx* ctx = PyXmlSec_IndexedKeysStoreGetCtx(store);
+    PyGILState_STATE state;
+
+    if (ctx->resolver != NULL) {
+        state = PyGILState_Ensure();
+        Py_CLEAR(ctx->resolver);
+        PyGILState_Release(state);
+    }
+    while (ctx->head != NULL) {
+        PyXmlSec_LazyKeysStoreRemove(ctx, ctx->head);
+    }
+    if (ctx->resolved != NULL) {
+        xmlHashFree(ctx->resolved, NULL);
+        ctx->resolved = NULL;
+    }
+    PyXmlSec_IndexedKeysStoreFinalize(store);
+}
+
+// finds the resolved key, the expired key is forgotten
+static xmlSecKeyPtr PyXmlSec_LazyKeysStoreLookup(PyXmlSec_IndexedKeysStoreCtx* ctx, const xmlChar* name, xmlSecKeyInfoCtxPtr keyInfoCtx) {
+    PyXmlSec_ResolvedKey* entry;
+    xmlSecKeyPtr key = NULL;
+
+    PyThread_acquire_lock(ctx->lock, WAIT_LOCK);
+    entry = (PyXmlSec_ResolvedKey*)xmlHashLookup(ctx->resolved, name);
+    if (entry != NULL && ctx->ttl > 0 && entry->expires <= PyXmlSec_GetTime()) {
+        PyXmlSec_LazyKeysStoreRemove(ctx, entry);
+        entry = NULL;
+    }
+    if (entry != NULL && xmlSecKeyMatch(entry->key, name, &(keyInfoCtx->keyReq)) == 1) {
+        PyXmlSec_LazyKeysStoreUnlink(ctx, entry);
+        PyXmlSec_LazyKeysStoreLink(ctx, entry);
+        key = xmlSecKeyDuplicate(entry->key);
+    }
+    PyThread_release_lock(ctx->lock);
+    return key;
+}
+
+// remembers the copy of the resolved key, the least recently used keys are forgotten
+static void PyXmlSec_LazyKeysStoreRemember(PyXmlSec_IndexedKeysStoreCtx* ctx, xmlSecKeyPtr key) {
+    PyXmlSec_ResolvedKey* entry;
+    PyXmlSec_ResolvedKey* old;
+
+    if (ctx->maxsize == 0) return;
+    if ((entry = (PyXmlSec_ResolvedKey*)xmlMalloc(sizeof(PyXmlSec_ResolvedKey))) == NULL) return;
+    if ((entry->key = xmlSecKeyDuplicate(key)) == NULL) {
+        xmlFree(entry);
+        return;
+    }
+    entry->prev = entry->next = NULL;
+    entry->expires = ctx->ttl > 0 ? PyXmlSec_GetTime() + ctx->ttl : 0;
+
+    PyThread_acquire_lock(ctx->lock, WAIT_LOCK);
+    // the key could be resolved by another thread meanwhile
+    if ((old = (PyXmlSec_ResolvedKey*)xmlHashLookup(ctx->resolved, xmlSecKeyGetName(key))) != NULL) {
+        PyXmlSec_LazyKeysStoreRemove(ctx, old);
+    }
+    if (xmlHashAddEntry(ctx->resolved, xmlSecKeyGetName(entry->key), entry) < 0) {
+        xmlSecKeyDestroy(entry->key);
+        xmlFree(entry);
+    } else {
+        PyXmlSec_LazyKeysStoreLink(ctx, entry);
+        ctx->size++;
+        while (ctx->size > ctx->maxsize) {
+            PyXmlSec_LazyKeysStoreRemove(ctx, ctx->head);
+        }
+    }
+    PyThread_release_lock(ctx->lock);
+}
+
+// asks the resolver for the key, the errors of the resolver are reported as unraisable and the key is not found
+static xmlSecKeyPtr PyXmlSec_LazyKeysStoreResolve(PyXmlSec_IndexedKeysStoreCtx* ctx, const xmlChar* name, xmlSecKeyInfoCtxPtr keyInfoCtx) {
+    PyGILState_STATE state = PyGILState_Ensure();
+    PyObject* klass = NULL;
+    PyObject* result = NULL;
+    xmlSecKeyPtr key = NULL;
+
+    if (keyInfoCtx->keyReq.keyId != xmlSecKeyDataIdUnknown) {
+        klass = PyXmlSec_KeyDataFromId(keyInfoCtx->keyReq.keyId);
+    } else {
+        Py_INCREF(Py_None);
+        klass = Py_None;
+    }
+    if (klass == NULL) goto ON_FAIL;
+    result = PyObject_CallFunction(ctx->resolver, "zOI", (const char*)name, klass, keyInfoCtx->keyReq.keyType);
+    if (result == NULL) goto ON_FAIL;
+    if (result != Py_None) {
+        if (!PyObject_TypeCheck(result, PyXmlSec_KeyType)) {
+            PyErr_Format(PyExc_TypeError, "resolver must return xmlsec.Key or None, not %s.", Py_TYPE(result)->tp_name);
+            goto ON_FAIL;
+        }
+        if (((PyXmlSec_Key*)result)->handle == NULL) {
+            PyErr_SetString(PyExc_ValueError, "the resolved key is invalid");
+            goto ON_FAIL;
+        }
+        if ((key = xmlSecKeyDuplicate(((PyXmlSec_Key*)result)->handle)) == NULL) {
+            PyXmlSec_SetLastError("cannot make copy of key");
+            goto ON_FAIL;
+        }
+    }
+    goto ON_EXIT;
+ON_FAIL:
+    PyErr_WriteUnraisable(ctx->resolver);
+ON_EXIT:
+    Py_XDECREF(result);
+    Py_XDECREF(klass);
+    PyGILState_Release(state);
+
+    // the key is found by the name, which the resolver was asked for
+    if (key != NULL && name != NULL) {
+        if (xmlSecKeySetName(key, name) < 0) {
+            xmlSecKeyDestroy(key);
+            return NULL;
+        }
+        PyXmlSec_LazyKeysStoreRemember(ctx, key);
+    }
+    return key;
+}
+
+// the added keys are found first, then the resolved ones; the resolver is asked only if neither is found
+static xmlSecKeyPtr PyXmlSec_LazyKeysStoreFindKey(xmlSecKeyStorePtr store, const xmlChar* name, xmlSecKeyInfoCtxPtr keyInfoCtx) {
+    PyXmlSec_IndexedKeysStoreCtx* ctx = PyXmlSec_IndexedKeysStoreGetCtx(store);
+    xmlSecKeyPtr key;
+
+    if ((key = PyXmlSec_IndexedKeysStoreFindKey(store, name, keyInfoCtx)) != NULL) return key;
+    if (name != NULL && (key = PyXmlSec_LazyKeysStoreLookup(ctx, name, keyInfoCtx)) != NULL) return key;
+    if (ctx->resolver == NULL) return NULL;
+    return PyXmlSec_LazyKeysStoreResolve(ctx, name, keyInfoCtx);
+}
+
+static xmlSecKeyStoreKlass PyXmlSec_LazyKeysStoreKlass = {
+    sizeof(xmlSecKeyStoreKlass),
+    PyXmlSec_IndexedKeysStoreSize,
+    BAD_CAST "lazy-keys-store",                 /* const xmlChar* name; */
+    PyXmlSec_LazyKeysStoreInitialize,           /* xmlSecKeyStoreInitializeMethod initialize; */
+    PyXmlSec_LazyKeysStoreFinalize,             /* xmlSecKeyStoreFinalizeMethod finalize; */
+    PyXmlSec_LazyKeysStoreFindKey,              /* xmlSecKeyStoreFindKeyMethod findKey; */
+    NULL,                                       /* void* reserved0; */
+    NULL,                                       /* void* reserved1; */
+};
+
+xmlSecKeyStoreId PyXmlSec_LazyKeysStoreGetKlass(void) {
+    return &PyXmlSec_LazyKeysStoreKlass;
+}
+
+void PyXmlSec_LazyKeysStoreSetResolver(xmlSecKeyStorePtr store, PyObject* resolver, xmlSecSize maxsize, double ttl) {
+    PyXmlSec_IndexedKeysStoreCtx* ctx = PyXmlSec_IndexedKeysStoreGetCtx(store);
+
+    Py_INCREF(resolver);
+    Py_XSETREF(ctx->resolver, resolver);
+    ctx->maxsize = maxsize;
+    ctx->ttl = ttl;
+}
+
+// checks that the store is the indexed or the lazy keys store
+static int PyXmlSec_KeysStoreIsIndexed(xmlSecKeyStorePtr store) {
+    return store != NULL && (xmlSecKeyStoreCheckId(store, PyXmlSec_IndexedKeysStoreId) || xmlSecKeyStoreCheckId(store, PyXmlSec_LazyKeysStoreId));
+}
+
+void PyXmlSec_KeysStoreBeforeFork(xmlSecKeyStorePtr store) {
+    PyXmlSec_IndexedKeysStoreCtx* ctx;
+
+    if (!PyXmlSec_KeysStoreIsIndexed(store)) return;
+    ctx = PyXmlSec_IndexedKeysStoreGetCtx(store);
+    if (!PyThread_acquire_lock(ctx->lock, NOWAIT_LOCK)) {
+        Py_BEGIN_ALLOW_THREADS;
+        PyThread_acquire_lock(ctx->lock, WAIT_LOCK);
+        Py_END_ALLOW_THREADS;
+    }
+}
+
+void PyXmlSec_KeysStoreAfterFork(xmlSecKeyStorePtr store) {
+    if (!PyXmlSec_KeysStoreIsIndexed(store)) return;
+    PyThread_release_lock(PyXmlSec_IndexedKeysStoreGetCtx(store)->lock);
+}
+
+int PyXmlSec_KeysMngrAdoptKey(xmlSecKeysMngrPtr mngr, xmlSecKeyPtr key) {
+    xmlSecKeyStorePtr store = xmlSecKeysMngrGetKeysStore(mngr);
+
+    if (PyXmlSec_KeysStoreIsIndexed(store)) {
+        return PyXmlSec_IndexedKeysStoreAdoptKey(store, key);
+    }
+    return xmlSecCryptoAppDefaultKeysMngrAdoptKey(mngr, key);
+}
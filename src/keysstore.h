@@ -0,0 +1,39 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+#ifndef __PYXMLSEC_KEYSSTORE_H__
+#define __PYXMLSEC_KEYSSTORE_H__
+
+#include "platform.h"
+
+#include <xmlsec/xmlsec.h>
+#include <xmlsec/keysmngr.h>
+
+// the keys store, which finds the keys by name through a hash index instead of scanning the list of keys
+#define PyXmlSec_IndexedKeysStoreId PyXmlSec_IndexedKeysStoreGetKlass()
+xmlSecKeyStoreId PyXmlSec_IndexedKeysStoreGetKlass(void);
+
+// the indexed keys store, which asks the python resolver for the keys, which are not found, and remembers them
+#define PyXmlSec_LazyKeysStoreId PyXmlSec_LazyKeysStoreGetKlass()
+xmlSecKeyStoreId PyXmlSec_LazyKeysStoreGetKlass(void);
+
+// sets the resolver of the lazy keys store, maxsize resolved keys are remembered for ttl seconds or forever if ttl is 0
+void PyXmlSec_LazyKeysStoreSetResolver(xmlSecKeyStorePtr store, PyObject* resolver, xmlSecSize maxsize, double ttl);
+
+// locks the keys of the indexed or the lazy keys store before fork, so the child gets them in a consistent state.
+// does nothing for the other keys stores. the gil is released while waiting for the lock.
+void PyXmlSec_KeysStoreBeforeFork(xmlSecKeyStorePtr store);
+
+// unlocks the keys, which are locked before fork, in the parent and in the child process
+void PyXmlSec_KeysStoreAfterFork(xmlSecKeyStorePtr store);
+
+// adds the key to the keys store of the manager, the manager owns the key on success
+int PyXmlSec_KeysMngrAdoptKey(xmlSecKeysMngrPtr mngr, xmlSecKeyPtr key);
+
+#endif //__PYXMLSEC_KEYSSTORE_H__
@@ -486,6 +486,20 @@ int PyXmlSec_DSModule_Init(PyObject* package);
 int PyXmlSec_EncModule_Init(PyObject* package);
 // templates management
 int PyXmlSec_TemplateModule_Init(PyObject* package);
+// parallel verification
+int PyXmlSec_ParallelModule_Init(PyObject* package);
+// asyncio operations
+int PyXmlSec_AioModule_Init(PyObject* package);
+// key loading cache
+int PyXmlSec_KeyCacheModule_Init(PyObject* package);
+// verification cache
+int PyXmlSec_CacheModule_Init(PyObject* package);
+// signature reports
+int PyXmlSec_ReportModule_Init(PyObject* package);
+// session key cache
+int PyXmlSec_SessionModule_Init(PyObject* package);
+// fork safety and preloading
+int PyXmlSec_ForkModule_Init(PyObject* package);
 
 static int PyXmlSec_PyClear(PyObject *self) {
     PyXmlSec_Free(free_mode);
@@ -521,18 +535,26 @@ PYENTRY_FUNC_NAME(void)
     // init first, since PyXmlSec_Init may raise XmlSecError
     if (PyXmlSec_ExceptionsModule_Init(module) < 0) goto ON_FAIL;
 
+    // lxml sets up libxml2 on import, it does not expect xmlsec to have done so already
+    if (PyXmlSec_InitLxmlModule() < 0) goto ON_FAIL;
     if (PyXmlSec_Init() < 0) goto ON_FAIL;
 
     if (PyModule_AddStringConstant(module, "__version__", STRINGIFY(MODULE_VERSION)) < 0) goto ON_FAIL;
 
-    if (PyXmlSec_InitLxmlModule() < 0) goto ON_FAIL;
     /* Populate final object settings */
     if (PyXmlSec_ConstantsModule_Init(module) < 0) goto ON_FAIL;
     if (PyXmlSec_KeyModule_Init(module) < 0) goto ON_FAIL;
     if (PyXmlSec_TreeModule_Init(module) < 0) goto ON_FAIL;
+    if (PyXmlSec_CacheModule_Init(module) < 0) goto ON_FAIL;
+    if (PyXmlSec_ReportModule_Init(module) < 0) goto ON_FAIL;
+    if (PyXmlSec_SessionModule_Init(module) < 0) goto ON_FAIL;
     if (PyXmlSec_DSModule_Init(module) < 0) goto ON_FAIL;
     if (PyXmlSec_EncModule_Init(module) < 0) goto ON_FAIL;
     if (PyXmlSec_TemplateModule_Init(module) < 0) goto ON_FAIL;
+    if (PyXmlSec_ParallelModule_Init(module) < 0) goto ON_FAIL;
+    if (PyXmlSec_AioModule_Init(module) < 0) goto ON_FAIL;
+    if (PyXmlSec_KeyCacheModule_Init(module) < 0) goto ON_FAIL;
+    if (PyXmlSec_ForkModule_Init(module) < 0) goto ON_FAIL;
 
     PY_MOD_RETURN(module);
 ON_FAIL:
@@ -0,0 +1,897 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+#include "common.h"
+#include "platform.h"
+#include "exception.h"
+#include "fork.h"
+#include "keys.h"
+#include "lxml.h"
+#include "ds.h"
+#include "utils.h"
+
+#include <xmlsec/xmltree.h>
+
+#include <pythread.h>
+
+#define PYXMLSEC_PARALLEL_DOC \
+    "Verification of many signatures on several threads or processes.\n\n" \
+    "The objects are shared between the threads by the following rules, which are enforced by this module:\n\n" \
+    "* the :class:`~xmlsec.KeysManager` is shared by all threads, it cannot be modified until the verification is over;\n" \
+    "* each thread uses its own signature context, which is reused for all nodes processed by the thread;\n" \
+    "* all nodes of documents sharing the same string dictionary are processed by the same thread one by one, " \
+    "the documents with different dictionaries are processed concurrently. " \
+    ":mod:`lxml` shares the dictionary between all documents parsed by the same thread, " \
+    "so parse the documents on different threads to have them verified concurrently.\n\n" \
+    "The documents must not be modified by other threads during the verification.\n\n" \
+    ":class:`ProcessVerifier` verifies serialized documents in worker processes, " \
+    "so the parsing of the documents does not hold the GIL of this process."
+
+// the node and the outcome of its verification
+typedef struct {
+    xmlNodePtr node;
+    Py_ssize_t next;  // the next node of the same document, -1 for the last one
+    int status;
+    int code;
+} PyXmlSec_ParallelItem;
+
+// the state shared by worker threads
+typedef struct {
+    xmlSecKeysMngrPtr manager;
+    PyXmlSec_ParallelItem* items;
+    Py_ssize_t* groups;  // the first node of each group of documents sharing the dictionary
+    Py_ssize_t groups_count;
+    Py_ssize_t next_group;  // guarded by lock
+    int running;            // guarded by lock
+    PyThread_type_lock lock;
+    PyThread_type_lock done;  // released by the last finished worker
+} PyXmlSec_ParallelJob;
+
+// verifies the node with the context and resets it, does not touch python objects
+static void PyXmlSec_ParallelVerifyNode(xmlSecDSigCtxPtr ctx, xmlNodePtr node, int* status, int* code) {
+    if (ctx == NULL || node == NULL) {
+        *status = xmlSecDSigStatusUnknown;
+        *code = -1;
+        return;
+    }
+    if (xmlSecDSigCtxVerify(ctx, node) < 0) {
+        *status = xmlSecDSigStatusUnknown;
+        *code = PyXmlSec_PopLastErrorCode();
+        if (*code == 0) {
+            *code = -1;
+        }
+    } else {
+        *status = ctx->status;
+        *code = PyXmlSec_PopLastErrorCode();
+        if (*status == xmlSecDSigStatusSucceeded) {
+            *code = 0;
+        }
+    }
+    PyXmlSec_DSigCtxResetState(ctx, 0);
+}
+
+// processes documents until there are no more left, does not touch python objects
+static void PyXmlSec_ParallelWorker(void* arg) {
+    PyXmlSec_ParallelJob* job = (PyXmlSec_ParallelJob*)arg;
+    PyXmlSec_ParallelItem* item;
+    xmlSecDSigCtxPtr ctx;
+    Py_ssize_t group;
+    Py_ssize_t i;
+    int last;
+
+    PyXmlSec_ClearError();
+    // the context is created once per thread and reset after each node
+    ctx = xmlSecDSigCtxCreate(job->manager);
+    PYXMLSEC_DEBUGF("parallel worker: context %p", ctx);
+
+    for (;;) {
+        PyThread_acquire_lock(job->lock, WAIT_LOCK);
+        group = job->next_group < job->groups_count ? job->groups[job->next_group++] : -1;
+        PyThread_release_lock(job->lock);
+        if (group < 0) break;
+
+        for (i = group; i >= 0; i = item->next) {
+            item = &(job->items[i]);
+            PyXmlSec_ParallelVerifyNode(ctx, item->node, &(item->status), &(item->code));
+        }
+    }
+
+    if (ctx != NULL) {
+        xmlSecDSigCtxDestroy(ctx);
+    }
+    PyXmlSec_ClearError();
+
+    PyThread_acquire_lock(job->lock, WAIT_LOCK);
+    last = (--job->running == 0);
+    PyThread_release_lock(job->lock);
+    if (last) {
+        PyThread_release_lock(job->done);
+    }
+}
+
+// splits the tuple of nodes by the dictionaries of their documents, items and groups should have space for all nodes
+// xmlsec adds ids and compiles xpath expressions into doc->dict without locking it,
+// the documents sharing the dictionary must not be processed concurrently
+static Py_ssize_t PyXmlSec_ParallelGroupNodes(PyObject* seq, PyXmlSec_ParallelItem* items, Py_ssize_t* groups) {
+    PyObject* tails = PyDict_New();  // the dictionary -> the index of the last node of its documents
+    PyObject* doc = NULL;
+    PyObject* tail;
+    PyObject* index;
+    PyXmlSec_LxmlElementPtr node = NULL;
+    Py_ssize_t count = PyTuple_GET_SIZE(seq);
+    Py_ssize_t groups_count = 0;
+    Py_ssize_t i;
+
+    if (tails == NULL) return -1;
+
+    for (i = 0; i < count; ++i) {
+        if (!PyXmlSec_LxmlElementConverter(PyTuple_GET_ITEM(seq, i), &node)) goto ON_FAIL;
+        items[i].node = node->_c_node;
+        items[i].next = -1;
+        items[i].status = xmlSecDSigStatusUnknown;
+        items[i].code = -1;
+
+        if (node->_c_node->doc->dict != NULL) {
+            doc = PyLong_FromVoidPtr(node->_c_node->doc->dict);
+        } else {
+            doc = PyLong_FromVoidPtr(node->_c_node->doc);
+        }
+        if (doc == NULL) goto ON_FAIL;
+        tail = PyDict_GetItemWithError(tails, doc);
+        if (tail != NULL) {
+            items[PyLong_AsSsize_t(tail)].next = i;
+        } else if (PyErr_Occurred()) {
+            goto ON_FAIL;
+        } else {
+            groups[groups_count++] = i;
+        }
+        if ((index = PyLong_FromSsize_t(i)) == NULL) goto ON_FAIL;
+        if (PyDict_SetItem(tails, doc, index) < 0) {
+            Py_DECREF(index);
+            goto ON_FAIL;
+        }
+        Py_DECREF(index);
+        Py_CLEAR(doc);
+    }
+
+    Py_DECREF(tails);
+    return groups_count;
+ON_FAIL:
+    Py_XDECREF(doc);
+    Py_DECREF(tails);
+    return -1;
+}
+
+static const char PyXmlSec_ParallelVerifyDocuments__doc__[] = \
+    "verify_documents(nodes, manager, workers = None) -> list[tuple[int, int]]\n"
+    "Verifies each of ``nodes`` using keys from ``manager`` on up to ``workers`` threads.\n\n"
+    "The GIL is released until all nodes are verified. The documents parsed by the same thread share "
+    "the string dictionary and are verified by the same worker. Like :meth:`~xmlsec.SignatureContext.verify_many`, "
+    "does not raise on invalid signatures or processing failures.\n\n"
+    ":param nodes: the pointers with :xml:`<dsig:Signature/>` nodes\n"
+    ":type nodes: :class:`~collections.abc.Iterable` of :class:`lxml.etree._Element`\n"
+    ":param manager: the keys manager shared by all threads\n"
+    ":type manager: :class:`~xmlsec.KeysManager`\n"
+    ":param workers: the maximum number of threads, :func:`os.cpu_count` by default\n"
+    ":type workers: :class:`int` or :data:`None`\n"
+    ":return: ``(status, code)`` for each node in the same order, where ``status`` is one of ``DSigStatus*`` constants "
+    "and ``code`` is the xmlsec error code, ``0`` if there was no error\n"
+    ":rtype: :class:`list` of :class:`tuple`";
+static PyObject* PyXmlSec_ParallelVerifyDocuments(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "nodes", "manager", "workers", NULL};
+
+    PyObject* nodes = NULL;
+    PyXmlSec_KeysManager* manager = NULL;
+    PyObject* workers_obj = Py_None;
+    PyObject* seq = NULL;
+    PyObject* result = NULL;
+    PyObject* tmp;
+    PyXmlSec_ParallelJob job = {0};
+    Py_ssize_t count;
+    Py_ssize_t i;
+    long workers;
+
+    PYXMLSEC_DEBUG("verify_documents - start");
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OO!|O:verify_documents", kwlist,
+        &nodes, PyXmlSec_KeysManagerType, &manager, &workers_obj))
+    {
+        goto ON_FAIL;
+    }
+
+    if (workers_obj == Py_None) {
+        workers = PyXmlSec_GetDefaultWorkers();
+    } else {
+        workers = PyLong_AsLong(workers_obj);
+    }
+    if (workers == -1 && PyErr_Occurred()) goto ON_FAIL;
+    if (workers < 1) {
+        PyErr_SetString(PyExc_ValueError, "workers must be greater than 0.");
+        goto ON_FAIL;
+    }
+    if (manager->handle == NULL) {
+        PyErr_SetString(PyExc_ValueError, "the provided manager is invalid");
+        goto ON_FAIL;
+    }
+
+    // a private tuple holds references to the nodes until the end of processing, the list of the caller may be
+    // changed by another thread while the workers run
+    if ((seq = PySequence_Tuple(nodes)) == NULL) goto ON_FAIL;
+    count = PyTuple_GET_SIZE(seq);
+
+    job.manager = manager->handle;
+    job.items = PyMem_New(PyXmlSec_ParallelItem, count > 0 ? count : 1);
+    job.groups = PyMem_New(Py_ssize_t, count > 0 ? count : 1);
+    if (job.items == NULL || job.groups == NULL) {
+        PyErr_NoMemory();
+        goto ON_FAIL;
+    }
+    if ((job.groups_count = PyXmlSec_ParallelGroupNodes(seq, job.items, job.groups)) < 0) goto ON_FAIL;
+    if (workers > job.groups_count) {
+        workers = (long)job.groups_count;
+    }
+
+    if (workers > 0) {
+        job.lock = PyThread_allocate_lock();
+        job.done = PyThread_allocate_lock();
+        if (job.lock == NULL || job.done == NULL) {
+            PyErr_SetString(PyExc_RuntimeError, "cannot allocate lock");
+            goto ON_FAIL;
+        }
+        PyThread_acquire_lock(job.done, WAIT_LOCK);
+        job.running = (int)workers;
+
+        manager->busy++;
+        Py_BEGIN_ALLOW_THREADS;
+        // the current thread is the last worker
+        for (i = 1; i < workers; ++i) {
+            if (PyThread_start_new_thread(PyXmlSec_ParallelWorker, &job) == PYTHREAD_INVALID_THREAD_ID) {
+                PYXMLSEC_DEBUG("verify_documents - cannot start thread");
+                PyThread_acquire_lock(job.lock, WAIT_LOCK);
+                job.running--;
+                PyThread_release_lock(job.lock);
+            }
+        }
+        PyXmlSec_ParallelWorker(&job);
+        PyThread_acquire_lock(job.done, WAIT_LOCK);
+        Py_END_ALLOW_THREADS;
+        manager->busy--;
+    }
+
+    if ((result = PyList_New(count)) == NULL) goto ON_FAIL;
+    for (i = 0; i < count; ++i) {
+        if ((tmp = Py_BuildValue("(ii)", job.items[i].status, job.items[i].code)) == NULL) goto ON_FAIL;
+        PyList_SET_ITEM(result, i, tmp);
+    }
+
+    PYXMLSEC_DEBUG("verify_documents - ok");
+    goto ON_EXIT;
+ON_FAIL:
+    PYXMLSEC_DEBUG("verify_documents - fail");
+    Py_CLEAR(result);
+ON_EXIT:
+    if (job.lock != NULL) PyThread_free_lock(job.lock);
+    if (job.done != NULL) PyThread_free_lock(job.done);
+    PyMem_Free(job.items);
+    PyMem_Free(job.groups);
+    Py_XDECREF(seq);
+    return result;
+}
+
+// the keys manager and the id attributes of the worker process, set by _init_worker
+static PyObject* PyXmlSec_ParallelWorkerManager = NULL;
+static PyObject* PyXmlSec_ParallelWorkerIds = NULL;  // tuple of utf-8 bytes
+// the worker functions, they are pickled by name
+static PyObject* PyXmlSec_ParallelInitWorkerFunc = NULL;
+static PyObject* PyXmlSec_ParallelVerifyChunkFunc = NULL;
+
+// creates the keys manager from the key spec
+static PyObject* PyXmlSec_ParallelLoadKeys(PyObject* keys) {
+    static const char* fields[] = { "file", "data", "format", "password", "name", NULL };
+
+    PyObject* manager = NULL;
+    PyObject* iter = NULL;
+    PyObject* spec = NULL;
+    PyObject* key = NULL;
+    PyObject* field;
+    PyObject* source;
+    PyObject* format;
+    PyObject* password;
+    PyObject* name;
+    PyObject* tmp;
+    Py_ssize_t pos;
+    int i;
+
+    if ((manager = PyObject_CallNoArgs((PyObject*)PyXmlSec_KeysManagerType)) == NULL) goto ON_FAIL;
+    if ((iter = PyObject_GetIter(keys)) == NULL) goto ON_FAIL;
+    while ((spec = PyIter_Next(iter)) != NULL) {
+        if (!PyDict_Check(spec)) {
+            PyErr_SetString(PyExc_TypeError, "key spec must be a dict.");
+            goto ON_FAIL;
+        }
+        pos = 0;
+        while (PyDict_Next(spec, &pos, &field, &tmp)) {
+            for (i = 0; fields[i] != NULL && !(PyUnicode_Check(field) && PyUnicode_CompareWithASCIIString(field, fields[i]) == 0); ++i);
+            if (fields[i] == NULL) {
+                PyErr_Format(PyExc_ValueError, "unknown key spec field %R.", field);
+                goto ON_FAIL;
+            }
+        }
+        source = PyDict_GetItemString(spec, "file");
+        if ((source == NULL) == (PyDict_GetItemString(spec, "data") == NULL)) {
+            PyErr_SetString(PyExc_ValueError, "key spec must have either 'file' or 'data'.");
+            goto ON_FAIL;
+        }
+        if ((format = PyDict_GetItemString(spec, "format")) == NULL) {
+            PyErr_SetString(PyExc_ValueError, "key spec must have 'format'.");
+            goto ON_FAIL;
+        }
+        if ((password = PyDict_GetItemString(spec, "password")) == NULL) password = Py_None;
+        if (source != NULL) {
+            key = PyObject_CallMethod((PyObject*)PyXmlSec_KeyType, "from_file", "OOO", source, format, password);
+        } else {
+            key = PyObject_CallMethod((PyObject*)PyXmlSec_KeyType, "from_memory", "OOO", PyDict_GetItemString(spec, "data"), format, password);
+        }
+        if (key == NULL) goto ON_FAIL;
+        if ((name = PyDict_GetItemString(spec, "name")) != NULL && name != Py_None) {
+            if (PyObject_SetAttrString(key, "name", name) < 0) goto ON_FAIL;
+        }
+        if ((tmp = PyObject_CallMethod(manager, "add_key", "(O)", key)) == NULL) goto ON_FAIL;
+        Py_DECREF(tmp);
+        Py_CLEAR(key);
+        Py_CLEAR(spec);
+    }
+    if (PyErr_Occurred()) goto ON_FAIL;
+    Py_DECREF(iter);
+    return manager;
+ON_FAIL:
+    Py_XDECREF(key);
+    Py_XDECREF(spec);
+    Py_XDECREF(iter);
+    Py_XDECREF(manager);
+    return NULL;
+}
+
+// converts the names of the id attributes to the tuple of utf-8 bytes
+static PyObject* PyXmlSec_ParallelEncodeIds(PyObject* ids) {
+    PyObject* seq;
+    PyObject* result;
+    PyObject* item;
+    Py_ssize_t i;
+
+    if (ids == Py_None) return PyTuple_New(0);
+    if ((seq = PySequence_Fast(ids, "ids must be a sequence of strings.")) == NULL) return NULL;
+    if ((result = PyTuple_New(PySequence_Fast_GET_SIZE(seq))) == NULL) goto ON_EXIT;
+    for (i = 0; i < PySequence_Fast_GET_SIZE(seq); ++i) {
+        item = PySequence_Fast_GET_ITEM(seq, i);
+        if (!PyUnicode_Check(item)) {
+            PyErr_SetString(PyExc_TypeError, "ids must be a sequence of strings.");
+            Py_CLEAR(result);
+            goto ON_EXIT;
+        }
+        if ((item = PyUnicode_AsUTF8String(item)) == NULL) {
+            Py_CLEAR(result);
+            goto ON_EXIT;
+        }
+        PyTuple_SET_ITEM(result, i, item);
+    }
+ON_EXIT:
+    Py_DECREF(seq);
+    return result;
+}
+
+static const char PyXmlSec_ParallelInitWorker__doc__[] = \
+    "_init_worker(keys, ids) -> None\n"
+    "Loads the keys of :class:`ProcessVerifier` in the worker process.";
+static PyObject* PyXmlSec_ParallelInitWorker(PyObject* self, PyObject* args) {
+    PyObject* keys;
+    PyObject* ids;
+    PyObject* manager;
+
+    PYXMLSEC_DEBUG("init worker - start");
+    if (!PyArg_ParseTuple(args, "OO!:_init_worker", &keys, &PyTuple_Type, &ids)) goto ON_FAIL;
+    if ((manager = PyXmlSec_ParallelLoadKeys(keys)) == NULL) goto ON_FAIL;
+    Py_XSETREF(PyXmlSec_ParallelWorkerManager, manager);
+    Py_INCREF(ids);
+    Py_XSETREF(PyXmlSec_ParallelWorkerIds, ids);
+    PYXMLSEC_DEBUG("init worker - ok");
+    Py_RETURN_NONE;
+ON_FAIL:
+    PYXMLSEC_DEBUG("init worker - fail");
+    return NULL;
+}
+
+static const char PyXmlSec_ParallelVerifyChunk__doc__[] = \
+    "_verify_chunk(name, offset, documents) -> int\n"
+    "Verifies the serialized documents in the worker process of :class:`ProcessVerifier`, "
+    "``(status, code)`` of each document is written to the shared memory ``name`` starting from ``offset``.";
+static PyObject* PyXmlSec_ParallelVerifyChunk(PyObject* self, PyObject* args) {
+    PyObject* name;
+    PyObject* documents;
+    PyObject* seq = NULL;
+    PyObject* module = NULL;
+    PyObject* shm = NULL;
+    PyObject* buf = NULL;
+    PyObject* tmp;
+    Py_buffer view = {0};
+    const xmlChar** ids = NULL;
+    xmlSecKeysMngrPtr manager;
+    xmlSecDSigCtxPtr ctx;
+    xmlDocPtr doc;
+    xmlNodePtr node;
+    int* results;
+    Py_ssize_t offset;
+    Py_ssize_t count = 0;
+    Py_ssize_t i;
+    int rv = -1;
+
+    PYXMLSEC_DEBUG("verify chunk - start");
+    if (!PyArg_ParseTuple(args, "UnO:_verify_chunk", &name, &offset, &documents)) goto ON_FAIL;
+    if (PyXmlSec_ParallelWorkerManager == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "the worker is not initialized.");
+        goto ON_FAIL;
+    }
+    manager = ((PyXmlSec_KeysManager*)PyXmlSec_ParallelWorkerManager)->handle;
+
+    if ((seq = PySequence_Fast(documents, "documents must be a sequence of bytes.")) == NULL) goto ON_FAIL;
+    count = PySequence_Fast_GET_SIZE(seq);
+    for (i = 0; i < count; ++i) {
+        if (!PyBytes_Check(PySequence_Fast_GET_ITEM(seq, i))) {
+            PyErr_SetString(PyExc_TypeError, "documents must be a sequence of bytes.");
+            goto ON_FAIL;
+        }
+        // libxml2 takes the size of the document as int
+        if (PyBytes_GET_SIZE(PySequence_Fast_GET_ITEM(seq, i)) > INT_MAX) {
+            PyErr_SetString(PyExc_ValueError, "documents must not be larger than INT_MAX bytes.");
+            goto ON_FAIL;
+        }
+    }
+    ids = PyMem_New(const xmlChar*, PyTuple_GET_SIZE(PyXmlSec_ParallelWorkerIds) + 1);
+    if (ids == NULL) {
+        PyErr_NoMemory();
+        goto ON_FAIL;
+    }
+    for (i = 0; i < PyTuple_GET_SIZE(PyXmlSec_ParallelWorkerIds); ++i) {
+        ids[i] = XSTR(PyBytes_AS_STRING(PyTuple_GET_ITEM(PyXmlSec_ParallelWorkerIds, i)));
+    }
+    ids[i] = NULL;
+
+    if ((module = PyImport_ImportModule("multiprocessing.shared_memory")) == NULL) goto ON_FAIL;
+    if ((shm = PyObject_CallMethod(module, "SharedMemory", "(O)", name)) == NULL) goto ON_FAIL;
+    if ((buf = PyObject_GetAttrString(shm, "buf")) == NULL) goto ON_FAIL;
+    if (PyObject_GetBuffer(buf, &view, PyBUF_WRITABLE) < 0) goto ON_FAIL;
+    if (offset < 0 || view.len / (Py_ssize_t)(2 * sizeof(int)) < offset + count) {
+        PyErr_SetString(PyExc_ValueError, "the shared memory is too small.");
+        goto ON_FAIL;
+    }
+    results = (int*)view.buf + 2 * offset;
+
+    Py_BEGIN_ALLOW_THREADS;
+    PyXmlSec_ClearError();
+    ctx = xmlSecDSigCtxCreate(manager);
+    for (i = 0; i < count; ++i) {
+        tmp = PySequence_Fast_GET_ITEM(seq, i);
+        doc = xmlReadMemory(PyBytes_AS_STRING(tmp), (int)PyBytes_GET_SIZE(tmp), NULL, NULL, XML_PARSE_NONET);
+        node = NULL;
+        if (doc != NULL && xmlDocGetRootElement(doc) != NULL) {
+            xmlSecAddIDs(doc, xmlDocGetRootElement(doc), ids);
+            node = xmlSecFindNode(xmlDocGetRootElement(doc), xmlSecNodeSignature, xmlSecDSigNs);
+        }
+        PyXmlSec_ParallelVerifyNode(ctx, node, &results[2 * i], &results[2 * i + 1]);
+        if (doc != NULL) xmlFreeDoc(doc);
+    }
+    if (ctx != NULL) xmlSecDSigCtxDestroy(ctx);
+    PyXmlSec_ClearError();
+    Py_END_ALLOW_THREADS;
+
+    rv = 0;
+    PYXMLSEC_DEBUG("verify chunk - ok");
+    goto ON_EXIT;
+ON_FAIL:
+    PYXMLSEC_DEBUG("verify chunk - fail");
+ON_EXIT:
+    if (view.obj != NULL) PyBuffer_Release(&view);
+    Py_XDECREF(buf);
+    if (shm != NULL) {
+        // the memory is unlinked by the parent process
+        if ((tmp = PyObject_CallMethod(shm, "close", NULL)) == NULL) rv = -1;
+        Py_XDECREF(tmp);
+        Py_DECREF(shm);
+    }
+    PyMem_Free(ids);
+    Py_XDECREF(module);
+    Py_XDECREF(seq);
+    if (rv < 0) return NULL;
+    return PyLong_FromSsize_t(count);
+}
+
+typedef struct {
+    PyObject_HEAD
+    PyObject* pool;  // concurrent.futures.ProcessPoolExecutor
+    int workers;
+    unsigned long forks;  // the worker processes belong to the process, which created the verifier
+} PyXmlSec_ProcessVerifier;
+
+static PyObject* PyXmlSec_ProcessVerifier__new__(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
+    PyXmlSec_ProcessVerifier* verifier = (PyXmlSec_ProcessVerifier*)PyType_GenericNew(type, args, kwargs);
+    PYXMLSEC_DEBUGF("%p: new process verifier", verifier);
+    if (verifier != NULL) {
+        verifier->pool = NULL;
+        verifier->workers = 0;
+        verifier->forks = PyXmlSec_ForkGeneration();
+    }
+    return (PyObject*)verifier;
+}
+
+static int PyXmlSec_ProcessVerifier__init__(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "keys", "workers", "ids", NULL};
+
+    PyXmlSec_ProcessVerifier* verifier = (PyXmlSec_ProcessVerifier*)self;
+    PyObject* keys = NULL;
+    PyObject* workers_obj = Py_None;
+    PyObject* ids = Py_None;
+    PyObject* spec = NULL;
+    PyObject* encoded_ids = NULL;
+    PyObject* manager = NULL;
+    PyObject* pool_type = NULL;
+    PyObject* pool_args = NULL;
+    PyObject* pool_kwargs = NULL;
+    long workers;
+    int rv = -1;
+
+    PYXMLSEC_DEBUGF("%p: init process verifier - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|OO:__init__", kwlist, &keys, &workers_obj, &ids)) goto ON_EXIT;
+    if (verifier->pool != NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "the verifier is already initialized.");
+        goto ON_EXIT;
+    }
+    workers = (workers_obj == Py_None) ? PyXmlSec_GetDefaultWorkers() : PyLong_AsLong(workers_obj);
+    if (workers == -1 && PyErr_Occurred()) goto ON_EXIT;
+    if (workers < 1 || workers > INT_MAX) {
+        PyErr_SetString(PyExc_ValueError, "workers must be greater than 0.");
+        goto ON_EXIT;
+    }
+    // the spec is sent to the workers, it is loaded here as well to report the errors early
+    if ((spec = PySequence_Tuple(keys)) == NULL) goto ON_EXIT;
+    if ((manager = PyXmlSec_ParallelLoadKeys(spec)) == NULL) goto ON_EXIT;
+    if ((encoded_ids = PyXmlSec_ParallelEncodeIds(ids)) == NULL) goto ON_EXIT;
+
+    if ((pool_type = PyImport_ImportModule("concurrent.futures")) == NULL) goto ON_EXIT;
+    Py_SETREF(pool_type, PyObject_GetAttrString(pool_type, "ProcessPoolExecutor"));
+    if (pool_type == NULL) goto ON_EXIT;
+    pool_kwargs = Py_BuildValue("{sOs(OO)}", "initializer", PyXmlSec_ParallelInitWorkerFunc, "initargs", spec, encoded_ids);
+    if (pool_kwargs == NULL) goto ON_EXIT;
+    if ((pool_args = Py_BuildValue("(l)", workers)) == NULL) goto ON_EXIT;
+    if ((verifier->pool = PyObject_Call(pool_type, pool_args, pool_kwargs)) == NULL) goto ON_EXIT;
+    verifier->workers = (int)workers;
+    rv = 0;
+ON_EXIT:
+    PYXMLSEC_DEBUGF("%p: init process verifier - %s", self, rv == 0 ? "ok" : "fail");
+    Py_XDECREF(pool_args);
+    Py_XDECREF(pool_kwargs);
+    Py_XDECREF(pool_type);
+    Py_XDECREF(manager);
+    Py_XDECREF(encoded_ids);
+    Py_XDECREF(spec);
+    return rv;
+}
+
+// stops the worker processes
+static int PyXmlSec_ProcessVerifierClose(PyXmlSec_ProcessVerifier* verifier, int wait) {
+    PyObject* pool = verifier->pool;
+    PyObject* tmp;
+
+    if (pool == NULL) return 0;
+    verifier->pool = NULL;
+    if (verifier->forks != PyXmlSec_ForkGeneration()) {
+        Py_DECREF(pool);
+        return 0;
+    }
+    tmp = PyObject_CallMethod(pool, "shutdown", "i", wait);
+    Py_DECREF(pool);
+    if (tmp == NULL) return -1;
+    Py_DECREF(tmp);
+    return 0;
+}
+
+static void PyXmlSec_ProcessVerifier__del__(PyObject* self) {
+    PYXMLSEC_DEBUGF("%p: delete process verifier", self);
+    if (PyXmlSec_ProcessVerifierClose((PyXmlSec_ProcessVerifier*)self, 0) < 0) PyErr_WriteUnraisable(self);
+    Py_TYPE(self)->tp_free(self);
+}
+
+static const char PyXmlSec_ProcessVerifierVerify__doc__[] = \
+    "verify(documents) -> list[tuple[int, int]]\n"
+    "Verifies the first :xml:`<dsig:Signature/>` node of each of the serialized ``documents`` in the worker processes.\n\n"
+    "Like :func:`verify_documents`, does not raise on invalid signatures or processing failures, "
+    "the documents, which cannot be parsed or have no signature, have the ``DSigStatusUnknown`` status.\n\n"
+    ":param documents: the serialized documents\n"
+    ":type documents: :class:`~collections.abc.Iterable` of :class:`bytes`\n"
+    ":return: ``(status, code)`` for each document in the same order, where ``status`` is one of ``DSigStatus*`` constants "
+    "and ``code`` is the xmlsec error code, ``0`` if there was no error\n"
+    ":rtype: :class:`list` of :class:`tuple`";
+static PyObject* PyXmlSec_ProcessVerifierVerify(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "documents", NULL};
+
+    PyXmlSec_ProcessVerifier* verifier = (PyXmlSec_ProcessVerifier*)self;
+    PyObject* documents = NULL;
+    PyObject* seq = NULL;
+    PyObject* module = NULL;
+    PyObject* shm = NULL;
+    PyObject* name = NULL;
+    PyObject* buf = NULL;
+    PyObject* futures = NULL;
+    PyObject* result = NULL;
+    PyObject* chunk;
+    PyObject* tmp;
+    Py_buffer view = {0};
+    const int* results;
+    Py_ssize_t count;
+    Py_ssize_t size;
+    Py_ssize_t i;
+
+    PYXMLSEC_DEBUGF("%p: process verify - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O:verify", kwlist, &documents)) goto ON_FAIL;
+    if (verifier->pool == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "the verifier is closed.");
+        goto ON_FAIL;
+    }
+    if (verifier->forks != PyXmlSec_ForkGeneration()) {
+        PyErr_SetString(PyExc_RuntimeError, "the verifier is created by the parent process and cannot be used after fork.");
+        goto ON_FAIL;
+    }
+    if ((seq = PySequence_Fast(documents, "documents must be a sequence of bytes.")) == NULL) goto ON_FAIL;
+    count = PySequence_Fast_GET_SIZE(seq);
+    for (i = 0; i < count; ++i) {
+        if (!PyBytes_Check(PySequence_Fast_GET_ITEM(seq, i))) {
+            PyErr_SetString(PyExc_TypeError, "documents must be a sequence of bytes.");
+            goto ON_FAIL;
+        }
+        // libxml2 takes the size of the document as int
+        if (PyBytes_GET_SIZE(PySequence_Fast_GET_ITEM(seq, i)) > INT_MAX) {
+            PyErr_SetString(PyExc_ValueError, "documents must not be larger than INT_MAX bytes.");
+            goto ON_FAIL;
+        }
+    }
+    if (count == 0) {
+        result = PyList_New(0);
+        goto ON_EXIT;
+    }
+
+    // the workers write (status, code) of each document to the shared memory
+    if ((module = PyImport_ImportModule("multiprocessing.shared_memory")) == NULL) goto ON_FAIL;
+    shm = PyObject_CallMethod(module, "SharedMemory", "Oin", Py_None, 1, count * (Py_ssize_t)(2 * sizeof(int)));
+    if (shm == NULL) goto ON_FAIL;
+    if ((name = PyObject_GetAttrString(shm, "name")) == NULL) goto ON_FAIL;
+
+    // several chunks per worker even out the load
+    size = (count + verifier->workers * 4 - 1) / (verifier->workers * 4);
+    if ((futures = PyList_New(0)) == NULL) goto ON_FAIL;
+    for (i = 0; i < count; i += size) {
+        if ((chunk = PyList_GetSlice(seq, i, i + size)) == NULL) goto ON_FAIL;
+        tmp = PyObject_CallMethod(verifier->pool, "submit", "OOnN", PyXmlSec_ParallelVerifyChunkFunc, name, i, chunk);
+        if (tmp == NULL) goto ON_FAIL;
+        if (PyList_Append(futures, tmp) < 0) {
+            Py_DECREF(tmp);
+            goto ON_FAIL;
+        }
+        Py_DECREF(tmp);
+    }
+    for (i = 0; i < PyList_GET_SIZE(futures); ++i) {
+        if ((tmp = PyObject_CallMethod(PyList_GET_ITEM(futures, i), "result", NULL)) == NULL) goto ON_FAIL;
+        Py_DECREF(tmp);
+    }
+
+    if ((buf = PyObject_GetAttrString(shm, "buf")) == NULL) goto ON_FAIL;
+    if (PyObject_GetBuffer(buf, &view, PyBUF_SIMPLE) < 0) goto ON_FAIL;
+    results = (const int*)view.buf;
+    if ((result = PyList_New(count)) == NULL) goto ON_FAIL;
+    for (i = 0; i < count; ++i) {
+        if ((tmp = Py_BuildValue("(ii)", results[2 * i], results[2 * i + 1])) == NULL) goto ON_FAIL;
+        PyList_SET_ITEM(result, i, tmp);
+    }
+
+    PYXMLSEC_DEBUGF("%p: process verify - ok", self);
+    goto ON_EXIT;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: process verify - fail", self);
+    Py_CLEAR(result);
+ON_EXIT:
+    if (view.obj != NULL) PyBuffer_Release(&view);
+    Py_XDECREF(buf);
+    if (futures != NULL) {
+        // the memory cannot be unlinked until the workers are done with it
+        for (i = 0; i < PyList_GET_SIZE(futures); ++i) {
+            tmp = PyObject_CallMethod(PyList_GET_ITEM(futures, i), "exception", NULL);
+            if (tmp == NULL) PyErr_WriteUnraisable(self);
+            Py_XDECREF(tmp);
+        }
+        Py_DECREF(futures);
+    }
+    if (shm != NULL) {
+        tmp = PyObject_CallMethod(shm, "close", NULL);
+        if (tmp != NULL) Py_SETREF(tmp, PyObject_CallMethod(shm, "unlink", NULL));
+        if (tmp == NULL) Py_CLEAR(result);
+        Py_XDECREF(tmp);
+        Py_DECREF(shm);
+    }
+    Py_XDECREF(name);
+    Py_XDECREF(module);
+    Py_XDECREF(seq);
+    return result;
+}
+
+static const char PyXmlSec_ProcessVerifierClose__doc__[] = \
+    "close() -> None\n"
+    "Stops the worker processes.";
+static PyObject* PyXmlSec_ProcessVerifierCloseMethod(PyObject* self, PyObject* args) {
+    PYXMLSEC_DEBUGF("%p: process verifier close", self);
+    if (PyXmlSec_ProcessVerifierClose((PyXmlSec_ProcessVerifier*)self, 1) < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+static PyObject* PyXmlSec_ProcessVerifier__enter__(PyObject* self, PyObject* args) {
+    Py_INCREF(self);
+    return self;
+}
+
+static PyObject* PyXmlSec_ProcessVerifier__exit__(PyObject* self, PyObject* args) {
+    if (PyXmlSec_ProcessVerifierClose((PyXmlSec_ProcessVerifier*)self, 1) < 0) return NULL;
+    Py_RETURN_NONE;
+}
+
+static const char PyXmlSec_ProcessVerifierWorkers__doc__[] = "The number of the worker processes.\n";
+static PyObject* PyXmlSec_ProcessVerifierWorkersGet(PyObject* self, void* closure) {
+    return PyLong_FromLong(((PyXmlSec_ProcessVerifier*)self)->workers);
+}
+
+static PyGetSetDef PyXmlSec_ProcessVerifierGetSet[] = {
+    {
+        "workers",
+        (getter)PyXmlSec_ProcessVerifierWorkersGet,
+        NULL,
+        (char*)PyXmlSec_ProcessVerifierWorkers__doc__,
+        NULL
+    },
+    {NULL} /* Sentinel */
+};
+
+static PyMethodDef PyXmlSec_ProcessVerifierMethods[] = {
+    {
+        "verify",
+        (PyCFunction)PyXmlSec_ProcessVerifierVerify,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_ProcessVerifierVerify__doc__
+    },
+    {
+        "close",
+        (PyCFunction)PyXmlSec_ProcessVerifierCloseMethod,
+        METH_NOARGS,
+        PyXmlSec_ProcessVerifierClose__doc__
+    },
+    {"__enter__", (PyCFunction)PyXmlSec_ProcessVerifier__enter__, METH_NOARGS, NULL},
+    {"__exit__", (PyCFunction)PyXmlSec_ProcessVerifier__exit__, METH_VARARGS, NULL},
+    {NULL, NULL} /* sentinel */
+};
+
+static PyTypeObject _PyXmlSec_ProcessVerifierType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    STRINGIFY(MODULE_NAME) ".parallel.ProcessVerifier", /* tp_name */
+    sizeof(PyXmlSec_ProcessVerifier),            /* tp_basicsize */
+    0,                                           /* tp_itemsize */
+    PyXmlSec_ProcessVerifier__del__,             /* tp_dealloc */
+    0,                                           /* tp_print */
+    0,                                           /* tp_getattr */
+    0,                                           /* tp_setattr */
+    0,                                           /* tp_reserved */
+    0,                                           /* tp_repr */
+    0,                                           /* tp_as_number */
+    0,                                           /* tp_as_sequence */
+    0,                                           /* tp_as_mapping */
+    0,                                           /* tp_hash  */
+    0,                                           /* tp_call */
+    0,                                           /* tp_str */
+    0,                                           /* tp_getattro */
+    0,                                           /* tp_setattro */
+    0,                                           /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT|Py_TPFLAGS_BASETYPE,      /* tp_flags */
+    "__init__(self, keys, workers=None, ids=None)\n"
+    "Verifies serialized documents on ``workers`` processes, :func:`os.cpu_count` by default.\n\n"
+    "The keys cannot be pickled, so each process loads them from the spec. "
+    "The spec is a sequence of :class:`dict`, each one describes a key with the following fields:\n\n"
+    "* ``file`` - the path to the key file, or ``data`` - the key as :class:`bytes`;\n"
+    "* ``format`` - the key format, one of ``KeyDataFormat*`` constants;\n"
+    "* ``password`` - the key password, optional;\n"
+    "* ``name`` - the key name, optional.\n\n"
+    ":param keys: the key spec\n"
+    ":type keys: :class:`~collections.abc.Iterable` of :class:`dict`\n"
+    ":param workers: the number of processes\n"
+    ":type workers: :class:`int` or :data:`None`\n"
+    ":param ids: the ID attributes registered in each document, see :func:`~xmlsec.tree.add_ids`\n"
+    ":type ids: :class:`list` of :class:`str` or :data:`None`", /* tp_doc */
+    0,                                           /* tp_traverse */
+    0,                                           /* tp_clear */
+    0,                                           /* tp_richcompare */
+    0,                                           /* tp_weaklistoffset */
+    0,                                           /* tp_iter */
+    0,                                           /* tp_iternext */
+    PyXmlSec_ProcessVerifierMethods,             /* tp_methods */
+    0,                                           /* tp_members */
+    PyXmlSec_ProcessVerifierGetSet,              /* tp_getset */
+    0,                                           /* tp_base */
+    0,                                           /* tp_dict */
+    0,                                           /* tp_descr_get */
+    0,                                           /* tp_descr_set */
+    0,                                           /* tp_dictoffset */
+    PyXmlSec_ProcessVerifier__init__,            /* tp_init */
+    0,                                           /* tp_alloc */
+    PyXmlSec_ProcessVerifier__new__,             /* tp_new */
+    0,                                           /* tp_free */
+};
+
+static PyMethodDef PyXmlSec_ParallelMethods[] = {
+    {
+        "verify_documents",
+        (PyCFunction)PyXmlSec_ParallelVerifyDocuments,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_ParallelVerifyDocuments__doc__
+    },
+    {
+        "_init_worker",
+        (PyCFunction)PyXmlSec_ParallelInitWorker,
+        METH_VARARGS,
+        PyXmlSec_ParallelInitWorker__doc__
+    },
+    {
+        "_verify_chunk",
+        (PyCFunction)PyXmlSec_ParallelVerifyChunk,
+        METH_VARARGS,
+        PyXmlSec_ParallelVerifyChunk__doc__
+    },
+    {NULL, NULL} /* sentinel */
+};
+
+static PyModuleDef PyXmlSec_ParallelModule =
+{
+    PyModuleDef_HEAD_INIT,
+    STRINGIFY(MODULE_NAME) ".parallel",
+    PYXMLSEC_PARALLEL_DOC,
+    -1,
+    PyXmlSec_ParallelMethods, /* m_methods */
+    NULL,                     /* m_slots */
+    NULL,                     /* m_traverse */
+    NULL,                     /* m_clear */
+    NULL,                     /* m_free */
+};
+
+int PyXmlSec_ParallelModule_Init(PyObject* package) {
+    PyObject* parallel = NULL;
+
+    if (PyType_Ready(&_PyXmlSec_ProcessVerifierType) < 0) goto ON_FAIL;
+    if ((parallel = PyModule_Create(&PyXmlSec_ParallelModule)) == NULL) goto ON_FAIL;
+
+    // the worker processes find the functions by the name of the module
+    if (PyDict_SetItemString(PyImport_GetModuleDict(), STRINGIFY(MODULE_NAME) ".parallel", parallel) < 0) goto ON_FAIL;
+    Py_XSETREF(PyXmlSec_ParallelInitWorkerFunc, PyObject_GetAttrString(parallel, "_init_worker"));
+    if (PyXmlSec_ParallelInitWorkerFunc == NULL) goto ON_FAIL;
+    Py_XSETREF(PyXmlSec_ParallelVerifyChunkFunc, PyObject_GetAttrString(parallel, "_verify_chunk"));
+    if (PyXmlSec_ParallelVerifyChunkFunc == NULL) goto ON_FAIL;
+
+    // PyModule_AddObject steals a reference on success
+    Py_INCREF(&_PyXmlSec_ProcessVerifierType);
+    if (PyModule_AddObject(parallel, "ProcessVerifier", (PyObject*)&_PyXmlSec_ProcessVerifierType) < 0) {
+        Py_DECREF(&_PyXmlSec_ProcessVerifierType);
+        goto ON_FAIL;
+    }
+    if (PyModule_AddObject(package, "parallel", parallel) < 0) goto ON_FAIL;
+
+    return 0;
+ON_FAIL:
+    Py_XDECREF(parallel);
+    return -1;
+}
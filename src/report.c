@@ -0,0 +1,311 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+#include "common.h"
+#include "platform.h"
+#include "utils.h"
+#include "report.h"
+
+#include <stddef.h>
+#include <structseq.h>
+
+// the transform which is inserted before the digest or the signature method
+// and measures the time spent in it, it passes the data through as is.
+typedef struct {
+    xmlSecTransform transform;
+    PyXmlSec_StageTiming* stage;
+} PyXmlSec_ProbeTransform;
+
+static int PyXmlSec_ProbePushBin(xmlSecTransformPtr transform, const xmlSecByte* data, xmlSecSize dataSize, int final, xmlSecTransformCtxPtr transformCtx) {
+    PyXmlSec_StageTiming* stage = ((PyXmlSec_ProbeTransform*)transform)->stage;
+    double started = PyXmlSec_GetTime();
+    double finished;
+    int rv;
+
+    rv = xmlSecTransformPushBin(transform->next, data, dataSize, final, transformCtx);
+    finished = PyXmlSec_GetTime();
+    stage->method += finished - started;
+    if (final) {
+        stage->finished = finished;
+        transform->status = xmlSecTransformStatusFinished;
+    }
+    return rv;
+}
+
+static xmlSecTransformKlass PyXmlSec_ProbeKlass = {
+    sizeof(xmlSecTransformKlass),               /* klassSize */
+    sizeof(PyXmlSec_ProbeTransform),            /* objSize */
+    BAD_CAST "pyxmlsec-probe",                  /* name */
+    NULL,                                       /* href */
+    xmlSecTransformUsageUnknown,                /* usage */
+    NULL,                                       /* initialize */
+    NULL,                                       /* finalize */
+    NULL,                                       /* readNode */
+    NULL,                                       /* writeNode */
+    NULL,                                       /* setKeyReq */
+    NULL,                                       /* setKey */
+    NULL,                                       /* verify */
+    xmlSecTransformDefaultGetDataType,          /* getDataType */
+    PyXmlSec_ProbePushBin,                      /* pushBin */
+    NULL,                                       /* popBin */
+    NULL,                                       /* pushXml */
+    NULL,                                       /* popXml */
+    NULL,                                       /* execute */
+    NULL,                                       /* reserved0 */
+    NULL,                                       /* reserved1 */
+};
+
+// inserts the probe before the method, if the method is fed with binary data by another transform.
+// the timings are optional, so the errors are ignored.
+static void PyXmlSec_InsertProbe(xmlSecTransformPtr method, PyXmlSec_StageTiming* stage, xmlSecTransformCtxPtr transformCtx) {
+    xmlSecTransformPtr probe;
+
+    if (method == NULL || method->prev == NULL) return;
+    if ((xmlSecTransformGetDataType(method->prev, xmlSecTransformModePop, transformCtx) & xmlSecTransformDataTypeBin) == 0) return;
+    if ((probe = xmlSecTransformCreate(&PyXmlSec_ProbeKlass)) == NULL) return;
+
+    ((PyXmlSec_ProbeTransform*)probe)->stage = stage;
+    probe->status = xmlSecTransformStatusWorking;
+    probe->prev = method->prev;
+    probe->next = method;
+    method->prev->next = probe;
+    method->prev = probe;
+}
+
+// the callback is called when the transforms of the reference are prepared
+static int PyXmlSec_ReferencePreExecute(xmlSecTransformCtxPtr transformCtx) {
+    xmlSecDSigReferenceCtxPtr dsigRefCtx = (xmlSecDSigReferenceCtxPtr)((char*)transformCtx - offsetof(xmlSecDSigReferenceCtx, transformCtx));
+    PyXmlSec_SignatureTiming* timing = (PyXmlSec_SignatureTiming*)dsigRefCtx->dsigCtx->userData;
+    PyXmlSec_ReferenceTiming* reference;
+
+    if (timing == NULL) return 0;
+    if ((reference = (PyXmlSec_ReferenceTiming*)xmlMalloc(sizeof(PyXmlSec_ReferenceTiming))) == NULL) return 0;
+
+    memset(reference, 0, sizeof(PyXmlSec_ReferenceTiming));
+    reference->next = timing->references;
+    timing->references = reference;
+    dsigRefCtx->userData = reference;
+
+    PyXmlSec_InsertProbe(dsigRefCtx->digestMethod, &(reference->stage), transformCtx);
+    reference->stage.started = PyXmlSec_GetTime();
+    return 0;
+}
+
+// the callback is called when the transforms of <dsig:SignedInfo/> are prepared
+static int PyXmlSec_SignedInfoPreExecute(xmlSecTransformCtxPtr transformCtx) {
+    xmlSecDSigCtxPtr dsigCtx = (xmlSecDSigCtxPtr)((char*)transformCtx - offsetof(xmlSecDSigCtx, transformCtx));
+    PyXmlSec_SignatureTiming* timing = (PyXmlSec_SignatureTiming*)dsigCtx->userData;
+
+    if (timing == NULL) return 0;
+    memset(&(timing->signed_info), 0, sizeof(timing->signed_info));
+    PyXmlSec_InsertProbe(dsigCtx->signMethod, &(timing->signed_info), transformCtx);
+    timing->signed_info.started = PyXmlSec_GetTime();
+    return 0;
+}
+
+void PyXmlSec_SignatureTimingClear(xmlSecDSigCtxPtr handle) {
+    PyXmlSec_SignatureTiming* timing = (PyXmlSec_SignatureTiming*)handle->userData;
+    PyXmlSec_ReferenceTiming* next;
+    xmlSecDSigReferenceCtxPtr dsigRefCtx;
+    xmlSecSize i;
+
+    if (timing == NULL) return;
+    for (i = 0; i < xmlSecPtrListGetSize(&(handle->signedInfoReferences)); ++i) {
+        dsigRefCtx = (xmlSecDSigReferenceCtxPtr)xmlSecPtrListGetItem(&(handle->signedInfoReferences), i);
+        if (dsigRefCtx != NULL) dsigRefCtx->userData = NULL;
+    }
+    while (timing->references != NULL) {
+        next = timing->references->next;
+        xmlFree(timing->references);
+        timing->references = next;
+    }
+    memset(timing, 0, sizeof(PyXmlSec_SignatureTiming));
+}
+
+void PyXmlSec_SignatureTimingStart(xmlSecDSigCtxPtr handle) {
+    PyXmlSec_SignatureTiming* timing = (PyXmlSec_SignatureTiming*)handle->userData;
+
+    if (timing == NULL) return;
+    PyXmlSec_SignatureTimingClear(handle);
+    handle->referencePreExecuteCallback = PyXmlSec_ReferencePreExecute;
+    handle->transformCtx.preExecCallback = PyXmlSec_SignedInfoPreExecute;
+    timing->started = PyXmlSec_GetTime();
+}
+
+void PyXmlSec_SignatureTimingFinish(xmlSecDSigCtxPtr handle) {
+    PyXmlSec_SignatureTiming* timing = (PyXmlSec_SignatureTiming*)handle->userData;
+
+    if (timing == NULL) return;
+    if (timing->finished == 0) timing->finished = PyXmlSec_GetTime();
+    // the other operations, e.g. verify_many, do not collect the timings
+    handle->referencePreExecuteCallback = NULL;
+    handle->transformCtx.preExecCallback = NULL;
+}
+
+// the time spent in the chain before the method
+static double PyXmlSec_StageTransformsTime(PyXmlSec_StageTiming* stage) {
+    if (stage->finished == 0) return 0;
+    return stage->finished - stage->started - stage->method;
+}
+
+static PyStructSequence_Field PyXmlSec_ReferenceReportFields[] = {
+    {"uri", "the URI attribute of the reference or None"},
+    {"id", "the Id attribute of the reference or None"},
+    {"type", "the Type attribute of the reference or None"},
+    {"status", "the status of the reference, one of DSigStatus* constants"},
+    {"digest_method", "the href of the digest method or None if it has not been read"},
+    {"canonicalization_time", "the seconds spent in the transforms of the reference, including canonicalization"},
+    {"digest_time", "the seconds spent in the digest method"},
+    {NULL}
+};
+
+static PyStructSequence_Desc PyXmlSec_ReferenceReportDesc = {
+    STRINGIFY(MODULE_NAME) ".ReferenceReport",
+    "The outcome of processing of a :xml:`<dsig:Reference/>` node, see :meth:`SignatureContext.report`.",
+    PyXmlSec_ReferenceReportFields,
+    7,
+};
+
+static PyStructSequence_Field PyXmlSec_SignatureReportFields[] = {
+    {"status", "the status of the signature, one of DSigStatus* constants"},
+    {"cached", "True if the document or all of its references have been found in the cache and have not been processed"},
+    {"canonicalization_method", "the href of the canonicalization method of SignedInfo or None"},
+    {"signature_method", "the href of the signature method or None"},
+    {"references", "the ReferenceReport for each reference of SignedInfo in the document order"},
+    {"canonicalization_time", "the seconds spent in the transforms of the references and the canonicalization of SignedInfo"},
+    {"digest_time", "the seconds spent in the digest methods of the references"},
+    {"signature_time", "the seconds spent in the signature method"},
+    {"total_time", "the seconds spent in the whole operation"},
+    {NULL}
+};
+
+static PyStructSequence_Desc PyXmlSec_SignatureReportDesc = {
+    STRINGIFY(MODULE_NAME) ".SignatureReport",
+    "The outcome and the timings of the last sign or verify operation, see :meth:`SignatureContext.report`.",
+    PyXmlSec_SignatureReportFields,
+    9,
+};
+
+static PyTypeObject PyXmlSec_ReferenceReportType;
+static PyTypeObject PyXmlSec_SignatureReportType;
+
+static PyObject* PyXmlSec_HrefOrNone(xmlSecTransformPtr transform) {
+    if (transform == NULL || transform->id->href == NULL) {
+        Py_RETURN_NONE;
+    }
+    return PyUnicode_FromString((const char*)transform->id->href);
+}
+
+static PyObject* PyXmlSec_StringOrNone(const xmlChar* value) {
+    if (value == NULL) {
+        Py_RETURN_NONE;
+    }
+    return PyUnicode_FromString((const char*)value);
+}
+
+static PyObject* PyXmlSec_ReferenceReportNew(xmlSecDSigReferenceCtxPtr dsigRefCtx, double* transforms_time, double* digest_time) {
+    PyXmlSec_ReferenceTiming* timing = (PyXmlSec_ReferenceTiming*)dsigRefCtx->userData;
+    double transforms = timing != NULL ? PyXmlSec_StageTransformsTime(&(timing->stage)) : 0;
+    double digest = timing != NULL ? timing->stage.method : 0;
+    PyObject* report = PyStructSequence_New(&PyXmlSec_ReferenceReportType);
+    PyObject* item;
+    int i = 0;
+
+    if (report == NULL) return NULL;
+
+#define PYXMLSEC_SET_ITEM(value) \
+    if ((item = (value)) == NULL) goto ON_FAIL; \
+    PyStructSequence_SET_ITEM(report, i++, item);
+
+    PYXMLSEC_SET_ITEM(PyXmlSec_StringOrNone(dsigRefCtx->uri));
+    PYXMLSEC_SET_ITEM(PyXmlSec_StringOrNone(dsigRefCtx->id));
+    PYXMLSEC_SET_ITEM(PyXmlSec_StringOrNone(dsigRefCtx->type));
+    PYXMLSEC_SET_ITEM(PyLong_FromLong((long)dsigRefCtx->status));
+    PYXMLSEC_SET_ITEM(PyXmlSec_HrefOrNone(dsigRefCtx->digestMethod));
+    PYXMLSEC_SET_ITEM(PyFloat_FromDouble(transforms));
+    PYXMLSEC_SET_ITEM(PyFloat_FromDouble(digest));
+#undef PYXMLSEC_SET_ITEM
+
+    *transforms_time += transforms;
+    *digest_time += digest;
+    return report;
+ON_FAIL:
+    Py_DECREF(report);
+    return NULL;
+}
+
+PyObject* PyXmlSec_SignatureReportNew(xmlSecDSigCtxPtr handle) {
+    PyXmlSec_SignatureTiming* timing = (PyXmlSec_SignatureTiming*)handle->userData;
+    xmlSecSize size = xmlSecPtrListGetSize(&(handle->signedInfoReferences));
+    PyObject* report = NULL;
+    PyObject* references = NULL;
+    PyObject* item;
+    double canonicalization_time = 0;
+    double digest_time = 0;
+    double signature_time = 0;
+    double total_time = 0;
+    xmlSecSize i;
+    int j = 0;
+
+    if ((references = PyTuple_New((Py_ssize_t)size)) == NULL) goto ON_FAIL;
+    for (i = 0; i < size; ++i) {
+        item = PyXmlSec_ReferenceReportNew(
+            (xmlSecDSigReferenceCtxPtr)xmlSecPtrListGetItem(&(handle->signedInfoReferences), i), &canonicalization_time, &digest_time);
+        if (item == NULL) goto ON_FAIL;
+        PyTuple_SET_ITEM(references, (Py_ssize_t)i, item);
+    }
+    if (timing != NULL) {
+        canonicalization_time += PyXmlSec_StageTransformsTime(&(timing->signed_info));
+        // the signature is verified after the signed info has been digested
+        signature_time = timing->signed_info.method;
+        if (timing->signed_info.finished != 0 && timing->finished != 0) {
+            signature_time += timing->finished - timing->signed_info.finished;
+        }
+        if (timing->finished != 0) {
+            total_time = timing->finished - timing->started;
+        }
+    }
+
+    if ((report = PyStructSequence_New(&PyXmlSec_SignatureReportType)) == NULL) goto ON_FAIL;
+
+#define PYXMLSEC_SET_ITEM(value) \
+    if ((item = (value)) == NULL) goto ON_FAIL; \
+    PyStructSequence_SET_ITEM(report, j++, item);
+
+    PYXMLSEC_SET_ITEM(PyLong_FromLong((long)handle->status));
+    PYXMLSEC_SET_ITEM(PyBool_FromLong(timing != NULL && timing->cached));
+    PYXMLSEC_SET_ITEM(PyXmlSec_HrefOrNone(handle->c14nMethod));
+    PYXMLSEC_SET_ITEM(PyXmlSec_HrefOrNone(handle->signMethod));
+    PyStructSequence_SET_ITEM(report, j++, references);
+    references = NULL;
+    PYXMLSEC_SET_ITEM(PyFloat_FromDouble(canonicalization_time));
+    PYXMLSEC_SET_ITEM(PyFloat_FromDouble(digest_time));
+    PYXMLSEC_SET_ITEM(PyFloat_FromDouble(signature_time));
+    PYXMLSEC_SET_ITEM(PyFloat_FromDouble(total_time));
+#undef PYXMLSEC_SET_ITEM
+
+    return report;
+ON_FAIL:
+    Py_XDECREF(references);
+    Py_XDECREF(report);
+    return NULL;
+}
+
+int PyXmlSec_ReportModule_Init(PyObject* package) {
+    if (PyStructSequence_InitType2(&PyXmlSec_ReferenceReportType, &PyXmlSec_ReferenceReportDesc) < 0) goto ON_FAIL;
+    if (PyStructSequence_InitType2(&PyXmlSec_SignatureReportType, &PyXmlSec_SignatureReportDesc) < 0) goto ON_FAIL;
+
+    Py_INCREF(&PyXmlSec_ReferenceReportType);
+    if (PyModule_AddObject(package, "ReferenceReport", (PyObject*)&PyXmlSec_ReferenceReportType) < 0) goto ON_FAIL;
+    Py_INCREF(&PyXmlSec_SignatureReportType);
+    if (PyModule_AddObject(package, "SignatureReport", (PyObject*)&PyXmlSec_SignatureReportType) < 0) goto ON_FAIL;
+    return 0;
+ON_FAIL:
+    return -1;
+}
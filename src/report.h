@@ -0,0 +1,50 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+#ifndef __PYXMLSEC_REPORT_H__
+#define __PYXMLSEC_REPORT_H__
+
+#include "platform.h"
+
+#include <xmlsec/xmldsig.h>
+
+// the wall time of a chain of transforms, which ends with the digest or the signature method
+typedef struct {
+    double started;
+    double finished;  // zero if the chain has not been finished
+    double method;    // the time spent in the digest or the signature method
+} PyXmlSec_StageTiming;
+
+typedef struct PyXmlSec_ReferenceTiming {
+    PyXmlSec_StageTiming stage;
+    struct PyXmlSec_ReferenceTiming* next;
+} PyXmlSec_ReferenceTiming;
+
+// the timings of the last sign or verify operation, it's pointed by the userData of the digital signature context
+typedef struct {
+    double started;
+    double finished;
+    int cached;  // the operation has been skipped, since the document has been verified already
+    PyXmlSec_StageTiming signed_info;
+    PyXmlSec_ReferenceTiming* references;
+} PyXmlSec_SignatureTiming;
+
+// forgets the timings of the last operation. the gil is not required.
+void PyXmlSec_SignatureTimingClear(xmlSecDSigCtxPtr handle);
+
+// starts collecting the timings of the operation. the gil is not required.
+void PyXmlSec_SignatureTimingStart(xmlSecDSigCtxPtr handle);
+
+// stops collecting the timings of the operation, may be called more than once. the gil is not required.
+void PyXmlSec_SignatureTimingFinish(xmlSecDSigCtxPtr handle);
+
+// creates the report of the last operation
+PyObject* PyXmlSec_SignatureReportNew(xmlSecDSigCtxPtr handle);
+
+#endif //__PYXMLSEC_REPORT_H__
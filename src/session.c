@@ -0,0 +1,376 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+#include "common.h"
+#include "platform.h"
+#include "cache.h"
+#include "session.h"
+#include "utils.h"
+
+#include <xmlsec/xmlenc.h>
+
+#define PYXMLSEC_SESSION_KEY_CAPSULE STRINGIFY(MODULE_NAME) ".SessionKey"
+
+// the key must not stay in the freed memory
+static void PyXmlSec_SessionKeyBufferDestroy(xmlSecBufferPtr buffer) {
+    if (xmlSecBufferGetData(buffer) != NULL) {
+        memset(xmlSecBufferGetData(buffer), 0, xmlSecBufferGetMaxSize(buffer));
+    }
+    xmlSecBufferDestroy(buffer);
+}
+
+static void PyXmlSec_SessionKeyCapsuleDestroy(PyObject* capsule) {
+    xmlSecBufferPtr buffer = (xmlSecBufferPtr)PyCapsule_GetPointer(capsule, PYXMLSEC_SESSION_KEY_CAPSULE);
+    if (buffer != NULL) {
+        PyXmlSec_SessionKeyBufferDestroy(buffer);
+    }
+}
+
+static PyObject* PyXmlSec_SessionKeyCache__new__(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
+    PyXmlSec_SessionKeyCache* cache = (PyXmlSec_SessionKeyCache*)PyType_GenericNew(type, args, kwargs);
+    PYXMLSEC_DEBUGF("%p: new session key cache", cache);
+    if (cache != NULL) {
+        cache->entries = NULL;
+        cache->timer = NULL;
+        cache->maxsize = 0;
+        cache->ttl = 0;
+        cache->hits = 0;
+        cache->misses = 0;
+    }
+    return (PyObject*)(cache);
+}
+
+static int PyXmlSec_SessionKeyCache__init__(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "maxsize", "ttl", "timer", NULL};
+    PyXmlSec_SessionKeyCache* cache = (PyXmlSec_SessionKeyCache*)self;
+    Py_ssize_t maxsize = 128;
+    PyObject* ttl = Py_None;
+    PyObject* timer = NULL;
+    double ttl_value = 0;
+
+    PYXMLSEC_DEBUGF("%p: init session key cache", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|nOO:__init__", kwlist, &maxsize, &ttl, &timer)) {
+        goto ON_FAIL;
+    }
+    if (maxsize < 0) {
+        PyErr_SetString(PyExc_ValueError, "maxsize must not be negative.");
+        goto ON_FAIL;
+    }
+    if (PyXmlSec_LruParseTtl(ttl, &ttl_value) < 0) goto ON_FAIL;
+    if ((timer = PyXmlSec_LruGetTimer(timer)) == NULL) goto ON_FAIL;
+
+    Py_XSETREF(cache->timer, timer);
+    if (cache->entries == NULL && (cache->entries = PyDict_New()) == NULL) goto ON_FAIL;
+    PyDict_Clear(cache->entries);
+    cache->maxsize = maxsize;
+    cache->ttl = ttl_value;
+    cache->hits = 0;
+    cache->misses = 0;
+    PYXMLSEC_DEBUGF("%p: init session key cache - ok", self);
+    return 0;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: init session key cache - failed", self);
+    return -1;
+}
+
+static void PyXmlSec_SessionKeyCache__del__(PyObject* self) {
+    PyXmlSec_SessionKeyCache* cache = (PyXmlSec_SessionKeyCache*)self;
+    PYXMLSEC_DEBUGF("%p: delete session key cache", self);
+    Py_XDECREF(cache->entries);
+    Py_XDECREF(cache->timer);
+    Py_TYPE(self)->tp_free(self);
+}
+
+static int PyXmlSec_SessionKeyCacheCheckReady(PyXmlSec_SessionKeyCache* cache) {
+    if (cache->entries == NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "SessionKeyCache is not initialized.");
+        return -1;
+    }
+    return 0;
+}
+
+// looks up the session key and copies it to sessionKey, returns 1 if found, 0 if not or expired, -1 on error
+static int PyXmlSec_SessionKeyCacheLookup(PyXmlSec_SessionKeyCache* cache, PyObject* entry, xmlSecBufferPtr sessionKey) {
+    PyObject* value = NULL;
+    xmlSecBufferPtr buffer;
+    int rv;
+
+    if (PyXmlSec_SessionKeyCacheCheckReady(cache) < 0) return -1;
+    if ((rv = PyXmlSec_LruLookupExpiring(cache->entries, entry, cache->timer, &value)) <= 0) {
+        if (rv == 0) cache->misses++;
+        return rv;
+    }
+    rv = -1;
+    if ((buffer = (xmlSecBufferPtr)PyCapsule_GetPointer(PyTuple_GET_ITEM(value, 1), PYXMLSEC_SESSION_KEY_CAPSULE)) == NULL) goto ON_EXIT;
+    if (xmlSecBufferSetData(sessionKey, xmlSecBufferGetData(buffer), xmlSecBufferGetSize(buffer)) < 0) {
+        PyErr_NoMemory();
+        goto ON_EXIT;
+    }
+    cache->hits++;
+    rv = 1;
+ON_EXIT:
+    Py_DECREF(value);
+    return rv;
+}
+
+static int PyXmlSec_SessionKeyCacheStore(PyXmlSec_SessionKeyCache* cache, PyObject* entry, const xmlSecByte* data, xmlSecSize size) {
+    PyObject* capsule;
+    xmlSecBufferPtr buffer;
+    int rv;
+
+    if (PyXmlSec_SessionKeyCacheCheckReady(cache) < 0) return -1;
+    if (cache->maxsize == 0) return 0;
+
+    if ((buffer = xmlSecBufferCreate(size)) == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    if (xmlSecBufferSetData(buffer, data, size) < 0) {
+        PyXmlSec_SessionKeyBufferDestroy(buffer);
+        PyErr_NoMemory();
+        return -1;
+    }
+    if ((capsule = PyCapsule_New(buffer, PYXMLSEC_SESSION_KEY_CAPSULE, PyXmlSec_SessionKeyCapsuleDestroy)) == NULL) {
+        PyXmlSec_SessionKeyBufferDestroy(buffer);
+        return -1;
+    }
+    rv = PyXmlSec_LruStoreExpiring(cache->entries, entry, capsule, cache->maxsize, cache->ttl, cache->timer);
+    Py_DECREF(capsule);
+    return rv;
+}
+
+// reads <enc:EncryptedKey/> like xmlSecKeyDataEncryptedKeyId does, but the unwrapped session keys are cached
+static int PyXmlSec_EncryptedKeyXmlRead(xmlSecKeyDataId id, xmlSecKeyPtr key, xmlNodePtr node, xmlSecKeyInfoCtxPtr keyInfoCtx) {
+    PyXmlSec_SessionKeyCacheRef* ref = (PyXmlSec_SessionKeyCacheRef*)keyInfoCtx->userData;
+    xmlSecByte digest[PYXMLSEC_SHA256_SIZE + sizeof(unsigned long long)];
+    xmlSecBufferPtr sessionKey = NULL;
+    xmlSecBufferPtr result;
+    PyGILState_STATE state;
+    PyObject* entry;
+    int found = 0;
+    int rv;
+
+    if (ref == NULL || ref->cache == NULL || ref->serial == 0 || keyInfoCtx->mode != xmlSecKeyInfoModeRead ||
+        keyInfoCtx->curEncryptedKeyLevel >= keyInfoCtx->maxEncryptedKeyLevel ||
+        PyXmlSec_ComputeNodeDigest(node, digest) < 0)
+    {
+        return xmlSecKeyDataEncryptedKeyId->xmlRead(xmlSecKeyDataEncryptedKeyId, key, node, keyInfoCtx);
+    }
+    // the session key is unwrapped with the private keys of the manager
+    memcpy(digest + PYXMLSEC_SHA256_SIZE, &(ref->serial), sizeof(ref->serial));
+
+    if ((sessionKey = xmlSecBufferCreate(0)) == NULL) return -1;
+    state = PyGILState_Ensure();
+    entry = PyBytes_FromStringAndSize((const char*)digest, sizeof(digest));
+    if (entry != NULL) {
+        found = PyXmlSec_SessionKeyCacheLookup(ref->cache, entry, sessionKey);
+    }
+    if (entry == NULL || found < 0) {
+        // the key is unwrapped as usual, if the cache fails
+        PyErr_WriteUnraisable((PyObject*)ref->cache);
+        found = 0;
+    }
+    PyGILState_Release(state);
+
+    if (found) {
+        rv = xmlSecKeyDataBinRead(keyInfoCtx->keyReq.keyId, key,
+                                  xmlSecBufferGetData(sessionKey), xmlSecBufferGetSize(sessionKey), keyInfoCtx);
+    } else {
+        rv = xmlSecKeyDataEncryptedKeyId->xmlRead(xmlSecKeyDataEncryptedKeyId, key, node, keyInfoCtx);
+        // the result is empty if the key could not be unwrapped and the failure is ignored
+        result = keyInfoCtx->encCtx != NULL ? keyInfoCtx->encCtx->result : NULL;
+        if (rv == 0 && xmlSecKeyGetValue(key) != NULL && result != NULL && xmlSecBufferGetSize(result) > 0) {
+            state = PyGILState_Ensure();
+            if (entry != NULL && PyXmlSec_SessionKeyCacheStore(ref->cache, entry, xmlSecBufferGetData(result), xmlSecBufferGetSize(result)) < 0) {
+                PyErr_WriteUnraisable((PyObject*)ref->cache);
+            }
+            PyGILState_Release(state);
+        }
+    }
+
+    state = PyGILState_Ensure();
+    Py_XDECREF(entry);
+    PyGILState_Release(state);
+    PyXmlSec_SessionKeyBufferDestroy(sessionKey);
+    return rv;
+}
+
+// the klass differs from xmlSecKeyDataEncryptedKeyId only by the reading of the node
+static struct _xmlSecKeyDataKlass PyXmlSec_EncryptedKeyKlass;
+
+int PyXmlSec_SessionKeyCacheEnable(xmlSecKeyInfoCtxPtr keyInfoCtx) {
+    xmlSecPtrListPtr list = &(keyInfoCtx->enabledKeyData);
+    xmlSecSize i;
+
+    // the empty list enables all registered key data
+    if (xmlSecPtrListGetSize(list) == 0 && xmlSecPtrListCopy(list, xmlSecKeyDataIdsGet()) < 0) return -1;
+    for (i = 0; i < xmlSecPtrListGetSize(list); ++i) {
+        if (xmlSecPtrListGetItem(list, i) == (xmlSecPtr)xmlSecKeyDataEncryptedKeyId) {
+            if (xmlSecPtrListSet(list, (xmlSecPtr)&PyXmlSec_EncryptedKeyKlass, i) < 0) return -1;
+        }
+    }
+    return 0;
+}
+
+static const char PyXmlSec_SessionKeyCacheClear__doc__[] = \
+    "clear() -> None\n"
+    "Forgets all session keys, e.g. when a private key is rotated. The memory of the keys is zeroed.\n";
+static PyObject* PyXmlSec_SessionKeyCacheClear(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyXmlSec_SessionKeyCache* cache = (PyXmlSec_SessionKeyCache*)self;
+
+    if (cache->entries != NULL) {
+        PyDict_Clear(cache->entries);
+    }
+    Py_RETURN_NONE;
+}
+
+static const char PyXmlSec_SessionKeyCacheInfo__doc__[] = \
+    "info() -> tuple[int, int, int, int]\n"
+    "Returns the statistics of the cache.\n\n"
+    ":return: ``(hits, misses, maxsize, currsize)``, expired entries are counted in ``currsize`` until they are looked up\n"
+    ":rtype: :class:`tuple`";
+static PyObject* PyXmlSec_SessionKeyCacheInfo(PyObject* self, PyObject* args, PyObject* kwargs) {
+    PyXmlSec_SessionKeyCache* cache = (PyXmlSec_SessionKeyCache*)self;
+    return Py_BuildValue("(nnnn)",
+        cache->hits,
+        cache->misses,
+        cache->maxsize,
+        cache->entries != NULL ? PyDict_Size(cache->entries) : (Py_ssize_t)0);
+}
+
+static Py_ssize_t PyXmlSec_SessionKeyCache__len__(PyObject* self) {
+    PyXmlSec_SessionKeyCache* cache = (PyXmlSec_SessionKeyCache*)self;
+    return cache->entries != NULL ? PyDict_Size(cache->entries) : 0;
+}
+
+static const char PyXmlSec_SessionKeyCacheTtl__doc__[] = "The lifetime of the entries in seconds or :data:`None` if they never expire.\n";
+static PyObject* PyXmlSec_SessionKeyCacheTtlGet(PyObject* self, void* closure) {
+    PyXmlSec_SessionKeyCache* cache = (PyXmlSec_SessionKeyCache*)self;
+    if (cache->ttl == 0) {
+        Py_RETURN_NONE;
+    }
+    return PyFloat_FromDouble(cache->ttl);
+}
+
+static const char PyXmlSec_SessionKeyCacheMaxsize__doc__[] = "The maximal number of the entries.\n";
+static PyObject* PyXmlSec_SessionKeyCacheMaxsizeGet(PyObject* self, void* closure) {
+    return PyLong_FromSsize_t(((PyXmlSec_SessionKeyCache*)self)->maxsize);
+}
+
+static PyGetSetDef PyXmlSec_SessionKeyCacheGetSet[] = {
+    {
+        "maxsize",
+        (getter)PyXmlSec_SessionKeyCacheMaxsizeGet,
+        NULL,
+        (char*)PyXmlSec_SessionKeyCacheMaxsize__doc__,
+        NULL
+    },
+    {
+        "ttl",
+        (getter)PyXmlSec_SessionKeyCacheTtlGet,
+        NULL,
+        (char*)PyXmlSec_SessionKeyCacheTtl__doc__,
+        NULL
+    },
+    {NULL} /* Sentinel */
+};
+
+static PyMethodDef PyXmlSec_SessionKeyCacheMethods[] = {
+    {
+        "clear",
+        (PyCFunction)PyXmlSec_SessionKeyCacheClear,
+        METH_NOARGS,
+        PyXmlSec_SessionKeyCacheClear__doc__
+    },
+    {
+        "info",
+        (PyCFunction)PyXmlSec_SessionKeyCacheInfo,
+        METH_NOARGS,
+        PyXmlSec_SessionKeyCacheInfo__doc__
+    },
+    {NULL, NULL} /* sentinel */
+};
+
+static PySequenceMethods PyXmlSec_SessionKeyCacheAsSequence = {
+    PyXmlSec_SessionKeyCache__len__,            /* sq_length */
+};
+
+static const char PyXmlSec_SessionKeyCache__doc__[] = \
+    "SessionKeyCache(maxsize = 128, ttl = None, timer = time.monotonic)\n"
+    "Remembers the session keys unwrapped from :xml:`<enc:EncryptedKey/>` nodes, "
+    "so an :class:`~xmlsec.EncryptionContext` which has the cache skips the private key operation "
+    "when it decrypts another message encrypted under the same :xml:`<enc:EncryptedKey/>`.\n\n"
+    "A session key is remembered by the digest of the whole :xml:`<enc:EncryptedKey/>` node and is bound "
+    "to the :class:`~xmlsec.KeysManager` which holds the private key, so one cache can be shared by several contexts. "
+    "The memory of the session keys is zeroed when they are evicted.\n\n"
+    ":param maxsize: the maximal number of session keys, the least recently used ones are forgotten first\n"
+    ":type maxsize: :class:`int`\n"
+    ":param ttl: the number of seconds the session key is kept for, :data:`None` means forever\n"
+    ":type ttl: :class:`float` or :data:`None`\n"
+    ":param timer: the function which returns the current time in seconds\n"
+    ":type timer: :class:`~collections.abc.Callable`";
+
+static PyTypeObject _PyXmlSec_SessionKeyCacheType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    STRINGIFY(MODULE_NAME) ".SessionKeyCache",  /* tp_name */
+    sizeof(PyXmlSec_SessionKeyCache),           /* tp_basicsize */
+    0,                                          /* tp_itemsize */
+    PyXmlSec_SessionKeyCache__del__,            /* tp_dealloc */
+    0,                                          /* tp_print */
+    0,                                          /* tp_getattr */
+    0,                                          /* tp_setattr */
+    0,                                          /* tp_reserved */
+    0,                                          /* tp_repr */
+    0,                                          /* tp_as_number */
+    &PyXmlSec_SessionKeyCacheAsSequence,        /* tp_as_sequence */
+    0,                                          /* tp_as_mapping */
+    0,                                          /* tp_hash  */
+    0,                                          /* tp_call */
+    0,                                          /* tp_str */
+    0,                                          /* tp_getattro */
+    0,                                          /* tp_setattro */
+    0,                                          /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT|Py_TPFLAGS_BASETYPE,     /* tp_flags */
+    PyXmlSec_SessionKeyCache__doc__,            /* tp_doc */
+    0,                                          /* tp_traverse */
+    0,                                          /* tp_clear */
+    0,                                          /* tp_richcompare */
+    0,                                          /* tp_weaklistoffset */
+    0,                                          /* tp_iter */
+    0,                                          /* tp_iternext */
+    PyXmlSec_SessionKeyCacheMethods,            /* tp_methods */
+    0,                                          /* tp_members */
+    PyXmlSec_SessionKeyCacheGetSet,             /* tp_getset */
+    0,                                          /* tp_base */
+    0,                                          /* tp_dict */
+    0,                                          /* tp_descr_get */
+    0,                                          /* tp_descr_set */
+    0,                                          /* tp_dictoffset */
+    PyXmlSec_SessionKeyCache__init__,           /* tp_init */
+    0,                                          /* tp_alloc */
+    PyXmlSec_SessionKeyCache__new__,            /* tp_new */
+    0,                                          /* tp_free */
+};
+
+PyTypeObject* PyXmlSec_SessionKeyCacheType = &_PyXmlSec_SessionKeyCacheType;
+
+int PyXmlSec_SessionModule_Init(PyObject* package) {
+    memcpy(&PyXmlSec_EncryptedKeyKlass, xmlSecKeyDataEncryptedKeyId, sizeof(PyXmlSec_EncryptedKeyKlass));
+    PyXmlSec_EncryptedKeyKlass.xmlRead = PyXmlSec_EncryptedKeyXmlRead;
+
+    if (PyType_Ready(PyXmlSec_SessionKeyCacheType) < 0) goto ON_FAIL;
+
+    // since objects is created as static objects, need to increase refcount to prevent deallocate
+    Py_INCREF(PyXmlSec_SessionKeyCacheType);
+
+    if (PyModule_AddObject(package, "SessionKeyCache", (PyObject*)PyXmlSec_SessionKeyCacheType) < 0) goto ON_FAIL;
+    return 0;
+ON_FAIL:
+    return -1;
+}
@@ -0,0 +1,40 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+#ifndef __PYXMLSEC_SESSION_H__
+#define __PYXMLSEC_SESSION_H__
+
+#include "platform.h"
+
+#include <xmlsec/xmlsec.h>
+#include <xmlsec/keyinfo.h>
+
+typedef struct {
+    PyObject_HEAD
+    PyObject* entries;  // digest of <enc:EncryptedKey/> -> (expiration time or None, capsule of the session key) in LRU order
+    PyObject* timer;
+    Py_ssize_t maxsize;
+    double ttl;  // zero if the entries never expire
+    Py_ssize_t hits;
+    Py_ssize_t misses;
+} PyXmlSec_SessionKeyCache;
+
+extern PyTypeObject* PyXmlSec_SessionKeyCacheType;
+
+// the cache which is used by the running decryption, it's pointed by the userData of the key info context.
+// the nested contexts, which decrypt <enc:EncryptedKey/>, copy the pointer, so it must live as long as the context.
+typedef struct {
+    PyXmlSec_SessionKeyCache* cache;  // NULL if the cache is not used
+    unsigned long long serial;        // the serial of the keys manager, which owns the private keys
+} PyXmlSec_SessionKeyCacheRef;
+
+// makes the key info context read <enc:EncryptedKey/> through the cache, which is pointed by its userData
+int PyXmlSec_SessionKeyCacheEnable(xmlSecKeyInfoCtxPtr keyInfoCtx);
+
+#endif //__PYXMLSEC_SESSION_H__
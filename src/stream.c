@@ -0,0 +1,296 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+
+#include "common.h"
+#include "platform.h"
+#include "stream.h"
+
+#include <errno.h>
+
+#ifdef MS_WIN32
+#include <io.h>
+#define PYXMLSEC_READ(fd, data, size) _read((fd), (data), (unsigned int)(size))
+#define PYXMLSEC_WRITE(fd, data, size) _write((fd), (data), (unsigned int)(size))
+#else
+#include <unistd.h>
+#define PYXMLSEC_READ(fd, data, size) read((fd), (data), (size_t)(size))
+#define PYXMLSEC_WRITE(fd, data, size) write((fd), (data), (size_t)(size))
+#endif /* MS_WIN32 */
+
+// the limit of a single read or write of the file descriptor
+#define PYXMLSEC_IO_MAX ((xmlSecSize)INT_MAX)
+
+int PyXmlSec_StreamSourceConverter(PyObject* o, PyXmlSec_StreamSource* source) {
+    source->readable = NULL;
+    source->fd = -1;
+    source->error = 0;
+    if (PyLong_Check(o)) {
+        source->fd = PyObject_AsFileDescriptor(o);
+        return source->fd < 0 ? 0 : 1;
+    }
+    if (!PyObject_HasAttrString(o, "readinto") && !PyObject_HasAttrString(o, "read")) {
+        PyErr_SetString(PyExc_TypeError, "readable must be a file descriptor or an object with the read method.");
+        return 0;
+    }
+    source->readable = o;
+    return 1;
+}
+
+// reads the data from the python object, readinto is preferred since it does not copy the data
+static Py_ssize_t PyXmlSec_StreamSourceReadObject(PyXmlSec_StreamSource* source, xmlSecByte* buffer, xmlSecSize size) {
+    PyGILState_STATE state = PyGILState_Ensure();
+    PyObject* view = NULL;
+    PyObject* result = NULL;
+    PyObject* tmp;
+    PyObject* type;
+    PyObject* value;
+    PyObject* traceback;
+    Py_buffer data = {0};
+    Py_ssize_t n = -1;
+
+    if (PyObject_HasAttrString(source->readable, "readinto")) {
+        view = PyMemoryView_FromMemory((char*)buffer, (Py_ssize_t)size, PyBUF_WRITE);
+        if (view == NULL) goto ON_FAIL;
+        result = PyObject_CallMethod(source->readable, "readinto", "O", view);
+        if (result == NULL) goto ON_FAIL;
+        // the object must not access the buffer after the call
+        tmp = PyObject_CallMethod(view, "release", NULL);
+        if (tmp == NULL) goto ON_FAIL;
+        Py_DECREF(tmp);
+        n = (result == Py_None) ? -1 : PyLong_AsSsize_t(result);
+    } else {
+        result = PyObject_CallMethod(source->readable, "read", "n", (Py_ssize_t)size);
+        if (result == NULL) goto ON_FAIL;
+        if (result != Py_None && PyObject_GetBuffer(result, &data, PyBUF_SIMPLE) == 0) {
+            n = data.len;
+            if ((xmlSecSize)n <= size) {
+                memcpy(buffer, data.buf, (size_t)n);
+            }
+            PyBuffer_Release(&data);
+        }
+    }
+    if (PyErr_Occurred()) {
+        n = -1;
+    } else if (n < 0 || (xmlSecSize)n > size) {
+        PyErr_SetString(PyExc_OSError, result == Py_None ? "read() returned no data, non-blocking streams are not supported." : "read() returned invalid length.");
+        n = -1;
+    }
+
+ON_FAIL:
+    if (view != NULL && result == NULL) {
+        // the buffer is released even if the object has failed, the error is preserved
+        PyErr_Fetch(&type, &value, &traceback);
+        tmp = PyObject_CallMethod(view, "release", NULL);
+        Py_XDECREF(tmp);
+        PyErr_Restore(type, value, traceback);
+    }
+    Py_XDECREF(result);
+    Py_XDECREF(view);
+    PyGILState_Release(state);
+    return n;
+}
+
+Py_ssize_t PyXmlSec_StreamSourceRead(PyXmlSec_StreamSource* source, xmlSecByte* buffer, xmlSecSize size) {
+    Py_ssize_t n;
+
+    if (source->readable != NULL) {
+        return PyXmlSec_StreamSourceReadObject(source, buffer, size);
+    }
+    if (size > PYXMLSEC_IO_MAX) {
+        size = PYXMLSEC_IO_MAX;
+    }
+    do {
+        n = PYXMLSEC_READ(source->fd, buffer, size);
+    } while (n < 0 && errno == EINTR);
+    if (n < 0) {
+        source->error = errno;
+    }
+    return n;
+}
+
+int PyXmlSec_StreamSourceCheckError(PyXmlSec_StreamSource* source) {
+    if (source->error != 0) {
+        errno = source->error;
+        PyErr_SetFromErrno(PyExc_OSError);
+        return 1;
+    }
+    return PyErr_Occurred() != NULL;
+}
+
+int PyXmlSec_StreamSinkConverter(PyObject* o, PyXmlSec_StreamSink* sink) {
+    sink->writable = NULL;
+    sink->fd = -1;
+    sink->error = 0;
+    sink->hold = 0;
+    sink->written = 0;
+    if (PyLong_Check(o)) {
+        sink->fd = PyObject_AsFileDescriptor(o);
+        return sink->fd < 0 ? 0 : 1;
+    }
+    if (!PyObject_HasAttrString(o, "write")) {
+        PyErr_SetString(PyExc_TypeError, "writable must be a file descriptor or an object with the write method.");
+        return 0;
+    }
+    sink->writable = o;
+    return 1;
+}
+
+// writes the data to the file descriptor, the gil is not required
+static int PyXmlSec_StreamSinkWriteFd(PyXmlSec_StreamSink* sink, const xmlSecByte* data, xmlSecSize size) {
+    Py_ssize_t n;
+
+    while (size > 0) {
+        n = PYXMLSEC_WRITE(sink->fd, data, size > PYXMLSEC_IO_MAX ? PYXMLSEC_IO_MAX : size);
+        if (n < 0) {
+            if (errno == EINTR) continue;
+            sink->error = errno;
+            return -1;
+        }
+        data += n;
+        size -= (xmlSecSize)n;
+        sink->written += (unsigned long long)n;
+    }
+    return 0;
+}
+
+// writes the data to the python object, the write may be partial like the one of io.RawIOBase
+static int PyXmlSec_StreamSinkWriteObject(PyXmlSec_StreamSink* sink, const xmlSecByte* data, xmlSecSize size) {
+    PyGILState_STATE state = PyGILState_Ensure();
+    PyObject* chunk;
+    PyObject* result;
+    Py_ssize_t n;
+    int rv = 0;
+
+    while (size > 0) {
+        chunk = PyBytes_FromStringAndSize((const char*)data, (Py_ssize_t)size);
+        if (chunk == NULL) {
+            rv = -1;
+            break;
+        }
+        result = PyObject_CallMethod(sink->writable, "write", "O", chunk);
+        Py_DECREF(chunk);
+        if (result == NULL) {
+            rv = -1;
+            break;
+        }
+        // the objects, which don't report the number of the written bytes, accept the whole chunk
+        n = (result == Py_None) ? (Py_ssize_t)size : PyLong_AsSsize_t(result);
+        Py_DECREF(result);
+        if (n < 0 || (xmlSecSize)n > size) {
+            if (!PyErr_Occurred()) {
+                PyErr_Format(PyExc_OSError, "write() returned invalid length %zd.", n);
+            }
+            rv = -1;
+            break;
+        }
+        if (n == 0) {
+            PyErr_SetString(PyExc_OSError, "write() accepted no data.");
+            rv = -1;
+            break;
+        }
+        data += n;
+        size -= (xmlSecSize)n;
+        sink->written += (unsigned long long)n;
+    }
+    PyGILState_Release(state);
+    return rv;
+}
+
+static int PyXmlSec_StreamSinkWrite(PyXmlSec_StreamSink* sink, const xmlSecByte* data, xmlSecSize size) {
+    if (sink->writable == NULL) {
+        return PyXmlSec_StreamSinkWriteFd(sink, data, size);
+    }
+    return PyXmlSec_StreamSinkWriteObject(sink, data, size);
+}
+
+int PyXmlSec_StreamSinkCheckError(PyXmlSec_StreamSink* sink) {
+    if (sink->error != 0) {
+        errno = sink->error;
+        PyErr_SetFromErrno(PyExc_OSError);
+        return 1;
+    }
+    // the error of the python object is set by the write
+    return PyErr_Occurred() != NULL;
+}
+
+// the transform collects the data into blocks and writes them to the sink,
+// the next transform, which is the result buffer of the chain, receives nothing.
+typedef struct {
+    xmlSecTransform transform;
+    PyXmlSec_StreamSink* sink;
+} PyXmlSec_SinkTransform;
+
+static int PyXmlSec_SinkPushBin(xmlSecTransformPtr transform, const xmlSecByte* data, xmlSecSize dataSize, int final, xmlSecTransformCtxPtr transformCtx) {
+    PyXmlSec_StreamSink* sink = ((PyXmlSec_SinkTransform*)transform)->sink;
+    xmlSecBufferPtr block = &(transform->inBuf);
+    xmlSecSize offset;
+    xmlSecSize size;
+
+    if (dataSize > 0 && xmlSecBufferAppend(block, data, dataSize) < 0) {
+        return -1;
+    }
+    size = xmlSecBufferGetSize(block);
+    if (size > 0 && (final || (!sink->hold && size >= sink->block_size))) {
+        // the held data is written by blocks as well
+        for (offset = 0; offset < size; offset += sink->block_size) {
+            if (PyXmlSec_StreamSinkWrite(sink, xmlSecBufferGetData(block) + offset, size - offset < sink->block_size ? size - offset : sink->block_size) < 0) {
+                return -1;
+            }
+        }
+        // the plain text is not kept in memory longer than needed
+        memset(xmlSecBufferGetData(block), 0, size);
+        xmlSecBufferSetSize(block, 0);
+    }
+    if (!final) {
+        return 0;
+    }
+    transform->status = xmlSecTransformStatusFinished;
+    return transform->next != NULL ? xmlSecTransformPushBin(transform->next, NULL, 0, 1, transformCtx) : 0;
+}
+
+static xmlSecTransformKlass PyXmlSec_SinkKlass = {
+    sizeof(xmlSecTransformKlass),               /* klassSize */
+    sizeof(PyXmlSec_SinkTransform),             /* objSize */
+    BAD_CAST "pyxmlsec-sink",                   /* name */
+    NULL,                                       /* href */
+    xmlSecTransformUsageUnknown,                /* usage */
+    NULL,                                       /* initialize */
+    NULL,                                       /* finalize */
+    NULL,                                       /* readNode */
+    NULL,                                       /* writeNode */
+    NULL,                                       /* setKeyReq */
+    NULL,                                       /* setKey */
+    NULL,                                       /* verify */
+    xmlSecTransformDefaultGetDataType,          /* getDataType */
+    PyXmlSec_SinkPushBin,                       /* pushBin */
+    NULL,                                       /* popBin */
+    NULL,                                       /* pushXml */
+    NULL,                                       /* popXml */
+    NULL,                                       /* execute */
+    NULL,                                       /* reserved0 */
+    NULL,                                       /* reserved1 */
+};
+
+int PyXmlSec_StreamSinkInsert(xmlSecTransformCtxPtr transformCtx, PyXmlSec_StreamSink* sink) {
+    xmlSecTransformPtr last = transformCtx->last;
+    xmlSecTransformPtr transform;
+
+    if (last == NULL || last->prev == NULL) return -1;
+    if ((transform = xmlSecTransformCreate(&PyXmlSec_SinkKlass)) == NULL) return -1;
+
+    PYXMLSEC_DEBUGF("%p: insert sink before %s", transformCtx, last->id->name);
+    ((PyXmlSec_SinkTransform*)transform)->sink = sink;
+    transform->status = xmlSecTransformStatusWorking;
+    transform->prev = last->prev;
+    transform->next = last;
+    last->prev->next = transform;
+    last->prev = transform;
+    return 0;
+}
@@ -0,0 +1,60 @@
+// Copyright (c) 2017 Ryan Leckey
+// THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+// IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+// FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+// AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+// LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+// OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+// SOFTWARE.
+
+
+#ifndef __PYXMLSEC_STREAM_H__
+#define __PYXMLSEC_STREAM_H__
+
+#include "platform.h"
+
+#include <xmlsec/xmlsec.h>
+#include <xmlsec/transforms.h>
+
+#define PYXMLSEC_STREAM_BLOCK_SIZE 65536
+
+// the origin of the streamed data, either a file descriptor or an object with the readinto or the read method
+typedef struct {
+    PyObject* readable;  // NULL if the data is read from the file descriptor
+    int fd;
+    int error;           // errno of the failed read from the file descriptor
+} PyXmlSec_StreamSource;
+
+// the converter for PyArg_Parse*, accepts the file descriptor or the object with the readinto or the read method.
+// the source holds a borrowed reference to the object.
+int PyXmlSec_StreamSourceConverter(PyObject* o, PyXmlSec_StreamSource* source);
+
+// reads at most size bytes into the buffer, returns the number of the read bytes, zero at the end of the data or -1.
+// the gil is not required, it's taken for the time of the read from the python object.
+Py_ssize_t PyXmlSec_StreamSourceRead(PyXmlSec_StreamSource* source, xmlSecByte* buffer, xmlSecSize size);
+
+// sets the python error after the failed operation, if the source failed. returns 1 if the error is set.
+int PyXmlSec_StreamSourceCheckError(PyXmlSec_StreamSource* source);
+
+// the destination of the streamed data, either a file descriptor or an object with the write method
+typedef struct {
+    PyObject* writable;  // NULL if the data is written to the file descriptor
+    int fd;
+    int error;           // errno of the failed write to the file descriptor
+    xmlSecSize block_size;
+    int hold;            // the data is written at the final push only, e.g. it's not authenticated before
+    unsigned long long written;
+} PyXmlSec_StreamSink;
+
+// the converter for PyArg_Parse*, accepts the file descriptor or the object with the write method.
+// the sink holds a borrowed reference to the object.
+int PyXmlSec_StreamSinkConverter(PyObject* o, PyXmlSec_StreamSink* sink);
+
+// inserts the transform, which writes the data to the sink instead of the result buffer, before the last transform
+// of the prepared chain. the gil is not required, it's taken for the time of each write to the python object.
+int PyXmlSec_StreamSinkInsert(xmlSecTransformCtxPtr transformCtx, PyXmlSec_StreamSink* sink);
+
+// sets the python error after the failed operation, if the sink failed. returns 1 if the error is set.
+int PyXmlSec_StreamSinkCheckError(PyXmlSec_StreamSink* sink);
+
+#endif //__PYXMLSEC_STREAM_H__
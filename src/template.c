@@ -14,6 +14,7 @@
 #include "lxml.h"
 
 #include <xmlsec/templates.h>
+#include <xmlsec/xmltree.h>
 
 #define PYXMLSEC_TEMPLATES_DOC "Xml Templates processing"
 
@@ -741,6 +742,45 @@ ON_FAIL:
     return NULL;
 }
 
+static char PyXmlSec_TemplateEncryptedDataEnsureCipherReference__doc__[] = \
+    "encrypted_data_ensure_cipher_reference(node, uri = None) -> lxml.etree._Element\n"
+    "Adds :xml:`<CipherReference/>` to the :xml:`<enc:EncryptedData/>` node of ``node``.\n\n"
+    ":param node: the pointer to :xml:`<enc:EncryptedData/>` node\n"
+    ":type node: :class:`lxml.etree._Element`\n"
+    ":param uri: the URI attribute (optional)\n"
+    ":type uri: :class:`str`\n"
+    ":return: the pointer to newly created :xml:`<enc:CipherReference/>` node\n"
+    ":rtype: :class:`lxml.etree._Element`";
+static PyObject* PyXmlSec_TemplateEncryptedDataEnsureCipherReference(PyObject* self, PyObject *args, PyObject *kwargs) {
+    static char *kwlist[] = { "node", "uri", NULL};
+
+    PyXmlSec_LxmlElementPtr node = NULL;
+    const char* uri = NULL;
+    xmlNodePtr res;
+
+    PYXMLSEC_DEBUG("template encrypted_data_ensure_cipher_reference - start");
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&|z:encrypted_data_ensure_cipher_reference", kwlist,
+        PyXmlSec_LxmlElementConverter, &node, &uri))
+    {
+        goto ON_FAIL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS;
+    res = xmlSecTmplEncDataEnsureCipherReference(node->_c_node, XSTR(uri));
+    Py_END_ALLOW_THREADS;
+    if (res == NULL) {
+        PyXmlSec_SetLastError("cannot ensure cipher reference for encrypted data.");
+        goto ON_FAIL;
+    }
+
+    PYXMLSEC_DEBUG("template encrypted_data_ensure_cipher_reference - ok");
+    return (PyObject*)PyXmlSec_elementFactory(node->_doc, res);
+
+ON_FAIL:
+    PYXMLSEC_DEBUG("template encrypted_data_ensure_cipher_reference - fail");
+    return NULL;
+}
+
 static char PyXmlSec_TemplateTransformAddC14NInclNamespaces__doc__[] = \
     "transform_add_c14n_inclusive_namespaces(node, prefixes = None) -> None\n"
     "Adds 'inclusive' namespaces to the ExcC14N transform node ``node``.\n\n"
@@ -800,6 +840,204 @@ ON_FAIL:
     return NULL;
 }
 
+// the template, which has been built once and is copied into the documents
+typedef struct {
+    PyObject_HEAD
+    xmlDocPtr doc;  // the private document, which owns the copy of the template
+} PyXmlSec_CompiledTemplate;
+
+static const char PyXmlSec_CompiledTemplate__doc__[] = \
+    "CompiledTemplate(node) -> CompiledTemplate\n"
+    "The template, e.g. :xml:`<dsig:Signature/>`, which has been built once with the functions of this module "
+    "and is stamped into the documents with :meth:`stamp`. The template cannot be changed, "
+    "so it may be stamped by several threads at once.\n\n"
+    ":param node: the root of the template, it is copied and may be modified or discarded afterwards\n"
+    ":type node: :class:`lxml.etree._Element`";
+static PyObject* PyXmlSec_CompiledTemplate__new__(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
+    PyXmlSec_CompiledTemplate* tmpl = (PyXmlSec_CompiledTemplate*)PyType_GenericNew(type, args, kwargs);
+    PYXMLSEC_DEBUGF("%p: new compiled template", tmpl);
+    if (tmpl != NULL) {
+        tmpl->doc = NULL;
+    }
+    return (PyObject*)(tmpl);
+}
+
+static int PyXmlSec_CompiledTemplate__init__(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "node", NULL};
+
+    PyXmlSec_CompiledTemplate* tmpl = (PyXmlSec_CompiledTemplate*)self;
+    PyXmlSec_LxmlElementPtr node = NULL;
+    xmlDocPtr doc = NULL;
+    xmlNodePtr root = NULL;
+
+    PYXMLSEC_DEBUGF("%p: init compiled template - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&:__init__", kwlist, PyXmlSec_LxmlElementConverter, &node)) {
+        goto ON_FAIL;
+    }
+    // stamp reads the document without the GIL, so it is never replaced
+    if (tmpl->doc != NULL) {
+        PyErr_SetString(PyExc_RuntimeError, "the template is already initialized.");
+        goto ON_FAIL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS;
+    doc = xmlNewDoc(BAD_CAST "1.0");
+    if (doc != NULL) {
+        // the namespaces, which are declared by the ancestors of node, are declared by the copy
+        root = xmlDocCopyNode(node->_c_node, doc, 1);
+        if (root != NULL) {
+            xmlDocSetRootElement(doc, root);
+        }
+    }
+    Py_END_ALLOW_THREADS;
+    if (root == NULL) {
+        PyErr_SetString(PyXmlSec_InternalError, "cannot copy template.");
+        goto ON_FAIL;
+    }
+
+    tmpl->doc = doc;
+    PYXMLSEC_DEBUGF("%p: init compiled template - ok", self);
+    return 0;
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: init compiled template - fail", self);
+    if (doc != NULL) {
+        xmlFreeDoc(doc);
+    }
+    return -1;
+}
+
+static void PyXmlSec_CompiledTemplate__del__(PyObject* self) {
+    PyXmlSec_CompiledTemplate* tmpl = (PyXmlSec_CompiledTemplate*)self;
+    PYXMLSEC_DEBUGF("%p: delete compiled template", self);
+    if (tmpl->doc != NULL) {
+        xmlFreeDoc(tmpl->doc);
+    }
+    Py_TYPE(self)->tp_free(self);
+}
+
+static const char PyXmlSec_CompiledTemplateStamp__doc__[] = \
+    "stamp(node, id = None, uri = None, reference_id = None) -> lxml.etree._Element\n"
+    "Appends the copy of the template to the children of ``node``, the attributes of the copy are replaced "
+    "by the given values.\n\n"
+    ":param node: the parent of the copy\n"
+    ":type node: :class:`lxml.etree._Element`\n"
+    ":param id: the ``\"Id\"`` attribute of the root of the copy (optional)\n"
+    ":type id: :class:`str` or :data:`None`\n"
+    ":param uri: the ``\"URI\"`` attribute of the first :xml:`<dsig:Reference/>` node of the copy (optional)\n"
+    ":type uri: :class:`str` or :data:`None`\n"
+    ":param reference_id: the ``\"Id\"`` attribute of the first :xml:`<dsig:Reference/>` node of the copy (optional)\n"
+    ":type reference_id: :class:`str` or :data:`None`\n"
+    ":return: the root of the copy\n"
+    ":rtype: :class:`lxml.etree._Element`";
+static PyObject* PyXmlSec_CompiledTemplateStamp(PyObject* self, PyObject* args, PyObject* kwargs) {
+    static char *kwlist[] = { "node", "id", "uri", "reference_id", NULL};
+
+    PyXmlSec_CompiledTemplate* tmpl = (PyXmlSec_CompiledTemplate*)self;
+    PyXmlSec_LxmlElementPtr node = NULL;
+    const char* id = NULL;
+    const char* uri = NULL;
+    const char* reference_id = NULL;
+    const char* error = NULL;
+    xmlNodePtr res = NULL;
+    xmlNodePtr ref = NULL;
+
+    PYXMLSEC_DEBUGF("%p: stamp - start", self);
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O&|zzz:stamp", kwlist,
+        PyXmlSec_LxmlElementConverter, &node, &id, &uri, &reference_id))
+    {
+        goto ON_FAIL;
+    }
+    if (tmpl->doc == NULL) {
+        PyErr_SetString(PyExc_ValueError, "template is not initialized.");
+        goto ON_FAIL;
+    }
+
+    Py_BEGIN_ALLOW_THREADS;
+    res = xmlDocCopyNode(xmlDocGetRootElement(tmpl->doc), node->_doc->_c_doc, 1);
+    if (res == NULL) {
+        error = "cannot copy template.";
+    } else if (uri != NULL || reference_id != NULL) {
+        ref = xmlSecFindNode(res, xmlSecNodeReference, xmlSecDSigNs);
+        if (ref == NULL) {
+            error = "template has no reference.";
+        } else if ((uri != NULL && xmlSetProp(ref, xmlSecAttrURI, XSTR(uri)) == NULL) ||
+                   (reference_id != NULL && xmlSetProp(ref, xmlSecAttrId, XSTR(reference_id)) == NULL)) {
+            error = "cannot set attribute.";
+        }
+    }
+    if (error == NULL && id != NULL && xmlSetProp(res, xmlSecAttrId, XSTR(id)) == NULL) {
+        error = "cannot set attribute.";
+    }
+    if (error == NULL) {
+        xmlAddChild(node->_c_node, res);
+    } else if (res != NULL) {
+        xmlFreeNode(res);
+    }
+    Py_END_ALLOW_THREADS;
+    if (error != NULL) {
+        PyErr_SetString(PyXmlSec_Error, error);
+        goto ON_FAIL;
+    }
+
+    PYXMLSEC_DEBUGF("%p: stamp - ok", self);
+    return (PyObject*)PyXmlSec_elementFactory(node->_doc, res);
+ON_FAIL:
+    PYXMLSEC_DEBUGF("%p: stamp - fail", self);
+    return NULL;
+}
+
+static PyMethodDef PyXmlSec_CompiledTemplateMethods[] = {
+    {
+        "stamp",
+        (PyCFunction)PyXmlSec_CompiledTemplateStamp,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_CompiledTemplateStamp__doc__
+    },
+    {NULL, NULL} /* sentinel */
+};
+
+static PyTypeObject _PyXmlSec_CompiledTemplateType = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    STRINGIFY(MODULE_NAME) ".template.CompiledTemplate", /* tp_name */
+    sizeof(PyXmlSec_CompiledTemplate),          /* tp_basicsize */
+    0,                                          /* tp_itemsize */
+    PyXmlSec_CompiledTemplate__del__,           /* tp_dealloc */
+    0,                                          /* tp_print */
+    0,                                          /* tp_getattr */
+    0,                                          /* tp_setattr */
+    0,                                          /* tp_reserved */
+    0,                                          /* tp_repr */
+    0,                                          /* tp_as_number */
+    0,                                          /* tp_as_sequence */
+    0,                                          /* tp_as_mapping */
+    0,                                          /* tp_hash  */
+    0,                                          /* tp_call */
+    0,                                          /* tp_str */
+    0,                                          /* tp_getattro */
+    0,                                          /* tp_setattro */
+    0,                                          /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT|Py_TPFLAGS_BASETYPE,     /* tp_flags */
+    PyXmlSec_CompiledTemplate__doc__,           /* tp_doc */
+    0,                                          /* tp_traverse */
+    0,                                          /* tp_clear */
+    0,                                          /* tp_richcompare */
+    0,                                          /* tp_weaklistoffset */
+    0,                                          /* tp_iter */
+    0,                                          /* tp_iternext */
+    PyXmlSec_CompiledTemplateMethods,           /* tp_methods */
+    0,                                          /* tp_members */
+    0,                                          /* tp_getset */
+    0,                                          /* tp_base */
+    0,                                          /* tp_dict */
+    0,                                          /* tp_descr_get */
+    0,                                          /* tp_descr_set */
+    0,                                          /* tp_dictoffset */
+    PyXmlSec_CompiledTemplate__init__,          /* tp_init */
+    0,                                          /* tp_alloc */
+    PyXmlSec_CompiledTemplate__new__,           /* tp_new */
+    0,                                          /* tp_free */
+};
+
 static PyMethodDef PyXmlSec_TemplateMethods[] = {
     {
         "create",
@@ -909,6 +1147,12 @@ static PyMethodDef PyXmlSec_TemplateMethods[] = {
         METH_VARARGS|METH_KEYWORDS,
         PyXmlSec_TemplateEncryptedDataEnsureCipherValue__doc__
     },
+    {
+        "encrypted_data_ensure_cipher_reference",
+        (PyCFunction)PyXmlSec_TemplateEncryptedDataEnsureCipherReference,
+        METH_VARARGS|METH_KEYWORDS,
+        PyXmlSec_TemplateEncryptedDataEnsureCipherReference__doc__
+    },
     {
         "transform_add_c14n_inclusive_namespaces",
         (PyCFunction)PyXmlSec_TemplateTransformAddC14NInclNamespaces,
@@ -937,6 +1181,13 @@ int PyXmlSec_TemplateModule_Init(PyObject* package) {
     if (!template) goto ON_FAIL;
     PYXMLSEC_DEBUGF("%p", template);
 
+    if (PyType_Ready(&_PyXmlSec_CompiledTemplateType) < 0) goto ON_FAIL;
+    Py_INCREF(&_PyXmlSec_CompiledTemplateType);
+    if (PyModule_AddObject(template, "CompiledTemplate", (PyObject*)&_PyXmlSec_CompiledTemplateType) < 0) {
+        Py_DECREF(&_PyXmlSec_CompiledTemplateType);
+        goto ON_FAIL;
+    }
+
     if (PyModule_AddObject(package, "template", template) < 0) goto ON_FAIL;
 
     return 0;
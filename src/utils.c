@@ -9,6 +9,10 @@
 
 #include "utils.h"
 
+#ifndef MS_WIN32
+#include <time.h>
+#endif /* MS_WIN32 */
+
 PyObject* PyXmlSec_GetFilePathOrContent(PyObject* file, int* is_content) {
     PyObject* data;
     PyObject* utf8;
@@ -54,3 +58,154 @@ int PyXmlSec_SetLongAttr(PyObject* obj, const char* name, long value) {
     Py_DECREF(tmp);
     return r;
 }
+
+double PyXmlSec_GetTime(void) {
+#ifdef MS_WIN32
+    LARGE_INTEGER frequency, counter;
+    QueryPerformanceFrequency(&frequency);
+    QueryPerformanceCounter(&counter);
+    return (double)counter.QuadPart / (double)frequency.QuadPart;
+#else
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return (double)now.tv_sec + (double)now.tv_nsec * 1e-9;
+#endif /* MS_WIN32 */
+}
+
+long PyXmlSec_GetDefaultWorkers(void) {
+    PyObject* os = PyImport_ImportModule("os");
+    PyObject* count;
+    long workers = -1;
+
+    if (os == NULL) return -1;
+    count = PyObject_CallMethod(os, "cpu_count", NULL);
+    Py_DECREF(os);
+    if (count == NULL) return -1;
+    workers = (count == Py_None) ? 1 : PyLong_AsLong(count);
+    Py_DECREF(count);
+    return workers;
+}
+
+int PyXmlSec_LruShrink(PyObject* entries, Py_ssize_t size) {
+    PyObject* oldest;
+    PyObject* value;
+    Py_ssize_t pos;
+    int rv;
+
+    while (PyDict_Size(entries) > size) {
+        pos = 0;
+        if (!PyDict_Next(entries, &pos, &oldest, &value)) break;
+        Py_INCREF(oldest);
+        rv = PyDict_DelItem(entries, oldest);
+        Py_DECREF(oldest);
+        if (rv < 0) return -1;
+    }
+    return 0;
+}
+
+int PyXmlSec_LruTouch(PyObject* entries, PyObject* entry, PyObject* value) {
+    int rv;
+
+    // the value may be owned by the dict only
+    Py_INCREF(value);
+    rv = PyDict_DelItem(entries, entry);
+    if (rv >= 0) rv = PyDict_SetItem(entries, entry, value);
+    Py_DECREF(value);
+    return rv;
+}
+
+int PyXmlSec_LruStore(PyObject* entries, PyObject* entry, PyObject* value, Py_ssize_t maxsize) {
+    int rv;
+
+    if (maxsize <= 0) return 0;
+    rv = PyDict_Contains(entries, entry);
+    if (rv == 1) rv = PyDict_DelItem(entries, entry);
+    if (rv >= 0) rv = PyXmlSec_LruShrink(entries, maxsize - 1);
+    if (rv >= 0) rv = PyDict_SetItem(entries, entry, value);
+    return rv < 0 ? -1 : 0;
+}
+
+int PyXmlSec_LruParseTtl(PyObject* ttl, double* value) {
+    *value = 0;
+    if (ttl == Py_None) return 0;
+    *value = PyFloat_AsDouble(ttl);
+    if (*value == -1 && PyErr_Occurred()) return -1;
+    if (!(*value > 0)) {
+        PyErr_SetString(PyExc_ValueError, "ttl must be positive.");
+        return -1;
+    }
+    return 0;
+}
+
+PyObject* PyXmlSec_LruGetTimer(PyObject* timer) {
+    PyObject* time_module;
+
+    if (timer == NULL) {
+        if ((time_module = PyImport_ImportModule("time")) == NULL) return NULL;
+        timer = PyObject_GetAttrString(time_module, "monotonic");
+        Py_DECREF(time_module);
+        return timer;
+    }
+    if (!PyCallable_Check(timer)) {
+        PyErr_SetString(PyExc_TypeError, "timer must be callable.");
+        return NULL;
+    }
+    Py_INCREF(timer);
+    return timer;
+}
+
+// returns the current time of the timer in *now
+static int PyXmlSec_LruNow(PyObject* timer, double* now) {
+    PyObject* value;
+
+    if ((value = PyObject_CallObject(timer, NULL)) == NULL) return -1;
+    *now = PyFloat_AsDouble(value);
+    Py_DECREF(value);
+    if (*now == -1 && PyErr_Occurred()) return -1;
+    return 0;
+}
+
+int PyXmlSec_LruLookupExpiring(PyObject* entries, PyObject* entry, PyObject* timer, PyObject** value) {
+    PyObject* found;
+    PyObject* expires;
+    double now;
+
+    *value = NULL;
+    if ((found = PyDict_GetItemWithError(entries, entry)) == NULL) {
+        return PyErr_Occurred() ? -1 : 0;
+    }
+    Py_INCREF(found);
+    expires = PyTuple_GET_ITEM(found, 0);
+    if (expires != Py_None) {
+        if (PyXmlSec_LruNow(timer, &now) < 0) goto ON_FAIL;
+        if (now >= PyFloat_AS_DOUBLE(expires)) {
+            Py_DECREF(found);
+            return PyDict_DelItem(entries, entry) < 0 ? -1 : 0;
+        }
+    }
+    if (PyXmlSec_LruTouch(entries, entry, found) < 0) goto ON_FAIL;
+    *value = found;
+    return 1;
+ON_FAIL:
+    Py_DECREF(found);
+    return -1;
+}
+
+int PyXmlSec_LruStoreExpiring(PyObject* entries, PyObject* entry, PyObject* payload, Py_ssize_t maxsize, double ttl, PyObject* timer) {
+    PyObject* value;
+    double now;
+    int rv;
+
+    if (maxsize <= 0) return 0;
+    if (ttl == 0) {
+        value = PyTuple_Pack(2, Py_None, payload);
+    } else if (PyXmlSec_LruNow(timer, &now) < 0) {
+        return -1;
+    } else {
+        value = Py_BuildValue("(dO)", now + ttl, payload);
+    }
+    if (value == NULL) return -1;
+    rv = PyXmlSec_LruStore(entries, entry, value, maxsize);
+    Py_DECREF(value);
+    return rv;
+}
@@ -19,4 +19,37 @@ int PyXmlSec_SetLongAttr(PyObject* obj, const char* name, long value);
 // return content if file is fileobject, or fs encoded filepath
 PyObject* PyXmlSec_GetFilePathOrContent(PyObject* file, int* is_content);
 
+// returns the value of the monotonic clock in seconds, the gil is not required
+double PyXmlSec_GetTime(void);
+
+// returns the number of worker threads or processes by default, that is os.cpu_count(), -1 on error
+long PyXmlSec_GetDefaultWorkers(void);
+
+// the LRU caches keep their entries in a dict, which keeps the insertion order,
+// so the least recently used entry is the first one
+
+// evicts the least recently used entries until the dict has at most size items
+int PyXmlSec_LruShrink(PyObject* entries, Py_ssize_t size);
+
+// marks the entry, which has the value, as the most recently used one
+int PyXmlSec_LruTouch(PyObject* entries, PyObject* entry, PyObject* value);
+
+// adds or replaces the entry as the most recently used one, evicts the least recently used entries beyond maxsize
+int PyXmlSec_LruStore(PyObject* entries, PyObject* entry, PyObject* value, Py_ssize_t maxsize);
+
+// the entries of the expiring caches have (expires, payload) values, where expires is None if they never expire
+
+// converts the ttl argument of a cache, None means forever and is converted to 0
+int PyXmlSec_LruParseTtl(PyObject* ttl, double* value);
+
+// returns the new reference to the timer argument of a cache, time.monotonic if timer is NULL
+PyObject* PyXmlSec_LruGetTimer(PyObject* timer);
+
+// looks up the entry and marks it as the most recently used one, the expired entry is dropped.
+// returns 1 and the new reference to the value in *value if found, 0 if not found or expired, -1 on error
+int PyXmlSec_LruLookupExpiring(PyObject* entries, PyObject* entry, PyObject* timer, PyObject** value);
+
+// stores the payload, which expires in ttl seconds or never if ttl is 0, like PyXmlSec_LruStore does
+int PyXmlSec_LruStoreExpiring(PyObject* entries, PyObject* entry, PyObject* payload, Py_ssize_t maxsize, double ttl, PyObject* timer);
+
 #endif //__PYXMLSEC_UTILS_H__
@@ -1,10 +1,12 @@
-from collections.abc import Callable, Iterable
-from typing import IO, Any, AnyStr, TypeVar, overload
+from collections.abc import Callable, Iterable, Sequence
+from typing import IO, Any, AnyStr, NamedTuple, TypeVar, overload
 
-from _typeshed import GenericPath, Self, StrOrBytesPath
+from _typeshed import GenericPath, ReadableBuffer, Self, StrOrBytesPath, SupportsRead, SupportsWrite
 from lxml.etree import _Element
 
+from xmlsec import aio as aio
 from xmlsec import constants as constants
+from xmlsec import parallel as parallel
 from xmlsec import template as template
 from xmlsec import tree as tree
 from xmlsec.constants import __KeyData as KeyData
@@ -12,10 +14,13 @@ from xmlsec.constants import __Transform as Transform
 
 _E = TypeVar('_E', bound=_Element)
 
+key_cache: KeyCache
+
 def enable_debug_trace(enabled: bool = ...) -> None: ...
 def get_libxml_version() -> tuple[int, int, int]: ...
 def get_libxml_compiled_version() -> tuple[int, int, int]: ...
 def init() -> None: ...
+def preload(*managers: KeysManager) -> None: ...
 def shutdown() -> None: ...
 def cleanup_callbacks() -> None: ...
 def register_default_callbacks() -> None: ...
@@ -32,9 +37,21 @@ def base64_default_line_size(size: int) -> None: ...
 
 class EncryptionContext:
     key: Key | None
+    session_key_cache: SessionKeyCache | None
     def __init__(self, manager: KeysManager | None = ...) -> None: ...
     def decrypt(self, node: _Element) -> _Element: ...
-    def encrypt_binary(self, template: _E, data: bytes) -> _E: ...
+    def decrypt_all(self, root: _Element) -> int: ...
+    def decrypt_to(self, node: _Element, writable: SupportsWrite[bytes] | int, block_size: int = ...) -> int: ...
+    def encrypt_binary(self, template: _E, data: ReadableBuffer) -> _E: ...
+    def encrypt_elements(
+        self, template: _Element, nodes: Iterable[_Element], encrypted_key: _Element | None = ..., per_element_key: bool = ...
+    ) -> list[_Element]: ...
+    def encrypt_for_recipients(
+        self, template: _E, data: ReadableBuffer | _Element, recipients: Iterable[Key | str], key_transport: Transform = ...
+    ) -> _E: ...
+    def encrypt_stream(
+        self, template: _E, readable: SupportsRead[bytes] | int, sink: SupportsWrite[bytes] | int, block_size: int = ...
+    ) -> _E: ...
     def encrypt_uri(self, template: _E, uri: str) -> _E: ...
     def encrypt_xml(self, template: _E, node: _Element) -> _E: ...
     def reset(self) -> None: ...
@@ -45,7 +62,7 @@ class InternalError(Error): ...
 class Key:
     name: str
     @classmethod
-    def from_binary_data(cls: type[Self], klass: KeyData, data: AnyStr) -> Self: ...
+    def from_binary_data(cls: type[Self], klass: KeyData, data: str | ReadableBuffer) -> Self: ...
     @classmethod
     def from_binary_file(cls: type[Self], klass: KeyData, filename: StrOrBytesPath) -> Self: ...
     @classmethod
@@ -53,28 +70,118 @@ class Key:
     @classmethod
     def from_engine(cls: type[Self], engine_and_key_id: AnyStr) -> Self: ...
     @classmethod
-    def from_memory(cls: type[Self], data: AnyStr, format: int, password: str | None = ...) -> Self: ...
+    def from_memory(cls: type[Self], data: str | ReadableBuffer, format: int, password: str | None = ...) -> Self: ...
+    @classmethod
+    def from_export(cls: type[Self], data: ReadableBuffer, encryption_key: Key | None = ...) -> Self: ...
     @classmethod
     def generate(cls: type[Self], klass: KeyData, size: int, type: int) -> Self: ...
+    def export(self, encryption_key: Key | None = ...) -> bytes: ...
     def load_cert_from_file(self, file: GenericPath[AnyStr] | IO[AnyStr], format: int) -> None: ...
-    def load_cert_from_memory(self, data: AnyStr, format: int) -> None: ...
+    def load_cert_from_memory(self, data: str | ReadableBuffer, format: int) -> None: ...
     def __copy__(self: Self) -> Self: ...
     def __deepcopy__(self: Self) -> Self: ...
 
 class KeysManager:
+    def __init__(
+        self,
+        indexed: bool = ...,
+        resolver: Callable[[str | None, KeyData | None, int], Key | None] | None = ...,
+        maxsize: int = ...,
+        ttl: float | None = ...,
+    ) -> None: ...
     def add_key(self, key: Key) -> None: ...
     def load_cert(self, filename: StrOrBytesPath, format: int, type: int) -> None: ...
-    def load_cert_from_memory(self, data: AnyStr, format: int, type: int) -> None: ...
+    def load_cert_from_memory(self, data: str | ReadableBuffer, format: int, type: int) -> None: ...
+    def load_directory(
+        self,
+        path: StrOrBytesPath,
+        patterns: str | Sequence[str] = ...,
+        workers: int | None = ...,
+        type: int = ...,
+        password: str | None = ...,
+    ) -> tuple[int, int]: ...
+    def load_pem_bundle(
+        self, data: str | ReadableBuffer, workers: int | None = ..., type: int = ..., password: str | None = ...
+    ) -> tuple[int, int]: ...
+
+class ReferenceReport(NamedTuple):
+    uri: str | None
+    id: str | None
+    type: str | None
+    status: int
+    digest_method: str | None
+    canonicalization_time: float
+    digest_time: float
+
+class KeyCache:
+    def __init__(self, maxsize: int = ...) -> None: ...
+    def __len__(self) -> int: ...
+    @property
+    def maxsize(self) -> int: ...
+    def from_file(
+        self,
+        file: GenericPath[AnyStr] | IO[AnyStr],
+        format: int,
+        password: str | None = ...,
+        certs: Iterable[tuple[GenericPath[AnyStr] | IO[AnyStr], int]] = ...,
+    ) -> Key: ...
+    def info(self) -> tuple[int, int, int, int]: ...
+    def invalidate(self, file: GenericPath[AnyStr] | IO[AnyStr] | None = ...) -> int: ...
+
+class SessionKeyCache:
+    def __init__(self, maxsize: int = ..., ttl: float | None = ..., timer: Callable[[], float] = ...) -> None: ...
+    def __len__(self) -> int: ...
+    @property
+    def maxsize(self) -> int: ...
+    @property
+    def ttl(self) -> float | None: ...
+    def clear(self) -> None: ...
+    def info(self) -> tuple[int, int, int, int]: ...
 
 class SignatureContext:
     key: Key | None
+    verification_cache: VerificationCache | None
+    def clear_digest_cache(self) -> None: ...
+    def digest_cache_info(self) -> tuple[int, int, int, int]: ...
+    def enable_digest_cache(self, maxsize: int = ...) -> None: ...
     def enable_reference_transform(self, transform: Transform) -> None: ...
     def enable_signature_transform(self, transform: Transform) -> None: ...
     def register_id(self, node: _Element, id_attr: str = ..., id_ns: str | None = ...) -> None: ...
+    def register_ids(self, node: _Element, attr_names: Iterable[str] = ..., ns: str | None = ...) -> list[str]: ...
+    def report(self) -> SignatureReport: ...
+    def reset(self) -> None: ...
     def set_enabled_key_data(self, keydata_list: Iterable[KeyData]) -> None: ...
     def sign(self, node: _Element) -> None: ...
-    def sign_binary(self, bytes: bytes, transform: Transform) -> bytes: ...
+    def sign_binary(self, bytes: ReadableBuffer, transform: Transform) -> bytes: ...
+    def sign_binary_stream(self, transform: Transform) -> SignatureStream: ...
     def verify(self, node: _Element) -> None: ...
-    def verify_binary(self, bytes: bytes, transform: Transform, signature: bytes) -> None: ...
+    def verify_many(self, nodes: Iterable[_Element]) -> list[tuple[int, int]]: ...
+    def verify_binary(self, bytes: ReadableBuffer, transform: Transform, signature: ReadableBuffer) -> None: ...
+    def verify_binary_stream(self, transform: Transform) -> SignatureStream: ...
+
+class SignatureReport(NamedTuple):
+    status: int
+    cached: bool
+    canonicalization_method: str | None
+    signature_method: str | None
+    references: tuple[ReferenceReport, ...]
+    canonicalization_time: float
+    digest_time: float
+    signature_time: float
+    total_time: float
+
+class SignatureStream:
+    def finalize(self, signature: ReadableBuffer | None = ...) -> bytes | None: ...
+    def update(self, data: ReadableBuffer) -> None: ...
+
+class VerificationCache:
+    def __init__(self, maxsize: int = ..., ttl: float | None = ..., timer: Callable[[], float] = ...) -> None: ...
+    def __len__(self) -> int: ...
+    @property
+    def maxsize(self) -> int: ...
+    @property
+    def ttl(self) -> float | None: ...
+    def info(self) -> tuple[int, int, int, int]: ...
+    def invalidate(self, key: Key | None = ...) -> int: ...
 
 class VerificationError(Error): ...
@@ -0,0 +1,24 @@
+from asyncio import Future
+from types import TracebackType
+
+from _typeshed import ReadableBuffer
+from lxml.etree import _Element
+
+from xmlsec import Key, KeysManager
+
+class Executor:
+    @property
+    def max_pending(self) -> int: ...
+    @property
+    def workers(self) -> int: ...
+    def __init__(self, manager: KeysManager | None = ..., workers: int | None = ..., max_pending: int | None = ...) -> None: ...
+    def __enter__(self) -> Executor: ...
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None: ...
+    def decrypt(self, node: _Element, key: Key | None = ...) -> Future[_Element | bytes]: ...
+    def encrypt_binary(self, template: _Element, data: ReadableBuffer, key: Key | None = ...) -> Future[_Element]: ...
+    def encrypt_xml(self, template: _Element, node: _Element, key: Key | None = ...) -> Future[_Element]: ...
+    def shutdown(self, wait: bool = ...) -> None: ...
+    def sign(self, node: _Element, key: Key | None = ...) -> Future[None]: ...
+    def verify(self, node: _Element, key: Key | None = ...) -> Future[None]: ...
@@ -20,6 +20,9 @@ class __TransformNoHref(NamedTuple):  # __Transform type
     usage: int
 
 DSigNs: Final[str]
+DSigStatusInvalid: Final[int]
+DSigStatusSucceeded: Final[int]
+DSigStatusUnknown: Final[int]
 EncNs: Final[str]
 KeyDataAes: Final[__KeyData]
 KeyDataDes: Final[__KeyData]
@@ -0,0 +1,20 @@
+from collections.abc import Iterable, Mapping
+from types import TracebackType
+from typing import Any
+
+from lxml.etree import _Element
+
+from xmlsec import KeysManager
+
+class ProcessVerifier:
+    @property
+    def workers(self) -> int: ...
+    def __init__(self, keys: Iterable[Mapping[str, Any]], workers: int | None = ..., ids: Iterable[str] | None = ...) -> None: ...
+    def __enter__(self) -> ProcessVerifier: ...
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None: ...
+    def close(self) -> None: ...
+    def verify(self, documents: Iterable[bytes]) -> list[tuple[int, int]]: ...
+
+def verify_documents(nodes: Iterable[_Element], manager: KeysManager, workers: int | None = ...) -> list[tuple[int, int]]: ...
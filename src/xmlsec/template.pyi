@@ -5,6 +5,10 @@ from lxml.etree import _Element
 
 from xmlsec.constants import __Transform as Transform
 
+class CompiledTemplate:
+    def __init__(self, node: _Element) -> None: ...
+    def stamp(self, node: _Element, id: str | None = ..., uri: str | None = ..., reference_id: str | None = ...) -> _Element: ...
+
 def add_encrypted_key(
     node: _Element, method: Transform, id: str | None = ..., type: str | None = ..., recipient: str | None = ...
 ) -> _Element: ...
@@ -25,6 +29,7 @@ def encrypted_data_create(
     encoding: str | None = ...,
     ns: str | None = ...,
 ) -> _Element: ...
+def encrypted_data_ensure_cipher_reference(node: _Element, uri: str | None = ...) -> _Element: ...
 def encrypted_data_ensure_cipher_value(node: _Element) -> _Element: ...
 def encrypted_data_ensure_key_info(node: _Element, id: str | None = ..., ns: str | None = ...) -> _Element: ...
 def ensure_key_info(node: _Element, id: str | None = ...) -> _Element: ...
@@ -0,0 +1,315 @@
+"""Signs, verifies, encrypts or decrypts many XML files with parallel worker processes.
+
+The keys are loaded once into a :class:`xmlsec.KeysManager`, which the forked workers share.
+A line is printed for every file as soon as it is processed, the throughput and the latency
+percentiles are printed to stderr at the end::
+
+    python -m xmlsec_cli verify --key rsapub.pem --workers 8 'incoming/**/*.xml'
+    python -m xmlsec_cli sign --key rsakey.pem --cert rsacert.pem --output-dir signed/ documents/
+
+The package installs the same command as ``xmlsec``. The exit status is 1 if any file fails.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import glob
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING, NamedTuple
+
+from lxml import etree
+
+import xmlsec
+from xmlsec import constants as consts
+
+if TYPE_CHECKING:
+    from xmlsec.constants import __Transform as Transform
+
+KEY_FORMATS = {
+    'pem': consts.KeyDataFormatPem,
+    'der': consts.KeyDataFormatDer,
+    'pkcs8-pem': consts.KeyDataFormatPkcs8Pem,
+    'pkcs8-der': consts.KeyDataFormatPkcs8Der,
+    'pkcs12': consts.KeyDataFormatPkcs12,
+    'cert-pem': consts.KeyDataFormatCertPem,
+    'cert-der': consts.KeyDataFormatCertDer,
+}
+
+CERT_FORMATS = {
+    'pem': consts.KeyDataFormatPem,
+    'der': consts.KeyDataFormatDer,
+}
+
+PERCENTILES = (50, 90, 99)
+
+# the number of files sent to a worker at once
+CHUNK_SIZE = 8
+
+
+class Job(NamedTuple):
+    path: str
+    output: str | None
+
+
+class Result(NamedTuple):
+    path: str
+    error: str | None
+    seconds: float
+
+
+def find_transform(name: str) -> Transform:
+    """Returns the transform named ``name``, e.g. ``rsa-sha256``."""
+    for attr in dir(consts):
+        transform = getattr(consts, attr)
+        if attr.startswith('Transform') and getattr(transform, 'name', None) == name:
+            return transform  # type: ignore[no-any-return]
+    raise argparse.ArgumentTypeError(f'unknown transform: {name!r}')
+
+
+def expand(paths: Iterable[str], pattern: str) -> Iterator[tuple[str, str]]:
+    """Yields ``(path, name)`` of every file given by a file name, a directory or a glob.
+
+    The files of a directory are matched by ``pattern`` and named relative to the directory,
+    the other files are named by their base name.
+    """
+    for arg in paths:
+        if os.path.isdir(arg):
+            for dirpath, dirnames, filenames in os.walk(arg):
+                dirnames.sort()
+                for filename in sorted(fnmatch.filter(filenames, pattern)):
+                    path = os.path.join(dirpath, filename)
+                    yield path, os.path.relpath(path, arg)
+        elif os.path.isfile(arg):
+            yield arg, os.path.basename(arg)
+        else:
+            matches = [path for path in sorted(glob.glob(arg, recursive=True)) if os.path.isfile(path)]
+            if not matches:
+                print(f'xmlsec: no files match {arg!r}', file=sys.stderr)
+            for path in matches:
+                yield path, os.path.basename(path)
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """Returns the nearest-rank percentile ``p`` of the sorted ``values``."""
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+class Worker:
+    """Processes the files with the keys, which are loaded once."""
+
+    def __init__(self, options: argparse.Namespace) -> None:
+        self.options = options
+        self.manager = xmlsec.KeysManager()
+        self.keys: list[xmlsec.Key] = []
+        names = options.key_name or []
+        if len(names) > len(options.key):
+            raise ValueError('there are more key names than keys.')
+        certs = [(cert, CERT_FORMATS[options.cert_format]) for cert in options.cert]
+        for i, path in enumerate(options.key):
+            # the certificates are sent along with the signature
+            key = xmlsec.key_cache.from_file(
+                path, KEY_FORMATS[options.key_format], options.password, certs if options.command == 'sign' else ()
+            )
+            key.name = names[i] if i < len(names) else os.path.basename(path)
+            self.manager.add_key(key)
+            self.keys.append(key)
+        if options.command != 'sign':
+            for cert in options.cert:
+                self.manager.load_cert(cert, CERT_FORMATS[options.cert_format], consts.KeyDataTypeTrusted)
+        self.template: xmlsec.template.CompiledTemplate | None = None
+        if options.command == 'sign':
+            self.template = self.signature_template(bool(certs))
+
+    def signature_template(self, x509: bool) -> xmlsec.template.CompiledTemplate:
+        """Returns the enveloped signature, which is added to the documents without one."""
+        signature = xmlsec.template.create(etree.Element('root'), consts.TransformExclC14N, self.options.sign_method)
+        reference = xmlsec.template.add_reference(signature, self.options.digest_method, uri='')
+        xmlsec.template.add_transform(reference, consts.TransformEnveloped)
+        xmlsec.template.add_transform(reference, consts.TransformExclC14N)
+        key_info = xmlsec.template.ensure_key_info(signature)
+        if x509:
+            xmlsec.template.x509_data_add_certificate(xmlsec.template.add_x509_data(key_info))
+        else:
+            xmlsec.template.add_key_name(key_info)
+        return xmlsec.template.CompiledTemplate(signature)
+
+    @staticmethod
+    def register_ids(ctx: xmlsec.SignatureContext, root: etree._Element) -> None:
+        """Registers the ids of the document, which must be unique, a reference could be wrapped otherwise."""
+        duplicated = ctx.register_ids(root)
+        if duplicated:
+            raise xmlsec.Error(f'the document has duplicated ids: {", ".join(duplicated)}')
+
+    def sign(self, root: etree._Element) -> None:
+        signature = xmlsec.tree.find_node(root, consts.NodeSignature)
+        if signature is None:
+            assert self.template is not None
+            signature = self.template.stamp(root)
+        ctx = xmlsec.SignatureContext(self.manager)
+        ctx.key = self.keys[0]
+        self.register_ids(ctx, root)
+        ctx.sign(signature)
+
+    def verify(self, root: etree._Element) -> None:
+        signature = xmlsec.tree.find_node(root, consts.NodeSignature)
+        if signature is None:
+            raise xmlsec.Error('the document is not signed.')
+        ctx = xmlsec.SignatureContext(self.manager)
+        self.register_ids(ctx, root)
+        ctx.verify(signature)
+
+    def encrypt(self, root: etree._Element) -> None:
+        template = xmlsec.template.encrypted_data_create(
+            root, self.options.encryption_method, type=consts.TypeEncContent, ns='xenc'
+        )
+        xmlsec.template.encrypted_data_ensure_cipher_value(template)
+        xmlsec.EncryptionContext(self.manager).encrypt_for_recipients(template, root, self.keys, self.options.key_transport)
+
+    def decrypt(self, root: etree._Element) -> None:
+        if root.tag == f'{{{consts.EncNs}}}{consts.NodeEncryptedData}':
+            xmlsec.EncryptionContext(self.manager).decrypt(root)
+        elif xmlsec.EncryptionContext(self.manager).decrypt_all(root) == 0:
+            raise xmlsec.Error('the document is not encrypted.')
+
+    def process(self, job: Job) -> Result:
+        started = time.perf_counter()
+        try:
+            parser = etree.XMLParser(resolve_entities=False, no_network=True)
+            tree = etree.parse(job.path, parser)
+            getattr(self, self.options.command)(tree.getroot())
+            if job.output is not None:
+                if os.path.dirname(job.output):
+                    os.makedirs(os.path.dirname(job.output), exist_ok=True)
+                tree.write(job.output, encoding=tree.docinfo.encoding or 'utf-8', xml_declaration=True)
+        except (OSError, ValueError, etree.Error, xmlsec.Error) as e:
+            return Result(job.path, str(e) or type(e).__name__, time.perf_counter() - started)
+        return Result(job.path, None, time.perf_counter() - started)
+
+
+_worker: Worker | None = None
+
+
+def init_worker(options: argparse.Namespace) -> None:
+    """Loads the keys in the worker, unless the worker is forked from the process with them."""
+    global _worker
+    if _worker is None:
+        _worker = Worker(options)
+
+
+def process(job: Job) -> Result:
+    assert _worker is not None
+    return _worker.process(job)
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='xmlsec', description=__doc__.split('\n', 1)[0])
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('paths', nargs='+', metavar='path', help='a file, a directory or a glob pattern')
+    common.add_argument('-k', '--key', action='append', default=[], metavar='FILE', help='a key file, may be repeated')
+    common.add_argument('--key-format', choices=sorted(KEY_FORMATS), default='pem', help='the format of the key files')
+    common.add_argument(
+        '--key-name', action='append', metavar='NAME', help='the name of the key in the order of --key, the file name by default'
+    )
+    common.add_argument(
+        '--password', default=os.environ.get('XMLSEC_KEY_PASSWORD'), help='the password of the key files, $XMLSEC_KEY_PASSWORD'
+    )
+    common.add_argument('--cert', action='append', default=[], metavar='FILE', help='a certificate file, may be repeated')
+    common.add_argument('--cert-format', choices=sorted(CERT_FORMATS), default='pem', help='the format of the certificate files')
+    common.add_argument('--pattern', default='*.xml', help='the pattern of the files in the directories, %(default)s by default')
+    common.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='the number of the worker processes, the number of CPUs by default',
+    )
+    output = argparse.ArgumentParser(add_help=False)
+    target = output.add_mutually_exclusive_group(required=True)
+    target.add_argument('-o', '--output-dir', metavar='DIR', help='the directory of the resulting files')
+    target.add_argument('--in-place', action='store_true', help='replace the files with the results')
+
+    sign = commands.add_parser('sign', parents=[common, output], help='sign the files')
+    sign.add_argument('--sign-method', type=find_transform, default='rsa-sha256', help='%(default)s by default')
+    sign.add_argument('--digest-method', type=find_transform, default='sha256', help='%(default)s by default')
+    commands.add_parser('verify', parents=[common], help='verify the signatures of the files')
+    encrypt = commands.add_parser('encrypt', parents=[common, output], help='encrypt the content of the files for the keys')
+    encrypt.add_argument('--encryption-method', type=find_transform, default='aes256-gcm', help='%(default)s by default')
+    encrypt.add_argument('--key-transport', type=find_transform, default='rsa-oaep-mgf1p', help='%(default)s by default')
+    commands.add_parser('decrypt', parents=[common, output], help='decrypt the files')
+    return parser
+
+
+def report(results: Iterable[Result]) -> tuple[int, list[float]]:
+    """Prints every result as soon as it is ready, returns the number of the failed files and the latencies."""
+    failed = 0
+    latencies = []
+    for result in results:
+        latencies.append(result.seconds)
+        if result.error is None:
+            print(f'ok {result.path} {result.seconds * 1000:.2f} ms', flush=True)
+        else:
+            failed += 1
+            print(f'failed {result.path}: {result.error}', flush=True)
+    return failed, latencies
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Runs the command with the arguments ``argv``, :data:`sys.argv` by default, and returns the exit status."""
+    global _worker
+    parser = make_parser()
+    options = parser.parse_args(argv)
+    if not options.key and not (options.command == 'verify' and options.cert):
+        parser.error('at least one --key is required')
+    if options.command == 'sign' and len(options.key) > 1:
+        parser.error('only one --key signs the files')
+    if options.workers < 1:
+        parser.error('--workers must be positive')
+    try:
+        _worker = Worker(options)
+    except (OSError, ValueError, xmlsec.Error) as e:
+        parser.error(f'cannot load the keys: {e}')
+
+    output_dir = getattr(options, 'output_dir', None)
+    in_place = getattr(options, 'in_place', False)
+    jobs = (
+        Job(path, os.path.join(output_dir, name) if output_dir is not None else path if in_place else None)
+        for path, name in expand(options.paths, options.pattern)
+    )
+    latencies: list[float] = []
+    failed = 0
+    started = time.perf_counter()
+    try:
+        if options.workers == 1:
+            results: Iterable[Result] = map(process, jobs)
+            failed, latencies = report(results)
+        else:
+            # the forked workers inherit the keys and the initialized crypto library
+            xmlsec.preload(_worker.manager)
+            with multiprocessing.Pool(options.workers, init_worker, (options,)) as pool:
+                failed, latencies = report(pool.imap_unordered(process, jobs, CHUNK_SIZE))
+    finally:
+        _worker = None
+    elapsed = time.perf_counter() - started
+
+    if not latencies:
+        print('xmlsec: no files', file=sys.stderr)
+        return 2
+    latencies.sort()
+    print(
+        f'{len(latencies)} files in {elapsed:.2f} s, {len(latencies) / elapsed:.1f} files/s, {failed} failed',
+        file=sys.stderr,
+    )
+    stats = [f'p{p} {percentile(latencies, p) * 1000:.2f} ms' for p in PERCENTILES]
+    print(f'latency: {", ".join(stats)}, max {latencies[-1] * 1000:.2f} ms', file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import asyncio
+
+import xmlsec
+from tests import base
+
+consts = xmlsec.constants
+
+
+class TestAio(base.TestMemoryLeaks):
+    # the event loops and threads leave garbage behind them, so the leak check is meaningless here
+    iterations = 0
+
+    def manager(self):
+        manager = xmlsec.KeysManager()
+        key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+        manager.add_key(key)
+        return manager
+
+    def signature(self, name='sign1-out.xml'):
+        root = self.load_xml(name)
+        xmlsec.tree.add_ids(root, ['ID'])
+        return xmlsec.tree.find_node(root, consts.NodeSignature)
+
+    def test_verify(self):
+        signs = [self.signature(f'sign{i}-out.xml') for i in range(1, 6)] * 2
+
+        async def main(executor):
+            return await asyncio.gather(*[executor.verify(sign) for sign in signs])
+
+        with xmlsec.aio.Executor(self.manager(), workers=3, max_pending=2) as executor:
+            self.assertEqual(3, executor.workers)
+            self.assertEqual(2, executor.max_pending)
+            self.assertEqual([None] * len(signs), asyncio.run(main(executor)))
+
+    def test_verify_fail(self):
+        root = self.load_xml('sign1-out.xml')
+        root.find('{urn:envelope}Data').text = 'tampered'
+        sign = xmlsec.tree.find_node(root, consts.NodeSignature)
+
+        async def main(executor):
+            with self.assertRaises(xmlsec.VerificationError):
+                await executor.verify(sign)
+            # the context of the failed operation is reused
+            await executor.verify(self.signature())
+
+        with xmlsec.aio.Executor(self.manager(), workers=1) as executor:
+            asyncio.run(main(executor))
+
+    def test_sign(self):
+        sign = xmlsec.tree.find_node(self.load_xml('sign1-in.xml'), consts.NodeSignature)
+        key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+
+        with xmlsec.aio.Executor(workers=2) as executor:
+            self.assertIsNone(asyncio.run(self._run(executor.sign, sign, key=key)))
+
+        self.assertEqual(self.load_xml('sign1-out.xml'), sign.getroottree().getroot())
+
+    async def _run(self, method, *args, **kwargs):
+        return await method(*args, **kwargs)
+
+    def test_encrypt_decrypt(self):
+        root = self.load_xml('enc1-in.xml')
+        key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+
+        async def main(executor):
+            templates = []
+            for _ in range(4):
+                template = xmlsec.template.encrypted_data_create(root, consts.TransformAes128Cbc)
+                xmlsec.template.encrypted_data_ensure_cipher_value(template)
+                templates.append(template)
+            encrypted = await asyncio.gather(*[executor.encrypt_binary(t, b'test %d' % i, key) for i, t in enumerate(templates)])
+            return await asyncio.gather(*[executor.decrypt(enc, key=key) for enc in encrypted])
+
+        with xmlsec.aio.Executor(workers=2, max_pending=1) as executor:
+            self.assertEqual([b'test 0', b'test 1', b'test 2', b'test 3'], asyncio.run(main(executor)))
+
+    def test_cancel_waiting(self):
+        signs = [self.signature(), self.signature('sign2-out.xml')]
+
+        async def main(executor):
+            first = executor.verify(signs[0])
+            second = executor.verify(signs[1])
+            second.cancel()
+            await first
+            with self.assertRaises(asyncio.CancelledError):
+                await second
+            await executor.verify(signs[1])
+
+        with xmlsec.aio.Executor(self.manager(), workers=1, max_pending=1) as executor:
+            asyncio.run(main(executor))
+
+    def test_shutdown(self):
+        manager = self.manager()
+        executor = xmlsec.aio.Executor(manager, workers=1)
+        with self.assertRaisesRegex(xmlsec.Error, 'shared by running operations'):
+            manager.add_key(xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession))
+        executor.shutdown()
+        executor.shutdown()
+        manager.add_key(xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession))
+
+        async def main():
+            executor.verify(self.signature())
+
+        with self.assertRaisesRegex(RuntimeError, 'shut down'):
+            asyncio.run(main())
+
+    def test_bad_args(self):
+        with self.assertRaises(TypeError):
+            xmlsec.aio.Executor('')
+        with self.assertRaises(ValueError):
+            xmlsec.aio.Executor(workers=0)
+        with self.assertRaises(ValueError):
+            xmlsec.aio.Executor(max_pending=0)
+
+        with xmlsec.aio.Executor(workers=1) as executor:
+            with self.assertRaises(RuntimeError):
+                executor.verify(self.signature())
+
+            async def main():
+                with self.assertRaises(TypeError):
+                    executor.verify(self.signature(), key='')
+
+            asyncio.run(main())
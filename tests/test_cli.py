@@ -0,0 +1,149 @@
+import contextlib
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import xmlsec_cli
+from tests import base
+
+
+class TestCli(base.TestMemoryLeaks):
+    # the worker processes leave garbage behind them, so the leak check is meaningless here
+    iterations = 0
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.documents = os.path.join(self.tmpdir, 'in')
+        os.makedirs(os.path.join(self.documents, 'sub'))
+        for name in ('a.xml', 'b.xml', os.path.join('sub', 'c.xml')):
+            shutil.copy(self.path('doc.xml'), os.path.join(self.documents, name))
+
+    def run_cli(self, *args):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            status = xmlsec_cli.main([str(arg) for arg in args])
+        return status, stdout.getvalue().splitlines(), stderr.getvalue()
+
+    def output(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def test_sign_and_verify(self):
+        status, lines, stderr = self.run_cli(
+            'sign',
+            '-k',
+            self.path('rsakey.pem'),
+            '--cert',
+            self.path('rsacert.pem'),
+            '-o',
+            self.output('signed'),
+            '-w',
+            1,
+            self.documents,
+        )
+        self.assertEqual(0, status)
+        self.assertEqual(3, len(lines))
+        self.assertTrue(all(line.startswith('ok ') for line in lines))
+        self.assertIn('3 files in', stderr)
+        self.assertIn('p50', stderr)
+        self.assertIn('p99', stderr)
+        self.assertTrue(os.path.isfile(os.path.join(self.output('signed'), 'sub', 'c.xml')))
+
+        status, lines, _ = self.run_cli(
+            'verify', '-k', self.path('rsapub.pem'), '-w', 2, os.path.join(self.output('signed'), '**', '*.xml')
+        )
+        self.assertEqual(0, status)
+        self.assertEqual(3, len(lines))
+
+    def test_verify_failed(self):
+        self.run_cli('sign', '-k', self.path('rsakey.pem'), '-o', self.output('signed'), '-w', 1, self.documents)
+        path = os.path.join(self.output('signed'), 'a.xml')
+        with open(path) as f:
+            tampered = f.read().replace('Hello, World!', 'Hello, Mallory!')
+        with open(path, 'w') as f:
+            f.write(tampered)
+
+        status, lines, stderr = self.run_cli('verify', '-k', self.path('rsapub.pem'), '-w', 1, self.output('signed'))
+        self.assertEqual(1, status)
+        self.assertEqual([f'failed {path}'], [line.split(':')[0] for line in lines if line.startswith('failed')])
+        self.assertIn('1 failed', stderr)
+        # the documents without a signature fail too
+        status, lines, _ = self.run_cli('verify', '-k', self.path('rsapub.pem'), '-w', 1, self.documents)
+        self.assertEqual(1, status)
+        self.assertTrue(all(line.startswith('failed ') for line in lines))
+
+    def test_duplicated_ids(self):
+        self.run_cli('sign', '-k', self.path('rsakey.pem'), '-o', self.output('signed'), '-w', 1, self.documents)
+        for directory in (self.documents, self.output('signed')):
+            path = os.path.join(directory, 'a.xml')
+            with open(path) as f:
+                wrapped = f.read().replace('<Data>', '<Data Id="data"/><Data Id="data">')
+            with open(path, 'w') as f:
+                f.write(wrapped)
+
+        status, lines, _ = self.run_cli(
+            'sign', '-k', self.path('rsakey.pem'), '-o', self.output('resigned'), '-w', 1, self.documents
+        )
+        self.assertEqual(1, status)
+        self.assertIn(f'failed {os.path.join(self.documents, "a.xml")}: the document has duplicated ids: data', lines)
+        self.assertFalse(os.path.exists(os.path.join(self.output('resigned'), 'a.xml')))
+        status, lines, _ = self.run_cli('verify', '-k', self.path('rsapub.pem'), '-w', 1, self.output('signed'))
+        self.assertEqual(1, status)
+        self.assertIn(f'failed {os.path.join(self.output("signed"), "a.xml")}: the document has duplicated ids: data', lines)
+
+    def test_encrypt_and_decrypt(self):
+        status, _, _ = self.run_cli(
+            'encrypt',
+            '-k',
+            self.path('rsacert.pem'),
+            '--key-format',
+            'cert-pem',
+            '--key-name',
+            'alice',
+            '-o',
+            self.output('encrypted'),
+            '-w',
+            2,
+            self.documents,
+        )
+        self.assertEqual(0, status)
+        with open(os.path.join(self.output('encrypted'), 'a.xml')) as f:
+            encrypted = f.read()
+        self.assertNotIn('Hello, World!', encrypted)
+        self.assertIn('EncryptedData', encrypted)
+
+        status, lines, _ = self.run_cli(
+            'decrypt', '-k', self.path('rsakey.pem'), '--key-name', 'alice', '--in-place', '-w', 1, self.output('encrypted')
+        )
+        self.assertEqual(0, status)
+        self.assertEqual(3, len(lines))
+        for name in ('a.xml', os.path.join('sub', 'c.xml')):
+            self.assertEqual(self.load_xml('doc.xml'), self.load_xml(os.path.join(self.output('encrypted'), name)))
+
+    def test_no_files(self):
+        status, lines, stderr = self.run_cli('verify', '-k', self.path('rsapub.pem'), self.output('*.missing'))
+        self.assertEqual(2, status)
+        self.assertEqual([], lines)
+        self.assertIn('no files', stderr)
+
+    def test_bad_arguments(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            for args in (
+                ['verify', self.documents],
+                ['sign', '-k', self.path('rsakey.pem'), self.documents],
+                ['sign', '-k', self.path('rsakey.pem'), '-o', self.tmpdir, '--sign-method', 'unknown', self.documents],
+                ['verify', '-k', self.path('rsapub.pem'), '-w', '0', self.documents],
+                ['verify', '-k', self.output('missing.pem'), self.documents],
+            ):
+                with self.assertRaises(SystemExit) as cm:
+                    xmlsec_cli.main(args)
+                self.assertEqual(2, cm.exception.code)
+
+    def test_main_module(self):
+        result = subprocess.run([sys.executable, '-m', 'xmlsec_cli', '--help'], capture_output=True, text=True, check=True)
+        self.assertIn('verify the signatures of the files', result.stdout)
@@ -1,5 +1,12 @@
+import mmap
+import sys
+import tempfile
+import threading
+import time
 import unittest
 
+from lxml import etree
+
 import xmlsec
 from tests import base
 
@@ -62,6 +69,51 @@ class TestSignContext(base.TestMemoryLeaks):
         with self.assertRaisesRegex(xmlsec.Error, 'missing attribute.'):
             ctx.register_id(sign, 'Id', id_ns='foo')
 
+    def test_register_ids(self):
+        ctx = xmlsec.SignatureContext()
+        root = etree.fromstring(
+            b'<Root ID="root"><A Id="a"><B ID="b" x:ID="x" xmlns:x="urn:x"/></A><C ID="a"/><D Id="b"/><E ID="b"/></Root>'
+        )
+        self.assertEqual(['a', 'b'], ctx.register_ids(root))
+        for value, tag in (('root', 'Root'), ('a', 'A'), ('b', 'B'), ('x', 'B')):
+            self.assertEqual([tag], [e.tag for e in root.xpath(f'id("{value}")')])
+        # the attributes, which are registered already, are not reported
+        self.assertEqual(['a', 'b'], ctx.register_ids(root))
+        self.assertEqual([], ctx.register_ids(root[0]))
+
+    def test_register_ids_with_names_and_namespace(self):
+        ctx = xmlsec.SignatureContext()
+        root = etree.fromstring(b'<Root><A x:Ref="x" Ref="a" ID="id" xmlns:x="urn:x"/></Root>')
+        self.assertEqual([], ctx.register_ids(root, ['Ref'], ns='urn:x'))
+        self.assertEqual(1, len(root.xpath('id("x")')))
+        self.assertEqual([], root.xpath('id("a")') + root.xpath('id("id")'))
+
+    def test_register_ids_subtree(self):
+        ctx = xmlsec.SignatureContext()
+        root = etree.fromstring(b'<Root ID="root"><A><B ID="b"/></A><C ID="c"/></Root>')
+        self.assertEqual([], ctx.register_ids(root[0]))
+        self.assertEqual(1, len(root.xpath('id("b")')))
+        self.assertEqual([], root.xpath('id("root")') + root.xpath('id("c")'))
+
+    def test_register_ids_verify(self):
+        root = self.load_xml('sign4-out.xml')
+        ctx = xmlsec.SignatureContext()
+        self.assertEqual([], ctx.register_ids(root))
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        ctx.verify(xmlsec.tree.find_node(root, consts.NodeSignature))
+
+    def test_register_ids_bad_args(self):
+        ctx = xmlsec.SignatureContext()
+        root = etree.fromstring(b'<Root ID="root"/>')
+        with self.assertRaises(TypeError):
+            ctx.register_ids('')
+        with self.assertRaisesRegex(TypeError, 'attr_names must be a sequence of strings.'):
+            ctx.register_ids(root, 'ID')
+        with self.assertRaisesRegex(TypeError, 'attr_names must be a sequence of strings.'):
+            ctx.register_ids(root, ['ID', 1])
+        with self.assertRaisesRegex(TypeError, 'attr_names must be a sequence of strings.'):
+            ctx.register_ids(root, 1)
+
     def test_sign_bad_args(self):
         ctx = xmlsec.SignatureContext()
         ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
@@ -216,6 +268,26 @@ class TestSignContext(base.TestMemoryLeaks):
         sign = ctx.sign_binary(self.load('sign6-in.bin'), consts.TransformRsaSha1)
         self.assertEqual(self.load('sign6-out.bin'), sign)
 
+    def test_sign_binary_buffer(self):
+        data = self.load('sign6-in.bin')
+        expected = self.load('sign6-out.bin')
+        with tempfile.TemporaryFile() as f:
+            f.write(data)
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for buf in (bytearray(data), memoryview(data), mapped):
+                    ctx = xmlsec.SignatureContext()
+                    ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+                    self.assertEqual(expected, ctx.sign_binary(buf, consts.TransformRsaSha1))
+
+    def test_sign_binary_releases_buffer(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        data = bytearray(self.load('sign6-in.bin'))
+        ctx.sign_binary(data, consts.TransformRsaSha1)
+        # resizing fails while a buffer is exported
+        data.extend(b'tail')
+
     def test_sign_binary_twice_not_possible(self):
         ctx = xmlsec.SignatureContext()
         ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
@@ -224,6 +296,55 @@ class TestSignContext(base.TestMemoryLeaks):
         with self.assertRaisesRegex(xmlsec.Error, 'Signature context already used; it is designed for one use only.'):
             ctx.sign_binary(data, consts.TransformRsaSha1)
 
+    def test_sign_binary_twice_after_reset(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        data = self.load('sign6-in.bin')
+        ctx.sign_binary(data, consts.TransformRsaSha1)
+        ctx.reset()
+        self.assertIsNotNone(ctx.key)
+        sign = ctx.sign_binary(data, consts.TransformRsaSha1)
+        self.assertEqual(self.load('sign6-out.bin'), sign)
+
+    def test_reset_sign_then_verify(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        ctx.key.name = 'rsakey.pem'
+        for _ in range(3):
+            root = self.load_xml('sign1-in.xml')
+            sign = xmlsec.tree.find_node(root, consts.NodeSignature)
+            ctx.sign(sign)
+            self.assertEqual(self.load_xml('sign1-out.xml'), root)
+            ctx.reset()
+            ctx.verify(sign)
+            ctx.reset()
+
+    def test_reset_keeps_enabled_transforms(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        ctx.enable_signature_transform(consts.TransformRsaSha256)
+        root = self.load_xml('sign1-out.xml')
+        sign = xmlsec.tree.find_node(root, consts.NodeSignature)
+        with self.assertRaisesRegex(xmlsec.Error, 'failed to verify'):
+            ctx.verify(sign)
+        ctx.reset()
+        with self.assertRaisesRegex(xmlsec.Error, 'failed to verify'):
+            ctx.verify(sign)
+
+    def test_reset_releases_key_from_manager(self):
+        manager = xmlsec.KeysManager()
+        key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+        manager.add_key(key)
+        ctx = xmlsec.SignatureContext(manager)
+        root = self.load_xml('sign2-out.xml')
+        sign = xmlsec.tree.find_node(root, consts.NodeSignature)
+        ctx.verify(sign)
+        self.assertIsNotNone(ctx.key)
+        ctx.reset()
+        self.assertIsNone(ctx.key)
+        ctx.verify(sign)
+
     def test_verify_bad_args(self):
         ctx = xmlsec.SignatureContext()
         ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
@@ -265,6 +386,247 @@ class TestSignContext(base.TestMemoryLeaks):
         self.assertEqual('rsapub.pem', ctx.key.name)
         ctx.verify(sign)
 
+    def test_verify_many(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        signs = []
+        for i in range(1, 6):
+            root = self.load_xml(f'sign{i}-out.xml')
+            xmlsec.tree.add_ids(root, ['ID'])
+            signs.append(xmlsec.tree.find_node(root, consts.NodeSignature))
+        results = ctx.verify_many(signs)
+        self.assertEqual([(consts.DSigStatusSucceeded, 0)] * len(signs), results)
+        # the context is left ready for the next operation
+        ctx.verify(signs[0])
+
+    def test_verify_many_reports_failures(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        good = xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature)
+        tampered_root = self.load_xml('sign1-out.xml')
+        tampered_root.find('{urn:envelope}Data').text = 'tampered'
+        tampered = xmlsec.tree.find_node(tampered_root, consts.NodeSignature)
+        broken = xmlsec.tree.find_node(self.load_xml('sign1-in.xml'), consts.NodeSignature)
+        status, code = zip(*ctx.verify_many(iter([good, tampered, broken, good])))
+        self.assertEqual(
+            (consts.DSigStatusSucceeded, consts.DSigStatusInvalid, consts.DSigStatusUnknown, consts.DSigStatusSucceeded),
+            status,
+        )
+        self.assertEqual(0, code[0])
+        self.assertNotEqual(0, code[2])
+        self.assertEqual(0, code[3])
+
+    def test_verify_many_list_cleared(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        # the list holds the only references to the documents
+        signs = [xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature) for _ in range(100)]
+        references = sys.getrefcount(signs[-1])
+        finished = threading.Event()
+        held = []
+
+        def clear():
+            # waits until verify_many holds its own references to the nodes
+            while sys.getrefcount(signs[-1]) == references and not finished.is_set():
+                time.sleep(0)
+            held.append(sys.getrefcount(signs[-1]) > references)
+            signs.clear()
+
+        clearer = threading.Thread(target=clear)
+        clearer.start()
+        try:
+            results = ctx.verify_many(signs)
+        finally:
+            finished.set()
+            clearer.join()
+        self.assertEqual([True], held)
+        self.assertEqual([(consts.DSigStatusSucceeded, 0)] * 100, results)
+
+    def test_verify_many_empty(self):
+        ctx = xmlsec.SignatureContext()
+        self.assertEqual([], ctx.verify_many([]))
+
+    def test_verify_many_bad_args(self):
+        ctx = xmlsec.SignatureContext()
+        with self.assertRaises(TypeError):
+            ctx.verify_many(1)
+        with self.assertRaises(TypeError):
+            ctx.verify_many([''])
+
+    def test_digest_cache_disabled_by_default(self):
+        ctx = xmlsec.SignatureContext()
+        self.assertEqual((0, 0, 0, 0), ctx.digest_cache_info())
+
+    def test_digest_cache(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        ctx.enable_digest_cache()
+        for _ in range(3):
+            ctx.verify(xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature))
+            ctx.reset()
+        self.assertEqual((2, 1, 128, 1), ctx.digest_cache_info())
+        ctx.clear_digest_cache()
+        self.assertEqual((0, 0, 128, 0), ctx.digest_cache_info())
+
+    def test_digest_cache_skips_changed_document(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        ctx.enable_digest_cache()
+        ctx.verify(xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature))
+        ctx.reset()
+        root = self.load_xml('sign1-out.xml')
+        root.find('{urn:envelope}Data').text = 'tampered'
+        with self.assertRaises(xmlsec.VerificationError):
+            ctx.verify(xmlsec.tree.find_node(root, consts.NodeSignature))
+        self.assertEqual((0, 2, 128, 1), ctx.digest_cache_info())
+
+    def test_digest_cache_eviction(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        ctx.enable_digest_cache(maxsize=1)
+        for name in ('sign1-out.xml', 'sign2-out.xml', 'sign1-out.xml'):
+            ctx.verify(xmlsec.tree.find_node(self.load_xml(name), consts.NodeSignature))
+            ctx.reset()
+        self.assertEqual((0, 3, 1, 1), ctx.digest_cache_info())
+        ctx.enable_digest_cache(maxsize=0)
+        self.assertEqual((0, 3, 0, 0), ctx.digest_cache_info())
+
+    def test_digest_cache_cleared_on_settings_change(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        ctx.enable_digest_cache()
+        ctx.verify(xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature))
+        ctx.reset()
+        ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        self.assertEqual(0, ctx.digest_cache_info()[3])
+        ctx.verify(xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature))
+        ctx.reset()
+        ctx.enable_reference_transform(consts.TransformEnveloped)
+        self.assertEqual(0, ctx.digest_cache_info()[3])
+
+    def test_digest_cache_bad_args(self):
+        ctx = xmlsec.SignatureContext()
+        with self.assertRaises(ValueError):
+            ctx.enable_digest_cache(-1)
+        with self.assertRaises(TypeError):
+            ctx.enable_digest_cache('1')
+
+    def test_digest_cache_verifies_signature(self):
+        manager = xmlsec.KeysManager()
+        key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+        manager.add_key(key)
+        ctx = xmlsec.SignatureContext(manager)
+        ctx.enable_digest_cache()
+        ctx.verify(xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature))
+        ctx.reset()
+        ctx.verify(xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature))
+        self.assertEqual((1, 1, 128, 1), ctx.digest_cache_info())
+        self.assertEqual('rsakey.pem', ctx.key.name)
+        report = ctx.report()
+        self.assertEqual(consts.DSigStatusSucceeded, report.status)
+        self.assertGreater(report.signature_time, 0)
+        ctx.reset()
+        # the references are the same, but the signature is not
+        root = self.load_xml('sign1-out.xml')
+        value = xmlsec.tree.find_node(root, consts.NodeSignatureValue)
+        value.text = value.text.replace(value.text.strip()[:4], 'AAAA', 1)
+        with self.assertRaises(xmlsec.VerificationError):
+            ctx.verify(xmlsec.tree.find_node(root, consts.NodeSignature))
+        self.assertEqual((2, 1, 128, 1), ctx.digest_cache_info())
+        self.assertEqual(consts.DSigStatusInvalid, ctx.report().status)
+
+    def test_digest_cache_follows_registered_ids(self):
+        # the signed element and its tampered copy have the same id, the reference refers to the registered one
+        signed = self.load_xml('sign4-out.xml')
+        copy = etree.fromstring(etree.tostring(signed))
+        copy.find('{urn:envelope}Data').text = 'tampered'
+        wrapper = etree.Element('Wrapper')
+        wrapper.extend([signed, copy])
+        data = etree.tostring(wrapper)
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        ctx.enable_digest_cache()
+        for registered, valid in ((0, True), (1, False), (0, True)):
+            root = etree.fromstring(data)
+            ctx.register_id(root[registered], 'ID')
+            if valid:
+                ctx.verify(xmlsec.tree.find_node(root[0], consts.NodeSignature))
+            else:
+                with self.assertRaises(xmlsec.VerificationError):
+                    ctx.verify(xmlsec.tree.find_node(root[0], consts.NodeSignature))
+            ctx.reset()
+        self.assertEqual((1, 2, 128, 1), ctx.digest_cache_info())
+
+    def test_report_empty(self):
+        ctx = xmlsec.SignatureContext()
+        report = ctx.report()
+        self.assertIsInstance(report, xmlsec.SignatureReport)
+        self.assertEqual(consts.DSigStatusUnknown, report.status)
+        self.assertFalse(report.cached)
+        self.assertEqual((), report.references)
+        self.assertEqual(0, report.total_time)
+
+    def test_report_sign(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        ctx.sign(xmlsec.tree.find_node(self.load_xml('sign1-in.xml'), consts.NodeSignature))
+        report = ctx.report()
+        self.assertEqual(consts.DSigStatusSucceeded, report.status)
+        self.assertEqual(consts.TransformRsaSha1.href, report.signature_method)
+        self.assertEqual(1, len(report.references))
+        self.assertEqual(consts.DSigStatusSucceeded, report.references[0].status)
+        self.assertGreater(report.signature_time, 0)
+
+    def test_report_verify(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        root = self.load_xml('sign4-out.xml')
+        xmlsec.tree.add_ids(root, ['ID'])
+        ctx.verify(xmlsec.tree.find_node(root, consts.NodeSignature))
+        report = ctx.report()
+        self.assertEqual(consts.DSigStatusSucceeded, report.status)
+        self.assertFalse(report.cached)
+        self.assertEqual(consts.TransformExclC14N.href, report.canonicalization_method)
+        self.assertEqual(consts.TransformRsaSha1.href, report.signature_method)
+        ref = report.references[0]
+        self.assertIsInstance(ref, xmlsec.ReferenceReport)
+        self.assertEqual('#ef115a20-cf73-11e5-aed1-3c15c2c2cc88', ref.uri)
+        self.assertEqual(consts.DSigStatusSucceeded, ref.status)
+        self.assertEqual(consts.TransformSha1.href, ref.digest_method)
+        self.assertGreater(ref.canonicalization_time, 0)
+        self.assertGreater(ref.digest_time, 0)
+        self.assertGreater(report.canonicalization_time, ref.canonicalization_time)
+        self.assertEqual(ref.digest_time, report.digest_time)
+        self.assertGreater(report.signature_time, 0)
+        self.assertGreaterEqual(report.total_time, report.canonicalization_time + report.digest_time + report.signature_time)
+        ctx.reset()
+        self.assertEqual((), ctx.report().references)
+
+    def test_report_verify_fail(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        root = self.load_xml('sign1-out.xml')
+        root.find('{urn:envelope}Data').text = 'tampered'
+        with self.assertRaises(xmlsec.VerificationError):
+            ctx.verify(xmlsec.tree.find_node(root, consts.NodeSignature))
+        report = ctx.report()
+        self.assertEqual(consts.DSigStatusInvalid, report.status)
+        self.assertEqual('', report.references[0].uri)
+        self.assertEqual(consts.DSigStatusInvalid, report.references[0].status)
+
+    def test_report_cached(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        ctx.enable_digest_cache()
+        ctx.verify(xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature))
+        ctx.reset()
+        ctx.verify(xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature))
+        report = ctx.report()
+        self.assertEqual(consts.DSigStatusSucceeded, report.status)
+        self.assertTrue(report.cached)
+        self.assertEqual((), report.references)
+
     def test_validate_binary_sign(self):
         ctx = xmlsec.SignatureContext()
         ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
@@ -284,6 +646,100 @@ class TestSignContext(base.TestMemoryLeaks):
         with self.assertRaises(xmlsec.Error):
             ctx.verify_binary(self.load('sign6-in.bin'), consts.TransformRsaSha1, b'invalid')
 
+    def test_sign_binary_stream(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        data = self.load('sign6-in.bin')
+        stream = ctx.sign_binary_stream(consts.TransformRsaSha1)
+        self.assertIsInstance(stream, xmlsec.SignatureStream)
+        for i in range(0, len(data), 7):
+            stream.update(data[i : i + 7])
+        stream.update(b'')
+        self.assertEqual(self.load('sign6-out.bin'), stream.finalize())
+
+    def test_verify_binary_stream(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        data = self.load('sign6-in.bin')
+        stream = ctx.verify_binary_stream(consts.TransformRsaSha1)
+        stream.update(data[:10])
+        stream.update(data[10:])
+        self.assertIsNone(stream.finalize(self.load('sign6-out.bin')))
+
+    def test_verify_binary_stream_fail(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        stream = ctx.verify_binary_stream(consts.TransformRsaSha1)
+        stream.update(self.load('sign6-in.bin')[1:])
+        with self.assertRaises(xmlsec.VerificationError):
+            stream.finalize(self.load('sign6-out.bin'))
+
+    def test_binary_stream_finalize_args(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        stream = ctx.sign_binary_stream(consts.TransformRsaSha1)
+        with self.assertRaises(TypeError):
+            stream.finalize(b'signature')
+        stream.finalize()
+        ctx.reset()
+        stream = ctx.verify_binary_stream(consts.TransformRsaSha1)
+        with self.assertRaises(TypeError):
+            stream.finalize()
+
+    def test_binary_stream_after_finalize(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        stream = ctx.sign_binary_stream(consts.TransformRsaSha1)
+        stream.finalize()
+        with self.assertRaisesRegex(xmlsec.Error, 'Signature stream is finalized'):
+            stream.update(b'data')
+        with self.assertRaisesRegex(xmlsec.Error, 'Signature stream is finalized'):
+            stream.finalize()
+
+    def test_binary_stream_after_reset(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        stream = ctx.sign_binary_stream(consts.TransformRsaSha1)
+        ctx.reset()
+        with self.assertRaisesRegex(xmlsec.Error, 'its context has been reset'):
+            stream.update(b'data')
+        sign = ctx.sign_binary(self.load('sign6-in.bin'), consts.TransformRsaSha1)
+        self.assertEqual(self.load('sign6-out.bin'), sign)
+
+    def test_binary_stream_context_used(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        ctx.sign_binary_stream(consts.TransformRsaSha1)
+        with self.assertRaisesRegex(xmlsec.Error, 'Signature context already used'):
+            ctx.sign_binary_stream(consts.TransformRsaSha1)
+
+    def test_binary_stream_bad_args(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        with self.assertRaises(TypeError):
+            ctx.sign_binary_stream('')
+        with self.assertRaisesRegex(xmlsec.Error, 'incompatible signature method'):
+            ctx.verify_binary_stream(consts.TransformXslt)
+        stream = ctx.sign_binary_stream(consts.TransformRsaSha1)
+        with self.assertRaises(TypeError):
+            stream.update(1)
+        with self.assertRaises(TypeError):
+            xmlsec.SignatureStream()
+
+    def test_verify_binary_buffer(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        ctx.verify_binary(bytearray(self.load('sign6-in.bin')), consts.TransformRsaSha1, memoryview(self.load('sign6-out.bin')))
+
+    def test_binary_stream_buffer(self):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        data = memoryview(self.load('sign6-in.bin'))
+        stream = ctx.verify_binary_stream(consts.TransformRsaSha1)
+        stream.update(data[:10])
+        stream.update(bytearray(data[10:]))
+        stream.finalize(bytearray(self.load('sign6-out.bin')))
+
     def test_enable_reference_transform(self):
         ctx = xmlsec.SignatureContext()
         ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
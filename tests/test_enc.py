@@ -1,4 +1,11 @@
+import base64
+import copy
+import io
+import os
+import sys
 import tempfile
+import threading
+import time
 
 from lxml import etree
 
@@ -8,6 +15,37 @@ from tests import base
 consts = xmlsec.constants
 
 
+class PartialWriter:
+    """Accepts at most 3 bytes per write, like a raw stream may do."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, chunk):
+        self.chunks.append(chunk[:3])
+        return len(self.chunks[-1])
+
+
+class FailingWriter:
+    def write(self, chunk):
+        raise OSError('disk is full')
+
+
+class Reader:
+    """Has the read method only, unlike the file objects which have readinto as well."""
+
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+    def read(self, size):
+        return self.stream.read(size)
+
+
+class FailingReader:
+    def readinto(self, buffer):
+        raise OSError('disk is broken')
+
+
 class TestEncryptionContext(base.TestMemoryLeaks):
     def test_init(self):
         ctx = xmlsec.EncryptionContext(manager=xmlsec.KeysManager())
@@ -138,6 +176,19 @@ class TestEncryptionContext(base.TestMemoryLeaks):
         cipher_value = xmlsec.tree.find_node(ki, consts.NodeCipherValue, consts.EncNs)
         self.assertIsNotNone(cipher_value)
 
+    def test_encrypt_binary_buffer(self):
+        for data in (bytearray(b'test'), memoryview(b'test')):
+            root = self.load_xml('enc2-in.xml')
+            enc_data = xmlsec.template.encrypted_data_create(
+                root, consts.TransformAes128Cbc, type=consts.TypeEncContent, ns='xenc', mime_type='binary/octet-stream'
+            )
+            xmlsec.template.encrypted_data_ensure_cipher_value(enc_data)
+            ctx = xmlsec.EncryptionContext()
+            ctx.key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+            encrypted = ctx.encrypt_binary(enc_data, data)
+            cipher_value = xmlsec.tree.find_node(encrypted, consts.NodeCipherValue, consts.EncNs)
+            self.assertTrue(cipher_value.text)
+
     def test_encrypt_binary_bad_args(self):
         ctx = xmlsec.EncryptionContext()
         with self.assertRaises(TypeError):
@@ -199,6 +250,239 @@ class TestEncryptionContext(base.TestMemoryLeaks):
     def test_decrypt2(self):
         self.check_decrypt(2)
 
+    def _encrypt(self, node, key, type=consts.TypeEncElement):
+        enc_data = xmlsec.template.encrypted_data_create(node.getroottree().getroot(), consts.TransformAes128Cbc, type=type)
+        xmlsec.template.encrypted_data_ensure_cipher_value(enc_data)
+        ctx = xmlsec.EncryptionContext()
+        ctx.key = key
+        return ctx.encrypt_xml(enc_data, node)
+
+    def _elements_template(self, root):
+        template = xmlsec.template.encrypted_data_create(root, consts.TransformAes128Cbc, type=consts.TypeEncElement, ns='xenc')
+        xmlsec.template.encrypted_data_ensure_cipher_value(template)
+        return template
+
+    def test_encrypt_elements(self):
+        root = etree.fromstring(b'<Doc><A>a</A><B>b</B><C>c</C></Doc>')
+        expected = etree.tostring(root)
+        template = self._elements_template(root)
+        ctx = xmlsec.EncryptionContext()
+        encrypted = ctx.encrypt_elements(template, [root[0], root[2]])
+        self.assertEqual(2, len(encrypted))
+        self.assertIs(encrypted[0], root[0])
+        self.assertIs(encrypted[1], root[2])
+        self.assertEqual('B', root[1].tag)
+        # the template is left unchanged
+        self.assertIsNone(template.getparent())
+        self.assertEqual('', xmlsec.tree.find_node(template, consts.NodeCipherValue, consts.EncNs).text or '')
+        # the generated session key is shared
+        self.assertIsNotNone(ctx.key)
+        self.assertEqual(2, ctx.decrypt_all(root))
+        self.assertEqual(expected, etree.tostring(root))
+
+    def test_encrypt_elements_encrypted_key(self):
+        root = etree.fromstring(b'<Doc><Header/><A>a</A><B>b</B></Doc>')
+        template = self._elements_template(root)
+        key_info = xmlsec.template.encrypted_data_ensure_key_info(template, ns='dsig')
+        enc_key = xmlsec.template.add_encrypted_key(key_info, consts.TransformRsaOaep, id='session-key')
+        xmlsec.template.encrypted_data_ensure_cipher_value(enc_key)
+        root[0].append(enc_key)
+        manager = xmlsec.KeysManager()
+        manager.add_key(xmlsec.Key.from_file(self.path('rsacert.pem'), format=consts.KeyDataFormatCertPem))
+
+        ctx = xmlsec.EncryptionContext(manager)
+        encrypted = ctx.encrypt_elements(template, [root[1], root[2]], encrypted_key=enc_key)
+        for enc_data in encrypted:
+            ki = xmlsec.tree.find_child(enc_data, consts.NodeKeyInfo, consts.DSigNs)
+            method = xmlsec.tree.find_child(ki, 'RetrievalMethod', consts.DSigNs)
+            self.assertEqual('#session-key', method.get('URI'))
+            self.assertIsNone(xmlsec.tree.find_node(ki, consts.NodeEncryptedKey, consts.EncNs))
+        self.assertTrue(xmlsec.tree.find_node(enc_key, consts.NodeCipherValue, consts.EncNs).text)
+
+        root = etree.fromstring(etree.tostring(root))
+        xmlsec.tree.add_ids(root, ['Id'])
+        manager = xmlsec.KeysManager()
+        manager.add_key(xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem))
+        self.assertEqual(2, xmlsec.EncryptionContext(manager).decrypt_all(root))
+        self.assertEqual(['Header', 'A', 'B'], [child.tag for child in root])
+
+    def test_encrypt_elements_per_element_key(self):
+        root = etree.fromstring(b'<Doc><A>a</A><B>b</B></Doc>')
+        template = self._elements_template(root)
+        key_info = xmlsec.template.encrypted_data_ensure_key_info(template, ns='dsig')
+        enc_key = xmlsec.template.add_encrypted_key(key_info, consts.TransformRsaOaep)
+        xmlsec.template.encrypted_data_ensure_cipher_value(enc_key)
+        manager = xmlsec.KeysManager()
+        manager.add_key(xmlsec.Key.from_file(self.path('rsacert.pem'), format=consts.KeyDataFormatCertPem))
+
+        ctx = xmlsec.EncryptionContext(manager)
+        encrypted = ctx.encrypt_elements(template, [root[0], root[1]], per_element_key=True)
+        self.assertIsNone(ctx.key)
+
+        manager = xmlsec.KeysManager()
+        manager.add_key(xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem))
+        session_keys = []
+        for enc_data in encrypted:
+            enc_key = xmlsec.tree.find_node(enc_data, consts.NodeEncryptedKey, consts.EncNs)
+            session_keys.append(xmlsec.EncryptionContext(manager).decrypt(copy.deepcopy(enc_key)))
+        self.assertNotEqual(session_keys[0], session_keys[1])
+        self.assertEqual(2, xmlsec.EncryptionContext(manager).decrypt_all(root))
+        self.assertEqual(b'<Doc><A>a</A><B>b</B></Doc>', etree.tostring(root))
+
+    def test_encrypt_elements_list_cleared(self):
+        template = self._elements_template(etree.Element('Doc'))
+        ctx = xmlsec.EncryptionContext()
+        ctx.key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+        # the list holds the only references to the documents
+        nodes = [etree.fromstring(b'<Doc><A>a</A></Doc>')[0] for _ in range(1000)]
+        references = sys.getrefcount(nodes[-1])
+        finished = threading.Event()
+        held = []
+
+        def clear():
+            # waits until encrypt_elements holds its own references to the nodes
+            while sys.getrefcount(nodes[-1]) == references and not finished.is_set():
+                time.sleep(0)
+            held.append(sys.getrefcount(nodes[-1]) > references)
+            nodes.clear()
+
+        clearer = threading.Thread(target=clear)
+        clearer.start()
+        try:
+            encrypted = ctx.encrypt_elements(template, nodes)
+        finally:
+            finished.set()
+            clearer.join()
+        self.assertEqual([True], held)
+        self.assertEqual(1000, len(encrypted))
+        self.assertEqual(b'<A>a</A>', etree.tostring(ctx.decrypt(encrypted[-1])))
+
+    def test_encrypt_elements_empty(self):
+        root = etree.fromstring(b'<Doc/>')
+        ctx = xmlsec.EncryptionContext()
+        self.assertEqual([], ctx.encrypt_elements(self._elements_template(root), []))
+        self.assertIsNone(ctx.key)
+
+    def test_encrypt_elements_fail(self):
+        root = etree.fromstring(b'<Doc><A>a</A></Doc>')
+        template = self._elements_template(root)
+        key_info = xmlsec.template.encrypted_data_ensure_key_info(template, ns='dsig')
+        enc_key = xmlsec.template.add_encrypted_key(key_info, consts.TransformRsaOaep, id='session-key')
+        xmlsec.template.encrypted_data_ensure_cipher_value(enc_key)
+        root.append(enc_key)
+        with self.assertRaisesRegex(xmlsec.Error, 'failed to encrypt the session key'):
+            xmlsec.EncryptionContext(xmlsec.KeysManager()).encrypt_elements(template, [root[0]], encrypted_key=enc_key)
+        self.assertEqual('A', root[0].tag)
+
+    def test_encrypt_elements_bad_args(self):
+        root = etree.fromstring(b'<Doc><A>a</A></Doc>')
+        template = self._elements_template(root)
+        ctx = xmlsec.EncryptionContext()
+        with self.assertRaises(TypeError):
+            ctx.encrypt_elements(template, None)
+        with self.assertRaises(TypeError):
+            ctx.encrypt_elements(template, ['A'])
+        with self.assertRaisesRegex(ValueError, 'must have the Id attribute'):
+            ctx.encrypt_elements(template, [root[0]], encrypted_key=etree.Element('EncryptedKey'))
+        with self.assertRaisesRegex(ValueError, 'cannot be used with encrypted_key'):
+            ctx.encrypt_elements(template, [root[0]], encrypted_key=etree.Element('EncryptedKey', Id='a'), per_element_key=True)
+        ctx.key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+        with self.assertRaisesRegex(ValueError, 'cannot be used with the key of the context'):
+            ctx.encrypt_elements(template, [root[0]], per_element_key=True)
+        del template.attrib['Type']
+        with self.assertRaisesRegex(xmlsec.Error, 'unsupported `Type`'):
+            ctx.encrypt_elements(template, [root[0]])
+
+    def test_decrypt_position(self):
+        root = etree.fromstring(b'<Doc><A/><!--comment-->text<B>b</B><C/></Doc>')
+        key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+        enc_data = self._encrypt(root[2], key)
+        ctx = xmlsec.EncryptionContext()
+        ctx.key = key
+        decrypted = ctx.decrypt(enc_data)
+        self.assertEqual('B', decrypted.tag)
+        self.assertIs(decrypted, root[2])
+        self.assertEqual(b'<Doc><A/><!--comment-->text<B>b</B><C/></Doc>', etree.tostring(root))
+
+    def test_decrypt_content_text(self):
+        root = etree.fromstring(b'<Doc><A/><B>b</B></Doc>')
+        key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+        enc_data = self._encrypt(root[1], key, type=consts.TypeEncContent)
+        ctx = xmlsec.EncryptionContext()
+        ctx.key = key
+        decrypted = ctx.decrypt(enc_data)
+        self.assertIs(decrypted, root[1])
+        self.assertEqual('b', decrypted.text)
+
+    def test_decrypt_all(self):
+        root = etree.fromstring(b'<Doc><A>a</A><B><C>c</C><D>d</D></B><E>e</E></Doc>')
+        expected = etree.tostring(root)
+        key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+        for tag in ('A', 'C', 'E'):
+            self._encrypt(root.find('.//' + tag), key)
+        self._encrypt(root.find('./B/D'), key, type=consts.TypeEncContent)
+        self.assertEqual(4, len(root.findall(f'.//{{{consts.EncNs}}}EncryptedData')))
+
+        ctx = xmlsec.EncryptionContext()
+        ctx.key = key
+        self.assertEqual(4, ctx.decrypt_all(root))
+        self.assertEqual(expected, etree.tostring(root))
+        # the key, which is set by the user, is kept for the next calls
+        self.assertIsNotNone(ctx.key)
+        self.assertEqual(0, ctx.decrypt_all(root))
+
+    def test_decrypt_all_nested(self):
+        root = etree.fromstring(b'<Doc><A><B>b</B><C>c</C></A></Doc>')
+        expected = etree.tostring(root)
+        key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+        self._encrypt(root.find('./A/B'), key)
+        self._encrypt(root.find('./A'), key)
+
+        ctx = xmlsec.EncryptionContext()
+        ctx.key = key
+        self.assertEqual(2, ctx.decrypt_all(root))
+        self.assertEqual(expected, etree.tostring(root))
+
+    def test_decrypt_all_keys_manager(self):
+        root = etree.Element('Doc')
+        root.extend([self.load_xml('enc1-out.xml'), self.load_xml('enc2-out.xml')])
+        manager = xmlsec.KeysManager()
+        manager.add_key(xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem))
+        ctx = xmlsec.EncryptionContext(manager)
+        self.assertEqual(2, ctx.decrypt_all(root))
+        self.assertIsNone(ctx.key)
+        self.assertEqual(self.load_xml('enc1-in.xml'), root[0])
+        self.assertEqual(self.load_xml('enc2-in.xml'), root[1])
+
+    def test_decrypt_all_skips_binary(self):
+        root = self.load_xml('enc1-out.xml')
+        enc_data = xmlsec.tree.find_child(root, consts.NodeEncryptedData, consts.EncNs)
+        binary = copy.deepcopy(enc_data)
+        del binary.attrib['Type']
+        root.append(binary)
+        manager = xmlsec.KeysManager()
+        manager.add_key(xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem))
+        ctx = xmlsec.EncryptionContext(manager)
+        self.assertEqual(1, ctx.decrypt_all(root))
+        self.assertEqual('Data', root[0].tag)
+        self.assertIs(binary, root[1])
+
+    def test_decrypt_all_fail(self):
+        root = etree.fromstring(b'<Doc><A>a</A><B>b</B></Doc>')
+        key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+        self._encrypt(root.find('./A'), key)
+        self._encrypt(root.find('./B'), xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession))
+        ctx = xmlsec.EncryptionContext()
+        ctx.key = key
+        with self.assertRaisesRegex(xmlsec.Error, 'failed to decrypt'):
+            ctx.decrypt_all(root)
+        self.assertEqual('A', root[0].tag)
+
+    def test_decrypt_all_bad_args(self):
+        ctx = xmlsec.EncryptionContext()
+        with self.assertRaises(TypeError):
+            ctx.decrypt_all('')
+
     def test_decrypt_key(self):
         root = self.load_xml('enc3-out.xml')
         enc_key = xmlsec.tree.find_child(root, consts.NodeEncryptedKey, consts.EncNs)
@@ -229,6 +513,292 @@ class TestEncryptionContext(base.TestMemoryLeaks):
         self.assertIsNotNone(decrypted)
         self.assertEqual(self.load_xml(f'enc{i}-in.xml'), root)
 
+    def encrypt_binary_data(self, data, method=consts.TransformAes128Cbc):
+        root = etree.Element('root')
+        enc_data = xmlsec.template.encrypted_data_create(root, method, ns='xenc')
+        xmlsec.template.encrypted_data_ensure_cipher_value(enc_data)
+        ki = xmlsec.template.encrypted_data_ensure_key_info(enc_data, ns='dsig')
+        ek = xmlsec.template.add_encrypted_key(ki, consts.TransformRsaOaep)
+        xmlsec.template.encrypted_data_ensure_cipher_value(ek)
+
+        manager = xmlsec.KeysManager()
+        manager.add_key(xmlsec.Key.from_file(self.path('rsacert.pem'), format=consts.KeyDataFormatCertPem))
+        ctx = xmlsec.EncryptionContext(manager)
+        ctx.key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+        return ctx.encrypt_binary(enc_data, data)
+
+    def decryption_context(self):
+        manager = xmlsec.KeysManager()
+        manager.add_key(xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem))
+        return xmlsec.EncryptionContext(manager)
+
+    def test_decrypt_to(self):
+        data = os.urandom(200000)
+        enc_data = self.encrypt_binary_data(data)
+        source = etree.tostring(enc_data)
+        for block_size in (7, 4096, 65536):
+            stream = io.BytesIO()
+            self.assertEqual(len(data), self.decryption_context().decrypt_to(enc_data, stream, block_size=block_size))
+            self.assertEqual(data, stream.getvalue())
+            self.assertEqual(source, etree.tostring(enc_data))
+
+    def test_decrypt_to_aes_gcm(self):
+        data = os.urandom(100000)
+        stream = io.BytesIO()
+        enc_data = self.encrypt_binary_data(data, consts.TransformAes128Gcm)
+        self.assertEqual(len(data), self.decryption_context().decrypt_to(enc_data, stream, block_size=1000))
+        self.assertEqual(data, stream.getvalue())
+
+    def test_decrypt_to_aes_gcm_tampered(self):
+        enc_data = self.encrypt_binary_data(os.urandom(100000), consts.TransformAes128Gcm)
+        cipher_value = xmlsec.tree.find_node(enc_data, consts.NodeCipherValue, consts.EncNs)
+        cipher = bytearray(base64.b64decode(cipher_value.text))
+        cipher[len(cipher) // 2] ^= 1
+        cipher_value.text = base64.b64encode(cipher).decode()
+        stream = io.BytesIO()
+        with self.assertRaisesRegex(xmlsec.Error, 'failed to decrypt'):
+            self.decryption_context().decrypt_to(enc_data, stream, block_size=1000)
+        # nothing is written before the tag is checked
+        self.assertEqual(b'', stream.getvalue())
+
+    def test_decrypt_to_small(self):
+        enc_data = self.encrypt_binary_data(b'test')
+        stream = io.BytesIO()
+        self.assertEqual(4, self.decryption_context().decrypt_to(enc_data, stream))
+        self.assertEqual(b'test', stream.getvalue())
+
+    def test_decrypt_to_xml(self):
+        root = self.load_xml('enc1-out.xml')
+        enc_data = xmlsec.tree.find_child(root, consts.NodeEncryptedData, consts.EncNs)
+        stream = io.BytesIO()
+        self.decryption_context().decrypt_to(enc_data, stream)
+        self.assertEqual(b'<Data>Hello, World!</Data>', stream.getvalue())
+        self.assertIs(enc_data, xmlsec.tree.find_child(root, consts.NodeEncryptedData, consts.EncNs))
+
+    def test_decrypt_to_fd(self):
+        data = os.urandom(100000)
+        enc_data = self.encrypt_binary_data(data)
+        with tempfile.TemporaryFile() as tmpfile:
+            self.assertEqual(len(data), self.decryption_context().decrypt_to(enc_data, tmpfile.fileno(), block_size=1000))
+            tmpfile.seek(0)
+            self.assertEqual(data, tmpfile.read())
+
+    def test_decrypt_to_partial_write(self):
+        data = os.urandom(1000)
+        writer = PartialWriter()
+        self.decryption_context().decrypt_to(self.encrypt_binary_data(data), writer, block_size=100)
+        self.assertEqual(data, b''.join(writer.chunks))
+        self.assertTrue(all(len(chunk) <= 3 for chunk in writer.chunks))
+
+    def test_decrypt_to_write_fail(self):
+        data = os.urandom(100000)
+        enc_data = self.encrypt_binary_data(data)
+        source = etree.tostring(enc_data)
+        with self.assertRaisesRegex(OSError, 'disk is full'):
+            self.decryption_context().decrypt_to(enc_data, FailingWriter(), block_size=1000)
+        self.assertEqual(source, etree.tostring(enc_data))
+
+    def test_decrypt_to_fail(self):
+        enc_data = self.encrypt_binary_data(os.urandom(100000))
+        source = etree.tostring(enc_data)
+        ctx = xmlsec.EncryptionContext(xmlsec.KeysManager())
+        with self.assertRaisesRegex(xmlsec.Error, 'failed to decrypt'):
+            ctx.decrypt_to(enc_data, io.BytesIO(), block_size=1000)
+        self.assertEqual(source, etree.tostring(enc_data))
+
+    def test_decrypt_to_bad_args(self):
+        ctx = xmlsec.EncryptionContext()
+        enc_data = self.encrypt_binary_data(b'test')
+        with self.assertRaises(TypeError):
+            ctx.decrypt_to('', io.BytesIO())
+        with self.assertRaisesRegex(TypeError, 'writable must be a file descriptor or an object with the write method.'):
+            ctx.decrypt_to(enc_data, object())
+        with self.assertRaises(ValueError):
+            ctx.decrypt_to(enc_data, -1)
+        with self.assertRaisesRegex(ValueError, 'block_size must be positive.'):
+            ctx.decrypt_to(enc_data, io.BytesIO(), block_size=0)
+
+    def encrypt_stream_template(self, uri):
+        root = etree.Element('root')
+        enc_data = xmlsec.template.encrypted_data_create(root, consts.TransformAes128Cbc, ns='xenc')
+        xmlsec.template.encrypted_data_ensure_cipher_reference(enc_data, uri)
+        ki = xmlsec.template.encrypted_data_ensure_key_info(enc_data, ns='dsig')
+        ek = xmlsec.template.add_encrypted_key(ki, consts.TransformRsaOaep)
+        xmlsec.template.encrypted_data_ensure_cipher_value(ek)
+        return enc_data
+
+    def encryption_context(self):
+        manager = xmlsec.KeysManager()
+        manager.add_key(xmlsec.Key.from_file(self.path('rsacert.pem'), format=consts.KeyDataFormatCertPem))
+        ctx = xmlsec.EncryptionContext(manager)
+        ctx.key = xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession)
+        return ctx
+
+    def temporary_path(self):
+        with tempfile.NamedTemporaryFile(delete=False) as tmpfile:
+            pass
+        self.addCleanup(os.remove, tmpfile.name)
+        return tmpfile.name
+
+    def test_encrypt_stream(self):
+        data = os.urandom(200001)
+        for block_size in (7, 65536):
+            path = self.temporary_path()
+            enc_data = self.encrypt_stream_template(path)
+            with open(path, 'wb') as sink:
+                encrypted = self.encryption_context().encrypt_stream(enc_data, io.BytesIO(data), sink, block_size=block_size)
+            self.assertIs(enc_data, encrypted)
+            # the IV and the padded cipher text
+            self.assertEqual(16 + (len(data) // 16 + 1) * 16, os.path.getsize(path))
+            cipher_ref = xmlsec.tree.find_node(encrypted, consts.NodeCipherReference, consts.EncNs)
+            self.assertEqual(path, cipher_ref.get('URI'))
+            self.assertIsNone(xmlsec.tree.find_child(cipher_ref.getparent(), consts.NodeCipherValue, consts.EncNs))
+
+            self.assertEqual(data, self.decryption_context().decrypt(encrypted))
+            stream = io.BytesIO()
+            self.decryption_context().decrypt_to(encrypted, stream)
+            self.assertEqual(data, stream.getvalue())
+
+    def test_encrypt_stream_fd(self):
+        data = os.urandom(1000)
+        with tempfile.TemporaryFile() as source, tempfile.TemporaryFile() as sink:
+            source.write(data)
+            source.seek(0)
+            self.encryption_context().encrypt_stream(
+                self.encrypt_stream_template('cipher.bin'), source.fileno(), sink.fileno(), block_size=100
+            )
+            sink.seek(0)
+            self.assertEqual(16 + 1008, len(sink.read()))
+
+    def test_encrypt_stream_read(self):
+        data = os.urandom(1000)
+        path = self.temporary_path()
+        enc_data = self.encrypt_stream_template(path)
+        with open(path, 'wb') as sink:
+            self.encryption_context().encrypt_stream(enc_data, Reader(data), sink, block_size=100)
+        self.assertEqual(data, self.decryption_context().decrypt(enc_data))
+
+    def test_encrypt_stream_empty(self):
+        with self.assertRaisesRegex(xmlsec.Error, 'no data to encrypt.'):
+            self.encryption_context().encrypt_stream(self.encrypt_stream_template('cipher.bin'), io.BytesIO(), io.BytesIO())
+
+    def test_encrypt_stream_read_fail(self):
+        with self.assertRaisesRegex(OSError, 'disk is broken'):
+            self.encryption_context().encrypt_stream(self.encrypt_stream_template('cipher.bin'), FailingReader(), io.BytesIO())
+
+    def test_encrypt_stream_write_fail(self):
+        with self.assertRaisesRegex(OSError, 'disk is full'):
+            self.encryption_context().encrypt_stream(
+                self.encrypt_stream_template('cipher.bin'), io.BytesIO(os.urandom(1000)), FailingWriter(), block_size=100
+            )
+
+    def test_encrypt_stream_no_cipher_reference(self):
+        root = etree.Element('root')
+        enc_data = xmlsec.template.encrypted_data_create(root, consts.TransformAes128Cbc, ns='xenc')
+        xmlsec.template.encrypted_data_ensure_cipher_value(enc_data)
+        with self.assertRaisesRegex(xmlsec.Error, 'template has no cipher reference.'):
+            self.encryption_context().encrypt_stream(enc_data, io.BytesIO(b'test'), io.BytesIO())
+
+    def test_encrypt_stream_bad_args(self):
+        ctx = xmlsec.EncryptionContext()
+        enc_data = self.encrypt_stream_template('cipher.bin')
+        with self.assertRaises(TypeError):
+            ctx.encrypt_stream('', io.BytesIO(b'test'), io.BytesIO())
+        with self.assertRaisesRegex(TypeError, 'readable must be a file descriptor or an object with the read method.'):
+            ctx.encrypt_stream(enc_data, object(), io.BytesIO())
+        with self.assertRaisesRegex(TypeError, 'writable must be a file descriptor or an object with the write method.'):
+            ctx.encrypt_stream(enc_data, io.BytesIO(b'test'), object())
+        with self.assertRaisesRegex(ValueError, 'block_size must be positive.'):
+            ctx.encrypt_stream(enc_data, io.BytesIO(b'test'), io.BytesIO(), block_size=-1)
+
+    def recipient_keys(self):
+        alice = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        alice.name = 'alice'
+        bob = xmlsec.Key.generate(consts.KeyDataRsa, 1024, consts.KeyDataTypePrivate)
+        bob.name = 'bob'
+        return alice, bob
+
+    def recipients_template(self, root=None, **kwargs):
+        root = etree.Element('root') if root is None else root
+        enc_data = xmlsec.template.encrypted_data_create(root, consts.TransformAes256Cbc, ns='xenc', **kwargs)
+        xmlsec.template.encrypted_data_ensure_cipher_value(enc_data)
+        return enc_data
+
+    def test_encrypt_for_recipients(self):
+        data = os.urandom(10000)
+        alice, bob = self.recipient_keys()
+        ctx = xmlsec.EncryptionContext()
+        encrypted = ctx.encrypt_for_recipients(self.recipients_template(), data, [alice, bob])
+        self.assertIsNotNone(ctx.key)
+
+        key_info = xmlsec.tree.find_child(encrypted, consts.NodeKeyInfo, consts.DSigNs)
+        enc_keys = [child for child in key_info if child.tag == f'{{{consts.EncNs}}}{consts.NodeEncryptedKey}']
+        self.assertEqual(['alice', 'bob'], [enc_key.get('Recipient') for enc_key in enc_keys])
+        self.assertEqual(
+            ['alice', 'bob'], [xmlsec.tree.find_node(enc_key, consts.NodeKeyName, consts.DSigNs).text for enc_key in enc_keys]
+        )
+        cipher_data = xmlsec.tree.find_child(encrypted, consts.NodeCipherData, consts.EncNs)
+        self.assertIsNotNone(xmlsec.tree.find_child(cipher_data, consts.NodeCipherValue, consts.EncNs))
+        for key in (alice, bob):
+            manager = xmlsec.KeysManager()
+            manager.add_key(key)
+            # the session key of aes256-cbc
+            self.assertEqual(
+                32, len(xmlsec.EncryptionContext(manager).decrypt(copy.deepcopy(enc_keys[0 if key is alice else 1])))
+            )
+            self.assertEqual(data, xmlsec.EncryptionContext(manager).decrypt(copy.deepcopy(encrypted)))
+
+    def test_encrypt_for_recipients_by_name(self):
+        manager = xmlsec.KeysManager()
+        key = xmlsec.Key.from_file(self.path('rsacert.pem'), format=consts.KeyDataFormatCertPem)
+        key.name = 'alice'
+        manager.add_key(key)
+        encrypted = xmlsec.EncryptionContext(manager).encrypt_for_recipients(self.recipients_template(), b'test', ['alice'])
+        self.assertEqual(b'test', self.decryption_context().decrypt(encrypted))
+
+    def test_encrypt_for_recipients_xml(self):
+        root = self.load_xml('enc1-in.xml')
+        template = self.recipients_template(root, type=consts.TypeEncElement)
+        alice, bob = self.recipient_keys()
+        encrypted = xmlsec.EncryptionContext().encrypt_for_recipients(template, root.find('Data'), [alice, bob])
+        self.assertIs(root, encrypted.getparent())
+        self.assertIsNone(root.find('Data'))
+
+        manager = xmlsec.KeysManager()
+        manager.add_key(bob)
+        xmlsec.EncryptionContext(manager).decrypt(encrypted)
+        self.assertEqual(self.load_xml('enc1-in.xml'), root)
+
+    def test_encrypt_for_recipients_session_key(self):
+        session_key = xmlsec.Key.generate(consts.KeyDataAes, 256, consts.KeyDataTypeSession)
+        ctx = xmlsec.EncryptionContext()
+        ctx.key = session_key
+        encrypted = ctx.encrypt_for_recipients(self.recipients_template(), b'test', self.recipient_keys()[:1])
+        ctx = xmlsec.EncryptionContext()
+        ctx.key = session_key
+        self.assertEqual(b'test', ctx.decrypt(encrypted))
+
+    def test_encrypt_for_recipients_fail(self):
+        ctx = xmlsec.EncryptionContext(xmlsec.KeysManager())
+        with self.assertRaisesRegex(xmlsec.Error, "recipient key 'carol' is not found."):
+            ctx.encrypt_for_recipients(self.recipients_template(), b'test', ['carol'])
+        ctx.key = self.recipient_keys()[0]
+        with self.assertRaisesRegex(xmlsec.Error, 'the session key must be symmetric.'):
+            ctx.encrypt_for_recipients(self.recipients_template(), b'test', self.recipient_keys()[:1])
+
+    def test_encrypt_for_recipients_bad_args(self):
+        ctx = xmlsec.EncryptionContext()
+        template = self.recipients_template()
+        with self.assertRaises(TypeError):
+            ctx.encrypt_for_recipients('', b'test', [])
+        with self.assertRaisesRegex(ValueError, 'recipients must not be empty.'):
+            ctx.encrypt_for_recipients(template, b'test', [])
+        for recipients in ('alice', 1, [1]):
+            with self.assertRaisesRegex(TypeError, 'recipients must be a sequence of keys or key names.'):
+                ctx.encrypt_for_recipients(template, b'test', recipients)
+        with self.assertRaises(TypeError):
+            ctx.encrypt_for_recipients(template, b'test', self.recipient_keys(), key_transport='rsa')
+
     def test_decrypt_bad_args(self):
         ctx = xmlsec.EncryptionContext()
         with self.assertRaises(TypeError):
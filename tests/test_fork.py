@@ -0,0 +1,100 @@
+import os
+import traceback
+import unittest
+
+import xmlsec
+from tests import base
+
+consts = xmlsec.constants
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'requires os.fork')
+class TestFork(base.TestMemoryLeaks):
+    # the forked processes leave garbage behind them, so the leak check is meaningless here
+    iterations = 0
+
+    def manager(self, **kwargs):
+        manager = xmlsec.KeysManager(**kwargs)
+        key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+        manager.add_key(key)
+        return manager
+
+    def verify(self, manager):
+        ctx = xmlsec.SignatureContext(manager)
+        ctx.verify(xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature))
+
+    def add_key(self, manager):
+        manager.add_key(xmlsec.Key.generate(consts.KeyDataAes, 128, consts.KeyDataTypeSession))
+
+    def run_in_child(self, func):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                func()
+                code = 0
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(0, os.waitstatus_to_exitcode(status))
+
+    def test_preload(self):
+        manager = self.manager()
+        self.assertIsNone(xmlsec.preload())
+        self.assertIsNone(xmlsec.preload(manager, self.manager(indexed=True)))
+        with self.assertRaises(TypeError):
+            xmlsec.preload('manager')
+
+    def test_preload_busy(self):
+        manager = self.manager()
+        executor = xmlsec.aio.Executor(manager, workers=1)
+        with self.assertRaisesRegex(xmlsec.Error, 'shared by running operations'):
+            xmlsec.preload(manager)
+        executor.shutdown()
+        xmlsec.preload(manager)
+
+    def test_fork(self):
+        managers = [self.manager(), self.manager(indexed=True), self.manager(resolver=lambda name, klass, type: None)]
+        xmlsec.preload(*managers)
+
+        def child():
+            for manager in managers:
+                self.verify(manager)
+                self.add_key(manager)
+
+        self.run_in_child(child)
+        for manager in managers:
+            self.verify(manager)
+
+    def test_fork_executor(self):
+        manager = self.manager()
+        executor = xmlsec.aio.Executor(manager, workers=1)
+
+        def child():
+            # the threads of the executor are not forked, so the manager is not shared by them
+            self.add_key(manager)
+            with self.assertRaisesRegex(RuntimeError, 'after fork'):
+                executor.verify(None)
+            executor.shutdown()
+            self.add_key(manager)
+
+        self.run_in_child(child)
+        with self.assertRaisesRegex(xmlsec.Error, 'shared by running operations'):
+            self.add_key(manager)
+        executor.shutdown()
+        self.add_key(manager)
+
+    def test_fork_process_verifier(self):
+        keys = [{'file': self.path('rsapub.pem'), 'format': consts.KeyDataFormatPem, 'name': 'rsakey.pem'}]
+        with xmlsec.parallel.ProcessVerifier(keys, workers=1) as verifier:
+
+            def child():
+                with self.assertRaisesRegex(RuntimeError, 'after fork'):
+                    verifier.verify([self.load('sign1-out.xml')])
+                verifier.close()
+
+            self.run_in_child(child)
+            self.assertEqual([(consts.DSigStatusSucceeded, 0)], verifier.verify([self.load('sign1-out.xml')]))
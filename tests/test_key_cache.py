@@ -0,0 +1,104 @@
+import os
+import tempfile
+
+import xmlsec
+from tests import base
+
+consts = xmlsec.constants
+
+
+class TestKeyCache(base.TestMemoryLeaks):
+    def setUp(self):
+        super().setUp()
+        self.key_path = self.path('rsakey.pem')
+
+    def copy(self, name):
+        with tempfile.NamedTemporaryFile(suffix='.pem', delete=False) as tmpfile:
+            tmpfile.write(self.load(name))
+        return tmpfile.name
+
+    def touch(self, path):
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+
+    def test_defaults(self):
+        cache = xmlsec.KeyCache()
+        self.assertEqual(128, cache.maxsize)
+        self.assertEqual((0, 0, 128, 0), cache.info())
+        self.assertEqual(0, len(cache))
+        self.assertIsInstance(xmlsec.key_cache, xmlsec.KeyCache)
+
+    def test_from_file(self):
+        cache = xmlsec.KeyCache()
+        first = cache.from_file(self.key_path, consts.KeyDataFormatPem)
+        second = cache.from_file(self.key_path, format=consts.KeyDataFormatPem)
+        self.assertIsNot(first, second)
+        self.assertEqual((1, 1, 128, 1), cache.info())
+        # the copies are independent of the cached key
+        first.name = 'changed'
+        self.assertIsNone(cache.from_file(self.key_path, consts.KeyDataFormatPem).name)
+
+    def test_from_file_entries(self):
+        cache = xmlsec.KeyCache()
+        cache.from_file(self.key_path, consts.KeyDataFormatPem)
+        cache.from_file(self.key_path, consts.KeyDataFormatPem, password='secret')
+        cache.from_file(self.key_path, consts.KeyDataFormatPem, certs=[(self.path('rsacert.pem'), consts.KeyDataFormatCertPem)])
+        with open(self.key_path, 'rb') as f:
+            cache.from_file(f, consts.KeyDataFormatPem)
+        with open(self.key_path) as f:
+            cache.from_file(f, consts.KeyDataFormatPem)
+        self.assertEqual((1, 4, 128, 4), cache.info())
+
+    def test_from_file_changed(self):
+        cache = xmlsec.KeyCache()
+        key_path = self.copy('rsakey.pem')
+        try:
+            cache.from_file(key_path, consts.KeyDataFormatPem)
+            self.touch(key_path)
+            cache.from_file(key_path, consts.KeyDataFormatPem)
+        finally:
+            os.remove(key_path)
+        # the key of the older file is forgotten
+        self.assertEqual((0, 2, 128, 1), cache.info())
+
+    def test_from_file_maxsize(self):
+        cache = xmlsec.KeyCache(maxsize=1)
+        cache.from_file(self.key_path, consts.KeyDataFormatPem)
+        cache.from_file(self.path('rsapub.pem'), consts.KeyDataFormatPem)
+        cache.from_file(self.key_path, consts.KeyDataFormatPem)
+        self.assertEqual((0, 3, 1, 1), cache.info())
+        cache = xmlsec.KeyCache(maxsize=0)
+        cache.from_file(self.key_path, consts.KeyDataFormatPem)
+        self.assertEqual((0, 1, 0, 0), cache.info())
+
+    def test_invalidate(self):
+        cache = xmlsec.KeyCache()
+        cert = self.path('rsacert.pem')
+        cache.from_file(self.key_path, consts.KeyDataFormatPem)
+        cache.from_file(self.key_path, consts.KeyDataFormatPem, certs=[(cert, consts.KeyDataFormatCertPem)])
+        cache.from_file(self.path('rsapub.pem'), consts.KeyDataFormatPem)
+        self.assertEqual(1, cache.invalidate(cert))
+        # the file does not need to exist anymore
+        key_path = self.copy('rsapub.pem')
+        cache.from_file(key_path, consts.KeyDataFormatPem)
+        os.remove(key_path)
+        self.assertEqual(1, cache.invalidate(key_path))
+        self.assertEqual(1, cache.invalidate(self.key_path))
+        self.assertEqual(1, cache.invalidate())
+        self.assertEqual(0, len(cache))
+
+    def test_from_file_fail(self):
+        cache = xmlsec.KeyCache()
+        with self.assertRaises(xmlsec.Error):
+            cache.from_file(self.path('sign1-in.xml'), consts.KeyDataFormatPem)
+        with self.assertRaises(OSError):
+            cache.from_file(self.path('missing.pem'), consts.KeyDataFormatPem)
+        with self.assertRaises(TypeError):
+            cache.from_file(self.key_path, consts.KeyDataFormatPem, certs=[self.path('rsacert.pem')])
+        self.assertEqual((0, 1, 128, 0), cache.info())
+
+    def test_bad_args(self):
+        with self.assertRaises(ValueError):
+            xmlsec.KeyCache(maxsize=-1)
+        with self.assertRaises(TypeError):
+            xmlsec.KeyCache().from_file(1, consts.KeyDataFormatPem)
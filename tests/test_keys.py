@@ -1,5 +1,9 @@
 import copy
+import pickle
 import tempfile
+import threading
+import time
+from unittest import mock
 
 import xmlsec
 from tests import base
@@ -12,6 +16,12 @@ class TestKeys(base.TestMemoryLeaks):
         key = xmlsec.Key.from_memory(self.load('rsakey.pem'), format=consts.KeyDataFormatPem)
         self.assertIsNotNone(key)
 
+    def test_key_from_memory_buffer(self):
+        data = self.load('rsakey.pem')
+        for buf in (bytearray(data), memoryview(data)):
+            key = xmlsec.Key.from_memory(buf, format=consts.KeyDataFormatPem)
+            self.assertIsNotNone(key)
+
     def test_key_from_memory_with_bad_args(self):
         with self.assertRaises(TypeError):
             xmlsec.Key.from_memory(1, format='')
@@ -73,6 +83,10 @@ class TestKeys(base.TestMemoryLeaks):
         key = xmlsec.Key.from_binary_data(klass=consts.KeyDataDes, data=self.load('deskey.bin'))
         self.assertIsNotNone(key)
 
+    def test_from_binary_data_buffer(self):
+        key = xmlsec.Key.from_binary_data(klass=consts.KeyDataDes, data=bytearray(self.load('deskey.bin')))
+        self.assertIsNotNone(key)
+
     def test_from_binary_data_with_bad_args(self):
         with self.assertRaises(TypeError):
             xmlsec.Key.from_binary_data(klass='', data=1)
@@ -124,6 +138,10 @@ class TestKeys(base.TestMemoryLeaks):
         self.assertIsNotNone(key)
         key.load_cert_from_memory(self.load('rsacert.pem'), format=consts.KeyDataFormatPem)
 
+    def test_load_cert_from_memory_buffer(self):
+        key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        key.load_cert_from_memory(memoryview(self.load('rsacert.pem')), format=consts.KeyDataFormatPem)
+
     def test_load_cert_from_memory_with_bad_args(self):
         key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
         self.assertIsNotNone(key)
@@ -167,6 +185,72 @@ class TestKeys(base.TestMemoryLeaks):
         del key
         key2.load_cert_from_file(self.path('rsacert.pem'), format=consts.KeyDataFormatPem)
 
+    def _sign(self, key, transform=consts.TransformRsaSha256):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = key
+        return ctx.sign_binary(b'data', transform)
+
+    def test_export(self):
+        key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        key.load_cert_from_file(self.path('rsacert.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+        data = key.export()
+        key2 = xmlsec.Key.from_export(data)
+        self.assertEqual('rsakey.pem', key2.name)
+        self.assertEqual(data, key2.export())
+        self.assertEqual(self._sign(key), self._sign(key2))
+
+    def test_export_public_key(self):
+        key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        key2 = xmlsec.Key.from_export(key.export())
+        self.assertIsNone(key2.name)
+        self.assertEqual(key.export(), key2.export())
+
+    def test_export_binary_key(self):
+        key = xmlsec.Key.from_binary_data(consts.KeyDataHmac, b'secret')
+        key2 = xmlsec.Key.from_export(bytearray(key.export()))
+        self.assertEqual(self._sign(key, consts.TransformHmacSha256), self._sign(key2, consts.TransformHmacSha256))
+
+    def test_export_encrypted(self):
+        key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        aes = xmlsec.Key.from_binary_data(consts.KeyDataAes, b'0' * 32)
+        data = key.export(encryption_key=aes)
+        self.assertNotEqual(data, key.export(aes))
+        self.assertEqual(key.export(), xmlsec.Key.from_export(data, encryption_key=aes).export())
+        with self.assertRaises(ValueError):
+            xmlsec.Key.from_export(data)
+        with self.assertRaises(xmlsec.Error):
+            xmlsec.Key.from_export(data, xmlsec.Key.from_binary_data(consts.KeyDataAes, b'1' * 16))
+
+    def test_export_fail(self):
+        key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        key.load_cert_from_file(self.path('rsacert.pem'), format=consts.KeyDataFormatPem)
+        data = key.export()
+        # AES-GCM has no 160 bit variant, so the records, which are written already, are discarded
+        with self.assertRaisesRegex(xmlsec.Error, 'cannot encrypt key'):
+            key.export(encryption_key=xmlsec.Key.from_binary_data(consts.KeyDataAes, b'0' * 20))
+        self.assertEqual(data, key.export())
+
+    def test_export_with_bad_args(self):
+        key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        with self.assertRaises(ValueError):
+            xmlsec.Key().export()
+        with self.assertRaises(ValueError):
+            key.export(encryption_key=key)
+        with self.assertRaises(TypeError):
+            key.export(encryption_key=b'0' * 32)
+        for data in (b'', self.load('rsakey.pem'), key.export()[:-1]):
+            with self.assertRaises(ValueError):
+                xmlsec.Key.from_export(data)
+
+    def test_pickle(self):
+        key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+        key2 = pickle.loads(pickle.dumps(key))
+        self.assertIsInstance(key2, xmlsec.Key)
+        self.assertEqual(key.export(), key2.export())
+        self.assertIsInstance(pickle.loads(pickle.dumps(xmlsec.Key())), xmlsec.Key)
+
 
 class TestKeysManager(base.TestMemoryLeaks):
     def test_add_key(self):
@@ -202,6 +286,12 @@ class TestKeysManager(base.TestMemoryLeaks):
         mngr.add_key(xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem))
         mngr.load_cert_from_memory(self.load('rsacert.pem'), format=consts.KeyDataFormatPem, type=consts.KeyDataTypeTrusted)
 
+    def test_load_cert_from_memory_buffer(self):
+        mngr = xmlsec.KeysManager()
+        mngr.load_cert_from_memory(
+            bytearray(self.load('rsacert.pem')), format=consts.KeyDataFormatPem, type=consts.KeyDataTypeTrusted
+        )
+
     def test_load_cert_from_memory_with_bad_args(self):
         mngr = xmlsec.KeysManager()
         mngr.add_key(xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem))
@@ -218,3 +308,194 @@ class TestKeysManager(base.TestMemoryLeaks):
         mngr = xmlsec.KeysManager()
         with self.assertRaises(ValueError):
             mngr.add_key(xmlsec.Key())
+
+    def _verify(self, mngr):
+        root = self.load_xml('sign1-out.xml')
+        ctx = xmlsec.SignatureContext(manager=mngr)
+        ctx.verify(xmlsec.tree.find_node(root, consts.NodeSignature))
+
+    def test_indexed(self):
+        mngr = xmlsec.KeysManager(indexed=True)
+        for i in range(100):
+            key = xmlsec.Key.from_binary_data(consts.KeyDataHmac, b'secret %d' % i)
+            key.name = f'key{i}'
+            mngr.add_key(key)
+        # the key of another type with the same name is skipped
+        key = xmlsec.Key.from_binary_data(consts.KeyDataHmac, b'secret')
+        key.name = 'rsakey.pem'
+        mngr.add_key(key)
+        key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+        mngr.add_key(key)
+        self._verify(mngr)
+
+    def test_indexed_without_name(self):
+        for indexed in (False, True):
+            mngr = xmlsec.KeysManager(indexed=indexed)
+            key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+            key.name = 'other.pem'
+            mngr.add_key(key)
+            # the key is looked up by the requirements when no key has the name
+            self._verify(mngr)
+
+    def test_indexed_key_not_found(self):
+        mngr = xmlsec.KeysManager(indexed=True)
+        key = xmlsec.Key.from_binary_data(consts.KeyDataHmac, b'secret')
+        key.name = 'rsakey.pem'
+        mngr.add_key(key)
+        with self.assertRaises(xmlsec.Error):
+            self._verify(mngr)
+
+    def test_indexed_load_cert(self):
+        mngr = xmlsec.KeysManager(indexed=True)
+        mngr.add_key(xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem))
+        mngr.load_cert(self.path('rsacert.pem'), format=consts.KeyDataFormatPem, type=consts.KeyDataTypeTrusted)
+
+    def _resolver(self, calls, result=True):
+        def resolve(name, klass, type):
+            calls.append((name, klass, type))
+            if result:
+                return xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+            return None
+
+        return resolve
+
+    def test_resolver(self):
+        calls = []
+        mngr = xmlsec.KeysManager(resolver=self._resolver(calls))
+        self._verify(mngr)
+        self._verify(mngr)
+        # the resolved key is remembered by name
+        self.assertEqual([('rsakey.pem', consts.KeyDataRsa, consts.KeyDataTypePublic)], calls)
+
+    def test_resolver_added_key(self):
+        calls = []
+        mngr = xmlsec.KeysManager(resolver=self._resolver(calls))
+        key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+        mngr.add_key(key)
+        self._verify(mngr)
+        self.assertEqual([], calls)
+
+    def test_resolver_not_found(self):
+        calls = []
+        mngr = xmlsec.KeysManager(resolver=self._resolver(calls, result=False))
+        with self.assertRaises(xmlsec.Error):
+            self._verify(mngr)
+        self.assertEqual(('rsakey.pem', consts.KeyDataRsa, consts.KeyDataTypePublic), calls[0])
+        # the key is looked up without name at last
+        self.assertEqual((None, consts.KeyDataRsa, consts.KeyDataTypePublic), calls[-1])
+
+    def test_resolver_maxsize(self):
+        calls = []
+        mngr = xmlsec.KeysManager(resolver=self._resolver(calls), maxsize=0)
+        self._verify(mngr)
+        self._verify(mngr)
+        self.assertEqual(2, len(calls))
+
+    def test_resolver_ttl(self):
+        calls = []
+        mngr = xmlsec.KeysManager(resolver=self._resolver(calls), ttl=0.01)
+        self._verify(mngr)
+        time.sleep(0.02)
+        self._verify(mngr)
+        self.assertEqual(2, len(calls))
+
+    def test_resolver_error(self):
+        errors = []
+
+        def resolve(name, klass, type):
+            raise RuntimeError('resolver failed')
+
+        mngr = xmlsec.KeysManager(resolver=resolve)
+        with mock.patch('sys.unraisablehook', lambda args: errors.append(args.exc_type)), self.assertRaises(xmlsec.Error):
+            self._verify(mngr)
+        self.assertEqual({RuntimeError}, set(errors))
+
+    def test_resolver_bad_result(self):
+        errors = []
+        mngr = xmlsec.KeysManager(resolver=lambda name, klass, type: 'key')
+        with mock.patch('sys.unraisablehook', lambda args: errors.append(args.exc_type)), self.assertRaises(xmlsec.Error):
+            self._verify(mngr)
+        self.assertEqual({TypeError}, set(errors))
+
+    def test_load_directory(self):
+        mngr = xmlsec.KeysManager(indexed=True)
+        self.assertEqual((1, 2), mngr.load_directory(self.data_dir, ['rsacert.pem', 'rsa*.pem'], workers=2))
+        # the keys are named by their files
+        self._verify(mngr)
+
+    def test_load_directory_der(self):
+        mngr = xmlsec.KeysManager()
+        self.assertEqual((1, 1), mngr.load_directory(self.data_dir, '*.der', workers=1))
+
+    def test_load_directory_fail(self):
+        mngr = xmlsec.KeysManager(indexed=True)
+        with self.assertRaises(xmlsec.Error):
+            mngr.load_directory(self.data_dir, ['rsakey.pem', 'sign1-in.xml'])
+        with self.assertRaises(OSError):
+            mngr.load_directory(self.path('missing'))
+        # nothing is loaded if any file fails
+        with self.assertRaises(xmlsec.Error):
+            self._verify(mngr)
+
+    def test_load_pem_bundle(self):
+        data = self.load('rsacert.pem') * 2 + self.load('rsakey.pem') * 2 + self.load('rsapub.pem')
+        mngr = xmlsec.KeysManager()
+        # the duplicates are loaded once
+        self.assertEqual((1, 2), mngr.load_pem_bundle(data, workers=2))
+        self._verify(mngr)
+        self.assertEqual((0, 0), mngr.load_pem_bundle(b'-----BEGIN OTHER-----\nAAAA\n-----END OTHER-----\n'))
+
+    def test_load_pem_bundle_fail(self):
+        mngr = xmlsec.KeysManager()
+        with self.assertRaises(xmlsec.Error):
+            mngr.load_pem_bundle(self.load('rsakey.pem') + b'-----BEGIN CERTIFICATE-----\nAAAA\n-----END CERTIFICATE-----\n')
+        with self.assertRaises(ValueError):
+            mngr.load_pem_bundle(self.load('rsakey.pem'), workers=0)
+        for data in (b'', self.load('dsakey.der')):
+            with self.assertRaisesRegex(xmlsec.Error, 'no PEM blocks'):
+                mngr.load_pem_bundle(data)
+        with self.assertRaises(xmlsec.Error):
+            self._verify(mngr)
+
+    def test_init_with_bad_args(self):
+        with self.assertRaises(TypeError):
+            xmlsec.KeysManager(indexed=True, unknown=1)
+        with self.assertRaises(TypeError):
+            xmlsec.KeysManager(resolver='')
+        with self.assertRaises(ValueError):
+            xmlsec.KeysManager(resolver=print, maxsize=-1)
+        with self.assertRaises(ValueError):
+            xmlsec.KeysManager(resolver=print, ttl=0)
+
+
+class TestKeysManagerThreads(base.TestMemoryLeaks):
+    # the threads leave garbage behind them, so the leak check is meaningless here
+    iterations = 0
+
+    def test_indexed_add_key_while_verifying(self):
+        mngr = xmlsec.KeysManager(indexed=True)
+        key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+        mngr.add_key(key)
+        stop = threading.Event()
+
+        def add_keys():
+            i = 0
+            while not stop.is_set():
+                # the index grows and the buckets of the looked up name are replaced meanwhile
+                key = xmlsec.Key.from_binary_data(consts.KeyDataHmac, b'secret')
+                key.name = 'rsakey.pem' if i % 2 else f'key{i}'
+                mngr.add_key(key)
+                i += 1
+
+        thread = threading.Thread(target=add_keys)
+        thread.start()
+        try:
+            for _ in range(200):
+                root = self.load_xml('sign1-out.xml')
+                xmlsec.SignatureContext(manager=mngr).verify(xmlsec.tree.find_node(root, consts.NodeSignature))
+        finally:
+            stop.set()
+            thread.join()
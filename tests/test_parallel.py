@@ -0,0 +1,224 @@
+import sys
+import threading
+import time
+
+import xmlsec
+from tests import base
+
+consts = xmlsec.constants
+
+
+class TestParallel(base.TestMemoryLeaks):
+    def manager(self):
+        manager = xmlsec.KeysManager()
+        key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+        manager.add_key(key)
+        return manager
+
+    def signature(self, name='sign1-out.xml'):
+        root = self.load_xml(name)
+        xmlsec.tree.add_ids(root, ['ID'])
+        return xmlsec.tree.find_node(root, consts.NodeSignature)
+
+    def test_verify_documents(self):
+        signs = [self.signature(f'sign{i}-out.xml') for i in range(1, 6)]
+        results = xmlsec.parallel.verify_documents(signs, self.manager(), workers=3)
+        self.assertEqual([(consts.DSigStatusSucceeded, 0)] * len(signs), results)
+
+    def test_verify_documents_keeps_order(self):
+        tampered_root = self.load_xml('sign1-out.xml')
+        tampered_root.find('{urn:envelope}Data').text = 'tampered'
+        tampered = xmlsec.tree.find_node(tampered_root, consts.NodeSignature)
+        broken = xmlsec.tree.find_node(self.load_xml('sign1-in.xml'), consts.NodeSignature)
+        signs = [self.signature(), tampered, broken] * 4
+        status, code = zip(*xmlsec.parallel.verify_documents(iter(signs), self.manager(), workers=4))
+        self.assertEqual((consts.DSigStatusSucceeded, consts.DSigStatusInvalid, consts.DSigStatusUnknown) * 4, status)
+        self.assertEqual(0, code[0])
+        self.assertNotEqual(0, code[2])
+
+    def test_verify_documents_same_document(self):
+        sign = self.signature()
+        results = xmlsec.parallel.verify_documents([sign, self.signature(), sign, sign], self.manager(), workers=2)
+        self.assertEqual([(consts.DSigStatusSucceeded, 0)] * 4, results)
+
+    def test_verify_documents_default_workers(self):
+        signs = [self.signature() for _ in range(3)]
+        self.assertEqual([(consts.DSigStatusSucceeded, 0)] * 3, xmlsec.parallel.verify_documents(signs, self.manager()))
+
+    def test_verify_documents_no_key(self):
+        status, code = xmlsec.parallel.verify_documents([self.signature()], xmlsec.KeysManager(), workers=1)[0]
+        self.assertEqual(consts.DSigStatusUnknown, status)
+        self.assertNotEqual(0, code)
+
+    def test_verify_documents_empty(self):
+        self.assertEqual([], xmlsec.parallel.verify_documents([], self.manager()))
+
+    def test_verify_documents_bad_args(self):
+        with self.assertRaises(TypeError):
+            xmlsec.parallel.verify_documents(1, self.manager())
+        with self.assertRaises(TypeError):
+            xmlsec.parallel.verify_documents([''], self.manager())
+        with self.assertRaises(TypeError):
+            xmlsec.parallel.verify_documents([self.signature()], None)
+        with self.assertRaises(ValueError):
+            xmlsec.parallel.verify_documents([self.signature()], self.manager(), workers=0)
+
+
+class TestParallelSharing(base.TestMemoryLeaks):
+    # threads leave garbage behind them, so the leak check is meaningless here
+    iterations = 0
+
+    def test_manager_is_locked_during_verification(self):
+        manager = xmlsec.KeysManager()
+        manager.add_key(xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem))
+        signs = [xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature) for _ in range(1000)]
+        key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        errors = []
+        started = threading.Event()
+        finished = threading.Event()
+
+        def modify():
+            started.set()
+            while not finished.is_set():
+                try:
+                    manager.add_key(key)
+                except xmlsec.Error as e:
+                    errors.append(str(e))
+                    break
+
+        thread = threading.Thread(target=modify)
+        thread.start()
+        started.wait()
+        try:
+            results = xmlsec.parallel.verify_documents(signs, manager, workers=2)
+        finally:
+            finished.set()
+            thread.join()
+        self.assertEqual([(consts.DSigStatusSucceeded, 0)] * len(signs), results)
+        self.assertEqual(['KeysManager is shared by running operations and cannot be modified.'], errors)
+        # the manager is released after verification
+        manager.add_key(key)
+
+    def test_verify_documents_list_cleared(self):
+        manager = self.manager()
+        # the list holds the only references to the documents
+        signs = [xmlsec.tree.find_node(self.load_xml('sign1-out.xml'), consts.NodeSignature) for _ in range(100)]
+        references = sys.getrefcount(signs[-1])
+        finished = threading.Event()
+        held = []
+
+        def clear():
+            # waits until verify_documents holds its own references to the nodes
+            while sys.getrefcount(signs[-1]) == references and not finished.is_set():
+                time.sleep(0)
+            held.append(sys.getrefcount(signs[-1]) > references)
+            signs.clear()
+
+        clearer = threading.Thread(target=clear)
+        clearer.start()
+        try:
+            results = xmlsec.parallel.verify_documents(signs, manager, workers=4)
+        finally:
+            finished.set()
+            clearer.join()
+        self.assertEqual([True], held)
+        self.assertEqual([(consts.DSigStatusSucceeded, 0)] * 100, results)
+
+    def manager(self):
+        manager = xmlsec.KeysManager()
+        key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+        manager.add_key(key)
+        return manager
+
+    def parse_signatures(self, count, threads):
+        """Parse ``count`` signed documents, each of ``threads`` threads parses its share of them."""
+        signs = [None] * count
+
+        def parse(start):
+            for i in range(start, count, threads):
+                root = self.load_xml(f'sign{i % 5 + 1}-out.xml')
+                xmlsec.tree.add_ids(root, ['ID'])
+                signs[i] = xmlsec.tree.find_node(root, consts.NodeSignature)
+
+        workers = [threading.Thread(target=parse, args=(i,)) for i in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return signs
+
+    def test_verify_documents_parsed_by_one_thread(self):
+        # lxml shares the dictionary between these documents, they are verified one by one
+        signs = self.parse_signatures(40, threads=1)
+        self.assertEqual(
+            [(consts.DSigStatusSucceeded, 0)] * 40, xmlsec.parallel.verify_documents(signs, self.manager(), workers=4)
+        )
+
+    def test_verify_documents_parsed_by_several_threads(self):
+        signs = self.parse_signatures(40, threads=4)
+        self.assertEqual(
+            [(consts.DSigStatusSucceeded, 0)] * 40, xmlsec.parallel.verify_documents(signs, self.manager(), workers=4)
+        )
+
+
+class TestProcessVerifier(base.TestMemoryLeaks):
+    # the worker processes leave garbage behind them, so the leak check is meaningless here
+    iterations = 0
+
+    def keys(self):
+        return [{'file': self.path('rsapub.pem'), 'format': consts.KeyDataFormatPem, 'name': 'rsakey.pem'}]
+
+    def document(self, name):
+        with open(self.path(name), 'rb') as f:
+            return f.read()
+
+    def test_verify(self):
+        documents = [self.document(f'sign{i}-out.xml') for i in range(1, 6)]
+        tampered = documents[0].replace(b'Hello, World!', b'Hello, Tampered!')
+        self.assertNotEqual(documents[0], tampered)
+        with xmlsec.parallel.ProcessVerifier(self.keys(), workers=2, ids=['ID']) as verifier:
+            self.assertEqual(2, verifier.workers)
+            status, code = zip(*verifier.verify([*documents, tampered, b'<not xml', b'<Envelope/>', *documents]))
+            self.assertEqual([], verifier.verify([]))
+        self.assertEqual(
+            (consts.DSigStatusSucceeded,) * 5
+            + (consts.DSigStatusInvalid, consts.DSigStatusUnknown, consts.DSigStatusUnknown)
+            + (consts.DSigStatusSucceeded,) * 5,
+            status,
+        )
+        self.assertEqual((0,) * 5, code[:5])
+        self.assertEqual(-1, code[6])
+
+    def test_verify_key_data(self):
+        with open(self.path('rsapub.pem'), 'rb') as f:
+            keys = [{'data': f.read(), 'format': consts.KeyDataFormatPem}]
+        with xmlsec.parallel.ProcessVerifier(keys, workers=1) as verifier:
+            self.assertEqual([(consts.DSigStatusSucceeded, 0)], verifier.verify([self.document('sign2-out.xml')]))
+
+    def test_closed(self):
+        verifier = xmlsec.parallel.ProcessVerifier(self.keys(), workers=1)
+        verifier.close()
+        verifier.close()
+        with self.assertRaisesRegex(RuntimeError, 'closed'):
+            verifier.verify([self.document('sign1-out.xml')])
+
+    def test_bad_args(self):
+        pem = self.path('rsapub.pem')
+        with self.assertRaises(TypeError):
+            xmlsec.parallel.ProcessVerifier([pem])
+        with self.assertRaisesRegex(ValueError, 'unknown key spec field'):
+            xmlsec.parallel.ProcessVerifier([{'file': pem, 'fromat': consts.KeyDataFormatPem}])
+        with self.assertRaisesRegex(ValueError, "'format'"):
+            xmlsec.parallel.ProcessVerifier([{'file': pem}])
+        with self.assertRaisesRegex(ValueError, "either 'file' or 'data'"):
+            xmlsec.parallel.ProcessVerifier([{'file': pem, 'data': b'', 'format': consts.KeyDataFormatPem}])
+        with self.assertRaises(xmlsec.Error):
+            xmlsec.parallel.ProcessVerifier([{'file': self.path('sign1-in.xml'), 'format': consts.KeyDataFormatPem}])
+        with self.assertRaises(TypeError):
+            xmlsec.parallel.ProcessVerifier(self.keys(), ids=[1])
+        with self.assertRaises(ValueError):
+            xmlsec.parallel.ProcessVerifier(self.keys(), workers=0)
+        with xmlsec.parallel.ProcessVerifier(self.keys(), workers=1) as verifier, self.assertRaises(TypeError):
+            verifier.verify(['<Envelope/>'])
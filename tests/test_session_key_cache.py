@@ -0,0 +1,120 @@
+import xmlsec
+from tests import base
+
+consts = xmlsec.constants
+
+
+class TestSessionKeyCache(base.TestMemoryLeaks):
+    def manager(self):
+        manager = xmlsec.KeysManager()
+        manager.add_key(xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem))
+        return manager
+
+    def context(self, cache, manager=None):
+        ctx = xmlsec.EncryptionContext(manager if manager is not None else self.manager())
+        ctx.session_key_cache = cache
+        return ctx
+
+    def decrypt(self, ctx, name='enc1-out.xml', tamper=None):
+        root = self.load_xml(name)
+        if tamper is not None:
+            tamper(xmlsec.tree.find_node(root, consts.NodeEncryptedKey, consts.EncNs))
+        try:
+            ctx.decrypt(xmlsec.tree.find_child(root, consts.NodeEncryptedData, consts.EncNs))
+        finally:
+            ctx.reset()
+        return root
+
+    def test_defaults(self):
+        cache = xmlsec.SessionKeyCache()
+        self.assertEqual(128, cache.maxsize)
+        self.assertIsNone(cache.ttl)
+        self.assertEqual((0, 0, 128, 0), cache.info())
+        self.assertEqual(0, len(cache))
+
+    def test_decrypt_cached(self):
+        cache = xmlsec.SessionKeyCache()
+        ctx = self.context(cache)
+        self.assertIs(cache, ctx.session_key_cache)
+        for name in ('enc1-out.xml', 'enc2-out.xml'):
+            for _ in range(3):
+                self.assertEqual(self.load_xml(name.replace('out', 'in')), self.decrypt(ctx, name))
+        self.assertEqual((4, 2, 128, 2), cache.info())
+
+    def test_shared_between_contexts(self):
+        cache = xmlsec.SessionKeyCache()
+        manager = self.manager()
+        self.decrypt(self.context(cache, manager))
+        self.decrypt(self.context(cache, manager))
+        self.assertEqual((1, 1, 128, 1), cache.info())
+
+    def test_bound_to_manager(self):
+        cache = xmlsec.SessionKeyCache()
+        self.decrypt(self.context(cache))
+        # the manager, which has no private key, does not get the cached session key
+        with self.assertRaisesRegex(xmlsec.Error, 'failed to decrypt'):
+            self.decrypt(self.context(cache, xmlsec.KeysManager()))
+        self.assertEqual((0, 2, 128, 1), cache.info())
+
+    def test_changed_encrypted_key(self):
+        cache = xmlsec.SessionKeyCache()
+        ctx = self.context(cache)
+        self.decrypt(ctx)
+        self.decrypt(ctx, tamper=lambda node: node.set('Recipient', 'someone'))
+        self.assertEqual((0, 2, 128, 2), cache.info())
+
+    def test_ttl(self):
+        now = [100.0]
+        cache = xmlsec.SessionKeyCache(ttl=10, timer=lambda: now[0])
+        self.assertEqual(10.0, cache.ttl)
+        ctx = self.context(cache)
+        self.decrypt(ctx)
+        now[0] = 109.5
+        self.decrypt(ctx)
+        now[0] = 110.0
+        self.decrypt(ctx)
+        self.assertEqual((1, 2, 128, 1), cache.info())
+
+    def test_maxsize(self):
+        cache = xmlsec.SessionKeyCache(maxsize=1)
+        ctx = self.context(cache)
+        for name in ('enc1-out.xml', 'enc2-out.xml', 'enc1-out.xml', 'enc1-out.xml'):
+            self.decrypt(ctx, name)
+        self.assertEqual((1, 3, 1, 1), cache.info())
+
+    def test_maxsize_zero(self):
+        cache = xmlsec.SessionKeyCache(maxsize=0)
+        ctx = self.context(cache)
+        self.decrypt(ctx)
+        self.decrypt(ctx)
+        self.assertEqual((0, 2, 0, 0), cache.info())
+
+    def test_clear(self):
+        cache = xmlsec.SessionKeyCache()
+        ctx = self.context(cache)
+        self.decrypt(ctx)
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.decrypt(ctx)
+        self.assertEqual((0, 2, 128, 1), cache.info())
+
+    def test_detach(self):
+        cache = xmlsec.SessionKeyCache()
+        ctx = self.context(cache)
+        ctx.session_key_cache = None
+        self.assertIsNone(ctx.session_key_cache)
+        self.decrypt(ctx)
+        self.assertEqual((0, 0, 128, 0), cache.info())
+
+    def test_bad_args(self):
+        with self.assertRaises(ValueError):
+            xmlsec.SessionKeyCache(maxsize=-1)
+        with self.assertRaises(ValueError):
+            xmlsec.SessionKeyCache(ttl=0)
+        with self.assertRaises(TypeError):
+            xmlsec.SessionKeyCache(ttl='1')
+        with self.assertRaises(TypeError):
+            xmlsec.SessionKeyCache(timer=1)
+        ctx = xmlsec.EncryptionContext()
+        with self.assertRaisesRegex(TypeError, 'instance of \\*xmlsec.SessionKeyCache\\* expected.'):
+            ctx.session_key_cache = {}
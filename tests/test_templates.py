@@ -184,6 +184,19 @@ class TestTemplates(base.TestMemoryLeaks):
         with self.assertRaises(TypeError):
             xmlsec.template.encrypted_data_ensure_cipher_value('')
 
+    def test_encrypted_data_ensure_cipher_reference(self):
+        root = self.load_xml('doc.xml')
+        enc = xmlsec.template.encrypted_data_create(root, method=consts.TransformDes3Cbc)
+        cr = xmlsec.template.encrypted_data_ensure_cipher_reference(enc, 'cipher.bin')
+        self.assertEqual(f'{{{consts.EncNs}}}{consts.NodeCipherReference}', cr.tag)
+        self.assertEqual('cipher.bin', cr.get('URI'))
+        self.assertEqual(f'{{{consts.EncNs}}}{consts.NodeCipherData}', cr.getparent().tag)
+        self.assertEqual(cr, xmlsec.template.encrypted_data_ensure_cipher_reference(enc))
+
+    def test_encrypted_data_ensure_cipher_reference_bad_args(self):
+        with self.assertRaises(TypeError):
+            xmlsec.template.encrypted_data_ensure_cipher_reference('')
+
     def test_encrypted_data_ensure_key_info(self):
         root = self.load_xml('doc.xml')
         enc = xmlsec.template.encrypted_data_create(root, method=consts.TransformDes3Cbc)
@@ -211,3 +224,73 @@ class TestTemplates(base.TestMemoryLeaks):
     def test_transform_add_c14n_inclusive_namespaces_bad_args(self):
         with self.assertRaises(TypeError):
             xmlsec.template.transform_add_c14n_inclusive_namespaces('', [])
+
+    def build_signature_template(self, root):
+        sign = xmlsec.template.create(root, c14n_method=consts.TransformExclC14N, sign_method=consts.TransformRsaSha1)
+        root.append(sign)
+        ref = xmlsec.template.add_reference(sign, consts.TransformSha1)
+        xmlsec.template.add_transform(ref, consts.TransformEnveloped)
+        xmlsec.template.add_key_name(xmlsec.template.ensure_key_info(sign))
+        return sign
+
+    def test_compiled_template_stamp(self):
+        tmpl = xmlsec.template.CompiledTemplate(self.build_signature_template(self.load_xml('doc.xml')))
+        root = self.load_xml('doc.xml')
+        sign = tmpl.stamp(root)
+        self.assertIs(root, sign.getparent())
+        self.assertIs(sign, root[-1])
+        expected = self.build_signature_template(self.load_xml('doc.xml'))
+        self.assertEqual(etree.tostring(expected), etree.tostring(sign))
+
+    def test_compiled_template_stamp_attributes(self):
+        tmpl = xmlsec.template.CompiledTemplate(self.build_signature_template(self.load_xml('doc.xml')))
+        first = tmpl.stamp(self.load_xml('doc.xml'), id='Sig1', uri='#Data1', reference_id='Ref1')
+        second = tmpl.stamp(self.load_xml('doc.xml'), uri='#Data2')
+        self.assertEqual('Sig1', first.get('Id'))
+        ref = xmlsec.tree.find_node(first, consts.NodeReference)
+        self.assertEqual(('#Data1', 'Ref1'), (ref.get('URI'), ref.get('Id')))
+        self.assertIsNone(second.get('Id'))
+        ref = xmlsec.tree.find_node(second, consts.NodeReference)
+        self.assertEqual(('#Data2', None), (ref.get('URI'), ref.get('Id')))
+
+    def test_compiled_template_copies_node(self):
+        parent = etree.Element('{urn:parent}Parent', nsmap={'p': 'urn:parent'})
+        node = etree.SubElement(parent, '{urn:parent}Template')
+        tmpl = xmlsec.template.CompiledTemplate(node)
+        node.set('changed', 'true')
+        del parent
+        stamped = tmpl.stamp(etree.Element('Root'))
+        self.assertEqual(b'<p:Template xmlns:p="urn:parent"/>', etree.tostring(stamped))
+
+    def test_compiled_template_sign(self):
+        tmpl = xmlsec.template.CompiledTemplate(self.build_signature_template(self.load_xml('doc.xml')))
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)
+        root = self.load_xml('doc.xml')
+        sign = tmpl.stamp(root, uri='')
+        ctx.sign(sign)
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        ctx.verify(sign)
+
+    def test_compiled_template_without_reference(self):
+        enc = xmlsec.template.encrypted_data_create(self.load_xml('doc.xml'), consts.TransformAes128Cbc)
+        tmpl = xmlsec.template.CompiledTemplate(enc)
+        root = self.load_xml('doc.xml')
+        with self.assertRaisesRegex(xmlsec.Error, 'template has no reference.'):
+            tmpl.stamp(root, uri='#Data')
+        self.assertEqual(0, len(root.findall(f'{{{consts.EncNs}}}EncryptedData')))
+
+    def test_compiled_template_bad_args(self):
+        with self.assertRaises(TypeError):
+            xmlsec.template.CompiledTemplate('')
+        tmpl = xmlsec.template.CompiledTemplate(etree.Element('Template'))
+        with self.assertRaises(TypeError):
+            tmpl.stamp('')
+        with self.assertRaises(TypeError):
+            tmpl.stamp(etree.Element('Root'), uri=1)
+        with self.assertRaisesRegex(ValueError, 'template is not initialized.'):
+            xmlsec.template.CompiledTemplate.__new__(xmlsec.template.CompiledTemplate).stamp(etree.Element('Root'))
+        with self.assertRaisesRegex(RuntimeError, 'the template is already initialized.'):
+            tmpl.__init__(etree.Element('Other'))
+        self.assertEqual('Template', tmpl.stamp(etree.Element('Root')).tag)
@@ -0,0 +1,235 @@
+from lxml import etree
+
+import xmlsec
+from tests import base
+
+consts = xmlsec.constants
+
+
+class TestVerificationCache(base.TestMemoryLeaks):
+    def context(self, cache, key_name='rsapub.pem', key_format=consts.KeyDataFormatPem):
+        ctx = xmlsec.SignatureContext()
+        ctx.key = xmlsec.Key.from_file(self.path(key_name), format=key_format)
+        ctx.verification_cache = cache
+        return ctx
+
+    def signature(self, name='sign1-out.xml'):
+        return xmlsec.tree.find_node(self.load_xml(name), consts.NodeSignature)
+
+    def verify(self, ctx, name='sign1-out.xml'):
+        try:
+            ctx.verify(self.signature(name))
+        finally:
+            ctx.reset()
+
+    def test_defaults(self):
+        cache = xmlsec.VerificationCache()
+        self.assertEqual(1024, cache.maxsize)
+        self.assertIsNone(cache.ttl)
+        self.assertEqual((0, 0, 1024, 0), cache.info())
+        self.assertEqual(0, len(cache))
+
+    def test_verify_cached(self):
+        cache = xmlsec.VerificationCache()
+        ctx = self.context(cache)
+        self.assertIs(cache, ctx.verification_cache)
+        for _ in range(3):
+            self.verify(ctx)
+        self.assertEqual((2, 1, 1024, 1), cache.info())
+
+    def test_shared_between_contexts(self):
+        cache = xmlsec.VerificationCache()
+        self.verify(self.context(cache))
+        self.verify(self.context(cache))
+        self.assertEqual((1, 1, 1024, 1), cache.info())
+
+    def test_changed_document_is_verified(self):
+        cache = xmlsec.VerificationCache()
+        ctx = self.context(cache)
+        self.verify(ctx)
+        for tamper in (lambda data: setattr(data, 'text', 'tampered'), lambda data: data.set('tampered', '')):
+            root = self.load_xml('sign1-out.xml')
+            tamper(root.find('{urn:envelope}Data'))
+            with self.assertRaises(xmlsec.VerificationError):
+                ctx.verify(xmlsec.tree.find_node(root, consts.NodeSignature))
+            ctx.reset()
+        self.assertEqual((0, 3, 1024, 1), cache.info())
+
+    def test_bound_to_key(self):
+        cache = xmlsec.VerificationCache()
+        self.verify(self.context(cache))
+        ctx = self.context(cache, 'dsakey.der', consts.KeyDataFormatDer)
+        with self.assertRaises(xmlsec.Error):
+            self.verify(ctx)
+        self.assertEqual((0, 2, 1024, 1), cache.info())
+
+    def test_bound_to_manager(self):
+        cache = xmlsec.VerificationCache()
+        contexts = []
+        for _ in range(2):
+            manager = xmlsec.KeysManager()
+            key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+            key.name = 'rsakey.pem'
+            manager.add_key(key)
+            ctx = xmlsec.SignatureContext(manager)
+            ctx.verification_cache = cache
+            contexts.append(ctx)
+        for ctx in contexts * 2:
+            self.verify(ctx)
+        self.assertEqual((2, 2, 1024, 2), cache.info())
+
+    def manager(self):
+        manager = xmlsec.KeysManager()
+        key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        key.name = 'rsakey.pem'
+        manager.add_key(key)
+        return manager
+
+    def test_cached_verification_sets_key(self):
+        cache = xmlsec.VerificationCache()
+        ctx = xmlsec.SignatureContext(self.manager())
+        ctx.verification_cache = cache
+        self.verify(ctx)
+        ctx.verify(self.signature())
+        self.assertEqual((1, 1, 1024, 1), cache.info())
+        self.assertEqual('rsakey.pem', ctx.key.name)
+        report = ctx.report()
+        self.assertTrue(report.cached)
+        self.assertEqual(consts.DSigStatusSucceeded, report.status)
+        ctx.reset()
+        self.assertIsNone(ctx.key)
+
+    def test_bound_to_manager_state(self):
+        cache = xmlsec.VerificationCache()
+        manager = self.manager()
+        ctx = xmlsec.SignatureContext(manager)
+        ctx.verification_cache = cache
+        self.verify(ctx)
+        self.verify(ctx)
+        manager.add_key(xmlsec.Key.from_file(self.path('dsakey.der'), format=consts.KeyDataFormatDer))
+        self.verify(ctx)
+        manager.load_cert(self.path('rsacert.pem'), consts.KeyDataFormatCertPem, consts.KeyDataTypeTrusted)
+        self.verify(ctx)
+        self.verify(ctx)
+        self.assertEqual((2, 3, 1024, 3), cache.info())
+
+    def test_resolver_is_not_cached(self):
+        key = xmlsec.Key.from_file(self.path('rsapub.pem'), format=consts.KeyDataFormatPem)
+        cache = xmlsec.VerificationCache()
+        ctx = xmlsec.SignatureContext(xmlsec.KeysManager(resolver=lambda name, klass, type: key))
+        ctx.verification_cache = cache
+        self.verify(ctx)
+        self.verify(ctx)
+        self.assertEqual((0, 0, 1024, 0), cache.info())
+
+    def test_bound_to_registered_ids(self):
+        # the signed element and its tampered copy have the same id, the reference refers to the registered one
+        signed = self.load_xml('sign4-out.xml')
+        copy = etree.fromstring(etree.tostring(signed))
+        copy.find('{urn:envelope}Data').text = 'tampered'
+        wrapper = etree.Element('Wrapper')
+        wrapper.extend([signed, copy])
+        data = etree.tostring(wrapper)
+        cache = xmlsec.VerificationCache()
+        ctx = self.context(cache)
+        for registered, valid in ((0, True), (1, False), (0, True)):
+            root = etree.fromstring(data)
+            ctx.register_id(root[registered], 'ID')
+            if valid:
+                ctx.verify(xmlsec.tree.find_node(root[0], consts.NodeSignature))
+            else:
+                with self.assertRaises(xmlsec.VerificationError):
+                    ctx.verify(xmlsec.tree.find_node(root[0], consts.NodeSignature))
+            ctx.reset()
+        self.assertEqual((1, 2, 1024, 1), cache.info())
+
+    def test_bound_to_enabled_transforms(self):
+        cache = xmlsec.VerificationCache()
+        ctx = self.context(cache)
+        self.verify(ctx)
+        ctx.enable_signature_transform(consts.TransformRsaSha1)
+        ctx.enable_signature_transform(consts.TransformInclC14N)
+        self.verify(ctx)
+        self.verify(ctx)
+        self.assertEqual((1, 2, 1024, 2), cache.info())
+
+    def test_ttl(self):
+        now = [100.0]
+        cache = xmlsec.VerificationCache(ttl=10, timer=lambda: now[0])
+        self.assertEqual(10.0, cache.ttl)
+        ctx = self.context(cache)
+        self.verify(ctx)
+        now[0] = 109.5
+        self.verify(ctx)
+        now[0] = 110.0
+        self.verify(ctx)
+        self.assertEqual((1, 2, 1024, 1), cache.info())
+
+    def test_maxsize(self):
+        cache = xmlsec.VerificationCache(maxsize=1)
+        ctx = self.context(cache)
+        for name in ('sign1-out.xml', 'sign2-out.xml', 'sign1-out.xml', 'sign1-out.xml'):
+            self.verify(ctx, name)
+        self.assertEqual((1, 3, 1, 1), cache.info())
+
+    def test_maxsize_zero(self):
+        cache = xmlsec.VerificationCache(maxsize=0)
+        ctx = self.context(cache)
+        self.verify(ctx)
+        self.verify(ctx)
+        self.assertEqual((0, 2, 0, 0), cache.info())
+
+    def test_invalidate(self):
+        cache = xmlsec.VerificationCache()
+        ctx = self.context(cache)
+        self.verify(ctx, 'sign1-out.xml')
+        self.verify(ctx, 'sign2-out.xml')
+        self.assertEqual(0, cache.invalidate(xmlsec.Key.from_file(self.path('dsakey.der'), format=consts.KeyDataFormatDer)))
+        # the key is matched by its public part
+        self.assertEqual(2, cache.invalidate(xmlsec.Key.from_file(self.path('rsakey.pem'), format=consts.KeyDataFormatPem)))
+        self.assertEqual(0, len(cache))
+        self.verify(ctx)
+        self.assertEqual(1, cache.invalidate(xmlsec.Key.from_file(self.path('rsacert.pem'), format=consts.KeyDataFormatCertPem)))
+        self.verify(ctx)
+        self.assertEqual(1, cache.invalidate())
+        self.assertEqual((0, 4, 1024, 0), cache.info())
+
+    def test_invalidate_symmetric_key(self):
+        root = self.load_xml('sign1-in.xml')
+        sign = xmlsec.template.create(root, consts.TransformExclC14N, consts.TransformHmacSha256)
+        root.append(sign)
+        ref = xmlsec.template.add_reference(sign, consts.TransformSha256, uri='')
+        xmlsec.template.add_transform(ref, consts.TransformEnveloped)
+        key = xmlsec.Key.from_binary_data(consts.KeyDataHmac, b'secret')
+        ctx = xmlsec.SignatureContext()
+        ctx.key = key
+        ctx.sign(sign)
+        ctx.reset()
+
+        cache = xmlsec.VerificationCache()
+        ctx.verification_cache = cache
+        ctx.verify(sign)
+        ctx.reset()
+        self.assertEqual(0, cache.invalidate(xmlsec.Key.from_binary_data(consts.KeyDataHmac, b'other')))
+        self.assertEqual(1, cache.invalidate(key))
+
+    def test_detach(self):
+        ctx = self.context(xmlsec.VerificationCache())
+        ctx.verification_cache = None
+        self.assertIsNone(ctx.verification_cache)
+        self.verify(ctx)
+
+    def test_bad_args(self):
+        with self.assertRaises(ValueError):
+            xmlsec.VerificationCache(maxsize=-1)
+        with self.assertRaises(ValueError):
+            xmlsec.VerificationCache(ttl=0)
+        with self.assertRaises(TypeError):
+            xmlsec.VerificationCache(ttl='1')
+        with self.assertRaises(TypeError):
+            xmlsec.VerificationCache(timer=1)
+        with self.assertRaisesRegex(TypeError, 'instance of \\*xmlsec.Key\\* expected.'):
+            xmlsec.VerificationCache().invalidate('')
+        ctx = xmlsec.SignatureContext()
+        with self.assertRaisesRegex(TypeError, 'instance of \\*xmlsec.VerificationCache\\* expected.'):
+            ctx.verification_cache = {}